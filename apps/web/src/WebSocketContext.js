@@ -22,7 +22,7 @@ export const WebSocketProvider = ({ children }) => {
 
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const backendUrl = process.env.REACT_APP_BACKEND_URL?.replace(/^https?:\/\//, '') || 'localhost:8001';
-    const wsUrl = `${wsProtocol}//${backendUrl}/ws/${user.company_id}`;
+    const wsUrl = `${wsProtocol}//${backendUrl}/ws/${user.company_id}?token=${encodeURIComponent(localStorage.getItem('token') || '')}`;
 
     try {
       const ws = new WebSocket(wsUrl);
@@ -59,7 +59,7 @@ export const WebSocketProvider = ({ children }) => {
     } catch (error) {
       console.error('WebSocket connection error:', error);
     }
-  }, [user?.company_id, isAuthenticated]);
+  }, [user?.company_id, user?.user_id, isAuthenticated]);
 
   useEffect(() => {
     if (isAuthenticated && user?.company_id) {
@@ -0,0 +1,211 @@
+/*
+  # Partition High-Volume Tables by Month
+
+  ## Modified Tables
+  - `activity_logs` (by `timestamp`), `screenshots` (by `taken_at`) and
+    `gps_locations` (by `timestamp`) become declaratively range-partitioned by
+    calendar month (UTC)
+    - The existing table is attached unchanged as `<table>_p_legacy`, covering
+      everything before the cutover month, so no rows are copied
+    - Monthly partitions are named `<table>_pYYYYMM`; `<table>_p_default`
+      catches rows outside every range and should stay empty
+    - Primary keys become (id, partition column), as Postgres requires, and
+      the partition column is NOT NULL
+    - Composite (user_id, ts) and (company_id, ts) indexes on the parents
+
+  ## New Functions
+  - `create_monthly_partitions(table, months_ahead)` - Creates the partitions
+    for the current month and the next `months_ahead` months; idempotent
+  - `drop_expired_partitions(table, retain_days)` - DETACHes and DROPs every
+    partition whose range ends more than `retain_days` ago; returns their names
+
+  ## Notes
+  - The `maintain_partitions` worker task calls both daily, with retention
+    from ACTIVITY_RETENTION_DAYS, SCREENSHOT_RETENTION_DAYS and
+    GPS_RETENTION_DAYS. Expired data is dropped a month at a time instead of
+    row by row, so it leaves no dead tuples or index bloat behind
+  - Queries prune to the matching partitions only when they filter on the
+    partition column
+  - `time_entries` stays unpartitioned: `screenshots` and other tables
+    reference `entry_id`, which a partitioned key would have to include
+
+  ## Security
+  - RLS enabled on the parents with the previous policies; partitions have
+    RLS enabled and no policies, so they are only reachable via the parent
+  - The functions run DDL and are executable by the service role only
+*/
+
+CREATE OR REPLACE FUNCTION public.create_monthly_partitions(p_table text, p_months_ahead integer DEFAULT 3)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+SET timezone = 'UTC'
+AS $function$
+DECLARE
+  v_month timestamptz := date_trunc('month', now());
+  v_name text;
+  v_created integer := 0;
+BEGIN
+  FOR i IN 0..p_months_ahead LOOP
+    v_name := format('%s_p%s', p_table, to_char(v_month, 'YYYYMM'));
+    IF to_regclass(format('public.%I', v_name)) IS NULL THEN
+      BEGIN
+        EXECUTE format(
+          'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+          v_name, p_table, v_month, v_month + interval '1 month'
+        );
+        EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+        v_created := v_created + 1;
+      EXCEPTION WHEN invalid_object_definition THEN
+        -- Month still covered by the legacy partition
+        NULL;
+      END;
+    END IF;
+    v_month := v_month + interval '1 month';
+  END LOOP;
+  RETURN v_created;
+END;
+$function$;
+
+CREATE OR REPLACE FUNCTION public.drop_expired_partitions(p_table text, p_retain_days integer)
+RETURNS SETOF text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+SET timezone = 'UTC'
+AS $function$
+DECLARE
+  v_cutoff timestamptz := now() - make_interval(days => p_retain_days);
+  r record;
+BEGIN
+  IF p_retain_days IS NULL OR p_retain_days < 1 THEN
+    RAISE EXCEPTION 'retain_days must be at least 1';
+  END IF;
+
+  FOR r IN
+    SELECT c.relname,
+           substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz AS upper_bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = format('public.%I', p_table)::regclass
+    ORDER BY upper_bound
+  LOOP
+    -- The default partition has no upper bound and is never dropped
+    CONTINUE WHEN r.upper_bound IS NULL OR r.upper_bound > v_cutoff;
+    EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', p_table, r.relname);
+    EXECUTE format('DROP TABLE public.%I', r.relname);
+    RETURN NEXT r.relname;
+  END LOOP;
+END;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.create_monthly_partitions(text, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.drop_expired_partitions(text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_monthly_partitions(text, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.drop_expired_partitions(text, integer) TO service_role;
+
+-- One-off conversion; dropped at the end of this migration
+CREATE OR REPLACE FUNCTION public.partition_by_month(p_table text, p_id_column text, p_column text)
+RETURNS void
+LANGUAGE plpgsql
+SET search_path = public
+SET timezone = 'UTC'
+AS $function$
+DECLARE
+  v_legacy text := p_table || '_p_legacy';
+  v_latest timestamptz;
+  v_cutover timestamptz;
+BEGIN
+  EXECUTE format('ALTER TABLE public.%I RENAME TO %I', p_table, v_legacy);
+  EXECUTE format('ALTER INDEX public.%I RENAME TO %I', p_table || '_pkey', v_legacy || '_pkey');
+
+  -- The legacy partition ends at the first month boundary after every stored
+  -- row (clients with skewed clocks can write future timestamps)
+  EXECUTE format('SELECT max(%I) FROM public.%I', p_column, v_legacy) INTO v_latest;
+  v_cutover := greatest(
+    date_trunc('month', now()) + interval '1 month',
+    date_trunc('month', coalesce(v_latest, now())) + interval '1 month'
+  );
+
+  -- Rows without a timestamp cannot be routed; file them under the legacy range
+  EXECUTE format('UPDATE public.%I SET %I = %L WHERE %I IS NULL',
+                 v_legacy, p_column, v_cutover - interval '1 microsecond', p_column);
+  EXECUTE format('ALTER TABLE public.%I ALTER COLUMN %I SET NOT NULL', v_legacy, p_column);
+
+  EXECUTE format(
+    'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+    p_table, v_legacy, p_column
+  );
+  EXECUTE format('ALTER TABLE public.%I ADD PRIMARY KEY (%I, %I)', p_table, p_id_column, p_column);
+
+  -- A matching CHECK lets ATTACH skip its own validation scan
+  EXECUTE format('ALTER TABLE public.%I ADD CONSTRAINT %I CHECK (%I < %L)',
+                 v_legacy, v_legacy || '_bound', p_column, v_cutover);
+  EXECUTE format('ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (MINVALUE) TO (%L)',
+                 p_table, v_legacy, v_cutover);
+  EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', v_legacy, v_legacy || '_bound');
+
+  EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I DEFAULT', p_table || '_p_default', p_table);
+  EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', p_table || '_p_default');
+  PERFORM public.create_monthly_partitions(p_table, 3);
+
+  EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', p_table);
+END;
+$function$;
+
+-- activity_logs
+SELECT public.partition_by_month('activity_logs', 'log_id', 'timestamp');
+
+ALTER TABLE activity_logs
+  ADD CONSTRAINT activity_logs_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+  ADD CONSTRAINT activity_logs_company_id_fkey FOREIGN KEY (company_id) REFERENCES companies(company_id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_activity_logs_user_ts ON activity_logs(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_company_ts ON activity_logs(company_id, timestamp DESC);
+
+CREATE POLICY "Allow all operations on activity_logs"
+  ON activity_logs FOR ALL
+  TO authenticated
+  USING (true)
+  WITH CHECK (true);
+
+-- screenshots
+SELECT public.partition_by_month('screenshots', 'screenshot_id', 'taken_at');
+
+ALTER TABLE screenshots
+  ADD CONSTRAINT screenshots_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+  ADD CONSTRAINT screenshots_company_id_fkey FOREIGN KEY (company_id) REFERENCES companies(company_id) ON DELETE CASCADE,
+  ADD CONSTRAINT screenshots_time_entry_id_fkey FOREIGN KEY (time_entry_id) REFERENCES time_entries(entry_id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_screenshots_user_ts ON screenshots(user_id, taken_at DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshots_company_ts ON screenshots(company_id, taken_at DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshots_time_entry ON screenshots(time_entry_id);
+
+CREATE POLICY "Allow all operations on screenshots"
+  ON screenshots FOR ALL
+  TO authenticated
+  USING (true)
+  WITH CHECK (true);
+
+-- gps_locations
+SELECT public.partition_by_month('gps_locations', 'location_id', 'timestamp');
+
+ALTER TABLE gps_locations
+  ADD CONSTRAINT gps_locations_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+  ADD CONSTRAINT gps_locations_company_id_fkey FOREIGN KEY (company_id) REFERENCES companies(company_id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_gps_locations_user_ts ON gps_locations(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_gps_locations_company_ts ON gps_locations(company_id, timestamp DESC);
+
+CREATE POLICY "Users can view own GPS data"
+  ON gps_locations FOR SELECT
+  TO authenticated
+  USING (true);
+
+CREATE POLICY "Users can insert own GPS data"
+  ON gps_locations FOR INSERT
+  TO authenticated
+  WITH CHECK (true);
+
+DROP FUNCTION public.partition_by_month(text, text, text);
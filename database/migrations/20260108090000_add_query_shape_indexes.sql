@@ -0,0 +1,73 @@
+/*
+  # Add Query-Shape Indexes
+
+  Composite indexes matched to the filters and sort orders the API actually
+  issues, replacing single-column indexes that could serve only the first
+  predicate.
+
+  ## New Indexes
+  - `time_entries`
+    - (company_id, user_id, start_time DESC, entry_id DESC) - Per-user lists,
+      dashboards and keyset pages within a company
+    - (company_id, start_time DESC, entry_id DESC) - Team lists and reports
+    - (user_id, start_time DESC) - Today / week hours, timesheet generation
+    - (user_id) WHERE status = 'active' - The running-timer lookup
+    - (company_id) INCLUDE (user_id) WHERE status = 'active' - Team online
+      count, index-only
+    - (project_id, start_time) INCLUDE (duration) - Project totals and
+      project reports, index-only
+  - `attendance` (company_id, date DESC, attendance_id DESC) - Attendance
+    lists and exports
+  - `timesheets` (company_id) WHERE status = 'pending' - Approval counts
+  - `payroll` (company_id, period_start DESC) - Payroll list
+
+  `activity_logs` (user_id, timestamp DESC) for the latest-activity lookup
+  and the matching `screenshots` / `gps_locations` indexes were created with
+  the partitioned tables (20260107090000).
+
+  ## Removed Indexes
+  - `idx_time_entries_user_id`, `idx_time_entries_company_id`,
+    `idx_time_entries_project_id_fk`, `idx_attendance_company_id_fk`,
+    `idx_payroll_company_id_fk` - Leading-column prefixes of the new indexes,
+    which also serve the foreign keys
+
+  ## Notes
+  - `services/api/scripts/explain_queries.py` EXPLAINs captured API queries
+    and lists those not served by an index; rerun it when adding query shapes
+  - Built inside the migration transaction; on a large production database
+    create them CONCURRENTLY by hand first (IF NOT EXISTS makes this a no-op)
+*/
+
+-- time_entries
+CREATE INDEX IF NOT EXISTS idx_time_entries_company_user_start
+  ON time_entries(company_id, user_id, start_time DESC, entry_id DESC);
+CREATE INDEX IF NOT EXISTS idx_time_entries_company_start
+  ON time_entries(company_id, start_time DESC, entry_id DESC);
+CREATE INDEX IF NOT EXISTS idx_time_entries_user_start
+  ON time_entries(user_id, start_time DESC);
+CREATE INDEX IF NOT EXISTS idx_time_entries_active_user
+  ON time_entries(user_id) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_time_entries_active_company
+  ON time_entries(company_id) INCLUDE (user_id) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_time_entries_project_start
+  ON time_entries(project_id, start_time) INCLUDE (duration);
+
+DROP INDEX IF EXISTS idx_time_entries_user_id;
+DROP INDEX IF EXISTS idx_time_entries_company_id;
+DROP INDEX IF EXISTS idx_time_entries_project_id_fk;
+
+-- attendance
+CREATE INDEX IF NOT EXISTS idx_attendance_company_date
+  ON attendance(company_id, date DESC, attendance_id DESC);
+
+DROP INDEX IF EXISTS idx_attendance_company_id_fk;
+
+-- timesheets
+CREATE INDEX IF NOT EXISTS idx_timesheets_pending_company
+  ON timesheets(company_id) WHERE status = 'pending';
+
+-- payroll
+CREATE INDEX IF NOT EXISTS idx_payroll_company_period
+  ON payroll(company_id, period_start DESC);
+
+DROP INDEX IF EXISTS idx_payroll_company_id_fk;
@@ -0,0 +1,70 @@
+/*
+  # Add Integration Sync State
+
+  ## Modified Tables
+  - `integrations`
+    - `sync_cursors` - Watermark per entity type ({"issues": {"updated_since": ...},
+      "commits": {"repositories": {"owner/repo": {"since": ..., "etag": ...}}}})
+    - `sync_status` - Progress of the current or last run (state, per-entity
+      fetched / synced counts, errors)
+
+  ## New Tables
+  - `integration_entities` - Projects, issues, tasks and commits imported from a
+    provider, one row per (integration, entity type, external id)
+    - `external_key` - Human key where the provider has one (Jira "PROJ-42")
+    - `external_updated_at` - Provider's last-modified time
+    - `data` - Raw provider payload
+  - `integration_worklogs` - Time entries exported as Jira worklogs
+
+  ## Notes
+  - Entities are upserted in batches on the primary key, so re-reading the
+    watermark overlap is harmless
+  - The partial time_entries indexes serve the worklog export scans (stopped
+    entries by end_time and by created_at, in keyset order)
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS sync_cursors JSONB NOT NULL DEFAULT '{}'::jsonb;
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS sync_status JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+CREATE TABLE IF NOT EXISTS integration_entities (
+  integration_id TEXT NOT NULL REFERENCES integrations(integration_id) ON DELETE CASCADE,
+  entity_type TEXT NOT NULL,
+  external_id TEXT NOT NULL,
+  company_id TEXT NOT NULL REFERENCES companies(company_id) ON DELETE CASCADE,
+  external_key TEXT,
+  title TEXT,
+  status TEXT,
+  external_updated_at TIMESTAMPTZ,
+  data JSONB NOT NULL DEFAULT '{}'::jsonb,
+  synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (integration_id, entity_type, external_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_integration_entities_key
+  ON integration_entities(integration_id, entity_type, external_key);
+CREATE INDEX IF NOT EXISTS idx_integration_entities_company
+  ON integration_entities(company_id, entity_type);
+
+ALTER TABLE integration_entities ENABLE ROW LEVEL SECURITY;
+
+CREATE TABLE IF NOT EXISTS integration_worklogs (
+  integration_id TEXT NOT NULL REFERENCES integrations(integration_id) ON DELETE CASCADE,
+  entry_id TEXT NOT NULL REFERENCES time_entries(entry_id) ON DELETE CASCADE,
+  issue_key TEXT NOT NULL,
+  worklog_id TEXT NOT NULL,
+  seconds INTEGER NOT NULL,
+  exported_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (integration_id, entry_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_integration_worklogs_entry ON integration_worklogs(entry_id);
+
+ALTER TABLE integration_worklogs ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_time_entries_stopped_end
+  ON time_entries(company_id, end_time, entry_id) WHERE status = 'stopped';
+CREATE INDEX IF NOT EXISTS idx_time_entries_stopped_created
+  ON time_entries(company_id, created_at, entry_id) WHERE status = 'stopped';
@@ -0,0 +1,104 @@
+/*
+  # Add Chat Store
+
+  ## Modified Tables
+  - `chat_messages`
+    - `content`, `reply_to`, `attachments` - Columns the chat API writes
+      (`message` and `user_name` are no longer required)
+    - `edited` / `edited_at`, `deleted` / `deleted_at` - Edit and soft-delete markers
+  - `chat_channels`
+    - `last_message_at` - Time of the newest message
+
+  ## New Tables
+  - `chat_read_state` - Read position per (channel, user): the newest message
+    read and its created_at
+
+  ## New Functions
+  - `chat_mark_read` - Applies a batch of receipts ([{channel_id, user_id,
+    message_id}]) in one statement. A position only moves forward.
+  - `chat_unread_counts` - Unread messages per channel for one user, counted
+    past the read position and capped at 1000 per channel
+
+  ## Notes
+  - Messages are paged by (channel_id, created_at, message_id) keyset; the
+    composite index serves both scroll directions and the unread counts
+  - Message ids are time-ordered, so the id tiebreak follows send order
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS content TEXT;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS reply_to TEXT;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS attachments JSONB;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS edited BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS edited_at TIMESTAMPTZ;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS deleted BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+ALTER TABLE chat_messages ALTER COLUMN message DROP NOT NULL;
+ALTER TABLE chat_messages ALTER COLUMN user_name DROP NOT NULL;
+
+ALTER TABLE chat_channels ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_channel_keyset
+  ON chat_messages(channel_id, created_at, message_id);
+DROP INDEX IF EXISTS idx_chat_messages_channel_id;
+
+CREATE TABLE IF NOT EXISTS chat_read_state (
+  channel_id TEXT NOT NULL REFERENCES chat_channels(channel_id) ON DELETE CASCADE,
+  user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  last_read_message_id TEXT NOT NULL,
+  last_read_at TIMESTAMPTZ NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (channel_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_read_state_user ON chat_read_state(user_id);
+
+ALTER TABLE chat_read_state ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.chat_mark_read(p_receipts jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  INSERT INTO public.chat_read_state AS rs (channel_id, user_id, last_read_message_id, last_read_at)
+  SELECT r.channel_id, r.user_id, m.message_id, m.created_at
+  FROM jsonb_to_recordset(p_receipts) AS r(channel_id text, user_id text, message_id text)
+  JOIN public.chat_messages m ON m.message_id = r.message_id AND m.channel_id = r.channel_id
+  ON CONFLICT (channel_id, user_id) DO UPDATE
+    SET last_read_message_id = EXCLUDED.last_read_message_id,
+        last_read_at = EXCLUDED.last_read_at,
+        updated_at = NOW()
+    WHERE (EXCLUDED.last_read_at, EXCLUDED.last_read_message_id)
+        > (rs.last_read_at, rs.last_read_message_id);
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$function$;
+
+CREATE OR REPLACE FUNCTION public.chat_unread_counts(p_user_id text, p_channel_ids text[])
+RETURNS TABLE(channel_id text, unread integer)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+  SELECT c.id, (
+    SELECT COUNT(*)::integer FROM (
+      SELECT 1 FROM public.chat_messages m
+      WHERE m.channel_id = c.id
+        AND (rs.last_read_at IS NULL
+             OR (m.created_at, m.message_id) > (rs.last_read_at, rs.last_read_message_id))
+        AND m.user_id IS DISTINCT FROM p_user_id
+        AND NOT m.deleted
+      LIMIT 1000
+    ) capped
+  )
+  FROM unnest(p_channel_ids) AS c(id)
+  LEFT JOIN public.chat_read_state rs ON rs.channel_id = c.id AND rs.user_id = p_user_id;
+$function$;
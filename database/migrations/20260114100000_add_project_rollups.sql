@@ -0,0 +1,33 @@
+/*
+  # Add Project Rollups
+
+  ## New Functions
+  - `project_rollups` - Tracked seconds and task count per project for a
+    page of projects, aggregated in the database (one row per project)
+
+  ## Notes
+  - The project list used to read every time entry and task of the page
+    just to sum durations and count tasks
+  - Served by `idx_time_entries_project_start` (which includes `duration`)
+    and `idx_tasks_project_id`
+  - Projects with no entries or tasks get 0
+*/
+
+CREATE OR REPLACE FUNCTION public.project_rollups(p_company_id text, p_project_ids text[])
+RETURNS TABLE(project_id text, tracked_seconds bigint, task_count integer)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+  SELECT p.id,
+    COALESCE((
+      SELECT SUM(te.duration)::bigint FROM public.time_entries te
+      WHERE te.project_id = p.id AND te.company_id = p_company_id
+    ), 0),
+    (
+      SELECT COUNT(*)::integer FROM public.tasks t
+      WHERE t.project_id = p.id AND t.company_id = p_company_id
+    )
+  FROM unnest(p_project_ids) AS p(id);
+$function$;
@@ -0,0 +1,16 @@
+/*
+  # Record Rejected Worklogs
+
+  ## Modified Tables
+  - `integration_worklogs`
+    - `worklog_id` - Now nullable: NULL when Jira rejected the worklog
+    - `rejected_status` - HTTP status of a permanent rejection (a 4xx other
+      than 401/408/429)
+
+  ## Notes
+  - A rejected entry keeps its row, so the export skips it on later runs
+    instead of holding back the worklog watermark forever
+*/
+
+ALTER TABLE integration_worklogs ALTER COLUMN worklog_id DROP NOT NULL;
+ALTER TABLE integration_worklogs ADD COLUMN IF NOT EXISTS rejected_status INTEGER;
@@ -0,0 +1,32 @@
+/*
+  # Add Scheduled Captures
+
+  ## New Tables
+  - `scheduled_captures` - Persistent due times for screenshot / screen recording timers
+
+  ## Notes
+  - One row per active (kind, entry). `lease_owner` is the API worker that fires it;
+    workers renew their leases in bulk and claim rows whose lease has expired.
+  - Rows are deleted when the time entry stops.
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS scheduled_captures (
+  job_id TEXT PRIMARY KEY,
+  kind TEXT NOT NULL CHECK (kind IN ('screenshot', 'recording')),
+  entry_id TEXT NOT NULL REFERENCES time_entries(entry_id) ON DELETE CASCADE,
+  user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  company_id TEXT NOT NULL REFERENCES companies(company_id) ON DELETE CASCADE,
+  interval_seconds INTEGER,
+  started_at TIMESTAMPTZ DEFAULT NOW(),
+  due_at TIMESTAMPTZ NOT NULL,
+  lease_owner TEXT NOT NULL,
+  lease_expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_scheduled_captures_lease_owner ON scheduled_captures(lease_owner);
+CREATE INDEX IF NOT EXISTS idx_scheduled_captures_lease_expires ON scheduled_captures(lease_expires_at);
+
+ALTER TABLE scheduled_captures ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,166 @@
+/*
+  # Add Usage Counters
+
+  ## New Tables
+  - `usage_counters` - Per company/user/resource/period counts used for plan limits
+  - `report_exports` - Export log counted against the monthly export limit (if missing)
+
+  ## New Functions
+  - `consume_usage_quota` - Atomic check-and-increment in one round trip. Returns
+    whether the increment fit under the limit and the resulting count. A negative
+    limit means unlimited; a negative amount releases quota.
+  - `reconcile_usage_counters` - Recomputes counters for a day/month from the
+    source tables and drops rows for periods older than the retention window
+
+  ## Notes
+  - `user_id` is '' for company-wide counters (exports, integrations)
+  - `period` is 'YYYY-MM-DD' for daily, 'YYYY-MM' for monthly and 'all' for
+    running totals; daily rollover is implicit in the period key
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS usage_counters (
+  company_id TEXT NOT NULL REFERENCES companies(company_id) ON DELETE CASCADE,
+  user_id TEXT NOT NULL DEFAULT '',
+  resource TEXT NOT NULL,
+  period TEXT NOT NULL,
+  count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (company_id, user_id, resource, period)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_counters_period ON usage_counters(resource, period);
+
+ALTER TABLE usage_counters ENABLE ROW LEVEL SECURITY;
+
+CREATE TABLE IF NOT EXISTS report_exports (
+  id BIGSERIAL PRIMARY KEY,
+  report_id TEXT NOT NULL,
+  company_id TEXT REFERENCES companies(company_id) ON DELETE CASCADE,
+  exported_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE report_exports ADD COLUMN IF NOT EXISTS company_id TEXT REFERENCES companies(company_id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_report_exports_company_exported ON report_exports(company_id, exported_at);
+
+ALTER TABLE report_exports ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.consume_usage_quota(
+  p_company_id text,
+  p_user_id text,
+  p_resource text,
+  p_period text,
+  p_amount integer,
+  p_limit integer
+)
+RETURNS TABLE(allowed boolean, used integer)
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  IF p_limit >= 0 AND p_amount > p_limit THEN
+    SELECT uc.count INTO v_count FROM public.usage_counters uc
+    WHERE uc.company_id = p_company_id AND uc.user_id = p_user_id
+      AND uc.resource = p_resource AND uc.period = p_period;
+    RETURN QUERY SELECT false, COALESCE(v_count, 0);
+    RETURN;
+  END IF;
+
+  -- Row lock from ON CONFLICT serializes concurrent increments of one counter
+  INSERT INTO public.usage_counters AS uc (company_id, user_id, resource, period, count)
+  VALUES (p_company_id, p_user_id, p_resource, p_period, GREATEST(p_amount, 0))
+  ON CONFLICT (company_id, user_id, resource, period) DO UPDATE
+    SET count = GREATEST(uc.count + p_amount, 0), updated_at = NOW()
+    WHERE p_limit < 0 OR uc.count + p_amount <= p_limit
+  RETURNING uc.count INTO v_count;
+
+  IF v_count IS NULL THEN
+    -- Conflict row left unchanged: limit reached
+    SELECT uc.count INTO v_count FROM public.usage_counters uc
+    WHERE uc.company_id = p_company_id AND uc.user_id = p_user_id
+      AND uc.resource = p_resource AND uc.period = p_period;
+    RETURN QUERY SELECT false, v_count;
+  ELSE
+    RETURN QUERY SELECT true, v_count;
+  END IF;
+END;
+$function$;
+
+CREATE OR REPLACE FUNCTION public.reconcile_usage_counters(
+  p_day date,
+  p_retention_days integer DEFAULT 35
+)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+DECLARE
+  v_month_start date := date_trunc('month', p_day)::date;
+  v_rows INTEGER := 0;
+  v_changed INTEGER;
+BEGIN
+  -- Screenshots per user per day
+  INSERT INTO public.usage_counters (company_id, user_id, resource, period, count)
+  SELECT s.company_id, s.user_id, 'screenshots', to_char(p_day, 'YYYY-MM-DD'), COUNT(*)
+  FROM public.screenshots s
+  WHERE s.taken_at >= p_day AND s.taken_at < p_day + 1
+  GROUP BY s.company_id, s.user_id
+  ON CONFLICT (company_id, user_id, resource, period) DO UPDATE
+    SET count = EXCLUDED.count, updated_at = NOW()
+    WHERE usage_counters.count IS DISTINCT FROM EXCLUDED.count;
+  GET DIAGNOSTICS v_changed = ROW_COUNT;
+  v_rows := v_rows + v_changed;
+
+  -- Report exports per company per month
+  INSERT INTO public.usage_counters (company_id, user_id, resource, period, count)
+  SELECT e.company_id, '', 'report_exports', to_char(v_month_start, 'YYYY-MM'), COUNT(*)
+  FROM public.report_exports e
+  WHERE e.company_id IS NOT NULL
+    AND e.exported_at >= v_month_start AND e.exported_at < (v_month_start + INTERVAL '1 month')
+  GROUP BY e.company_id
+  ON CONFLICT (company_id, user_id, resource, period) DO UPDATE
+    SET count = EXCLUDED.count, updated_at = NOW()
+    WHERE usage_counters.count IS DISTINCT FROM EXCLUDED.count;
+  GET DIAGNOSTICS v_changed = ROW_COUNT;
+  v_rows := v_rows + v_changed;
+
+  -- Active integrations per company (running total)
+  INSERT INTO public.usage_counters (company_id, user_id, resource, period, count)
+  SELECT i.company_id, '', 'integrations', 'all', COUNT(*)
+  FROM public.integrations i
+  WHERE i.status = 'active'
+  GROUP BY i.company_id
+  ON CONFLICT (company_id, user_id, resource, period) DO UPDATE
+    SET count = EXCLUDED.count, updated_at = NOW()
+    WHERE usage_counters.count IS DISTINCT FROM EXCLUDED.count;
+  GET DIAGNOSTICS v_changed = ROW_COUNT;
+  v_rows := v_rows + v_changed;
+
+  UPDATE public.usage_counters uc SET count = 0, updated_at = NOW()
+  WHERE uc.resource = 'integrations' AND uc.period = 'all' AND uc.count <> 0
+    AND NOT EXISTS (
+      SELECT 1 FROM public.integrations i
+      WHERE i.company_id = uc.company_id AND i.status = 'active'
+    );
+  GET DIAGNOSTICS v_changed = ROW_COUNT;
+  v_rows := v_rows + v_changed;
+
+  -- Rollover cleanup: drop daily/monthly rows past retention
+  DELETE FROM public.usage_counters
+  WHERE period <> 'all'
+    AND period < to_char(p_day - p_retention_days, 'YYYY-MM-DD')
+    AND length(period) = 10;
+  DELETE FROM public.usage_counters
+  WHERE length(period) = 7
+    AND period < to_char(v_month_start - INTERVAL '12 months', 'YYYY-MM');
+
+  RETURN v_rows;
+END;
+$function$;
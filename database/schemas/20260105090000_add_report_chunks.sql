@@ -0,0 +1,57 @@
+/*
+  # Add Chunked Report Storage
+
+  ## New Tables
+  - `generated_reports` - Report handles (if missing): configuration, status and progress
+  - `generated_report_chunks` - Result rows for a report, stored in fixed-size chunks
+
+  ## Modified Tables
+  - `generated_reports`
+    - `status` - running, completed, cancelled or failed
+    - `rows_processed` - Source rows read so far (progress)
+    - `total_records` / `chunk_count` - Result size once completed
+    - `cancel_requested` - Set by the cancel endpoint; checked by the worker per batch
+    - `error`, `completed_at`
+
+  ## Notes
+  - Result rows are no longer stored inline in `generated_reports.data`;
+    the column is kept for reports generated before this migration
+  - Chunks are deleted with their report
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS generated_reports (
+  report_id TEXT PRIMARY KEY,
+  company_id TEXT REFERENCES companies(company_id) ON DELETE CASCADE,
+  report_type TEXT NOT NULL,
+  start_date TEXT,
+  end_date TEXT,
+  config JSONB DEFAULT '{}',
+  data JSONB,
+  generated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS company_id TEXT REFERENCES companies(company_id) ON DELETE CASCADE;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'completed';
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS rows_processed BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS total_records BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS cancel_requested BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS error TEXT;
+ALTER TABLE generated_reports ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_generated_reports_company ON generated_reports(company_id, generated_at DESC);
+
+ALTER TABLE generated_reports ENABLE ROW LEVEL SECURITY;
+
+CREATE TABLE IF NOT EXISTS generated_report_chunks (
+  report_id TEXT NOT NULL REFERENCES generated_reports(report_id) ON DELETE CASCADE,
+  chunk_index INTEGER NOT NULL,
+  rows JSONB NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (report_id, chunk_index)
+);
+
+ALTER TABLE generated_report_chunks ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,45 @@
+/*
+  # Add Background Jobs
+
+  ## New Tables
+  - `jobs` - Work submitted by heavy endpoints (reports, AI analysis, PDFs) and
+    run on the Celery workers
+    - `job_key` - Hash of kind, company and parameters
+    - `queue` - interactive or bulk
+    - `status` - queued, running, succeeded or failed
+    - `result` / `error` - Set when the job finishes
+    - `expires_at` - Until when a succeeded result is served for identical requests
+
+  ## Notes
+  - The partial unique index allows one in-flight (queued or running) job per
+    key, so concurrent identical submissions share a job
+  - Expired results and week-old failures are deleted by the
+    `cleanup_expired_sessions` maintenance task
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS jobs (
+  job_id TEXT PRIMARY KEY,
+  job_key TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  company_id TEXT REFERENCES companies(company_id) ON DELETE CASCADE,
+  user_id TEXT,
+  params JSONB NOT NULL DEFAULT '{}',
+  queue TEXT NOT NULL DEFAULT 'bulk',
+  status TEXT NOT NULL DEFAULT 'queued',
+  cache_ttl INTEGER NOT NULL DEFAULT 0,
+  result JSONB,
+  error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  started_at TIMESTAMPTZ,
+  completed_at TIMESTAMPTZ,
+  expires_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_in_flight_key ON jobs(job_key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_cached_key ON jobs(job_key, expires_at DESC) WHERE status = 'succeeded';
+CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs(company_id, created_at DESC);
+
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,24 @@
+/*
+  # Add Exchange Rates
+
+  ## New Tables
+  - `exchange_rates` - Last known rates fetched from the FX provider
+    - `base` - Pivot currency the rates are quoted against (USD)
+    - `rates` - {currency: units per 1 base}
+    - `fetched_at` - When the provider returned them
+
+  ## Notes
+  - Written after every successful fetch by the API's FX rate service; read
+    by cold workers and when the provider is unavailable
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS exchange_rates (
+  base TEXT PRIMARY KEY,
+  rates JSONB NOT NULL,
+  fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE exchange_rates ENABLE ROW LEVEL SECURITY;
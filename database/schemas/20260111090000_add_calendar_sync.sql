@@ -0,0 +1,60 @@
+/*
+  # Add Calendar Sync
+
+  ## New Tables
+  - `calendar_events` - Local cache of each user's Google / Outlook events,
+    one row per (user, provider, provider event id)
+    - `entry_id` - Time entry the event was pushed from, if any
+    - `is_online_meeting` - Outlook only
+  - `calendar_sync_state` - Incremental sync position per (user, provider)
+    - `sync_token` - Google nextSyncToken or Graph @odata.deltaLink
+    - `window_start` / `window_end` - Range the cache covers (window_end is
+      null for Google, whose sync has no upper bound)
+    - `synced_at` - Last provider sync; reads within the sync interval are
+      served from the cache
+
+  ## Notes
+  - Event changes are upserted in batches on the primary key; removed and
+    cancelled events are deleted
+  - The (user, provider, entry_id) index makes time entry pushes idempotent
+    without calling the provider
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS calendar_events (
+  user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  provider TEXT NOT NULL CHECK (provider IN ('google', 'outlook')),
+  event_id TEXT NOT NULL,
+  summary TEXT,
+  description TEXT,
+  start_at TIMESTAMPTZ,
+  end_at TIMESTAMPTZ,
+  location TEXT,
+  status TEXT,
+  web_link TEXT,
+  is_online_meeting BOOLEAN,
+  entry_id TEXT,
+  synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (user_id, provider, event_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_events_range
+  ON calendar_events(user_id, provider, start_at);
+CREATE INDEX IF NOT EXISTS idx_calendar_events_entry
+  ON calendar_events(user_id, provider, entry_id) WHERE entry_id IS NOT NULL;
+
+ALTER TABLE calendar_events ENABLE ROW LEVEL SECURITY;
+
+CREATE TABLE IF NOT EXISTS calendar_sync_state (
+  user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  provider TEXT NOT NULL CHECK (provider IN ('google', 'outlook')),
+  sync_token TEXT,
+  window_start TIMESTAMPTZ,
+  window_end TIMESTAMPTZ,
+  synced_at TIMESTAMPTZ,
+  PRIMARY KEY (user_id, provider)
+);
+
+ALTER TABLE calendar_sync_state ENABLE ROW LEVEL SECURITY;
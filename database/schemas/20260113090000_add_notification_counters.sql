@@ -0,0 +1,168 @@
+/*
+  # Add Notification Counters
+
+  ## New Tables
+  - `notification_counters` - Unread notifications per (user, company), kept
+    in step with `notifications` by triggers
+
+  ## Modified Tables
+  - `notifications`
+    - Statement-level INSERT / UPDATE / DELETE triggers apply the counter
+      change in the same transaction, one upsert per affected user
+    - Inbox index on (user_id, company_id, created_at, notification_id) for
+      keyset paging
+
+  ## New Functions
+  - `mark_notifications_read` - Marks the given notifications (or all, when
+    no ids are passed) read for one user in one statement and returns how
+    many changed
+  - `notification_counters_on_insert` / `_on_update` / `_on_delete` - Trigger
+    functions reading the statement's transition tables
+
+  ## Notes
+  - Counters are backfilled from existing unread rows
+  - A NULL `read` counts as unread, matching the column default
+
+  ## Security
+  - RLS enabled, service role only
+*/
+
+CREATE TABLE IF NOT EXISTS notification_counters (
+  user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  company_id TEXT NOT NULL REFERENCES companies(company_id) ON DELETE CASCADE,
+  unread INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (user_id, company_id)
+);
+
+ALTER TABLE notification_counters ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_notifications_inbox
+  ON notifications(user_id, company_id, created_at, notification_id);
+
+CREATE OR REPLACE FUNCTION public.notification_counters_apply(p_user_id text, p_company_id text, p_delta integer)
+RETURNS void
+LANGUAGE sql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+  INSERT INTO public.notification_counters AS c (user_id, company_id, unread)
+  VALUES (p_user_id, p_company_id, GREATEST(p_delta, 0))
+  ON CONFLICT (user_id, company_id) DO UPDATE
+    SET unread = GREATEST(c.unread + p_delta, 0),
+        updated_at = NOW();
+$function$;
+
+CREATE OR REPLACE FUNCTION public.notification_counters_on_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+BEGIN
+  PERFORM public.notification_counters_apply(d.user_id, d.company_id, d.delta)
+  FROM (
+    SELECT user_id, company_id, COUNT(*)::integer AS delta
+    FROM new_rows
+    WHERE read IS NOT TRUE
+    GROUP BY user_id, company_id
+    ORDER BY user_id, company_id
+  ) d;
+  RETURN NULL;
+END;
+$function$;
+
+CREATE OR REPLACE FUNCTION public.notification_counters_on_update()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+BEGIN
+  PERFORM public.notification_counters_apply(d.user_id, d.company_id, d.delta)
+  FROM (
+    SELECT user_id, company_id, SUM(delta)::integer AS delta
+    FROM (
+      SELECT user_id, company_id, 1 AS delta FROM new_rows WHERE read IS NOT TRUE
+      UNION ALL
+      SELECT user_id, company_id, -1 AS delta FROM old_rows WHERE read IS NOT TRUE
+    ) changes
+    GROUP BY user_id, company_id
+    HAVING SUM(delta) <> 0
+    ORDER BY user_id, company_id
+  ) d;
+  RETURN NULL;
+END;
+$function$;
+
+CREATE OR REPLACE FUNCTION public.notification_counters_on_delete()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+BEGIN
+  PERFORM public.notification_counters_apply(d.user_id, d.company_id, -d.delta)
+  FROM (
+    SELECT user_id, company_id, COUNT(*)::integer AS delta
+    FROM old_rows
+    WHERE read IS NOT TRUE
+    GROUP BY user_id, company_id
+    ORDER BY user_id, company_id
+  ) d;
+  RETURN NULL;
+END;
+$function$;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS notifications_counters_insert ON notifications;
+CREATE TRIGGER notifications_counters_insert
+  AFTER INSERT ON notifications
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_insert();
+
+DROP TRIGGER IF EXISTS notifications_counters_update ON notifications;
+CREATE TRIGGER notifications_counters_update
+  AFTER UPDATE ON notifications
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_update();
+
+DROP TRIGGER IF EXISTS notifications_counters_delete ON notifications;
+CREATE TRIGGER notifications_counters_delete
+  AFTER DELETE ON notifications
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_delete();
+
+INSERT INTO notification_counters (user_id, company_id, unread)
+SELECT user_id, company_id, COUNT(*)
+FROM notifications
+WHERE read IS NOT TRUE
+GROUP BY user_id, company_id
+ON CONFLICT (user_id, company_id) DO UPDATE
+  SET unread = EXCLUDED.unread,
+      updated_at = NOW();
+
+CREATE OR REPLACE FUNCTION public.mark_notifications_read(
+  p_user_id text,
+  p_company_id text,
+  p_notification_ids text[] DEFAULT NULL
+)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  UPDATE public.notifications
+  SET read = true,
+      read_at = NOW()
+  WHERE user_id = p_user_id
+    AND company_id = p_company_id
+    AND read IS NOT TRUE
+    AND (p_notification_ids IS NULL OR notification_id = ANY(p_notification_ids));
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$function$;
@@ -0,0 +1,37 @@
+/*
+  # Chat Read Receipts Skip Unknown Users
+
+  ## Modified Functions
+  - `chat_mark_read` - Receipts whose user no longer exists (or never did)
+    are skipped instead of failing the whole batch on the
+    `chat_read_state.user_id` foreign key
+
+  ## Notes
+  - Receipts for unknown messages were already skipped by the join on
+    `chat_messages`; unknown users are now filtered the same way
+*/
+
+CREATE OR REPLACE FUNCTION public.chat_mark_read(p_receipts jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $function$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  INSERT INTO public.chat_read_state AS rs (channel_id, user_id, last_read_message_id, last_read_at)
+  SELECT r.channel_id, r.user_id, m.message_id, m.created_at
+  FROM jsonb_to_recordset(p_receipts) AS r(channel_id text, user_id text, message_id text)
+  JOIN public.chat_messages m ON m.message_id = r.message_id AND m.channel_id = r.channel_id
+  JOIN public.users u ON u.user_id = r.user_id
+  ON CONFLICT (channel_id, user_id) DO UPDATE
+    SET last_read_message_id = EXCLUDED.last_read_message_id,
+        last_read_at = EXCLUDED.last_read_at,
+        updated_at = NOW()
+    WHERE (EXCLUDED.last_read_at, EXCLUDED.last_read_message_id)
+        > (rs.last_read_at, rs.last_read_message_id);
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$function$;
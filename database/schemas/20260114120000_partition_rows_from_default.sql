@@ -0,0 +1,75 @@
+/*
+  # Move Default-Partition Rows Into New Monthly Partitions
+
+  ## Modified Functions
+  - `create_monthly_partitions(table, months_ahead)` - When
+    `<table>_p_default` already holds rows for a month (written before its
+    partition existed, e.g. by a client with a skewed clock), they are moved
+    into the new partition before it is attached. Previously creating the
+    partition failed with a check_violation and the month, along with every
+    later one in the run, stayed unpartitioned
+
+  ## Notes
+  - The new month is created as a plain table, filled from the default
+    partition and then ATTACHed, all within the same transaction, so no row
+    is ever visible twice or missing
+  - A month that still fails is reported with a WARNING and skipped; the
+    remaining months are still created
+*/
+
+CREATE OR REPLACE FUNCTION public.create_monthly_partitions(p_table text, p_months_ahead integer DEFAULT 3)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+SET timezone = 'UTC'
+AS $function$
+DECLARE
+  v_month timestamptz := date_trunc('month', now());
+  v_default text := p_table || '_p_default';
+  v_column text;
+  v_name text;
+  v_created integer := 0;
+BEGIN
+  SELECT a.attname INTO v_column
+  FROM pg_partitioned_table pt
+  JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+  WHERE pt.partrelid = format('public.%I', p_table)::regclass;
+
+  FOR i IN 0..p_months_ahead LOOP
+    v_name := format('%s_p%s', p_table, to_char(v_month, 'YYYYMM'));
+    IF to_regclass(format('public.%I', v_name)) IS NULL THEN
+      BEGIN
+        EXECUTE format(
+          'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+          v_name, p_table
+        );
+        IF to_regclass(format('public.%I', v_default)) IS NOT NULL THEN
+          EXECUTE format(
+            'WITH moved AS (DELETE FROM public.%I WHERE %I >= %L AND %I < %L RETURNING *)
+             INSERT INTO public.%I SELECT * FROM moved',
+            v_default, v_column, v_month, v_column, v_month + interval '1 month', v_name
+          );
+        END IF;
+        EXECUTE format(
+          'ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+          p_table, v_name, v_month, v_month + interval '1 month'
+        );
+        EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+        v_created := v_created + 1;
+      EXCEPTION
+        WHEN invalid_object_definition THEN
+          -- Month still covered by the legacy partition
+          NULL;
+        WHEN OTHERS THEN
+          RAISE WARNING 'create_monthly_partitions: % skipped: %', v_name, SQLERRM;
+      END;
+    END IF;
+    v_month := v_month + interval '1 month';
+  END LOOP;
+  RETURN v_created;
+END;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.create_monthly_partitions(text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_monthly_partitions(text, integer) TO service_role;
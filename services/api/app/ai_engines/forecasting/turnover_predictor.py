@@ -11,6 +11,8 @@ import joblib
 from datetime import datetime
 import logging
 
+from app.ai_engines.model_cache import model_cache, CachedModel
+
 logger = logging.getLogger(__name__)
 
 class TurnoverPredictor:
@@ -153,12 +155,24 @@ class TurnoverPredictor:
         }, path)
         logger.info(f"Model saved to {path}")
     
-    def load_model(self, path):
+    def load_model(self, path, mmap_mode=None):
         """Load model from disk"""
-        data = joblib.load(path)
+        self.apply_artifact(joblib.load(path, mmap_mode=mmap_mode))
+        logger.info(f"Model loaded from {path}")
+    
+    def apply_artifact(self, data):
+        """Use model/scaler from a loaded artifact"""
         self.model = data['model']
         self.scaler = data['scaler']
-        logger.info(f"Model loaded from {path}")
+    
+    @classmethod
+    def from_artifact(cls, data=None):
+        """Build predictor from a loaded artifact (untrained if None)"""
+        predictor = cls()
+        if data is not None:
+            predictor.apply_artifact(data)
+        return predictor
 
-# Global instance
-turnover_predictor = TurnoverPredictor()
+# Global instance - resolves lazily to the active production version
+model_cache.register('turnover', TurnoverPredictor.from_artifact)
+turnover_predictor = CachedModel(model_cache, 'turnover')
@@ -7,20 +7,27 @@ from typing import Dict, List, Any
 from datetime import datetime, timedelta
 import logging
 import numpy as np
-from collections import defaultdict
+from collections import deque
+
+from app.ai_governance.drift_sketch import RingBuffer, StreamingDriftEngine
 
 logger = logging.getLogger(__name__)
 
 class DriftDetector:
     """
     Detects model drift and data distribution changes
+    All state is fixed-size: ring buffers for outcomes/confidences and
+    per-feature histogram sketches for inputs
     """
     
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, window_size: int = 1000):
         self.model_name = model_name
+        self.window_size = window_size
         self.baseline_metrics = {}
-        self.recent_predictions = []
-        self.input_distributions = defaultdict(list)
+        self.recent_predictions = deque(maxlen=window_size)
+        self.outcomes = RingBuffer(window_size)  # 1.0 correct / 0.0 incorrect
+        self.confidences = RingBuffer(window_size)
+        self.input_sketches = StreamingDriftEngine(window=window_size)
         self.alert_threshold = 0.15  # 15% degradation triggers alert
         
     def record_prediction(
@@ -47,20 +54,24 @@ class DriftDetector:
             'confidence': confidence
         }
         
+        # deque/ring buffers drop the oldest entry in O(1) once full
         self.recent_predictions.append(record)
         
-        # Keep only last 1000 predictions
-        if len(self.recent_predictions) > 1000:
-            self.recent_predictions = self.recent_predictions[-1000:]
+        if actual is not None:
+            self.outcomes.append(1.0 if self._is_correct(prediction, actual) else 0.0)
+        
+        if confidence is not None:
+            self.confidences.append(confidence)
         
         # Track input distributions
-        for key, value in input_features.items():
-            if isinstance(value, (int, float)):
-                self.input_distributions[key].append(value)
-                
-                # Keep only last 1000 values per feature
-                if len(self.input_distributions[key]) > 1000:
-                    self.input_distributions[key] = self.input_distributions[key][-1000:]
+        self.input_sketches.observe(self.model_name, input_features)
+    
+    def set_input_baseline(self, feature_data: Dict[str, List[float]]):
+        """
+        Set reference input distributions
+        Without this, the first window of observations becomes the baseline
+        """
+        self.input_sketches.set_baseline(self.model_name, feature_data)
     
     def set_baseline(self, metrics: Dict[str, float]):
         """
@@ -87,21 +98,13 @@ class DriftDetector:
         if not self.baseline_metrics:
             return {'drift_detected': False, 'reason': 'No baseline set'}
         
-        # Calculate current metrics from recent predictions
-        predictions_with_actuals = [
-            p for p in self.recent_predictions 
-            if p.get('actual') is not None
-        ]
+        # Calculate current metrics from recent outcomes
+        samples = len(self.outcomes)
         
-        if len(predictions_with_actuals) < 10:
+        if samples < 10:
             return {'drift_detected': False, 'reason': 'Insufficient data'}
         
-        # Calculate accuracy
-        correct = sum(
-            1 for p in predictions_with_actuals 
-            if self._is_correct(p['prediction'], p['actual'])
-        )
-        current_accuracy = correct / len(predictions_with_actuals)
+        current_accuracy = float(self.outcomes.values().mean())
         
         current_metrics = {'accuracy': current_accuracy}
         
@@ -124,7 +127,7 @@ class DriftDetector:
             'current_metrics': current_metrics,
             'baseline_metrics': self.baseline_metrics,
             'degradation': degradation,
-            'samples_evaluated': len(predictions_with_actuals)
+            'samples_evaluated': samples
         }
     
     def check_input_drift(self) -> Dict[str, Any]:
@@ -141,31 +144,21 @@ class DriftDetector:
         drifted_features = []
         details = {}
         
-        for feature, values in self.input_distributions.items():
-            if len(values) < 100:
+        # Baseline vs current window, computed from sketches in O(bins)
+        for feature, metrics in self.input_sketches.compare(self.model_name).items():
+            if metrics['samples'] < 100:
                 continue
             
-            # Split into two halves
-            mid = len(values) // 2
-            old_values = values[:mid]
-            new_values = values[mid:]
-            
-            # Calculate statistics
-            old_mean = np.mean(old_values)
-            new_mean = np.mean(new_values)
-            old_std = np.std(old_values)
-            
-            # Check if mean shifted significantly
-            if old_std > 0:
-                z_score = abs(new_mean - old_mean) / old_std
-                
-                if z_score > 2.0:  # 2 standard deviations
-                    drifted_features.append(feature)
-                    details[feature] = {
-                        'old_mean': float(old_mean),
-                        'new_mean': float(new_mean),
-                        'z_score': float(z_score)
-                    }
+            # Mean shifted by 2 standard deviations, or distribution shape changed
+            if metrics['z_score'] > 2.0 or metrics['drift_detected']:
+                drifted_features.append(feature)
+                details[feature] = {
+                    'old_mean': metrics['baseline_mean'],
+                    'new_mean': metrics['current_mean'],
+                    'z_score': metrics['z_score'],
+                    'psi': metrics['psi'],
+                    'ks_statistic': metrics['ks_statistic']
+                }
         
         drift_detected = len(drifted_features) > 0
         
@@ -192,15 +185,10 @@ class DriftDetector:
                 'confidence_trend': str
             }
         """
-        predictions_with_confidence = [
-            p for p in self.recent_predictions 
-            if p.get('confidence') is not None
-        ]
-        
-        if len(predictions_with_confidence) < 10:
+        if len(self.confidences) < 10:
             return {'drift_detected': False, 'reason': 'Insufficient data'}
         
-        confidences = [p['confidence'] for p in predictions_with_confidence]
+        confidences = self.confidences.values()
         avg_confidence = np.mean(confidences)
         
         # Check if confidence is declining
@@ -0,0 +1,190 @@
+"""
+Model Artifact Cache
+Process-wide, lazily populated cache of loaded model artifacts
+Keyed by (model_name, version) and kept in sync with ModelManager
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+import joblib
+
+from monitoring.metrics import ai_model_cache_requests_total, ai_model_load_duration
+
+from .model_manager import model_manager, ModelManager
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Optional[str]]
+
+
+class ModelCache:
+    """
+    Caches loaded models per (model_name, version)
+
+    - Loads lazily on first use (single load per key, even under concurrency)
+    - Memory-maps joblib arrays so forked workers share the same pages
+    - Hot-swaps when the active version changes in ModelManager
+    - Tracks hit/miss counts and load times
+    """
+
+    def __init__(self, manager: ModelManager, mmap_mode: Optional[str] = 'r'):
+        self.manager = manager
+        self.mmap_mode = mmap_mode
+        self._factories: Dict[str, Callable[[Optional[Dict[str, Any]]], Any]] = {}
+        self._entries: Dict[CacheKey, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[CacheKey, threading.Lock] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'load_errors': 0,
+            'load_seconds_total': 0.0,
+            'last_load_seconds': {}
+        }
+
+        manager.add_listener(self._on_active_version_changed)
+
+    def register(self, model_name: str, factory: Callable[[Optional[Dict[str, Any]]], Any]):
+        """
+        Register how to build a model from its artifact
+
+        Args:
+            model_name: Name used in ModelManager (e.g., 'performance')
+            factory: Called with the loaded artifact dict, or None when no
+                version is active (returns an untrained default instance)
+        """
+        self._factories[model_name] = factory
+
+    def get(self, model_name: str, version: Optional[str] = None) -> Any:
+        """
+        Get model instance, loading it on first use
+
+        Args:
+            model_name: Registered model name
+            version: Explicit version, defaults to the active production version
+        """
+        if version is None:
+            if not self.manager.is_enabled(model_name):
+                raise RuntimeError(f"Model disabled: {model_name}")
+            version = self.manager.get_active_version(model_name)
+
+        key = (model_name, version)
+        model = self._entries.get(key)
+        if model is not None:
+            self._record('hits', model_name)
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished loading while we waited
+            model = self._entries.get(key)
+            if model is not None:
+                self._record('hits', model_name)
+                return model
+
+            self._record('misses', model_name)
+            model = self._load(model_name, version)
+            self._entries[key] = model
+            return model
+
+    def _load(self, model_name: str, version: Optional[str]) -> Any:
+        """Load artifact from disk and build the model instance"""
+        factory = self._factories.get(model_name)
+        if factory is None:
+            raise KeyError(f"No model factory registered for: {model_name}")
+
+        if version is None:
+            return factory(None)
+
+        path = self.manager.get_model_path(model_name, version)
+        if not path:
+            raise KeyError(f"Model version not registered: {model_name} {version}")
+
+        start_time = time.perf_counter()
+        try:
+            artifact = joblib.load(path, mmap_mode=self.mmap_mode)
+            model = factory(artifact)
+        except Exception:
+            self._stats['load_errors'] += 1
+            logger.exception(f"Failed to load model: {model_name} {version} from {path}")
+            raise
+
+        duration = time.perf_counter() - start_time
+        self._stats['loads'] += 1
+        self._stats['load_seconds_total'] += duration
+        self._stats['last_load_seconds'][f"{model_name}:{version}"] = duration
+        ai_model_load_duration.labels(model=model_name).observe(duration)
+
+        logger.info(f"Loaded model {model_name} {version} in {duration:.3f}s")
+        return model
+
+    def _record(self, result: str, model_name: str):
+        self._stats[result] += 1
+        ai_model_cache_requests_total.labels(
+            model=model_name,
+            result='hit' if result == 'hits' else 'miss'
+        ).inc()
+
+    def evict(self, model_name: str, keep_version: Optional[str] = None):
+        """Drop cached versions of a model (except keep_version)"""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == model_name and key[1] != keep_version
+            ]
+            for key in stale:
+                self._entries.pop(key, None)
+                self._key_locks.pop(key, None)
+
+        if stale:
+            logger.info(f"Evicted {len(stale)} cached version(s) of {model_name}")
+
+    def clear(self):
+        """Drop all cached models"""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+
+    def _on_active_version_changed(self, model_name: str, old_version: Optional[str], new_version: Optional[str]):
+        """Hot-swap: subsequent get() calls resolve to new_version"""
+        logger.info(f"Active version changed: {model_name} {old_version} -> {new_version}")
+        self.evict(model_name, keep_version=new_version)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        requests = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'last_load_seconds': dict(self._stats['last_load_seconds']),
+            'hit_rate': self._stats['hits'] / requests if requests else 0.0,
+            'cached_models': sorted(f"{name}:{version}" for name, version in self._entries)
+        }
+
+
+class CachedModel:
+    """
+    Lazy proxy for the active version of a cached model
+
+    Attribute access resolves through the cache on every call, so callers
+    holding the proxy always see the current production version.
+    """
+
+    def __init__(self, cache: ModelCache, model_name: str):
+        self._cache = cache
+        self._model_name = model_name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cache.get(self._model_name), name)
+
+    def __repr__(self) -> str:
+        return f"<CachedModel {self._model_name}>"
+
+
+# Global instance
+model_cache = ModelCache(model_manager)
@@ -6,8 +6,9 @@ Handles versioning, rollback, and kill switches
 import os
 import shutil
 import json
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,10 +22,16 @@ class ModelManager:
     - Model metadata
     """
     
+    # Seconds between on-disk metadata checks (picks up promotions by other processes)
+    METADATA_CHECK_INTERVAL = 1.0
+    
     def __init__(self, models_dir: str = 'models'):
         self.models_dir = models_dir
         self.metadata_file = os.path.join(models_dir, 'metadata.json')
         self.active_models = {}
+        self._metadata_mtime = None
+        self._metadata_checked_at = 0.0
+        self._listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
         self.load_metadata()
     
     def load_metadata(self):
@@ -32,14 +39,65 @@ class ModelManager:
         if os.path.exists(self.metadata_file):
             with open(self.metadata_file, 'r') as f:
                 self.metadata = json.load(f)
+            self._metadata_mtime = os.path.getmtime(self.metadata_file)
         else:
             self.metadata = {'models': {}, 'active': {}}
+            self._metadata_mtime = None
+    
+    def refresh_metadata(self):
+        """
+        Reload metadata only if another process changed it on disk
+        Notifies listeners about active versions that changed
+        """
+        now = time.monotonic()
+        if now - self._metadata_checked_at < self.METADATA_CHECK_INTERVAL:
+            return
+        self._metadata_checked_at = now
+        
+        try:
+            mtime = os.path.getmtime(self.metadata_file)
+        except OSError:
+            return
+        
+        if mtime == self._metadata_mtime:
+            return
+        
+        previous = {
+            name: self._active_version(info)
+            for name, info in self.metadata['active'].items()
+        }
+        self.load_metadata()
+        
+        for name in set(previous) | set(self.metadata['active']):
+            current = self._active_version(self.metadata['active'].get(name, {}))
+            if current != previous.get(name):
+                self._notify(name, previous.get(name), current)
     
     def save_metadata(self):
         """Save model metadata"""
         os.makedirs(self.models_dir, exist_ok=True)
         with open(self.metadata_file, 'w') as f:
             json.dump(self.metadata, f, indent=2)
+        self._metadata_mtime = os.path.getmtime(self.metadata_file)
+    
+    def add_listener(self, callback: Callable[[str, Optional[str], Optional[str]], None]):
+        """
+        Subscribe to active version changes
+        
+        Callback receives (model_name, old_version, new_version)
+        """
+        self._listeners.append(callback)
+    
+    def _notify(self, model_name: str, old_version: Optional[str], new_version: Optional[str]):
+        for callback in self._listeners:
+            try:
+                callback(model_name, old_version, new_version)
+            except Exception as e:
+                logger.error(f"Model version listener failed for {model_name}: {e}")
+    
+    @staticmethod
+    def _active_version(info: Dict[str, Any]) -> Optional[str]:
+        return info.get('version') if info else None
     
     def register_model(
         self,
@@ -99,6 +157,7 @@ class ModelManager:
             logger.info(f"Backed up current model: {backup_path}")
         
         # Promote new model
+        old_version = self.get_active_version(model_name)
         self.metadata['active'][model_name] = {
             'version': version,
             'path': model['path'],
@@ -108,10 +167,38 @@ class ModelManager:
         
         model['status'] = 'production'
         self.save_metadata()
+        self._notify(model_name, old_version, version)
         
         logger.info(f"Promoted to production: {model_name} {version}")
         return True
     
+    def promote_if_validated(self, model_name: str, version: str, metric: str, minimum: float) -> bool:
+        """
+        Promote a registered version if its validation metric passes
+        
+        The metric must reach `minimum` and must not be worse than the live
+        version's. A model switched off by the kill switch is never
+        re-enabled this way; promote it by hand.
+        """
+        model_versions = self.metadata['models'].get(model_name, [])
+        model = next((m for m in model_versions if m['version'] == version), None)
+        score = (model or {}).get('metrics', {}).get(metric)
+        if score is None or score < minimum:
+            logger.warning(f"Not promoting {model_name} {version}: {metric}={score} (minimum {minimum})")
+            return False
+        
+        if not self.is_enabled(model_name):
+            logger.warning(f"Not promoting {model_name} {version}: model is disabled")
+            return False
+        
+        active = next((m for m in model_versions if m['version'] == self.get_active_version(model_name)), None)
+        live_score = (active or {}).get('metrics', {}).get(metric)
+        if live_score is not None and score < live_score:
+            logger.warning(f"Not promoting {model_name} {version}: {metric}={score} below live {live_score}")
+            return False
+        
+        return self.promote_to_production(model_name, version)
+    
     def rollback(self, model_name: str) -> bool:
         """
         ONE-CLICK ROLLBACK
@@ -143,6 +230,7 @@ class ModelManager:
             }
             
             self.save_metadata()
+            self._notify(model_name, current['version'], previous_version)
             return True
         
         return False
@@ -159,15 +247,24 @@ class ModelManager:
             self.metadata['active'][model_name]['status'] = 'disabled'
             self.metadata['active'][model_name]['disabled_at'] = datetime.utcnow().isoformat()
             self.save_metadata()
+            self._notify(model_name, self.metadata['active'][model_name]['version'], None)
     
     def is_enabled(self, model_name: str) -> bool:
         """Check if model is enabled"""
+        self.refresh_metadata()
         model = self.metadata['active'].get(model_name, {})
         return model.get('status') != 'disabled'
     
     def get_active_version(self, model_name: str) -> Optional[str]:
         """Get currently active model version"""
-        return self.metadata['active'].get(model_name, {}).get('version')
+        self.refresh_metadata()
+        return self._active_version(self.metadata['active'].get(model_name, {}))
+    
+    def get_model_path(self, model_name: str, version: str) -> Optional[str]:
+        """Get artifact path for a registered model version"""
+        model_versions = self.metadata['models'].get(model_name, [])
+        model = next((m for m in model_versions if m['version'] == version), None)
+        return model['path'] if model else None
     
     def list_versions(self, model_name: str) -> list:
         """List all versions of a model"""
@@ -13,6 +13,8 @@ import joblib
 from datetime import datetime, timedelta
 import logging
 
+from app.ai_engines.model_cache import model_cache, CachedModel
+
 logger = logging.getLogger(__name__)
 
 class PerformancePredictor:
@@ -197,13 +199,25 @@ class PerformancePredictor:
         }, path)
         logger.info(f"Model saved to {path}")
     
-    def load_model(self, path):
+    def load_model(self, path, mmap_mode=None):
         """Load model from disk"""
-        data = joblib.load(path)
+        self.apply_artifact(joblib.load(path, mmap_mode=mmap_mode))
+        logger.info(f"Model loaded from {path}")
+    
+    def apply_artifact(self, data):
+        """Use model/scaler from a loaded artifact"""
         self.model = data['model']
         self.scaler = data['scaler']
         self.feature_names = data['feature_names']
-        logger.info(f"Model loaded from {path}")
+    
+    @classmethod
+    def from_artifact(cls, data=None):
+        """Build predictor from a loaded artifact (untrained if None)"""
+        predictor = cls()
+        if data is not None:
+            predictor.apply_artifact(data)
+        return predictor
 
-# Global instance
-performance_predictor = PerformancePredictor()
+# Global instance - resolves lazily to the active production version
+model_cache.register('performance', PerformancePredictor.from_artifact)
+performance_predictor = CachedModel(model_cache, 'performance')
@@ -9,6 +9,7 @@ from .fallback_handler import FallbackHandler
 from .explainability import ExplainabilityEngine
 from .bias_detection import BiasDetector
 from .drift_monitor import DriftMonitor
+from .drift_sketch import StreamingDriftEngine
 from .ai_audit_logs import AIAuditLogger
 from .human_override import HumanOverride
 from .kill_switch import AIKillSwitch
@@ -21,6 +22,7 @@ __all__ = [
     'ExplainabilityEngine',
     'BiasDetector',
     'DriftMonitor',
+    'StreamingDriftEngine',
     'AIAuditLogger',
     'HumanOverride',
     'AIKillSwitch',
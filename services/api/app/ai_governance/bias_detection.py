@@ -2,7 +2,7 @@
 AI Bias Detection & Monitoring
 Enterprise requirement: Detect and prevent biased AI decisions
 """
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from enum import Enum
 import numpy as np
 
@@ -22,15 +22,40 @@ class BiasMetric(Enum):
     DISPARATE_IMPACT = "disparate_impact"
 
 class BiasDetector:
-    """Detects bias in AI predictions"""
+    """
+    Detects bias in AI predictions
+    
+    Works on columns: predictions/outcomes are converted to boolean arrays
+    once, each protected attribute is grouped once (np.unique + bincount),
+    and all metrics are derived from the same per-group counts.
+    """
     
     # Thresholds for bias detection
     DISPARATE_IMPACT_THRESHOLD = 0.8  # 80% rule
     DEMOGRAPHIC_PARITY_THRESHOLD = 0.1  # 10% difference max
+    EQUAL_OPPORTUNITY_THRESHOLD = 0.1  # 10% TPR difference max
+    
+    POSITIVE_LABELS = ('true', 'yes', '1', 'positive', 'high')
+    
+    # Bootstrap settings for confidence intervals
+    BOOTSTRAP_SAMPLES = 1000
+    CONFIDENCE_LEVEL = 0.95
+    
+    def __init__(self, random_state: Optional[int] = None):
+        self.rng = np.random.default_rng(random_state)
     
     def check_bias(self, predictions: List[Any], protected_attributes: Dict[str, List[Any]], 
-                   actual_outcomes: List[Any] = None) -> Dict:
-        """Check for bias in predictions"""
+                   actual_outcomes: List[Any] = None,
+                   bootstrap_samples: Optional[int] = None) -> Dict:
+        """
+        Check for bias in predictions
+        
+        Args:
+            predictions: Model outputs (bool, score > 0.5, or 'yes'/'high'/...)
+            protected_attributes: {attribute_name: group value per prediction}
+            actual_outcomes: Ground truth, enables equal opportunity check
+            bootstrap_samples: Resamples for confidence intervals (0 disables)
+        """
         
         bias_report = {
             'has_bias': False,
@@ -39,32 +64,28 @@ class BiasDetector:
             'recommendations': []
         }
         
+        if bootstrap_samples is None:
+            bootstrap_samples = self.BOOTSTRAP_SAMPLES
+        
+        predicted_positive = self._positive_mask(predictions)
+        actual_positive = self._positive_mask(actual_outcomes) if actual_outcomes else None
+        
         for attr_name, attr_values in protected_attributes.items():
-            # Check demographic parity
-            parity_result = self._check_demographic_parity(predictions, attr_values)
-            bias_report['metrics'][f'{attr_name}_demographic_parity'] = parity_result
-            
-            if parity_result['biased']:
-                bias_report['has_bias'] = True
-                bias_report['bias_detected_in'].append(attr_name)
-            
-            # Check disparate impact
-            impact_result = self._check_disparate_impact(predictions, attr_values)
-            bias_report['metrics'][f'{attr_name}_disparate_impact'] = impact_result
+            counts = self._group_counts(attr_values, predicted_positive, actual_positive)
             
-            if impact_result['biased']:
-                bias_report['has_bias'] = True
-                if attr_name not in bias_report['bias_detected_in']:
-                    bias_report['bias_detected_in'].append(attr_name)
+            results = {
+                'demographic_parity': self._check_demographic_parity(counts, bootstrap_samples),
+                'disparate_impact': self._check_disparate_impact(counts, bootstrap_samples)
+            }
             
             # If actual outcomes provided, check equal opportunity
-            if actual_outcomes:
-                eq_opp_result = self._check_equal_opportunity(
-                    predictions, attr_values, actual_outcomes
-                )
-                bias_report['metrics'][f'{attr_name}_equal_opportunity'] = eq_opp_result
+            if actual_positive is not None:
+                results['equal_opportunity'] = self._check_equal_opportunity(counts, bootstrap_samples)
+            
+            for metric_name, result in results.items():
+                bias_report['metrics'][f'{attr_name}_{metric_name}'] = result
                 
-                if eq_opp_result['biased']:
+                if result['biased']:
                     bias_report['has_bias'] = True
                     if attr_name not in bias_report['bias_detected_in']:
                         bias_report['bias_detected_in'].append(attr_name)
@@ -77,108 +98,161 @@ class BiasDetector:
         
         return bias_report
     
-    def _check_demographic_parity(self, predictions: List, attributes: List) -> Dict:
-        """Check if positive outcome rate is similar across groups"""
-        groups = {}
+    def _positive_mask(self, values: List[Any]) -> np.ndarray:
+        """Vectorized _is_positive over a column"""
+        array = np.asarray(values)
+        
+        if array.dtype == np.bool_:
+            return array
+        if np.issubdtype(array.dtype, np.number):
+            return array > 0.5
+        if array.dtype.kind == 'U' and all(isinstance(v, str) for v in values):
+            return np.isin(np.char.lower(array), list(self.POSITIVE_LABELS))
+        
+        # Mixed types - fall back to per-element check
+        return np.fromiter((self._is_positive(v) for v in values), dtype=bool, count=len(values))
+    
+    def _group_counts(self, attributes: List[Any], predicted_positive: np.ndarray,
+                      actual_positive: Optional[np.ndarray]) -> Dict[str, Any]:
+        """Group once and count totals, positives and true positives per group"""
+        array = np.asarray(attributes)
         
-        # Group by attribute
-        for pred, attr in zip(predictions, attributes):
-            if attr not in groups:
-                groups[attr] = []
-            groups[attr].append(pred)
+        if array.dtype == object:
+            # Unsortable mixes (e.g., None and str) - assign codes in first-seen order
+            codes = {}
+            inverse = np.fromiter(
+                (codes.setdefault(a, len(codes)) for a in attributes),
+                dtype=np.intp, count=len(attributes)
+            )
+            groups = list(codes)
+        else:
+            unique, inverse = np.unique(array, return_inverse=True)
+            groups = unique.tolist()
+        
+        inverse = inverse.ravel()
+        n_groups = len(groups)
         
-        # Calculate positive rate for each group
-        positive_rates = {}
-        for group, preds in groups.items():
-            positive_count = sum(1 for p in preds if self._is_positive(p))
-            positive_rates[group] = positive_count / len(preds) if preds else 0
+        counts = {
+            'groups': groups,
+            'total': np.bincount(inverse, minlength=n_groups),
+            'positive': np.bincount(inverse, weights=predicted_positive, minlength=n_groups)
+        }
+        
+        if actual_positive is not None:
+            counts['actual_positive'] = np.bincount(inverse, weights=actual_positive, minlength=n_groups)
+            counts['true_positive'] = np.bincount(
+                inverse, weights=predicted_positive & actual_positive, minlength=n_groups
+            )
+        
+        return counts
+    
+    @staticmethod
+    def _rates(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        return np.divide(
+            numerator, denominator,
+            out=np.zeros(len(numerator), dtype=np.float64),
+            where=denominator > 0
+        )
+    
+    def _bootstrap_rates(self, trials: np.ndarray, rates: np.ndarray, samples: int) -> np.ndarray:
+        """
+        Stratified bootstrap of per-group rates, shape (samples, groups)
+        
+        Resampling a group's n rows with replacement yields a positive count
+        distributed Binomial(n, rate), so all replicates are drawn in one call
+        instead of materializing resampled index arrays.
+        """
+        trials = trials.astype(np.int64)
+        draws = self.rng.binomial(trials, rates, size=(samples, len(rates)))
+        return self._rates(draws.ravel(), np.tile(trials, samples)).reshape(samples, len(rates))
+    
+    def _confidence_interval(self, replicates: np.ndarray) -> List[float]:
+        alpha = (1 - self.CONFIDENCE_LEVEL) / 2
+        low, high = np.quantile(replicates, [alpha, 1 - alpha])
+        return [float(low), float(high)]
+    
+    def _check_demographic_parity(self, counts: Dict[str, Any], bootstrap_samples: int) -> Dict:
+        """Check if positive outcome rate is similar across groups"""
+        rates = self._rates(counts['positive'], counts['total'])
+        positive_rates = dict(zip(counts['groups'], rates.tolist()))
         
         # Check if rates are similar
         if len(positive_rates) > 1:
-            max_rate = max(positive_rates.values())
-            min_rate = min(positive_rates.values())
-            difference = max_rate - min_rate
+            difference = float(rates.max() - rates.min())
             
             biased = difference > self.DEMOGRAPHIC_PARITY_THRESHOLD
             
-            return {
+            result = {
                 'biased': biased,
                 'difference': difference,
                 'rates_by_group': positive_rates,
                 'threshold': self.DEMOGRAPHIC_PARITY_THRESHOLD
             }
+            
+            if bootstrap_samples:
+                replicates = self._bootstrap_rates(counts['total'], rates, bootstrap_samples)
+                result['confidence_interval'] = self._confidence_interval(
+                    replicates.max(axis=1) - replicates.min(axis=1)
+                )
+            
+            return result
         
         return {'biased': False, 'rates_by_group': positive_rates}
     
-    def _check_disparate_impact(self, predictions: List, attributes: List) -> Dict:
+    def _check_disparate_impact(self, counts: Dict[str, Any], bootstrap_samples: int) -> Dict:
         """Check 80% rule - ratio of selection rates"""
-        groups = {}
-        
-        # Group by attribute
-        for pred, attr in zip(predictions, attributes):
-            if attr not in groups:
-                groups[attr] = []
-            groups[attr].append(pred)
-        
-        # Calculate selection rates
-        selection_rates = {}
-        for group, preds in groups.items():
-            positive_count = sum(1 for p in preds if self._is_positive(p))
-            selection_rates[group] = positive_count / len(preds) if preds else 0
+        rates = self._rates(counts['positive'], counts['total'])
+        selection_rates = dict(zip(counts['groups'], rates.tolist()))
         
         # Calculate disparate impact ratio
         if len(selection_rates) >= 2:
-            max_rate = max(selection_rates.values())
-            min_rate = min(selection_rates.values())
+            max_rate = rates.max()
             
             if max_rate > 0:
-                ratio = min_rate / max_rate
+                ratio = float(rates.min() / max_rate)
                 biased = ratio < self.DISPARATE_IMPACT_THRESHOLD
                 
-                return {
+                result = {
                     'biased': biased,
                     'ratio': ratio,
                     'selection_rates': selection_rates,
                     'threshold': self.DISPARATE_IMPACT_THRESHOLD
                 }
+                
+                if bootstrap_samples:
+                    replicates = self._bootstrap_rates(counts['total'], rates, bootstrap_samples)
+                    result['confidence_interval'] = self._confidence_interval(
+                        self._rates(replicates.min(axis=1), replicates.max(axis=1))
+                    )
+                
+                return result
         
         return {'biased': False, 'selection_rates': selection_rates}
     
-    def _check_equal_opportunity(self, predictions: List, attributes: List, 
-                                 actual_outcomes: List) -> Dict:
+    def _check_equal_opportunity(self, counts: Dict[str, Any], bootstrap_samples: int) -> Dict:
         """Check if true positive rate is equal across groups"""
-        groups = {}
-        
-        # Group by attribute
-        for pred, attr, actual in zip(predictions, attributes, actual_outcomes):
-            if attr not in groups:
-                groups[attr] = {'tp': 0, 'fn': 0}
-            
-            if self._is_positive(actual):
-                if self._is_positive(pred):
-                    groups[attr]['tp'] += 1
-                else:
-                    groups[attr]['fn'] += 1
-        
-        # Calculate true positive rates
-        tpr_by_group = {}
-        for group, counts in groups.items():
-            total_positives = counts['tp'] + counts['fn']
-            tpr_by_group[group] = counts['tp'] / total_positives if total_positives > 0 else 0
+        tpr = self._rates(counts['true_positive'], counts['actual_positive'])
+        tpr_by_group = dict(zip(counts['groups'], tpr.tolist()))
         
         # Check if rates are similar
         if len(tpr_by_group) > 1:
-            max_tpr = max(tpr_by_group.values())
-            min_tpr = min(tpr_by_group.values())
-            difference = max_tpr - min_tpr
+            difference = float(tpr.max() - tpr.min())
             
-            biased = difference > 0.1  # 10% threshold
+            biased = difference > self.EQUAL_OPPORTUNITY_THRESHOLD
             
-            return {
+            result = {
                 'biased': biased,
                 'difference': difference,
                 'tpr_by_group': tpr_by_group
             }
+            
+            if bootstrap_samples:
+                replicates = self._bootstrap_rates(counts['actual_positive'], tpr, bootstrap_samples)
+                result['confidence_interval'] = self._confidence_interval(
+                    replicates.max(axis=1) - replicates.min(axis=1)
+                )
+            
+            return result
         
         return {'biased': False, 'tpr_by_group': tpr_by_group}
     
@@ -189,7 +263,7 @@ class BiasDetector:
         elif isinstance(prediction, (int, float)):
             return prediction > 0.5
         elif isinstance(prediction, str):
-            return prediction.lower() in ['true', 'yes', '1', 'positive', 'high']
+            return prediction.lower() in self.POSITIVE_LABELS
         return False
     
     def _generate_recommendations(self, biased_attributes: List[str]) -> List[str]:
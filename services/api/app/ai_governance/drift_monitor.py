@@ -4,10 +4,11 @@ Detects data drift and concept drift in production models
 """
 from typing import Dict, List
 import numpy as np
-from scipy import stats
 from datetime import datetime, timedelta
 import logging
 
+from .drift_sketch import StreamingHistogram, StreamingDriftEngine, quantile_edges
+
 logger = logging.getLogger(__name__)
 
 class DriftMonitor:
@@ -19,10 +20,14 @@ class DriftMonitor:
     ACCURACY_DROP_ALERT = 0.05  # 5% accuracy drop
     ACCURACY_DROP_CRITICAL = 0.10  # 10% accuracy drop
     
-    def __init__(self):
+    # Bins for baseline histograms (equal-mass, from baseline quantiles)
+    HISTOGRAM_BINS = 10
+    
+    def __init__(self, window_size: int = 1000):
         self.baseline_distributions = {}
         self.performance_history = {}
         self.drift_alerts = []
+        self.stream = StreamingDriftEngine(window=window_size, bins=self.HISTOGRAM_BINS)
     
     def set_baseline(self, model_name: str, feature_data: Dict[str, List]):
         """Set baseline distribution for drift detection"""
@@ -30,8 +35,29 @@ class DriftMonitor:
             feature_name: self._calculate_distribution(values)
             for feature_name, values in feature_data.items()
         }
+        self.stream.set_baseline(model_name, feature_data)
         logger.info(f"Baseline set for model: {model_name}")
     
+    def observe(self, model_name: str, features: Dict[str, float]):
+        """Record one production input for streaming drift detection"""
+        self.stream.observe(model_name, features)
+    
+    def detect_streaming_drift(self, model_name: str) -> Dict:
+        """Detect drift of the sliding window of observed inputs vs baseline"""
+        metrics = self.stream.compare(model_name)
+        drift_results = {
+            'model': model_name,
+            'timestamp': datetime.utcnow().isoformat(),
+            'has_drift': any(m['drift_detected'] for m in metrics.values()),
+            'features_with_drift': [f for f, m in metrics.items() if m['drift_detected']],
+            'metrics': metrics
+        }
+        
+        if drift_results['has_drift']:
+            self._log_drift_alert(model_name, drift_results)
+        
+        return drift_results
+    
     def detect_data_drift(self, model_name: str, current_data: Dict[str, List]) -> Dict:
         """Detect statistical drift in input data"""
         if model_name not in self.baseline_distributions:
@@ -50,17 +76,16 @@ class DriftMonitor:
             if feature_name not in baseline:
                 continue
             
+            # Bin current values on the baseline edges, then compare in O(bins)
+            baseline_hist = baseline[feature_name]
+            current_hist = StreamingHistogram(baseline_hist.bin_edges)
+            current_hist.add_many(current_values)
+            
             # Calculate PSI (Population Stability Index)
-            psi = self._calculate_psi(
-                baseline[feature_name],
-                self._calculate_distribution(current_values)
-            )
+            psi = current_hist.psi(baseline_hist)
             
             # Calculate KS statistic
-            ks_stat = self._calculate_ks_statistic(
-                baseline[feature_name]['values'],
-                current_values
-            )
+            ks_stat = current_hist.ks(baseline_hist)
             
             drift_results['metrics'][feature_name] = {
                 'psi': psi,
@@ -154,40 +179,11 @@ class DriftMonitor:
             'trend': self._calculate_trend(accuracies)
         }
     
-    def _calculate_distribution(self, values: List) -> Dict:
-        """Calculate distribution statistics"""
-        values_array = np.array(values)
-        
-        # Create bins for PSI calculation
-        bins = 10
-        hist, bin_edges = np.histogram(values_array, bins=bins)
-        
-        return {
-            'values': values,
-            'mean': np.mean(values_array),
-            'std': np.std(values_array),
-            'histogram': hist.tolist(),
-            'bin_edges': bin_edges.tolist()
-        }
-    
-    def _calculate_psi(self, baseline_dist: Dict, current_dist: Dict) -> float:
-        """Calculate Population Stability Index"""
-        baseline_hist = np.array(baseline_dist['histogram']) + 1e-10  # Avoid div by zero
-        current_hist = np.array(current_dist['histogram']) + 1e-10
-        
-        # Normalize
-        baseline_prop = baseline_hist / baseline_hist.sum()
-        current_prop = current_hist / current_hist.sum()
-        
-        # Calculate PSI
-        psi = np.sum((current_prop - baseline_prop) * np.log(current_prop / baseline_prop))
-        
-        return float(psi)
-    
-    def _calculate_ks_statistic(self, baseline_values: List, current_values: List) -> float:
-        """Calculate Kolmogorov-Smirnov statistic"""
-        ks_stat, _ = stats.ks_2samp(baseline_values, current_values)
-        return float(ks_stat)
+    def _calculate_distribution(self, values: List) -> StreamingHistogram:
+        """Calculate distribution sketch (histogram + moments, no raw values)"""
+        histogram = StreamingHistogram(quantile_edges(values, self.HISTOGRAM_BINS))
+        histogram.add_many(values)
+        return histogram
     
     def _calculate_accuracy(self, predictions: List, actuals: List) -> float:
         """Calculate prediction accuracy"""
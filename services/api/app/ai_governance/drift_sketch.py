@@ -0,0 +1,252 @@
+"""
+Streaming Drift Sketches
+Fixed-memory ring buffers and histograms for online drift detection
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-10  # Avoid div by zero / log(0) in PSI
+
+
+class RingBuffer:
+    """Fixed-capacity circular float array with O(1) append"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float64)
+        self._head = 0  # Next write position
+        self._size = 0
+
+    def append(self, value: float) -> Optional[float]:
+        """Append value, returning the evicted value when full"""
+        evicted = float(self._data[self._head]) if self._size == self.capacity else None
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return evicted
+
+    def values(self) -> np.ndarray:
+        """Values in insertion order (oldest first)"""
+        if self._size < self.capacity:
+            return self._data[:self._size]
+        return np.concatenate((self._data[self._head:], self._data[:self._head]))
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class StreamingHistogram:
+    """
+    Histogram over fixed bin edges with an optional sliding window
+
+    The first and last bins are open-ended. When window is set,
+    the oldest value's bin is decremented as it leaves the window, so
+    counts always describe the last `window` observations.
+    """
+
+    def __init__(self, bin_edges: np.ndarray, window: Optional[int] = None):
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.bin_edges) + 1, dtype=np.int64)
+        self._window = RingBuffer(window) if window else None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def _bin(self, values):
+        return np.searchsorted(self.bin_edges, values, side='right')
+
+    def add(self, value: float):
+        self.counts[self._bin(value)] += 1
+        self._sum += value
+        self._sum_sq += value * value
+
+        if self._window is not None:
+            evicted = self._window.append(value)
+            if evicted is not None:
+                self.counts[self._bin(evicted)] -= 1
+                self._sum -= evicted
+                self._sum_sq -= evicted * evicted
+
+    def add_many(self, values: Iterable[float]):
+        values = np.asarray(values, dtype=np.float64)
+        if self._window is not None:
+            for value in values:
+                self.add(float(value))
+            return
+
+        np.add.at(self.counts, self._bin(values), 1)
+        self._sum += float(values.sum())
+        self._sum_sq += float(np.square(values).sum())
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total if self.total else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.total:
+            return 0.0
+        variance = self._sum_sq / self.total - self.mean ** 2
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def proportions(self) -> np.ndarray:
+        counts = self.counts + EPSILON
+        return counts / counts.sum()
+
+    def psi(self, other: 'StreamingHistogram') -> float:
+        """Population Stability Index against other (same edges), O(bins)"""
+        expected = other.proportions()
+        actual = self.proportions()
+        return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    def ks(self, other: 'StreamingHistogram') -> float:
+        """
+        Kolmogorov-Smirnov statistic against other (same edges), O(bins)
+        Evaluated at bin edges, so it is a lower bound on the exact statistic
+        """
+        if not self.total or not other.total:
+            return 0.0
+        cdf_self = np.cumsum(self.counts) / self.total
+        cdf_other = np.cumsum(other.counts) / other.total
+        return float(np.max(np.abs(cdf_self - cdf_other)))
+
+    def snapshot(self) -> Dict:
+        """Serializable summary (no raw values)"""
+        return {
+            'mean': self.mean,
+            'std': self.std,
+            'count': self.total,
+            'histogram': self.counts.tolist(),
+            'bin_edges': self.bin_edges.tolist()
+        }
+
+
+def quantile_edges(values: Iterable[float], bins: int) -> np.ndarray:
+    """Bin edges at baseline quantiles (equal-mass bins give stable PSI)"""
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+    if len(edges) == 0:
+        edges = np.array([float(values[0]) if len(values) else 0.0])
+    return edges
+
+
+class FeatureDriftSketch:
+    """
+    Baseline + sliding-window sketch for one feature
+
+    Without an explicit baseline, the first `window` observations are
+    buffered and then frozen as the baseline.
+    """
+
+    def __init__(self, window: int = 1000, bins: int = 10):
+        self.window = window
+        self.bins = bins
+        self.baseline: Optional[StreamingHistogram] = None
+        self.current: Optional[StreamingHistogram] = None
+        self._warmup = RingBuffer(window)
+
+    def set_baseline(self, values: Iterable[float]):
+        values = np.asarray(values, dtype=np.float64)
+        edges = quantile_edges(values, self.bins)
+        self.baseline = StreamingHistogram(edges)
+        self.baseline.add_many(values)
+        self.current = StreamingHistogram(edges, window=self.window)
+        self._warmup = None
+
+    def add(self, value: float):
+        if self.current is not None:
+            self.current.add(value)
+            return
+
+        self._warmup.append(value)
+        if len(self._warmup) == self.window:
+            self.set_baseline(self._warmup.values())
+
+    def compare(self) -> Optional[Dict[str, float]]:
+        """PSI/KS/z-score of the current window vs baseline"""
+        if self.current is None or not self.current.total:
+            return None
+
+        z_score = 0.0
+        if self.baseline.std > 0:
+            z_score = abs(self.current.mean - self.baseline.mean) / self.baseline.std
+
+        return {
+            'psi': self.current.psi(self.baseline),
+            'ks_statistic': self.current.ks(self.baseline),
+            'baseline_mean': self.baseline.mean,
+            'current_mean': self.current.mean,
+            'z_score': float(z_score),
+            'samples': self.current.total
+        }
+
+
+class StreamingDriftEngine:
+    """
+    Bounded-memory drift tracking across many models and features
+
+    Memory per feature is O(window + bins); max_features caps features per model.
+    """
+
+    PSI_THRESHOLD = 0.2
+    KS_THRESHOLD = 0.1
+
+    def __init__(self, window: int = 1000, bins: int = 10, max_features: int = 256):
+        self.window = window
+        self.bins = bins
+        self.max_features = max_features
+        self._sketches: Dict[str, Dict[str, FeatureDriftSketch]] = {}
+
+    def _sketch(self, model_name: str, feature: str) -> Optional[FeatureDriftSketch]:
+        features = self._sketches.setdefault(model_name, {})
+        sketch = features.get(feature)
+        if sketch is None:
+            if len(features) >= self.max_features:
+                logger.warning(f"Drift feature limit reached for {model_name}, ignoring {feature}")
+                return None
+            sketch = features[feature] = FeatureDriftSketch(self.window, self.bins)
+        return sketch
+
+    def set_baseline(self, model_name: str, feature_data: Dict[str, Iterable[float]]):
+        for feature, values in feature_data.items():
+            sketch = self._sketch(model_name, feature)
+            if sketch is not None:
+                sketch.set_baseline(values)
+
+    def observe(self, model_name: str, features: Dict[str, object]):
+        """Record one observation (non-numeric features are skipped)"""
+        for feature, value in features.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            sketch = self._sketch(model_name, feature)
+            if sketch is not None:
+                sketch.add(float(value))
+
+    def compare(self, model_name: str) -> Dict[str, Dict[str, float]]:
+        """Per-feature drift metrics for a model"""
+        results = {}
+        for feature, sketch in self._sketches.get(model_name, {}).items():
+            metrics = sketch.compare()
+            if metrics is not None:
+                metrics['drift_detected'] = (
+                    metrics['psi'] > self.PSI_THRESHOLD or
+                    metrics['ks_statistic'] > self.KS_THRESHOLD
+                )
+                results[feature] = metrics
+        return results
+
+    def drifted_features(self, model_name: str) -> List[Tuple[str, Dict[str, float]]]:
+        return [
+            (feature, metrics)
+            for feature, metrics in self.compare(model_name).items()
+            if metrics['drift_detected']
+        ]
+
+    def reset(self, model_name: str):
+        self._sketches.pop(model_name, None)
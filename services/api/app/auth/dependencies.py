@@ -0,0 +1,44 @@
+"""
+Auth Dependencies
+Authenticated-principal dependency for route modules
+
+Route modules cannot import server.get_current_user (server imports the
+routers), so they depend on current_user instead and server.py binds it:
+
+    app.dependency_overrides[current_user] = get_current_user
+
+Unbound, it rejects every request. Websocket handlers authenticate the
+handshake with websocket_user, which runs the same bound dependency.
+"""
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException, Request, WebSocket
+
+
+async def current_user(request: Request) -> Dict:
+    """The authenticated user (bound to server.get_current_user at startup)"""
+    raise HTTPException(status_code=401, detail="Not authenticated")
+
+
+async def websocket_user(websocket: WebSocket) -> Optional[Dict]:
+    """
+    The user a websocket handshake authenticates as, or None
+
+    Browsers cannot set headers on a websocket, so besides the session
+    cookie and Authorization header a `token` query parameter is accepted.
+    """
+    scope = {**websocket.scope, "type": "http"}  # Request only wraps HTTP scopes
+    token = websocket.query_params.get("token")
+    if token:
+        scope["headers"] = [*scope.get("headers", []), (b"authorization", f"Bearer {token}".encode())]
+    resolve = websocket.app.dependency_overrides.get(current_user, current_user)
+    try:
+        return await resolve(Request(scope))
+    except HTTPException:
+        return None
+
+
+def require_role(user: Dict, roles: Iterable[str]):
+    """403 unless the user has one of roles"""
+    if user.get("role") not in roles:
+        raise HTTPException(status_code=403, detail="Not authorized")
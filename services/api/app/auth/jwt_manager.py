@@ -8,11 +8,14 @@ import jwt
 from passlib.context import CryptContext
 import secrets
 
-# Password hashing configuration
+from utils.password_hasher import password_hasher
+
+# Password hashing configuration (cost shared with the password pool, BCRYPT_ROUNDS)
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__rounds=12
+    bcrypt__rounds=password_hasher.rounds,
+    bcrypt__min_rounds=password_hasher.rounds
 )
 
 # JWT Configuration
@@ -39,7 +42,7 @@ class JWTManager:
     
     def hash_password(self, password: str) -> str:
         """
-        Hash password with bcrypt (12 rounds)
+        Hash password with bcrypt (BCRYPT_ROUNDS, default 12)
         
         Production-ready: secure, slow by design to prevent brute force
         """
@@ -49,6 +52,22 @@ class JWTManager:
         """Verify password against hash"""
         return self.pwd_context.verify(plain_password, hashed_password)
     
+    async def hash_password_async(self, password: str) -> str:
+        """
+        Hash password on the bounded password pool
+        
+        Use from async handlers; raises PasswordHasherBusy when saturated
+        """
+        return await password_hasher.run(self.pwd_context.hash, password)
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password on the bounded password pool"""
+        return await password_hasher.run(self.pwd_context.verify, plain_password, hashed_password)
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if hash uses outdated settings (same rule as login's rehash in server.py)"""
+        return password_hasher.needs_rehash(hashed_password)
+    
     def create_access_token(self, user_id: str, email: str, 
                            roles: list, tenant_id: str) -> str:
         """
@@ -2,9 +2,12 @@
 Complete Role-Based Access Control (RBAC)
 Production-ready permission system
 """
-from typing import List, Set, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from enum import Enum
-from functools import wraps
+from functools import lru_cache, wraps
+import inspect
+
+from fastapi import HTTPException
 
 class Permission(Enum):
     # User Management
@@ -49,6 +52,44 @@ class Permission(Enum):
     AI_VIEW_INSIGHTS = "ai:view_insights"
     AI_OVERRIDE = "ai:override"
 
+class PermissionBits:
+    """
+    Maps permission names to bit positions
+
+    A principal's permissions compile to one int, so a check is a single AND
+    and any/all checks over several permissions are one AND plus a compare.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.bits: Dict[str, int] = {name: 1 << i for i, name in enumerate(names)}
+        self.all = (1 << len(self.bits)) - 1
+
+    def mask(self, names: Iterable[str]) -> int:
+        """OR of the bits for names (unknown names are ignored)"""
+        mask = 0
+        for name in names:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def apply_grants(self, mask: int, grants: Iterable[Tuple[str, bool]]) -> int:
+        """Custom per-user grants: True sets the bit, False clears it"""
+        for name, granted in grants:
+            bit = self.bits.get(name, 0)
+            mask = mask | bit if granted else mask & ~bit
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        return [name for name, bit in self.bits.items() if mask & bit]
+
+
+PERMISSION_BITS = PermissionBits(permission.value for permission in Permission)
+
+
+def permission_mask(permissions: Iterable[Permission]) -> int:
+    """Bitmask for a set of permissions"""
+    return PERMISSION_BITS.mask(permission.value for permission in permissions)
+
+
 class Role(Enum):
     SUPER_ADMIN = "super_admin"
     ADMIN = "admin"
@@ -61,8 +102,8 @@ class Role(Enum):
 class RBACSystem:
     """
     Production RBAC System
-    - Role-permission mapping
-    - Permission checking
+    - Role-permission mapping (compiled to bitmasks once)
+    - Permission checking (one AND per check)
     - Tenant isolation enforcement
     - Audit logging
     """
@@ -117,10 +158,52 @@ class RBACSystem:
             }
         }
     
+        # Role name -> bitmask, so checks never parse role strings into enums
+        self.role_masks: Dict[str, int] = {
+            role.value: permission_mask(permissions)
+            for role, permissions in self.role_permissions.items()
+        }
+        self._compile = lru_cache(maxsize=4096)(self._compile_mask)
+    
     def _get_all_permissions(self) -> Set[Permission]:
         """Get all available permissions"""
         return set(Permission)
     
+    def _compile_mask(self, roles: Tuple[str, ...], grants: Tuple[Tuple[str, bool], ...]) -> int:
+        mask = 0
+        for role_name in roles:
+            mask |= self.role_masks.get(role_name, 0)
+        return PERMISSION_BITS.apply_grants(mask, grants)
+    
+    def compile_mask(self, user_roles: Iterable[str],
+                     custom_permissions: Optional[Dict[str, bool]] = None) -> int:
+        """
+        Bitmask for roles plus custom grants
+        
+        Memoized per distinct (roles, grants), so each principal shape is
+        compiled once per process.
+        """
+        grants = tuple(sorted(custom_permissions.items())) if custom_permissions else ()
+        return self._compile(tuple(user_roles), grants)
+    
+    def principal_mask(self, user: Dict[str, Any]) -> int:
+        """
+        Bitmask for an authenticated principal
+        
+        Accepts JWT payloads ({'roles': [...]}) and user documents
+        ({'role': ...}); optional 'custom_permissions' override role grants.
+        Always compiled from those fields (memoized): a mask carried on the
+        dict itself could come from a token or request body.
+        """
+        roles = user.get('roles')
+        if roles is None:
+            roles = [user['role']] if user.get('role') else []
+        return self.compile_mask(roles, user.get('custom_permissions'))
+    
+    def check(self, user: Dict[str, Any], required_permission: Permission) -> bool:
+        """Check a principal against one permission"""
+        return bool(self.principal_mask(user) & PERMISSION_BITS.bits[required_permission.value])
+    
     def has_permission(self, user_roles: List[str], 
                       required_permission: Permission) -> bool:
         """
@@ -133,44 +216,22 @@ class RBACSystem:
         Returns:
             True if user has permission
         """
-        for role_name in user_roles:
-            try:
-                role = Role(role_name)
-                permissions = self.role_permissions.get(role, set())
-                if required_permission in permissions:
-                    return True
-            except ValueError:
-                # Unknown role
-                continue
-        
-        return False
+        return bool(self.compile_mask(user_roles) & PERMISSION_BITS.bits[required_permission.value])
     
     def has_any_permission(self, user_roles: List[str],
                           required_permissions: List[Permission]) -> bool:
         """Check if user has any of the required permissions"""
-        for permission in required_permissions:
-            if self.has_permission(user_roles, permission):
-                return True
-        return False
+        return bool(self.compile_mask(user_roles) & permission_mask(required_permissions))
     
     def has_all_permissions(self, user_roles: List[str],
                            required_permissions: List[Permission]) -> bool:
         """Check if user has all required permissions"""
-        for permission in required_permissions:
-            if not self.has_permission(user_roles, permission):
-                return False
-        return True
+        required = permission_mask(required_permissions)
+        return self.compile_mask(user_roles) & required == required
     
     def get_user_permissions(self, user_roles: List[str]) -> Set[Permission]:
         """Get all permissions for user's roles"""
-        permissions = set()
-        for role_name in user_roles:
-            try:
-                role = Role(role_name)
-                permissions.update(self.role_permissions.get(role, set()))
-            except ValueError:
-                continue
-        return permissions
+        return {Permission(name) for name in PERMISSION_BITS.names(self.compile_mask(user_roles))}
     
     def enforce_tenant_isolation(self, user_tenant_id: str, 
                                 resource_tenant_id: str) -> bool:
@@ -184,27 +245,56 @@ class RBACSystem:
 # Global RBAC system
 rbac = RBACSystem()
 
+def has_permission(user: Dict[str, Any], permission: Permission) -> bool:
+    """Check an authenticated principal (JWT payload or user document)"""
+    return rbac.check(user, permission)
+
+def guard_endpoint(func, allowed: Callable[[Dict[str, Any]], bool], detail: str):
+    """
+    Wrap a FastAPI endpoint so it raises 403 unless allowed(current_user)
+    
+    The endpoint must take the authenticated principal as `current_user`.
+    functools.wraps keeps the original signature visible to FastAPI, so all
+    dependencies still resolve; sync endpoints stay sync (threadpool).
+    """
+    if 'current_user' not in inspect.signature(func).parameters:
+        raise TypeError(f"{func.__name__} needs a current_user parameter to be permission-checked")
+    
+    def authorize(kwargs):
+        user = kwargs.get('current_user')
+        if not user or not allowed(user):
+            raise HTTPException(status_code=403, detail=detail)
+    
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            authorize(kwargs)
+            return await func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            authorize(kwargs)
+            return func(*args, **kwargs)
+    return wrapper
+
 # Decorator for permission checking
 def require_permission(permission: Permission):
     """
     Decorator to require permission for endpoint
     
+    Place it below the route decorator; the endpoint takes the principal as
+    `current_user` (usually `Depends(get_current_user)`).
+    
     Usage:
+        @router.post("/users")
         @require_permission(Permission.USER_CREATE)
-        def create_user(request):
+        async def create_user(data: UserCreate, current_user: dict = Depends(get_current_user)):
             ...
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Extract user from request (implementation depends on framework)
-            # This is a template - adjust for your framework
-            request = args[0] if args else kwargs.get('request')
-            user_roles = getattr(request, 'user_roles', [])
-            
-            if not rbac.has_permission(user_roles, permission):
-                raise PermissionError(f"Permission denied: {permission.value}")
-            
-            return func(*args, **kwargs)
-        return wrapper
+        return guard_endpoint(
+            func,
+            lambda user: has_permission(user, permission),
+            f"Permission denied: {permission.value}"
+        )
     return decorator
@@ -187,6 +187,7 @@ class Settings(BaseSettings):
     # Data retention (days)
     SCREENSHOT_RETENTION_DAYS: int = 90
     ACTIVITY_RETENTION_DAYS: int = 365
+    GPS_RETENTION_DAYS: int = 365
     AUDIT_LOG_RETENTION_DAYS: int = 2555  # 7 years
     
     # ==================== RATE LIMITING ====================
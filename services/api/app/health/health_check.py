@@ -137,8 +137,10 @@ async def detailed_health() -> Dict[str, Any]:
     
     # AI models info
     try:
-        from app.ai_engines.performance import performance_predictor
+        from app.ai_engines.performance.performance_predictor import performance_predictor
+        from app.ai_engines.model_cache import model_cache
         health_info["ai"]["models_loaded"] = True
+        health_info["ai"]["model_cache"] = model_cache.stats()
     except:
         health_info["ai"]["models_loaded"] = False
     
@@ -55,8 +55,8 @@ async def lifespan(app: FastAPI):
     
     # Load AI models
     try:
-        from app.ai_engines.performance import performance_predictor
-        from app.ai_engines.forecasting import turnover_predictor
+        from app.ai_engines.performance.performance_predictor import performance_predictor
+        from app.ai_engines.forecasting.turnover_predictor import turnover_predictor
         
         # Wrap with safety
         from app.ai_engines.governance.safe_ai_wrapper import wrap_model
@@ -47,7 +47,7 @@ class RBACMiddleware:
         ('POST', '/api/payroll/run'): Permission.PAYROLL_RUN,
         
         # Reports
-        ('GET', '/api/reports'): Permission.REPORT_READ,
+        ('GET', '/api/reports'): Permission.REPORT_VIEW,
         ('GET', '/api/dashboard'): Permission.EMPLOYEE_READ,
         
         # Admin
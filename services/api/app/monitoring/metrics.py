@@ -30,6 +30,38 @@ auth_attempts_total = Counter(
     ['result']  # success, failure
 )
 
+auth_principal_cache_requests_total = Counter(
+    'auth_principal_cache_requests_total',
+    'Authenticated principal cache lookups',
+    ['cache', 'result']  # cache: user, session; result: hit, miss, shared
+)
+
+entitlement_cache_requests_total = Counter(
+    'entitlement_cache_requests_total',
+    'Subscription entitlement cache lookups',
+    ['cache', 'result']  # hit, miss, shared
+)
+
+manager_scope_cache_requests_total = Counter(
+    'manager_scope_cache_requests_total',
+    'Manager assigned-employee scope cache lookups',
+    ['cache', 'result']  # hit, miss, shared
+)
+
+# Analytics query cache metrics (cache label is the endpoint)
+analytics_cache_requests_total = Counter(
+    'analytics_cache_requests_total',
+    'Analytics/dashboard result cache lookups',
+    ['cache', 'result']  # hit, miss, shared, remote_hit
+)
+
+analytics_cache_result_age_seconds = Histogram(
+    'analytics_cache_result_age_seconds',
+    'Age of analytics results when served (staleness)',
+    ['cache'],
+    buckets=(0, 1, 5, 15, 30, 60, 120, 300)
+)
+
 # RBAC metrics
 permission_checks_total = Counter(
     'permission_checks_total',
@@ -56,6 +88,37 @@ ai_confidence_score = Histogram(
     ['model']
 )
 
+ai_model_cache_requests_total = Counter(
+    'ai_model_cache_requests_total',
+    'AI model cache lookups',
+    ['model', 'result']  # hit, miss
+)
+
+ai_model_load_duration = Histogram(
+    'ai_model_load_duration_seconds',
+    'AI model artifact load duration',
+    ['model']
+)
+
+# Outbound integration metrics (provider label: jira, slack, google_calendar, ...)
+integration_requests_total = Counter(
+    'integration_requests_total',
+    'Outbound integration requests by outcome',
+    ['provider', 'outcome']  # success, client_error, server_error, throttled, transport_error, circuit_open
+)
+
+integration_request_duration = Histogram(
+    'integration_request_duration_seconds',
+    'Outbound integration request latency per attempt',
+    ['provider']
+)
+
+integration_retries_total = Counter(
+    'integration_retries_total',
+    'Outbound integration request retries',
+    ['provider']
+)
+
 # Database metrics
 db_query_duration = Histogram(
     'db_query_duration_seconds',
@@ -41,7 +41,7 @@ async def predict_performance(
     # Use safe wrapper
     try:
         from app.ai_engines.governance.safe_ai_wrapper import wrap_model
-        from app.ai_engines.performance import performance_predictor
+        from app.ai_engines.performance.performance_predictor import performance_predictor
         
         safe_predictor = wrap_model(performance_predictor, "performance_predictor")
         
@@ -83,7 +83,7 @@ async def predict_turnover(
     
     try:
         from app.ai_engines.governance.safe_ai_wrapper import wrap_model
-        from app.ai_engines.forecasting import turnover_predictor
+        from app.ai_engines.forecasting.turnover_predictor import turnover_predictor
         
         safe_predictor = wrap_model(turnover_predictor, "turnover_predictor")
         
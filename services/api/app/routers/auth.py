@@ -4,6 +4,7 @@ Authentication Router - Complete Implementation
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
 from ..auth.jwt_manager import jwt_manager
+from ..utils.password_hasher import PasswordHasherBusy
 from ..auth.rbac import rbac
 
 router = APIRouter()
@@ -31,17 +32,22 @@ async def login(request: LoginRequest):
     # In production: query database for user
     # user = db.query(User).filter(User.email == request.email).first()
     
-    # For now, mock user
-    mock_user = {
-        "id": "user_123",
-        "email": request.email,
-        "password_hash": jwt_manager.hash_password("password"),
-        "roles": ["admin"],
-        "tenant_id": "tenant_abc"
-    }
+    try:
+        # For now, mock user
+        mock_user = {
+            "id": "user_123",
+            "email": request.email,
+            "password_hash": await jwt_manager.hash_password_async("password"),
+            "roles": ["admin"],
+            "tenant_id": "tenant_abc"
+        }
+        
+        # Verify password (off the event loop)
+        valid = await jwt_manager.verify_password_async(request.password, mock_user["password_hash"])
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
     
-    # Verify password
-    if not jwt_manager.verify_password(request.password, mock_user["password_hash"]):
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Generate tokens
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Request
 from typing import Optional
 from datetime import datetime, timezone
 from utils.id_generator import generate_id
+from utils.manager_scope import manager_scopes
 import logging
 
 router = APIRouter()
@@ -69,21 +70,12 @@ async def get_activity_history(
             # Managers see their assigned employees' activity
             if employee_id:
                 # Check if manager is assigned to this employee
-                assignment = await db.manager_assignments.find_one({
-                    "manager_id": user["user_id"],
-                    "employee_id": employee_id,
-                    "active": True
-                })
-                if not assignment:
+                if not await manager_scopes.can_access(db, user, employee_id):
                     raise HTTPException(status_code=403, detail="Access denied")
                 query["user_id"] = employee_id
             else:
                 # Get all assigned employees
-                assigned_employees = await db.manager_assignments.find({
-                    "manager_id": user["user_id"],
-                    "active": True
-                })
-                employee_ids = [a["employee_id"] for a in assigned_employees]
+                employee_ids = list(await manager_scopes.get_assigned(db, user["user_id"]))
                 employee_ids.append(user["user_id"])  # Include manager's own activity
                 query["user_id"] = {"$in": employee_ids}
         else:
@@ -130,12 +122,7 @@ async def get_employee_activity(employee_id: str, request: Request, user: dict,
             has_access = employee and employee["company_id"] == user["company_id"]
         elif user["role"] == "manager":
             # Check if manager is assigned to employee
-            assignment = await db.manager_assignments.find_one({
-                "manager_id": user["user_id"],
-                "employee_id": employee_id,
-                "active": True
-            })
-            has_access = assignment is not None
+            has_access = employee_id in await manager_scopes.get_assigned(db, user["user_id"])
         elif user["user_id"] == employee_id:
             has_access = True
 
@@ -180,11 +167,7 @@ async def get_activity_stats(request: Request, user: dict):
 
         # Role-based filtering
         if user["role"] == "manager":
-            assigned_employees = await db.manager_assignments.find({
-                "manager_id": user["user_id"],
-                "active": True
-            })
-            employee_ids = [a["employee_id"] for a in assigned_employees]
+            employee_ids = list(await manager_scopes.get_assigned(db, user["user_id"]))
             query["user_id"] = {"$in": employee_ids}
         elif user["role"] == "employee":
             raise HTTPException(status_code=403, detail="Access denied")
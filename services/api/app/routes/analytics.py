@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, date, timedelta
 
+from utils.query_cache import query_cache
+
 router = APIRouter(prefix='/api/analytics', tags=['Analytics'])
 
 class FocusTime(BaseModel):
@@ -227,33 +229,36 @@ async def get_team_productivity(start_date: Optional[str] = None, end_date: Opti
     try:
         target_date = date.fromisoformat(start_date) if start_date else date.today()
 
-        scores = await db.query('productivity_scores', {'company_id': user['company_id'], 'date': target_date})
-
-        if not scores:
-            return {'success': True, 'data': {'average_score': 0, 'team_scores': []}}
+        async def compute():
+            scores = await db.query('productivity_scores', {'company_id': user['company_id'], 'date': target_date})
 
-        avg_score = sum(s.get('overall_score', 0) for s in scores) / len(scores)
+            if not scores:
+                return {'average_score': 0, 'team_scores': []}
 
-        team_scores = []
-        for score in scores:
-            user_data = await db.get('users', {'user_id': score['user_id']})
-            team_scores.append({
-                'user_id': score['user_id'],
-                'user_name': user_data.get('name') if user_data else 'Unknown',
-                'overall_score': score.get('overall_score', 0),
-                'productive_minutes': score.get('total_productive_minutes', 0),
-                'active_minutes': score.get('total_active_minutes', 0)
-            })
+            avg_score = sum(s.get('overall_score', 0) for s in scores) / len(scores)
 
-        team_scores.sort(key=lambda x: x['overall_score'], reverse=True)
+            team_scores = []
+            for score in scores:
+                user_data = await db.get('users', {'user_id': score['user_id']})
+                team_scores.append({
+                    'user_id': score['user_id'],
+                    'user_name': user_data.get('name') if user_data else 'Unknown',
+                    'overall_score': score.get('overall_score', 0),
+                    'productive_minutes': score.get('total_productive_minutes', 0),
+                    'active_minutes': score.get('total_active_minutes', 0)
+                })
 
-        return {
-            'success': True,
-            'data': {
+            team_scores.sort(key=lambda x: x['overall_score'], reverse=True)
+            return {
                 'average_score': round(avg_score, 1),
                 'team_scores': team_scores
             }
-        }
+
+        data = await query_cache.get_or_compute(
+            'team_productivity', user['company_id'], {'date': target_date}, compute,
+            depends_on=('productivity_scores',)
+        )
+        return {'success': True, 'data': data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -4,7 +4,8 @@ Custom Report Builder & Workforce Analytics
 Advanced reporting with custom templates and workforce insights
 """
 
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
@@ -12,9 +13,18 @@ import uuid
 import json
 import logging
 
+from auth.dependencies import current_user
+from routes.feature_gate import consume_report_export_quota, release_report_export_quota
+from utils.pagination import EXPORT_FORMATS, stream_rows
+from utils.query_cache import query_cache
+from utils.jobs import job_queue, job_response, BULK, INTERACTIVE
+from utils.report_engine import report_engine, COMPLETED
+
 router = APIRouter(prefix="/reports", tags=["reports"])
 logger = logging.getLogger(__name__)
 
+INTERACTIVE_REPORT_DAYS = 31
+
 # ==================== MODELS ====================
 
 class ReportField(BaseModel):
@@ -344,11 +354,12 @@ async def get_report_templates(company_id: str, request: Request):
     return {"templates": templates, "predefined": REPORT_TYPES}
 
 @router.post("/generate")
-async def generate_report(data: GenerateReportRequest, request: Request):
-    """Generate a report"""
+async def generate_report(data: GenerateReportRequest, request: Request, user: dict = Depends(current_user)):
+    """Queue a report; returns the job (and report handle) to poll, page or download"""
     db = request.app.state.db
+    company_id = user["company_id"]
     
-    # Get report configuration
+    # Get report configuration (before reserving an export, so a bad template costs nothing)
     if data.template_id:
         template = await db.report_templates.find_one(
             {"template_id": data.template_id},
@@ -365,116 +376,84 @@ async def generate_report(data: GenerateReportRequest, request: Request):
             "group_by": data.group_by
         }
     
-    # Build query
-    query = {
-        "start_time": {
-            "$gte": data.start_date,
-            "$lte": data.end_date
-        }
+    params = {
+        "report_type": data.report_type,
+        "start_date": data.start_date,
+        "end_date": data.end_date,
+        "user_ids": sorted(data.user_ids or []),
+        "project_ids": sorted(data.project_ids or []),
+        "config": config
     }
+    reserved = []
     
-    if data.user_ids:
-        query["user_id"] = {"$in": data.user_ids}
-    
-    if data.project_ids:
-        query["project_id"] = {"$in": data.project_ids}
-    
-    # Fetch data based on report type
-    if data.report_type in ["time_summary", "productivity"]:
-        entries = await db.time_entries.find(query, {"_id": 0}).to_list(10000)
-        
-        # Process data
-        report_data = []
-        grouped = {}
-        
-        for entry in entries:
-            key = entry.get("user_id", "unknown")
-            if key not in grouped:
-                grouped[key] = {
-                    "user_id": key,
-                    "total_hours": 0,
-                    "active_hours": 0,
-                    "idle_hours": 0,
-                    "entries_count": 0
+    async def start_report(job: dict):
+        # Runs for a new job only: a cached or in-flight identical report costs no export
+        export_quota = await consume_report_export_quota(db, company_id)
+        if not export_quota["allowed"]:
+            raise HTTPException(
+                status_code=403,
+                detail={
+                    "error": "export_limit_reached",
+                    "limit": export_quota["limit"],
+                    "used": export_quota["used"],
+                    "message": f"Monthly report export limit reached ({export_quota['limit']} exports)"
                 }
-            
-            duration = entry.get("duration", 0) / 3600
-            idle = entry.get("idle_time", 0) / 3600
-            
-            grouped[key]["total_hours"] += duration
-            grouped[key]["active_hours"] += (duration - idle)
-            grouped[key]["idle_hours"] += idle
-            grouped[key]["entries_count"] += 1
+            )
+        reserved.append(job["job_id"])
         
-        # Calculate derived fields
-        for user_id, stats in grouped.items():
-            productivity = (stats["active_hours"] / stats["total_hours"] * 100) if stats["total_hours"] > 0 else 0
-            report_data.append({
-                **stats,
-                "productivity_score": round(productivity, 1),
-                "total_hours": round(stats["total_hours"], 2),
-                "active_hours": round(stats["active_hours"], 2),
-                "idle_hours": round(stats["idle_hours"], 2)
-            })
-        
-    elif data.report_type == "attendance":
-        entries = await db.attendance.find(query, {"_id": 0}).to_list(10000)
-        report_data = entries
-        
-    elif data.report_type == "project_time":
-        entries = await db.time_entries.find(query, {"_id": 0}).to_list(10000)
-        
-        # Group by project
-        grouped = {}
-        for entry in entries:
-            project_id = entry.get("project_id", "no_project")
-            if project_id not in grouped:
-                grouped[project_id] = {"project_id": project_id, "hours": 0, "entries": 0}
-            grouped[project_id]["hours"] += entry.get("duration", 0) / 3600
-            grouped[project_id]["entries"] += 1
-        
-        report_data = list(grouped.values())
+        # The job id doubles as the report id; the worker streams rows into its chunks
+        await report_engine.create_handle(
+            db, job["job_id"], data.report_type, data.start_date, data.end_date,
+            config=config, company_id=company_id
+        )
         
-    else:
-        report_data = []
-    
-    # Generate report ID
-    report_id = f"rep_{uuid.uuid4().hex[:12]}"
+        # Export log (source of truth for usage counter reconciliation)
+        await db.report_exports.insert_one({
+            "report_id": job["job_id"],
+            "company_id": company_id,
+            "exported_at": datetime.now(timezone.utc).isoformat()
+        })
     
-    # Store report
-    report = {
-        "report_id": report_id,
-        "report_type": data.report_type,
-        "start_date": data.start_date,
-        "end_date": data.end_date,
-        "config": config,
-        "data": report_data,
-        "generated_at": datetime.now(timezone.utc).isoformat()
-    }
+    try:
+        job = await job_queue.submit(
+            db, "custom_report", params,
+            company_id=company_id,
+            user_id=user.get("user_id"),
+            queue=_report_queue(data.start_date, data.end_date),
+            prepare=start_report
+        )
+    except Exception:
+        if reserved:
+            await release_report_export_quota(db, company_id)
+            await db.report_exports.delete_one({"report_id": reserved[0]})
+        raise
     
-    await db.generated_reports.insert_one(report)
+    report_id = job["job_id"]
     
-    # Track export for limits
-    await db.report_exports.insert_one({
-        "report_id": report_id,
-        "exported_at": datetime.now(timezone.utc).isoformat()
+    return job_response(job, links={
+        "report": f"/reports/{report_id}",
+        "rows": f"/reports/{report_id}/rows",
+        "download": f"/reports/{report_id}/download",
+        "cancel": f"/reports/{report_id}/cancel"
     })
-    
-    return {
-        "report_id": report_id,
-        "report_type": data.report_type,
-        "data": report_data,
-        "summary": {
-            "total_records": len(report_data),
-            "period": f"{data.start_date} to {data.end_date}"
-        }
-    }
+
+def _report_queue(start_date: str, end_date: str) -> str:
+    """Reports spanning more than a month run on the bulk queue"""
+    try:
+        span = datetime.fromisoformat(end_date[:10]) - datetime.fromisoformat(start_date[:10])
+    except ValueError:
+        return BULK
+    return INTERACTIVE if span <= timedelta(days=INTERACTIVE_REPORT_DAYS) else BULK
 
 @router.get("/analytics/benchmarks/{company_id}")
 async def get_workforce_benchmarks(company_id: str, days: int = 30, request: Request = None):
     """Get workforce benchmarks and leaderboard"""
     db = request.app.state.db
-    return await WorkforceAnalytics.calculate_benchmarks(db, company_id, days)
+    return await query_cache.get_or_compute(
+        "workforce_benchmarks", company_id, {"days": days},
+        lambda: WorkforceAnalytics.calculate_benchmarks(db, company_id, days),
+        depends_on=("time_entries",)
+    )
 
 @router.get("/analytics/work-life-balance/{user_id}")
 async def get_work_life_balance(user_id: str, days: int = 30, request: Request = None):
@@ -482,11 +461,7 @@ async def get_work_life_balance(user_id: str, days: int = 30, request: Request =
     db = request.app.state.db
     return await WorkforceAnalytics.calculate_work_life_balance(db, user_id, days)
 
-@router.get("/{report_id}")
-async def get_report(report_id: str, request: Request):
-    """Get a generated report by ID"""
-    db = request.app.state.db
-    
+async def _get_report_handle(db, report_id: str) -> dict:
     report = await db.generated_reports.find_one(
         {"report_id": report_id},
         {"_id": 0}
@@ -497,6 +472,55 @@ async def get_report(report_id: str, request: Request):
     
     return report
 
+@router.get("/{report_id}")
+async def get_report(report_id: str, request: Request):
+    """Get a generated report's status and progress"""
+    db = request.app.state.db
+    return await _get_report_handle(db, report_id)
+
+@router.get("/{report_id}/rows")
+async def get_report_rows(report_id: str, request: Request, chunk: int = Query(0, ge=0)):
+    """One page (stored chunk) of a completed report's rows"""
+    db = request.app.state.db
+    report = await _get_report_handle(db, report_id)
+    
+    if report.get("status") != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Report is {report.get('status')}")
+    
+    chunk_count = report.get("chunk_count", 0)
+    return {
+        "report_id": report_id,
+        "chunk": chunk,
+        "rows": await report_engine.get_chunk(db, report_id, chunk),
+        "next_chunk": chunk + 1 if chunk + 1 < chunk_count else None,
+        "total_records": report.get("total_records", 0)
+    }
+
+@router.get("/{report_id}/download")
+async def download_report(report_id: str, request: Request, format: str = Query("csv")):
+    """Download a completed report as CSV or NDJSON, streamed chunk by chunk"""
+    db = request.app.state.db
+    report = await _get_report_handle(db, report_id)
+    
+    if report.get("status") != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Report is {report.get('status')}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    rows = report_engine.iter_rows(db, report_id, report.get("chunk_count", 0))
+    return stream_rows(rows, format, f"{report['report_type']}_{report_id}")
+
+@router.post("/{report_id}/cancel")
+async def cancel_report(report_id: str, request: Request):
+    """Cancel a running report"""
+    db = request.app.state.db
+    await _get_report_handle(db, report_id)
+    
+    if not await report_engine.cancel(db, report_id):
+        raise HTTPException(status_code=409, detail="Report is not running")
+    
+    return {"report_id": report_id, "status": "cancelling"}
+
 @router.delete("/templates/{template_id}")
 async def delete_template(template_id: str, request: Request):
     """Delete a report template"""
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
+from utils.manager_scope import manager_scopes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -193,6 +194,7 @@ async def update_assignment_request(
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             await db.manager_assignments.insert_one(assignment_doc)
+            manager_scopes.invalidate(assignment_request["manager_id"])
 
     logger.info(f"Assignment request {request_id} updated to {data.status}")
 
@@ -8,6 +8,7 @@ from typing import Optional
 from datetime import datetime, timezone, date, timedelta
 from dateutil.relativedelta import relativedelta
 from utils.id_generator import generate_id
+from utils.manager_scope import manager_scopes
 import logging
 
 router = APIRouter()
@@ -72,12 +73,7 @@ async def calculate_expenses(data: ExpenseCalculationRequest, request: Request,
                     raise HTTPException(status_code=403, detail="Expense access not granted")
 
                 # Check if employee is assigned to this manager
-                assignment = await db.manager_assignments.find_one({
-                    "manager_id": user["user_id"],
-                    "employee_id": data.employee_id,
-                    "active": True
-                })
-                if not assignment:
+                if data.employee_id not in await manager_scopes.get_assigned(db, user["user_id"]):
                     raise HTTPException(status_code=403, detail="Employee not assigned to you")
 
         # Build query for time entries
@@ -327,11 +323,7 @@ async def get_all_employees_expenses(
 
         if user["role"] == "manager":
             # Get assigned employees
-            assignments = await db.manager_assignments.find({
-                "manager_id": user["user_id"],
-                "active": True
-            })
-            employee_ids = [a["employee_id"] for a in assignments]
+            employee_ids = list(await manager_scopes.get_assigned(db, user["user_id"]))
             query["user_id"] = {"$in": employee_ids}
 
         employees = await db.users.find(query)
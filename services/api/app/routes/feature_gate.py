@@ -13,23 +13,16 @@ logger = logging.getLogger(__name__)
 
 # Import plan definitions
 from routes.pricing import PRICING_PLANS
+from utils.entitlements import entitlements
+from utils.usage_counters import usage_counters
 
 class FeatureGate:
     """Feature gating utility class"""
     
     @staticmethod
     async def get_company_features(db, company_id: str) -> dict:
-        """Get features for a company from their subscription"""
-        subscription = await db.subscriptions.find_one(
-            {"company_id": company_id, "status": {"$in": ["active", "trialing"]}},
-            {"_id": 0}
-        )
-        
-        if not subscription:
-            # Default to starter features
-            return PRICING_PLANS["starter"]["features"]
-        
-        return subscription.get("features", PRICING_PLANS["starter"]["features"])
+        """Get features for a company from their subscription (cached, starter by default)"""
+        return await entitlements.get_features(db, company_id)
     
     @staticmethod
     async def check_feature(db, company_id: str, feature: str) -> bool:
@@ -155,21 +148,14 @@ def require_features(features: List[str]):
 
 
 async def check_screenshot_limit(db, company_id: str, user_id: str) -> dict:
-    """Check screenshot upload limit for today"""
-    from datetime import datetime, timezone
-    
+    """Check screenshot upload limit for today (read-only, one counter lookup)"""
     features = await FeatureGate.get_company_features(db, company_id)
     limit = features.get("screenshot_limit", 100)
     
     if limit == -1:
         return {"allowed": True, "limit": -1, "used": 0, "remaining": -1}
     
-    # Count today's screenshots for this user
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    count = await db.screenshots.count_documents({
-        "user_id": user_id,
-        "taken_at": {"$gte": today_start.isoformat()}
-    })
+    count = await usage_counters.bind(db).usage("screenshots", company_id, user_id)
     
     return {
         "allowed": count < limit,
@@ -179,6 +165,13 @@ async def check_screenshot_limit(db, company_id: str, user_id: str) -> dict:
     }
 
 
+async def consume_screenshot_quota(db, company_id: str, user_id: str) -> dict:
+    """Reserve one screenshot against today's limit (atomic check-and-increment)"""
+    features = await FeatureGate.get_company_features(db, company_id)
+    limit = features.get("screenshot_limit", 100)
+    return await usage_counters.bind(db).consume("screenshots", company_id, limit, user_id=user_id)
+
+
 async def check_integration_limit(db, company_id: str) -> dict:
     """Check integration connection limit"""
     features = await FeatureGate.get_company_features(db, company_id)
@@ -188,11 +181,8 @@ async def check_integration_limit(db, company_id: str) -> dict:
     
     limit = features.get("integrations_count", 3)
     
-    # Count active integrations
-    count = await db.integrations.count_documents({
-        "company_id": company_id,
-        "status": "active"
-    })
+    # Active integrations (maintained on connect/disconnect, reconciled daily)
+    count = await usage_counters.bind(db).usage("integrations", company_id)
     
     return {
         "allowed": count < limit,
@@ -202,22 +192,27 @@ async def check_integration_limit(db, company_id: str) -> dict:
     }
 
 
+async def consume_integration_quota(db, company_id: str) -> dict:
+    """Reserve one integration slot; give it back with release_integration_quota"""
+    features = await FeatureGate.get_company_features(db, company_id)
+    limit = -1 if features.get("unlimited_integrations") else features.get("integrations_count", 3)
+    return await usage_counters.bind(db).consume("integrations", company_id, limit)
+
+
+async def release_integration_quota(db, company_id: str):
+    """Free the slot of an integration that was removed (or never stored)"""
+    await usage_counters.bind(db).release("integrations", company_id)
+
+
 async def check_report_export_limit(db, company_id: str) -> dict:
     """Check report export limit for this month"""
-    from datetime import datetime, timezone
-    
     features = await FeatureGate.get_company_features(db, company_id)
     limit = features.get("exportable_reports_count", 5)
     
     if limit == -1:
         return {"allowed": True, "limit": -1, "used": 0, "remaining": -1}
     
-    # Count this month's exports
-    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    count = await db.report_exports.count_documents({
-        "company_id": company_id,
-        "exported_at": {"$gte": month_start.isoformat()}
-    })
+    count = await usage_counters.bind(db).usage("report_exports", company_id)
     
     return {
         "allowed": count < limit,
@@ -227,6 +222,18 @@ async def check_report_export_limit(db, company_id: str) -> dict:
     }
 
 
+async def consume_report_export_quota(db, company_id: str) -> dict:
+    """Reserve one report export against this month's limit"""
+    features = await FeatureGate.get_company_features(db, company_id)
+    limit = features.get("exportable_reports_count", 5)
+    return await usage_counters.bind(db).consume("report_exports", company_id, limit)
+
+
+async def release_report_export_quota(db, company_id: str):
+    """Give back an export reserved for a report that was never queued"""
+    await usage_counters.bind(db).release("report_exports", company_id)
+
+
 # Feature check functions for specific features
 async def can_use_silent_tracking(db, company_id: str) -> bool:
     return await FeatureGate.check_feature(db, company_id, "silent_tracking")
@@ -3,11 +3,14 @@ from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import os
-import httpx
 from datetime import datetime, timezone, timedelta
 import json
 import logging
 
+from utils.calendar_sync import GOOGLE, CalendarError, CalendarSync, entry_event
+from utils.http_client import outbound
+from utils.ttl_cache import TTLCache
+
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,14 @@ class SyncTimeEntryRequest(BaseModel):
     project_name: Optional[str] = None
     description: Optional[str] = None
 
+class SyncTimeEntriesRequest(BaseModel):
+    time_entry_ids: List[str]
+
+MAX_SYNC_ENTRIES = 500
+
+# Concurrent requests for one connection share a single token refresh
+_token_refreshes = TTLCache('google_calendar_token', 60, 10000)
+
 @router.get("/connect")
 async def connect_google_calendar(request: Request):
     """Initiate Google Calendar OAuth flow"""
@@ -77,33 +88,31 @@ async def google_calendar_callback(
         raise HTTPException(status_code=503, detail="Google Calendar not configured")
     
     # Exchange code for tokens
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": GOOGLE_REDIRECT_URI
-            }
-        )
-        
-        if token_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
-        
-        tokens = token_response.json()
+    token_response = await outbound.post(
+        "google_calendar", GOOGLE_TOKEN_URL,
+        data={
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": GOOGLE_REDIRECT_URI
+        }
+    )
+    
+    if token_response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
+    
+    tokens = token_response.json()
     
     # Store tokens (in production, associate with user)
     db = request.app.state.db
     
     # Get user info from Google
-    async with httpx.AsyncClient() as client:
-        user_response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        google_user = user_response.json()
+    user_response = await outbound.get(
+        "google_calendar", "https://www.googleapis.com/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
+    google_user = user_response.json()
     
     # Store calendar connection
     await db.calendar_connections.update_one(
@@ -154,23 +163,44 @@ async def get_calendar_events(
     if not end_date:
         end_date = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
     
+    # Serve from the local cache when the synced window covers the range
+    calendar = CalendarSync(db, GOOGLE)
+    try:
+        state = await calendar.sync(user_id, access_token)
+    except CalendarError as e:
+        logger.warning(f"Google Calendar sync failed for {user_id}: {e}")
+        state = {}
+    start, end = _parse(start_date), _parse(end_date)
+    if CalendarSync.covers(state, start, end):
+        rows = await calendar.cached_events(user_id, start, end)
+        events = [{
+            "id": row["event_id"],
+            "summary": row.get("summary"),
+            "description": row.get("description"),
+            "start": row.get("start_at"),
+            "end": row.get("end_at"),
+            "location": row.get("location"),
+            "status": row.get("status"),
+            "html_link": row.get("web_link")
+        } for row in rows]
+        return {"events": events, "count": len(events)}
+
     # Fetch events from Google Calendar
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{GOOGLE_CALENDAR_API}/calendars/primary/events",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={
-                "timeMin": start_date,
-                "timeMax": end_date,
-                "singleEvents": True,
-                "orderBy": "startTime"
-            }
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch calendar events")
-        
-        data = response.json()
+    response = await outbound.get(
+        "google_calendar", f"{GOOGLE_CALENDAR_API}/calendars/primary/events",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={
+            "timeMin": start_date,
+            "timeMax": end_date,
+            "singleEvents": True,
+            "orderBy": "startTime"
+        }
+    )
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail="Failed to fetch calendar events")
+    
+    data = response.json()
     
     events = []
     for item in data.get("items", []):
@@ -228,20 +258,19 @@ async def create_calendar_event(
     if event.location:
         event_body["location"] = event.location
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{GOOGLE_CALENDAR_API}/calendars/primary/events",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            },
-            json=event_body
-        )
-        
-        if response.status_code not in [200, 201]:
-            raise HTTPException(status_code=500, detail="Failed to create calendar event")
-        
-        created_event = response.json()
+    response = await outbound.post(
+        "google_calendar", f"{GOOGLE_CALENDAR_API}/calendars/primary/events",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        },
+        json=event_body
+    )
+    
+    if response.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail="Failed to create calendar event")
+    
+    created_event = response.json()
     
     return {
         "event_id": created_event.get("id"),
@@ -267,16 +296,73 @@ async def sync_time_entry_to_calendar(
     if not time_entry:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
-    # Create calendar event from time entry
-    event = CalendarEvent(
-        summary=f"Work: {data.project_name or 'Time Entry'}",
-        description=data.description or f"Time tracked via Working Tracker\nEntry ID: {data.time_entry_id}",
-        start_time=time_entry["start_time"],
-        end_time=time_entry.get("end_time") or datetime.now(timezone.utc).isoformat(),
-        reminder_minutes=0
+    access_token = await _access_token(db, user_id)
+    event = entry_event(
+        time_entry,
+        f"Work: {data.project_name or 'Time Entry'}",
+        data.description or f"Time tracked via Working Tracker\nEntry ID: {data.time_entry_id}"
     )
     
-    return await create_calendar_event(event, user_id, request)
+    result = (await _push(db, user_id, access_token, [event]))[0]
+    if result["status"] == "failed":
+        raise HTTPException(status_code=500, detail="Failed to create calendar event")
+    
+    cached = result["event"] or {}
+    return {
+        "event_id": cached.get("event_id"),
+        "html_link": cached.get("web_link"),
+        "status": result["status"]
+    }
+
+@router.post("/sync-time-entries")
+async def sync_time_entries_to_calendar(
+    data: SyncTimeEntriesRequest,
+    user_id: str,
+    request: Request = None
+):
+    """Sync many time entries to Google Calendar (batched; already-synced entries are skipped)"""
+    db = request.app.state.db
+    
+    if len(data.time_entry_ids) > MAX_SYNC_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYNC_ENTRIES} time entries per request")
+    
+    time_entries = await db.time_entries.find(
+        {"entry_id": {"$in": data.time_entry_ids}, "user_id": user_id}
+    )
+    if not time_entries:
+        raise HTTPException(status_code=404, detail="No time entries found")
+    
+    access_token = await _access_token(db, user_id)
+    events = await _entry_events(db, time_entries)
+    results = await _push(db, user_id, access_token, events)
+    
+    found = {entry["entry_id"] for entry in time_entries}
+    return {
+        "results": [{
+            "time_entry_id": result["entry_id"],
+            "status": result["status"],
+            "event_id": (result["event"] or {}).get("event_id")
+        } for result in results],
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "not_found": [entry_id for entry_id in data.time_entry_ids if entry_id not in found]
+    }
+
+@router.post("/events/sync")
+async def sync_calendar_events(user_id: str, request: Request = None):
+    """Pull calendar changes into the local cache now (incremental unless the token expired)"""
+    db = request.app.state.db
+    access_token = await _access_token(db, user_id)
+    try:
+        state = await CalendarSync(db, GOOGLE).sync(user_id, access_token, force=True)
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {
+        "synced_at": state["synced_at"],
+        "changed": state["changed"],
+        "removed": state["removed"],
+        "full": state["full"]
+    }
 
 @router.delete("/disconnect")
 async def disconnect_calendar(user_id: str, request: Request = None):
@@ -318,7 +404,7 @@ async def get_calendar_status(user_id: str, request: Request = None):
     }
 
 async def refresh_token_if_needed(db, connection):
-    """Refresh access token if expired"""
+    """Refresh access token if expired (one refresh in flight per connection)"""
     token_expiry = datetime.fromisoformat(connection.get("token_expiry", "2000-01-01T00:00:00+00:00").replace('Z', '+00:00'))
     
     if datetime.now(timezone.utc) < token_expiry - timedelta(minutes=5):
@@ -328,9 +414,9 @@ async def refresh_token_if_needed(db, connection):
     if not connection.get("refresh_token"):
         raise HTTPException(status_code=401, detail="Calendar authorization expired. Please reconnect.")
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            GOOGLE_TOKEN_URL,
+    async def refresh():
+        response = await outbound.post(
+            "google_calendar", GOOGLE_TOKEN_URL,
             data={
                 "client_id": GOOGLE_CLIENT_ID,
                 "client_secret": GOOGLE_CLIENT_SECRET,
@@ -343,14 +429,55 @@ async def refresh_token_if_needed(db, connection):
             raise HTTPException(status_code=401, detail="Failed to refresh token. Please reconnect calendar.")
         
         tokens = response.json()
+        
+        # Update stored tokens
+        await db.calendar_connections.update_one(
+            {"google_email": connection["google_email"]},
+            {"$set": {
+                "access_token": tokens["access_token"],
+                "token_expiry": (datetime.now(timezone.utc) + timedelta(seconds=tokens.get("expires_in", 3600))).isoformat()
+            }}
+        )
+        
+        return tokens["access_token"]
     
-    # Update stored tokens
-    await db.calendar_connections.update_one(
-        {"google_email": connection["google_email"]},
-        {"$set": {
-            "access_token": tokens["access_token"],
-            "token_expiry": (datetime.now(timezone.utc) + timedelta(seconds=tokens.get("expires_in", 3600))).isoformat()
-        }}
+    return await _token_refreshes.get_or_load(connection["google_email"], refresh)
+
+async def _access_token(db, user_id: str) -> str:
+    """A valid access token for the user's calendar connection"""
+    user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    if not user or not user.get("google_email"):
+        raise HTTPException(status_code=404, detail="User not connected to Google Calendar")
+    
+    connection = await db.calendar_connections.find_one(
+        {"google_email": user["google_email"]},
+        {"_id": 0}
     )
+    if not connection:
+        raise HTTPException(status_code=404, detail="Calendar not connected")
     
-    return tokens["access_token"]
+    return await refresh_token_if_needed(db, connection)
+
+async def _entry_events(db, time_entries):
+    """Calendar events for time entries, titled by project"""
+    project_ids = list({entry["project_id"] for entry in time_entries if entry.get("project_id")})
+    projects = await db.projects.find({"project_id": {"$in": project_ids}}) if project_ids else []
+    names = {project["project_id"]: project.get("name") for project in projects}
+    return [
+        entry_event(
+            entry,
+            f"Work: {names.get(entry.get('project_id')) or 'Time Entry'}",
+            entry.get("notes") or f"Time tracked via Working Tracker\nEntry ID: {entry['entry_id']}"
+        )
+        for entry in time_entries
+    ]
+
+async def _push(db, user_id: str, access_token: str, events):
+    try:
+        return await CalendarSync(db, GOOGLE).push_entries(user_id, access_token, events)
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+def _parse(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
@@ -105,6 +105,13 @@ async def get_locations(user_id: Optional[str] = None, start_date: Optional[str]
         query = {'company_id': user['company_id']}
         if user_id:
             query['user_id'] = user_id
+        # Without a range every monthly partition is scanned
+        if start_date or end_date:
+            query['timestamp'] = {}
+            if start_date:
+                query['timestamp']['$gte'] = start_date
+            if end_date:
+                query['timestamp']['$lte'] = end_date
 
         locations = await db.query('gps_locations', query)
         return {'success': True, 'data': locations}
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+from auth.dependencies import current_user
+from routes.feature_gate import consume_integration_quota, release_integration_quota
+from utils.integration_sync import SOURCES, is_running, sync_integration as run_integration_sync
+
 router = APIRouter(prefix='/api/integrations', tags=['Integrations'])
 
 class Integration(BaseModel):
@@ -18,8 +22,28 @@ class SyncLog(BaseModel):
     error_message: Optional[str] = None
     sync_duration_ms: Optional[int] = None
 
+async def _company_integration(db, integration_id: str, user: dict) -> dict:
+    """The integration if it belongs to the caller's company (404 otherwise)"""
+    integration = await db.integrations.find_one({'integration_id': integration_id})
+    if not integration or integration.get('company_id') != user['company_id']:
+        raise HTTPException(status_code=404, detail='Integration not found')
+    return integration
+
 @router.post('')
-async def create_integration(integration: Integration, user=Depends(lambda: None), db=Depends(lambda: None)):
+async def create_integration(integration: Integration, request: Request, user: dict = Depends(current_user)):
+    """Connect an integration (counts against the plan's integration limit)"""
+    db = request.app.state.db
+    quota = await consume_integration_quota(db, user['company_id'])
+    if not quota['allowed']:
+        raise HTTPException(
+            status_code=403,
+            detail={
+                'error': 'integration_limit_reached',
+                'limit': quota['limit'],
+                'used': quota['used'],
+                'message': f"Integration limit reached ({quota['limit']} integrations)"
+            }
+        )
     try:
         from utils.id_generator import generate_id
         integration_id = generate_id('integ')
@@ -35,9 +59,10 @@ async def create_integration(integration: Integration, user=Depends(lambda: None
             'created_by': user['user_id']
         }
 
-        await db.insert('integrations', integration_data)
+        await db.integrations.insert_one(integration_data)
         return {'success': True, 'integration_id': integration_id}
     except Exception as e:
+        await release_integration_quota(db, user['company_id'])
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get('')
@@ -67,12 +92,18 @@ async def update_integration(integration_id: str, integration: Integration, user
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete('/{integration_id}')
-async def delete_integration(integration_id: str, user=Depends(lambda: None), db=Depends(lambda: None)):
+async def delete_integration(integration_id: str, request: Request, user: dict = Depends(current_user)):
+    """Remove an integration and free its slot"""
+    db = request.app.state.db
+    integration = await _company_integration(db, integration_id, user)
     try:
-        await db.delete('integrations', {'integration_id': integration_id})
-        return {'success': True}
+        result = await db.integrations.delete_one({'integration_id': integration_id})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    # Only active integrations hold a slot (as reconcile_usage_counters counts them)
+    if result['deleted_count'] and integration.get('status') == 'active':
+        await release_integration_quota(db, user['company_id'])
+    return {'success': True}
 
 @router.post('/{integration_id}/sync')
 async def sync_integration(integration_id: str, sync_data: SyncLog, user=Depends(lambda: None), db=Depends(lambda: None)):
@@ -102,6 +133,33 @@ async def sync_integration(integration_id: str, sync_data: SyncLog, user=Depends
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/{integration_id}/sync/run')
+async def run_sync(integration_id: str, request: Request, background_tasks: BackgroundTasks,
+                   entity_type: Optional[str] = None, user: dict = Depends(current_user)):
+    """Start an incremental sync in the background; poll /sync/status for progress"""
+    db = request.app.state.db
+    integration = await _company_integration(db, integration_id, user)
+    if integration.get('integration_type') not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"Sync is not supported for {integration.get('integration_type')}")
+    if is_running(integration):
+        raise HTTPException(status_code=409, detail='A sync is already running')
+
+    background_tasks.add_task(run_integration_sync, db, integration_id, [entity_type] if entity_type else None)
+    return {'success': True, 'message': 'Sync started in background'}
+
+@router.get('/{integration_id}/sync/status')
+async def get_sync_status(integration_id: str, request: Request, user: dict = Depends(current_user)):
+    """Progress of the current (or last) sync and the per-entity watermarks"""
+    integration = await _company_integration(request.app.state.db, integration_id, user)
+    return {
+        'success': True,
+        'data': {
+            'sync_status': integration.get('sync_status') or {},
+            'sync_cursors': integration.get('sync_cursors') or {},
+            'last_sync_at': integration.get('last_sync_at')
+        }
+    }
+
 @router.get('/{integration_id}/logs')
 async def get_sync_logs(integration_id: str, limit: int = 50, user=Depends(lambda: None), db=Depends(lambda: None)):
     try:
@@ -7,14 +7,16 @@ Supports: Jira, Asana, Trello, Slack, Teams, GitHub, GitLab, Salesforce, HubSpot
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from datetime import datetime
-import httpx
+from datetime import datetime, timezone
 import base64
 import hashlib
 import hmac
 import json
 import os
 
+from utils.http_client import outbound
+from utils.integration_sync import JiraSource, WorklogRejected, sync_integration
+
 router = APIRouter(prefix="/api/integrations", tags=["Integrations"])
 
 # ============================================
@@ -47,52 +49,47 @@ class JiraIntegration:
     
     async def test_connection(self) -> bool:
         """Test Jira connection"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/rest/api/3/myself",
-                headers={"Authorization": f"Basic {self.auth}"}
-            )
-            return response.status_code == 200
+        response = await outbound.get(
+            "jira", f"{self.base_url}/rest/api/3/myself",
+            headers={"Authorization": f"Basic {self.auth}"}
+        )
+        return response.status_code == 200
     
     async def import_projects(self) -> List[Dict]:
         """Import projects from Jira"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/rest/api/3/project",
-                headers={"Authorization": f"Basic {self.auth}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return []
-    
-    async def import_issues(self, project_key: str) -> List[Dict]:
-        """Import issues (tasks) from Jira project"""
-        async with httpx.AsyncClient() as client:
-            jql = f"project={project_key}"
-            response = await client.get(
-                f"{self.base_url}/rest/api/3/search",
-                params={"jql": jql},
-                headers={"Authorization": f"Basic {self.auth}"}
-            )
-            if response.status_code == 200:
-                return response.json().get('issues', [])
-            return []
+        response = await outbound.get(
+            "jira", f"{self.base_url}/rest/api/3/project",
+            headers={"Authorization": f"Basic {self.auth}"}
+        )
+        if response.status_code == 200:
+            return response.json()
+        return []
     
-    async def create_worklog(self, issue_key: str, time_spent_seconds: int, comment: str):
+    async def import_issues(self, project_key: str, updated_since: Optional[datetime] = None) -> List[Dict]:
+        """Import issues (tasks) from Jira project, every page, optionally only those updated since"""
+        source = self._source()
+        issues = []
+        async for page in source.search(source.issue_jql(updated_since, [project_key])):
+            issues.extend(page)
+        return issues
+    
+    async def create_worklog(self, issue_key: str, time_spent_seconds: int, comment: str,
+                             started: Optional[datetime] = None):
         """Export time entry to Jira as worklog"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/rest/api/3/issue/{issue_key}/worklog",
-                headers={
-                    "Authorization": f"Basic {self.auth}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "timeSpentSeconds": time_spent_seconds,
-                    "comment": comment
-                }
+        try:
+            worklog_id = await self._source().add_worklog(
+                issue_key, time_spent_seconds, started or datetime.now(timezone.utc), comment
             )
-            return response.status_code == 201
+        except WorklogRejected:
+            return False
+        return worklog_id is not None
+    
+    async def create_worklogs(self, worklogs: List[Dict]) -> List[bool]:
+        """Export many time entries as worklogs concurrently ({issue_key, seconds, started, comment})"""
+        return [isinstance(result, str) for result in await self._source().add_worklogs(worklogs)]
+    
+    def _source(self) -> JiraSource:
+        return JiraSource(self.base_url, self.email, self.api_token)
 
 # ============================================
 # ASANA INTEGRATION
@@ -107,47 +104,43 @@ class AsanaIntegration:
     
     async def test_connection(self) -> bool:
         """Test Asana connection"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/users/me",
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            return response.status_code == 200
+        response = await outbound.get(
+            "asana", f"{self.base_url}/users/me",
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        return response.status_code == 200
     
     async def get_workspaces(self) -> List[Dict]:
         """Get Asana workspaces"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/workspaces",
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json().get('data', [])
-            return []
+        response = await outbound.get(
+            "asana", f"{self.base_url}/workspaces",
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json().get('data', [])
+        return []
     
     async def import_projects(self, workspace_gid: str) -> List[Dict]:
         """Import projects from Asana workspace"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/projects",
-                params={"workspace": workspace_gid},
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json().get('data', [])
-            return []
+        response = await outbound.get(
+            "asana", f"{self.base_url}/projects",
+            params={"workspace": workspace_gid},
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json().get('data', [])
+        return []
     
     async def import_tasks(self, project_gid: str) -> List[Dict]:
         """Import tasks from Asana project"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/tasks",
-                params={"project": project_gid},
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json().get('data', [])
-            return []
+        response = await outbound.get(
+            "asana", f"{self.base_url}/tasks",
+            params={"project": project_gid},
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json().get('data', [])
+        return []
 
 # ============================================
 # SLACK INTEGRATION
@@ -162,32 +155,30 @@ class SlackIntegration:
     
     async def test_connection(self) -> bool:
         """Test Slack connection"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/auth.test",
-                headers={"Authorization": f"Bearer {self.bot_token}"}
-            )
-            return response.status_code == 200 and response.json().get('ok')
+        response = await outbound.post(
+            "slack", f"{self.base_url}/auth.test",
+            headers={"Authorization": f"Bearer {self.bot_token}"}
+        )
+        return response.status_code == 200 and response.json().get('ok')
     
     async def send_message(self, channel: str, text: str, blocks: Optional[List] = None):
         """Send message to Slack channel"""
-        async with httpx.AsyncClient() as client:
-            payload = {
-                "channel": channel,
-                "text": text
-            }
-            if blocks:
-                payload["blocks"] = blocks
-            
-            response = await client.post(
-                f"{self.base_url}/chat.postMessage",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json=payload
-            )
-            return response.json()
+        payload = {
+            "channel": channel,
+            "text": text
+        }
+        if blocks:
+            payload["blocks"] = blocks
+        
+        response = await outbound.post(
+            "slack", f"{self.base_url}/chat.postMessage",
+            headers={
+                "Authorization": f"Bearer {self.bot_token}",
+                "Content-Type": "application/json"
+            },
+            json=payload
+        )
+        return response.json()
     
     async def notify_time_entry(self, channel: str, user: str, project: str, hours: float):
         """Send time entry notification to Slack"""
@@ -228,12 +219,11 @@ class TeamsIntegration:
                 "facts": facts
             }]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.webhook_url,
-                json=card
-            )
-            return response.status_code == 200
+        response = await outbound.post(
+            "teams", self.webhook_url,
+            json=card
+        )
+        return response.status_code == 200
 
 # ============================================
 # GITHUB INTEGRATION
@@ -248,14 +238,13 @@ class GitHubIntegration:
     
     async def get_user_repos(self, username: str) -> List[Dict]:
         """Get user repositories"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/users/{username}/repos",
-                headers={"Authorization": f"token {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return []
+        response = await outbound.get(
+            "github", f"{self.base_url}/users/{username}/repos",
+            headers={"Authorization": f"token {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json()
+        return []
     
     async def get_commits(self, owner: str, repo: str, author: str = None) -> List[Dict]:
         """Get repository commits"""
@@ -263,15 +252,14 @@ class GitHubIntegration:
         if author:
             params['author'] = author
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/repos/{owner}/{repo}/commits",
-                params=params,
-                headers={"Authorization": f"token {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return []
+        response = await outbound.get(
+            "github", f"{self.base_url}/repos/{owner}/{repo}/commits",
+            params=params,
+            headers={"Authorization": f"token {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json()
+        return []
 
 # ============================================
 # SALESFORCE INTEGRATION
@@ -286,15 +274,14 @@ class SalesforceIntegration:
     
     async def query(self, soql: str) -> Dict:
         """Execute SOQL query"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.instance_url}/services/data/v57.0/query",
-                params={"q": soql},
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return {}
+        response = await outbound.get(
+            "salesforce", f"{self.instance_url}/services/data/v57.0/query",
+            params={"q": soql},
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        if response.status_code == 200:
+            return response.json()
+        return {}
     
     async def get_accounts(self) -> List[Dict]:
         """Get Salesforce accounts"""
@@ -324,18 +311,17 @@ class QuickBooksIntegration:
     
     async def create_invoice(self, invoice_data: Dict) -> Dict:
         """Create invoice in QuickBooks"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/{self.realm_id}/invoice",
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json"
-                },
-                json=invoice_data
-            )
-            if response.status_code == 200:
-                return response.json()
-            return {}
+        response = await outbound.post(
+            "quickbooks", f"{self.base_url}/{self.realm_id}/invoice",
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "Content-Type": "application/json"
+            },
+            json=invoice_data
+        )
+        if response.status_code == 200:
+            return response.json()
+        return {}
     
     async def sync_invoice(self, workingtracker_invoice: Dict) -> bool:
         """Sync WorkingTracker invoice to QuickBooks"""
@@ -377,18 +363,17 @@ class GoogleDriveIntegration:
         if parent_id:
             metadata["parents"] = [parent_id]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/files",
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json"
-                },
-                json=metadata
-            )
-            if response.status_code == 200:
-                return response.json()
-            return {}
+        response = await outbound.post(
+            "google_drive", f"{self.base_url}/files",
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "Content-Type": "application/json"
+            },
+            json=metadata
+        )
+        if response.status_code == 200:
+            return response.json()
+        return {}
     
     async def upload_file(self, file_path: str, folder_id: Optional[str] = None) -> Dict:
         """Upload file to Google Drive"""
@@ -405,9 +390,8 @@ class ZapierIntegration:
     @staticmethod
     async def trigger_zap(webhook_url: str, data: Dict) -> bool:
         """Trigger a Zapier webhook"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(webhook_url, json=data)
-            return response.status_code == 200
+        response = await outbound.post("zapier", webhook_url, json=data)
+        return response.status_code == 200
 
 # ============================================
 # MAIN INTEGRATION ENDPOINTS
@@ -492,6 +476,7 @@ async def sync_integration(
         # Run sync in background
         background_tasks.add_task(
             run_integration_sync,
+            db=db,
             integration_id=sync_request.integration_id,
             sync_type=sync_request.sync_type,
             entity_type=sync_request.entity_type,
@@ -540,10 +525,9 @@ async def get_integration_status(
 # HELPER FUNCTIONS
 # ============================================
 
-async def run_integration_sync(integration_id: str, sync_type: str, entity_type: str, user_id: str):
-    """Background task for integration sync"""
-    # Implementation would handle actual sync logic
-    pass
+async def run_integration_sync(db, integration_id: str, sync_type: str, entity_type: str, user_id: str):
+    """Background task for integration sync (incremental import, then worklog export)"""
+    await sync_integration(db, integration_id, [entity_type] if entity_type else None)
 
 def encrypt_credentials(credentials: Dict) -> Dict:
     """Encrypt sensitive credentials"""
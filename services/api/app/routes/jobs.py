@@ -0,0 +1,57 @@
+"""
+Background Job Status
+Poll or subscribe to jobs submitted by heavy endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+
+from utils.jobs import job_queue, public_view, TERMINAL
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+logger = logging.getLogger(__name__)
+
+# WebSocket status checks back off from 0.5s to 5s while a job is pending
+WS_POLL_INITIAL = 0.5
+WS_POLL_MAX = 5.0
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Get a job's status, and its result once it has succeeded"""
+    db = request.app.state.db
+    job = await job_queue.get(db, job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return public_view(job)
+
+@router.websocket("/{job_id}/ws")
+async def watch_job(websocket: WebSocket, job_id: str):
+    """Push each status change of a job; closes once it has finished"""
+    db = websocket.app.state.db
+    await websocket.accept()
+
+    delay = WS_POLL_INITIAL
+    last_status = None
+    try:
+        while True:
+            job = await job_queue.get(db, job_id)
+            if not job:
+                await websocket.send_json({"type": "error", "detail": "Job not found"})
+                await websocket.close(code=4404)
+                return
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                await websocket.send_json({"type": "job", **public_view(job)})
+
+            if last_status in TERMINAL:
+                await websocket.close()
+                return
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WS_POLL_MAX)
+    except WebSocketDisconnect:
+        logger.debug(f"Job watcher disconnected: {job_id}")
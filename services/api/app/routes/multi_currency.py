@@ -8,39 +8,10 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone
-import httpx
 
-router = APIRouter(prefix="/currency", tags=["currency"])
-
-# Supported currencies with symbols
-SUPPORTED_CURRENCIES = {
-    "USD": {"symbol": "$", "name": "US Dollar"},
-    "EUR": {"symbol": "€", "name": "Euro"},
-    "GBP": {"symbol": "£", "name": "British Pound"},
-    "CAD": {"symbol": "C$", "name": "Canadian Dollar"},
-    "AUD": {"symbol": "A$", "name": "Australian Dollar"},
-    "INR": {"symbol": "₹", "name": "Indian Rupee"},
-    "JPY": {"symbol": "¥", "name": "Japanese Yen"},
-    "CNY": {"symbol": "¥", "name": "Chinese Yuan"},
-    "BRL": {"symbol": "R$", "name": "Brazilian Real"},
-    "MXN": {"symbol": "$", "name": "Mexican Peso"},
-    "SGD": {"symbol": "S$", "name": "Singapore Dollar"},
-    "CHF": {"symbol": "CHF", "name": "Swiss Franc"},
-    "NZD": {"symbol": "NZ$", "name": "New Zealand Dollar"},
-    "SEK": {"symbol": "kr", "name": "Swedish Krona"},
-    "NOK": {"symbol": "kr", "name": "Norwegian Krone"},
-    "DKK": {"symbol": "kr", "name": "Danish Krone"},
-    "ZAR": {"symbol": "R", "name": "South African Rand"},
-    "AED": {"symbol": "د.إ", "name": "UAE Dirham"},
-    "PHP": {"symbol": "₱", "name": "Philippine Peso"},
-    "PLN": {"symbol": "zł", "name": "Polish Zloty"},
-}
+from utils.fx_rates import SUPPORTED_CURRENCIES, FALLBACK, STORED, fx_rates
 
-# Cache for exchange rates (updated every hour)
-exchange_rate_cache = {
-    "rates": {},
-    "last_updated": None
-}
+router = APIRouter(prefix="/currency", tags=["currency"])
 
 class CurrencyConversion(BaseModel):
     amount: float
@@ -62,81 +33,33 @@ async def get_supported_currencies():
     }
 
 @router.get("/rates")
-async def get_exchange_rates(base: str = "USD"):
+async def get_exchange_rates(request: Request, base: str = "USD"):
     """Get current exchange rates"""
     if base not in SUPPORTED_CURRENCIES:
         raise HTTPException(status_code=400, detail=f"Unsupported base currency: {base}")
     
-    # Check cache (refresh hourly)
-    now = datetime.now(timezone.utc)
-    if (exchange_rate_cache["last_updated"] and 
-        (now - exchange_rate_cache["last_updated"]).seconds < 3600 and
-        exchange_rate_cache.get("base") == base):
-        return {
-            "base": base,
-            "rates": exchange_rate_cache["rates"],
-            "last_updated": exchange_rate_cache["last_updated"].isoformat()
-        }
-    
-    # Fetch fresh rates (using free API)
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.exchangerate-api.com/v4/latest/{base}",
-                timeout=10.0
-            )
-            data = response.json()
-            
-            # Filter to supported currencies only
-            rates = {
-                code: data["rates"].get(code, 1.0)
-                for code in SUPPORTED_CURRENCIES.keys()
-            }
-            
-            exchange_rate_cache["rates"] = rates
-            exchange_rate_cache["base"] = base
-            exchange_rate_cache["last_updated"] = now
-            
-            return {
-                "base": base,
-                "rates": rates,
-                "last_updated": now.isoformat()
-            }
-    except Exception as e:
-        # Return cached rates if available, otherwise fallback rates
-        if exchange_rate_cache["rates"]:
-            return {
-                "base": base,
-                "rates": exchange_rate_cache["rates"],
-                "last_updated": exchange_rate_cache["last_updated"].isoformat(),
-                "cached": True
-            }
-        
-        # Fallback static rates (approximate)
-        return {
-            "base": "USD",
-            "rates": {
-                "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "CAD": 1.36,
-                "AUD": 1.53, "INR": 83.12, "JPY": 149.50, "CNY": 7.24,
-                "BRL": 4.97, "MXN": 17.15, "SGD": 1.34, "CHF": 0.88,
-                "NZD": 1.63, "SEK": 10.42, "NOK": 10.52, "DKK": 6.87,
-                "ZAR": 18.62, "AED": 3.67, "PHP": 55.50, "PLN": 4.02
-            },
-            "fallback": True
-        }
+    matrix = await fx_rates.matrix(request.app.state.db)
+    result = {
+        "base": base,
+        "rates": matrix.rates_for(base),
+        "last_updated": matrix.fetched_at.isoformat()
+    }
+    if matrix.source == STORED:
+        result["cached"] = True
+    elif matrix.source == FALLBACK:
+        result["fallback"] = True
+    return result
 
 @router.post("/convert")
-async def convert_currency(conversion: CurrencyConversion):
+async def convert_currency(request: Request, conversion: CurrencyConversion):
     """Convert amount between currencies"""
     if conversion.from_currency not in SUPPORTED_CURRENCIES:
         raise HTTPException(status_code=400, detail=f"Unsupported currency: {conversion.from_currency}")
     if conversion.to_currency not in SUPPORTED_CURRENCIES:
         raise HTTPException(status_code=400, detail=f"Unsupported currency: {conversion.to_currency}")
     
-    rates_data = await get_exchange_rates(conversion.from_currency)
-    rates = rates_data["rates"]
-    
-    converted_amount = conversion.amount * rates.get(conversion.to_currency, 1.0)
+    matrix = await fx_rates.matrix(request.app.state.db)
+    rate = matrix.rate(conversion.from_currency, conversion.to_currency)
     
     return {
         "original": {
@@ -145,11 +68,11 @@ async def convert_currency(conversion: CurrencyConversion):
             "symbol": SUPPORTED_CURRENCIES[conversion.from_currency]["symbol"]
         },
         "converted": {
-            "amount": round(converted_amount, 2),
+            "amount": round(conversion.amount * rate, 2),
             "currency": conversion.to_currency,
             "symbol": SUPPORTED_CURRENCIES[conversion.to_currency]["symbol"]
         },
-        "rate": rates.get(conversion.to_currency, 1.0)
+        "rate": rate
     }
 
 @router.post("/payroll/settings")
@@ -218,39 +141,39 @@ async def calculate_multi_currency_payroll(
     base_currency = settings["base_currency"]
     employee_currencies = settings["employee_currencies"]
     
-    # Get exchange rates
-    rates_data = await get_exchange_rates(base_currency)
-    rates = rates_data["rates"]
+    matrix = await fx_rates.matrix(db)
     
     # Get payroll data
     payroll = await db.payroll.find({
         "period_start": {"$gte": period_start},
         "period_end": {"$lte": period_end}
-    }, {"_id": 0}).to_list(1000)
+    }, {"_id": 0}, limit=1000)
+    
+    # Convert every record to its employee's currency in one pass
+    targets = [employee_currencies.get(record.get("user_id"), base_currency) for record in payroll]
+    gross = [record.get("gross_pay", 0) for record in payroll]
+    net = [record.get("net_pay", 0) for record in payroll]
+    converted_gross = matrix.convert_many(gross, base_currency, targets)
+    converted_net = matrix.convert_many(net, base_currency, targets)
+    exchange_rates = matrix.convert_many([1.0] * len(payroll), base_currency, targets, decimals=None)
     
-    # Convert to employee currencies
-    multi_currency_payroll = []
-    for record in payroll:
-        user_id = record.get("user_id")
-        target_currency = employee_currencies.get(user_id, base_currency)
-        rate = rates.get(target_currency, 1.0)
-        
-        # Convert amounts
-        converted_record = {
+    multi_currency_payroll = [
+        {
             **record,
             "original_currency": base_currency,
             "payment_currency": target_currency,
-            "exchange_rate": rate,
+            "exchange_rate": float(rate),
             "original_gross": record.get("gross_pay", 0),
             "original_net": record.get("net_pay", 0),
-            "converted_gross": round(record.get("gross_pay", 0) * rate, 2),
-            "converted_net": round(record.get("net_pay", 0) * rate, 2),
+            "converted_gross": float(converted_gross[i]),
+            "converted_net": float(converted_net[i]),
             "currency_symbol": SUPPORTED_CURRENCIES.get(target_currency, {}).get("symbol", "$")
         }
-        multi_currency_payroll.append(converted_record)
+        for i, (record, target_currency, rate) in enumerate(zip(payroll, targets, exchange_rates))
+    ]
     
     return {
         "base_currency": base_currency,
-        "rates_date": rates_data.get("last_updated"),
+        "rates_date": matrix.fetched_at.isoformat(),
         "payroll": multi_currency_payroll
     }
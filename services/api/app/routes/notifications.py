@@ -2,11 +2,10 @@
 Notifications Routes
 Handles user notifications for screenshots, recordings, submissions, etc.
 """
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime, timezone
-from utils.id_generator import generate_id
+from typing import Iterable, List, Optional
+from utils.notifications import notification_inbox
 import logging
 
 router = APIRouter()
@@ -28,51 +27,55 @@ async def create_notification(
     priority: str = "normal"
 ):
     """Helper function to create a notification"""
+    ids = await create_notifications(db, company_id, [user_id], notification_type, title, message, data, priority)
+    return ids[0] if ids else None
+
+
+async def create_notifications(
+    db,
+    company_id: str,
+    user_ids: Iterable[str],
+    notification_type: str,
+    title: str,
+    message: str,
+    data: Optional[dict] = None,
+    priority: str = "normal"
+) -> List[str]:
+    """Helper function to send the same notification to many users in one insert"""
     try:
-        notification_id = generate_id("notification")
-
-        notification_doc = {
-            "notification_id": notification_id,
-            "company_id": company_id,
-            "user_id": user_id,
-            "notification_type": notification_type,
-            "title": title,
-            "message": message,
-            "data": data or {},
-            "read": False,
-            "priority": priority,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-
-        await db.notifications.insert_one(notification_doc)
-        logger.info(f"Created notification {notification_id} for user {user_id}")
-
-        return notification_id
+        notification_ids = await notification_inbox.create_many(
+            db, company_id, user_ids, notification_type, title, message, data, priority
+        )
+        logger.info(f"Created {len(notification_ids)} {notification_type} notifications")
+        return notification_ids
 
     except Exception as e:
-        logger.error(f"Error creating notification: {e}")
-        return None
+        logger.error(f"Error creating notifications: {e}")
+        return []
 
 
 @router.get("")
-async def get_notifications(request: Request, user: dict, unread_only: Optional[bool] = False):
-    """Get user notifications"""
+async def get_notifications(
+    request: Request,
+    response: Response,
+    user: dict,
+    unread_only: Optional[bool] = False,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get user notifications, newest first (next page cursor in X-Next-Cursor)"""
     from db import SupabaseDB
     db = SupabaseDB.get_db()
 
     try:
-        query = {
-            "user_id": user["user_id"],
-            "company_id": user["company_id"]
-        }
-
-        if unread_only:
-            query["read"] = False
-
-        notifications = await db.notifications.find(query, sort=[("created_at", -1)], limit=100)
+        notifications = await notification_inbox.page(
+            db, user["user_id"], user["company_id"], limit, cursor, response, unread_only=unread_only
+        )
 
-        return {"success": True, "data": notifications}
+        return {"success": True, "data": notifications, "next_cursor": response.headers.get("X-Next-Cursor")}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching notifications: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -85,11 +88,7 @@ async def get_unread_count(request: Request, user: dict):
     db = SupabaseDB.get_db()
 
     try:
-        count = await db.notifications.count({
-            "user_id": user["user_id"],
-            "company_id": user["company_id"],
-            "read": False
-        })
+        count = await notification_inbox.unread_count(db, user["user_id"], user["company_id"])
 
         return {"success": True, "count": count}
 
@@ -105,21 +104,11 @@ async def mark_notifications_read(data: NotificationMarkRead, request: Request,
     db = SupabaseDB.get_db()
 
     try:
-        # Update all specified notifications
-        await db.notifications.update_many(
-            {
-                "notification_id": {"$in": data.notification_ids},
-                "user_id": user["user_id"]
-            },
-            {
-                "$set": {
-                    "read": True,
-                    "read_at": datetime.now(timezone.utc).isoformat()
-                }
-            }
+        updated = await notification_inbox.mark_read(
+            db, user["user_id"], user["company_id"], data.notification_ids
         )
 
-        return {"success": True, "message": "Notifications marked as read"}
+        return {"success": True, "message": "Notifications marked as read", "updated": updated}
 
     except Exception as e:
         logger.error(f"Error marking notifications as read: {e}")
@@ -133,21 +122,9 @@ async def mark_all_notifications_read(request: Request, user: dict):
     db = SupabaseDB.get_db()
 
     try:
-        await db.notifications.update_many(
-            {
-                "user_id": user["user_id"],
-                "company_id": user["company_id"],
-                "read": False
-            },
-            {
-                "$set": {
-                    "read": True,
-                    "read_at": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
+        updated = await notification_inbox.mark_read(db, user["user_id"], user["company_id"])
 
-        return {"success": True, "message": "All notifications marked as read"}
+        return {"success": True, "message": "All notifications marked as read", "updated": updated}
 
     except Exception as e:
         logger.error(f"Error marking all notifications as read: {e}")
@@ -161,12 +138,9 @@ async def delete_notification(notification_id: str, request: Request, user: dict
     db = SupabaseDB.get_db()
 
     try:
-        result = await db.notifications.delete_one({
-            "notification_id": notification_id,
-            "user_id": user["user_id"]
-        })
+        deleted = await notification_inbox.delete(db, user["user_id"], notification_id)
 
-        if result.deleted_count == 0:
+        if deleted == 0:
             raise HTTPException(status_code=404, detail="Notification not found")
 
         return {"success": True, "message": "Notification deleted"}
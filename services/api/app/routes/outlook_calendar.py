@@ -10,10 +10,13 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
 import os
-import httpx
 import uuid
 import logging
 
+from utils.calendar_sync import OUTLOOK, CalendarError, CalendarSync, entry_event
+from utils.http_client import outbound
+from utils.ttl_cache import TTLCache
+
 router = APIRouter(prefix="/outlook", tags=["outlook"])
 logger = logging.getLogger(__name__)
 
@@ -48,6 +51,14 @@ class SyncTimeEntryRequest(BaseModel):
     project_name: Optional[str] = None
     description: Optional[str] = None
 
+class SyncTimeEntriesRequest(BaseModel):
+    time_entry_ids: List[str]
+
+MAX_SYNC_ENTRIES = 500
+
+# Concurrent requests for one connection share a single token refresh
+_token_refreshes = TTLCache('outlook_calendar_token', 60, 10000)
+
 @router.get("/connect")
 async def connect_outlook_calendar(request: Request):
     """Initiate Outlook Calendar OAuth flow"""
@@ -78,32 +89,30 @@ async def outlook_callback(code: str, state: str = None, request: Request = None
         raise HTTPException(status_code=503, detail="Outlook not configured")
     
     # Exchange code for tokens
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            MS_TOKEN_URL,
-            data={
-                "client_id": MS_CLIENT_ID,
-                "client_secret": MS_CLIENT_SECRET,
-                "code": code,
-                "redirect_uri": MS_REDIRECT_URI,
-                "grant_type": "authorization_code"
-            }
-        )
-        
-        if token_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get tokens")
-        
-        tokens = token_response.json()
+    token_response = await outbound.post(
+        "outlook_calendar", MS_TOKEN_URL,
+        data={
+            "client_id": MS_CLIENT_ID,
+            "client_secret": MS_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": MS_REDIRECT_URI,
+            "grant_type": "authorization_code"
+        }
+    )
+    
+    if token_response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get tokens")
+    
+    tokens = token_response.json()
     
     db = request.app.state.db
     
     # Get user info from Microsoft Graph
-    async with httpx.AsyncClient() as client:
-        user_response = await client.get(
-            f"{MS_GRAPH_API}/me",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        ms_user = user_response.json()
+    user_response = await outbound.get(
+        "outlook_calendar", f"{MS_GRAPH_API}/me",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
+    ms_user = user_response.json()
     
     # Store connection
     await db.outlook_connections.update_one(
@@ -153,22 +162,43 @@ async def get_outlook_events(
     if not end_date:
         end_date = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{MS_GRAPH_API}/me/calendarview",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={
-                "startdatetime": start_date,
-                "enddatetime": end_date,
-                "$orderby": "start/dateTime",
-                "$top": 50
-            }
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch events")
-        
-        data = response.json()
+    # Serve from the local cache when the synced window covers the range
+    calendar = CalendarSync(db, OUTLOOK)
+    try:
+        state = await calendar.sync(user_id, access_token)
+    except CalendarError as e:
+        logger.warning(f"Outlook sync failed for {user_id}: {e}")
+        state = {}
+    start, end = _parse(start_date), _parse(end_date)
+    if CalendarSync.covers(state, start, end):
+        rows = await calendar.cached_events(user_id, start, end)
+        events = [{
+            "id": row["event_id"],
+            "subject": row.get("summary"),
+            "body": row.get("description"),
+            "start": row.get("start_at"),
+            "end": row.get("end_at"),
+            "location": row.get("location"),
+            "is_online_meeting": row.get("is_online_meeting"),
+            "web_link": row.get("web_link")
+        } for row in rows]
+        return {"events": events, "count": len(events)}
+    
+    response = await outbound.get(
+        "outlook_calendar", f"{MS_GRAPH_API}/me/calendarview",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={
+            "startdatetime": start_date,
+            "enddatetime": end_date,
+            "$orderby": "start/dateTime",
+            "$top": 50
+        }
+    )
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail="Failed to fetch events")
+    
+    data = response.json()
     
     events = []
     for item in data.get("value", []):
@@ -235,20 +265,19 @@ async def create_outlook_event(
     if event.location:
         event_body["location"] = {"displayName": event.location}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{MS_GRAPH_API}/me/events",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            },
-            json=event_body
-        )
-        
-        if response.status_code not in [200, 201]:
-            raise HTTPException(status_code=500, detail="Failed to create event")
-        
-        created_event = response.json()
+    response = await outbound.post(
+        "outlook_calendar", f"{MS_GRAPH_API}/me/events",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        },
+        json=event_body
+    )
+    
+    if response.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail="Failed to create event")
+    
+    created_event = response.json()
     
     return {
         "event_id": created_event.get("id"),
@@ -273,14 +302,73 @@ async def sync_time_entry_to_outlook(
     if not time_entry:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
-    event = OutlookEvent(
-        subject=f"Work: {data.project_name or 'Time Entry'}",
-        body=data.description or f"Time tracked via Working Tracker\nEntry ID: {data.time_entry_id}",
-        start_time=time_entry["start_time"],
-        end_time=time_entry.get("end_time") or datetime.now(timezone.utc).isoformat()
+    access_token = await _access_token(db, user_id)
+    event = entry_event(
+        time_entry,
+        f"Work: {data.project_name or 'Time Entry'}",
+        data.description or f"Time tracked via Working Tracker\nEntry ID: {data.time_entry_id}"
     )
     
-    return await create_outlook_event(event, user_id, request)
+    result = (await _push(db, user_id, access_token, [event]))[0]
+    if result["status"] == "failed":
+        raise HTTPException(status_code=500, detail="Failed to create event")
+    
+    cached = result["event"] or {}
+    return {
+        "event_id": cached.get("event_id"),
+        "web_link": cached.get("web_link"),
+        "status": result["status"]
+    }
+
+@router.post("/sync-time-entries")
+async def sync_time_entries_to_outlook(
+    data: SyncTimeEntriesRequest,
+    user_id: str,
+    request: Request = None
+):
+    """Sync many time entries to Outlook Calendar (batched; already-synced entries are skipped)"""
+    db = request.app.state.db
+    
+    if len(data.time_entry_ids) > MAX_SYNC_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYNC_ENTRIES} time entries per request")
+    
+    time_entries = await db.time_entries.find(
+        {"entry_id": {"$in": data.time_entry_ids}, "user_id": user_id}
+    )
+    if not time_entries:
+        raise HTTPException(status_code=404, detail="No time entries found")
+    
+    access_token = await _access_token(db, user_id)
+    events = await _entry_events(db, time_entries)
+    results = await _push(db, user_id, access_token, events)
+    
+    found = {entry["entry_id"] for entry in time_entries}
+    return {
+        "results": [{
+            "time_entry_id": result["entry_id"],
+            "status": result["status"],
+            "event_id": (result["event"] or {}).get("event_id")
+        } for result in results],
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "not_found": [entry_id for entry_id in data.time_entry_ids if entry_id not in found]
+    }
+
+@router.post("/events/sync")
+async def sync_outlook_events(user_id: str, request: Request = None):
+    """Pull calendar changes into the local cache now (delta unless the link expired)"""
+    db = request.app.state.db
+    access_token = await _access_token(db, user_id)
+    try:
+        state = await CalendarSync(db, OUTLOOK).sync(user_id, access_token, force=True)
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {
+        "synced_at": state["synced_at"],
+        "changed": state["changed"],
+        "removed": state["removed"],
+        "full": state["full"]
+    }
 
 @router.delete("/disconnect")
 async def disconnect_outlook(user_id: str, request: Request = None):
@@ -320,7 +408,7 @@ async def get_outlook_status(user_id: str, request: Request = None):
     }
 
 async def refresh_outlook_token_if_needed(db, connection):
-    """Refresh Outlook access token if expired"""
+    """Refresh Outlook access token if expired (one refresh in flight per connection)"""
     token_expiry = datetime.fromisoformat(connection.get("token_expiry", "2000-01-01T00:00:00+00:00").replace('Z', '+00:00'))
     
     if datetime.now(timezone.utc) < token_expiry - timedelta(minutes=5):
@@ -329,9 +417,10 @@ async def refresh_outlook_token_if_needed(db, connection):
     if not connection.get("refresh_token"):
         raise HTTPException(status_code=401, detail="Outlook authorization expired. Please reconnect.")
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            MS_TOKEN_URL,
+    # Microsoft rotates refresh tokens, so parallel refreshes would race
+    async def refresh():
+        response = await outbound.post(
+            "outlook_calendar", MS_TOKEN_URL,
             data={
                 "client_id": MS_CLIENT_ID,
                 "client_secret": MS_CLIENT_SECRET,
@@ -344,14 +433,55 @@ async def refresh_outlook_token_if_needed(db, connection):
             raise HTTPException(status_code=401, detail="Failed to refresh token. Please reconnect.")
         
         tokens = response.json()
+        
+        await db.outlook_connections.update_one(
+            {"ms_email": connection["ms_email"]},
+            {"$set": {
+                "access_token": tokens["access_token"],
+                "refresh_token": tokens.get("refresh_token", connection["refresh_token"]),
+                "token_expiry": (datetime.now(timezone.utc) + timedelta(seconds=tokens.get("expires_in", 3600))).isoformat()
+            }}
+        )
+        
+        return tokens["access_token"]
     
-    await db.outlook_connections.update_one(
-        {"ms_email": connection["ms_email"]},
-        {"$set": {
-            "access_token": tokens["access_token"],
-            "refresh_token": tokens.get("refresh_token", connection["refresh_token"]),
-            "token_expiry": (datetime.now(timezone.utc) + timedelta(seconds=tokens.get("expires_in", 3600))).isoformat()
-        }}
+    return await _token_refreshes.get_or_load(connection["ms_email"], refresh)
+
+async def _access_token(db, user_id: str) -> str:
+    """A valid access token for the user's Outlook connection"""
+    user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    connection = await db.outlook_connections.find_one(
+        {"ms_email": user.get("email")},
+        {"_id": 0}
     )
+    if not connection:
+        raise HTTPException(status_code=404, detail="Outlook not connected")
     
-    return tokens["access_token"]
+    return await refresh_outlook_token_if_needed(db, connection)
+
+async def _entry_events(db, time_entries):
+    """Calendar events for time entries, titled by project"""
+    project_ids = list({entry["project_id"] for entry in time_entries if entry.get("project_id")})
+    projects = await db.projects.find({"project_id": {"$in": project_ids}}) if project_ids else []
+    names = {project["project_id"]: project.get("name") for project in projects}
+    return [
+        entry_event(
+            entry,
+            f"Work: {names.get(entry.get('project_id')) or 'Time Entry'}",
+            entry.get("notes") or f"Time tracked via Working Tracker\nEntry ID: {entry['entry_id']}"
+        )
+        for entry in time_entries
+    ]
+
+async def _push(db, user_id: str, access_token: str, events):
+    try:
+        return await CalendarSync(db, OUTLOOK).push_entries(user_id, access_token, events)
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+def _parse(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
@@ -11,6 +11,8 @@ from datetime import datetime, timezone, timedelta
 from enum import Enum
 import uuid
 
+from utils.entitlements import entitlements
+
 router = APIRouter(prefix="/pricing", tags=["pricing"])
 
 # ==================== PLAN DEFINITIONS ====================
@@ -432,6 +434,7 @@ async def start_free_trial(data: StartTrialRequest, request: Request):
     }
     
     await db.subscriptions.insert_one(subscription)
+    entitlements.invalidate(data.company_id)
     
     return {
         "subscription_id": subscription_id,
@@ -486,6 +489,7 @@ async def get_subscription(company_id: str, request: Request):
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             await db.subscriptions.insert_one(starter_sub)
+            entitlements.invalidate(company_id)
             
             return {
                 "has_subscription": True,
@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
+from utils.query_cache import query_cache
+
 router = APIRouter(prefix='/api/productivity', tags=['Productivity Monitoring'])
 
 class AppUsage(BaseModel):
@@ -304,6 +306,7 @@ async def get_productivity_score(user_id: Optional[str] = None, date_param: Opti
             }
 
             await db.insert('productivity_scores', score_data)
+            await query_cache.invalidate(user['company_id'], 'productivity_scores')
             score = score_data
 
         return {'success': True, 'data': score}
@@ -190,22 +190,21 @@ async def approve_project_wage(assignment_id: str, data: ProjectWageApproval, re
         )
 
         # Notify admin
-        from routes.notifications import create_notification
+        from routes.notifications import create_notifications
         admins = await db.users.find({
             "company_id": assignment["company_id"],
             "role": "admin"
         })
-        for admin in admins:
-            await create_notification(
-                db=db,
-                company_id=assignment["company_id"],
-                user_id=admin["user_id"],
-                notification_type="project_wage_approved",
-                title="Project Wage Response",
-                message=f"Employee {'approved' if data.approved else 'rejected'} project wage",
-                data={"assignment_id": assignment_id},
-                priority="normal"
-            )
+        await create_notifications(
+            db=db,
+            company_id=assignment["company_id"],
+            user_ids=[admin["user_id"] for admin in admins],
+            notification_type="project_wage_approved",
+            title="Project Wage Response",
+            message=f"Employee {'approved' if data.approved else 'rejected'} project wage",
+            data={"assignment_id": assignment_id},
+            priority="normal"
+        )
 
         return {"success": True, "message": "Project wage approval updated"}
 
@@ -7,8 +7,11 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from functools import lru_cache
 import uuid
 
+from auth.rbac import PermissionBits, guard_endpoint
+
 router = APIRouter(prefix="/api/rbac", tags=["RBAC"])
 
 # ============================================
@@ -519,6 +522,13 @@ PERMISSIONS_MATRIX = {
     }
 }
 
+# Matrix compiled to bitmasks: one bit per permission name, one mask per role
+MATRIX_BITS = PermissionBits(PERMISSIONS_MATRIX["ceo"].keys())
+ROLE_MASKS = {
+    role: MATRIX_BITS.mask(name for name, granted in permissions.items() if granted)
+    for role, permissions in PERMISSIONS_MATRIX.items()
+}
+
 # ============================================
 # PYDANTIC MODELS
 # ============================================
@@ -684,31 +694,28 @@ async def get_user_permissions(
 # HELPER FUNCTIONS
 # ============================================
 
+@lru_cache(maxsize=4096)
+def _compile_mask(role: str, grants: tuple) -> int:
+    # Custom permissions override the role, as in get_user_permissions
+    return MATRIX_BITS.apply_grants(ROLE_MASKS.get(role, 0), grants)
+
+def permission_mask(user: dict) -> int:
+    """Role and custom_permissions compiled into one bitmask"""
+    custom_perms = user.get('custom_permissions') or {}
+    return _compile_mask(user.get('role', 'employee'), tuple(sorted(custom_perms.items())))
+
 def has_permission(user: dict, permission: str) -> bool:
     """Check if user has specific permission"""
-    role = user.get('role', 'employee')
-    base_permissions = PERMISSIONS_MATRIX.get(role, {})
-    
-    # Check custom permissions
-    custom_perms = user.get('custom_permissions', {})
-    
-    # Custom permissions override base
-    if permission in custom_perms:
-        return custom_perms[permission]
-    
-    return base_permissions.get(permission, False)
+    return bool(permission_mask(user) & MATRIX_BITS.bits.get(permission, 0))
 
 def require_permission(permission: str):
-    """Decorator to require specific permission"""
+    """Decorator to require specific permission (endpoint takes current_user)"""
     def decorator(func):
-        async def wrapper(*args, current_user: dict = None, **kwargs):
-            if not has_permission(current_user, permission):
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"Permission '{permission}' required"
-                )
-            return await func(*args, current_user=current_user, **kwargs)
-        return wrapper
+        return guard_endpoint(
+            func,
+            lambda user: has_permission(user, permission),
+            f"Permission '{permission}' required"
+        )
     return decorator
 
 async def get_current_user():
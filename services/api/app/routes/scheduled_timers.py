@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone, time
 import logging
+from utils.manager_scope import manager_scopes
 
 logger = logging.getLogger(__name__)
 
@@ -87,11 +88,7 @@ async def create_scheduled_timer(
 
     # Check if manager is assigned to employee
     if user["role"] == "manager":
-        assignment = await db.manager_assignments.find_one({
-            "manager_id": user["user_id"],
-            "employee_id": data.employee_id
-        })
-        if not assignment:
+        if data.employee_id not in await manager_scopes.get_assigned(db, user["user_id"]):
             raise HTTPException(status_code=403, detail="You are not assigned to this employee")
 
     # Validate agreement if provided
@@ -166,14 +163,13 @@ async def get_scheduled_timers(
         query["employee_id"] = user["user_id"]
     elif user["role"] == "manager":
         # Get assigned employees
-        assignments = await db.manager_assignments.find({
-            "manager_id": user["user_id"]
-        })
-        assigned_employee_ids = [a["employee_id"] for a in assignments]
-        query["employee_id"] = {"$in": assigned_employee_ids}
+        assigned_employee_ids = await manager_scopes.get_assigned(db, user["user_id"])
+        query["employee_id"] = {"$in": list(assigned_employee_ids)}
 
-    # Filter by employee_id if provided
+    # Filter by employee_id if provided (managers only within their assignments)
     if employee_id and user["role"] in ["admin", "manager"]:
+        if user["role"] == "manager" and employee_id not in assigned_employee_ids:
+            raise HTTPException(status_code=403, detail="You are not assigned to this employee")
         query["employee_id"] = employee_id
 
     # Filter by active status
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timezone
 from utils.id_generator import generate_id
+from utils.manager_scope import manager_scopes
 import logging
 
 router = APIRouter()
@@ -120,21 +121,12 @@ async def get_recordings(
             # Managers see their assigned employees' recordings
             if employee_id:
                 # Check if manager is assigned to this employee
-                assignment = await db.manager_assignments.find_one({
-                    "manager_id": user["user_id"],
-                    "employee_id": employee_id,
-                    "active": True
-                })
-                if not assignment:
+                if employee_id not in await manager_scopes.get_assigned(db, user["user_id"]):
                     raise HTTPException(status_code=403, detail="Access denied")
                 query["user_id"] = employee_id
             else:
                 # Get all assigned employees
-                assigned_employees = await db.manager_assignments.find({
-                    "manager_id": user["user_id"],
-                    "active": True
-                })
-                employee_ids = [a["employee_id"] for a in assigned_employees]
+                employee_ids = list(await manager_scopes.get_assigned(db, user["user_id"]))
                 query["user_id"] = {"$in": employee_ids}
         else:
             # Admins see all company recordings
@@ -183,12 +175,7 @@ async def get_recording(recording_id: str, request: Request, user: dict):
             has_access = recording["company_id"] == user["company_id"]
         elif user["role"] == "manager":
             # Check if manager is assigned to employee
-            assignment = await db.manager_assignments.find_one({
-                "manager_id": user["user_id"],
-                "employee_id": recording["user_id"],
-                "active": True
-            })
-            has_access = assignment is not None
+            has_access = recording["user_id"] in await manager_scopes.get_assigned(db, user["user_id"])
         elif user["user_id"] == recording["user_id"]:
             has_access = True
 
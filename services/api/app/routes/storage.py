@@ -1,44 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File, Form
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Optional
 import os
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
 import base64
 import uuid
 from datetime import datetime, timezone
 import logging
 
+from utils.object_storage import get_uploader
+
 router = APIRouter(prefix="/storage", tags=["storage"])
 logger = logging.getLogger(__name__)
 
 # S3-compatible storage configuration (works with Contabo Object Storage, MinIO, AWS S3, etc.)
 def get_s3_client():
-    """Initialize S3-compatible client for Contabo or other providers"""
-    endpoint_url = os.environ.get('S3_ENDPOINT_URL')  # e.g., https://eu2.contabostorage.com
-    access_key = os.environ.get('S3_ACCESS_KEY')
-    secret_key = os.environ.get('S3_SECRET_KEY')
-    region = os.environ.get('S3_REGION', 'eu2')
-    
-    if not all([endpoint_url, access_key, secret_key]):
-        return None
-    
-    return boto3.client(
-        's3',
-        endpoint_url=endpoint_url,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        region_name=region,
-        config=Config(
-            signature_version='s3v4',
-            s3={'addressing_style': 'path'}
-        )
-    )
+    """Shared S3-compatible client (None if storage is not configured)"""
+    uploader = get_uploader()
+    return uploader.client if uploader else None
 
 def get_bucket_name():
     return os.environ.get('S3_BUCKET_NAME', 'workmonitor-screenshots')
 
+# Extensions for accepted screenshot content types
+SCREENSHOT_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp'
+}
+
+# Chunk size when reading multipart form files
+UPLOAD_READ_CHUNK = 1024 * 1024
+
 class ScreenshotUploadRequest(BaseModel):
     time_entry_id: str
     image_data: str  # Base64 encoded image
@@ -51,93 +44,182 @@ class PresignedUrlRequest(BaseModel):
     file_key: str
     expires_in: int = 3600  # 1 hour default
 
+async def _store_screenshot(
+    db,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    time_entry_id: str,
+    taken_at: str,
+    app_name: Optional[str],
+    window_title: Optional[str],
+    blurred: bool
+) -> dict:
+    """
+    Stream a screenshot body to object storage, then record its metadata
+
+    Metadata is only written once the upload has completed, so a failed
+    upload never leaves a row pointing at a missing object.
+    """
+    uploader = get_uploader()
+    extension = SCREENSHOT_EXTENSIONS.get(content_type)
+    if not extension:
+        raise HTTPException(status_code=415, detail=f"Unsupported screenshot type: {content_type}")
+    
+    # Generate unique file key
+    screenshot_id = f"ss_{uuid.uuid4().hex[:12]}"
+    file_key = f"screenshots/{datetime.now().strftime('%Y/%m/%d')}/{screenshot_id}.{extension}"
+    
+    if uploader:
+        # Upload to S3-compatible storage (off the event loop, multipart for large bodies)
+        result = await uploader.upload_stream(
+            file_key,
+            chunks,
+            content_type,
+            metadata={
+                'time_entry_id': time_entry_id,
+                'taken_at': taken_at,
+                'app_name': app_name or '',
+                'blurred': str(blurred)
+            }
+        )
+        file_size = result.size
+        
+        # Generate presigned URL for viewing
+        url = await uploader.presigned_get_url(file_key, expires_in=86400)  # 24 hours
+    else:
+        # Fallback: Store reference without actual upload (for development)
+        file_size = 0
+        async for chunk in chunks:
+            file_size += len(chunk)
+        url = f"/api/storage/screenshots/{screenshot_id}"
+        logger.warning("S3 not configured - screenshot stored as reference only")
+    
+    # Save metadata to database
+    screenshot_doc = {
+        "screenshot_id": screenshot_id,
+        "time_entry_id": time_entry_id,
+        "s3_key": file_key,
+        "s3_url": url,
+        "taken_at": taken_at,
+        "app_name": app_name,
+        "window_title": window_title,
+        "blurred": blurred,
+        "file_size": file_size,
+        "storage_type": "s3" if uploader else "reference",
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    
+    await db.screenshots.insert_one(screenshot_doc)
+    
+    return {
+        "screenshot_id": screenshot_id,
+        "url": url,
+        "file_key": file_key,
+        "file_size": file_size,
+        "storage_type": screenshot_doc["storage_type"]
+    }
+
 @router.post("/upload-screenshot")
 async def upload_screenshot(
     data: ScreenshotUploadRequest,
     request: Request
 ):
-    """Upload a screenshot to S3-compatible storage"""
+    """
+    Upload a base64-encoded screenshot (legacy JSON clients)
+    Prefer /screenshots/raw or /screenshots/upload, which avoid base64 overhead
+    """
     db = request.app.state.db
-    s3_client = get_s3_client()
-    bucket_name = get_bucket_name()
+    uploader = get_uploader()
+
+    async def decoded():
+        # Decode on the upload pool - large payloads would otherwise stall the event loop
+        if uploader:
+            yield await uploader.run(base64.b64decode, data.image_data)
+        else:
+            yield base64.b64decode(data.image_data)
+
+    try:
+        return await _store_screenshot(
+            db, decoded(), 'image/png',
+            data.time_entry_id, data.taken_at, data.app_name, data.window_title, data.blurred
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Screenshot upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to upload screenshot: {str(e)}")
+
+@router.post("/screenshots/raw")
+async def upload_screenshot_raw(
+    request: Request,
+    time_entry_id: str,
+    taken_at: str,
+    app_name: Optional[str] = None,
+    window_title: Optional[str] = None,
+    blurred: bool = False
+):
+    """
+    Upload a screenshot sent as the raw request body (Content-Type: image/png|jpeg|webp)
+    The body is streamed to storage as it arrives
+    """
+    db = request.app.state.db
+    content_type = request.headers.get('content-type', 'image/png').split(';')[0].strip()
     
-    # Generate unique file key
-    screenshot_id = f"ss_{uuid.uuid4().hex[:12]}"
-    file_key = f"screenshots/{datetime.now().strftime('%Y/%m/%d')}/{screenshot_id}.png"
+    try:
+        return await _store_screenshot(
+            db, request.stream(), content_type,
+            time_entry_id, taken_at, app_name, window_title, blurred
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Screenshot upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to upload screenshot: {str(e)}")
+
+@router.post("/screenshots/upload")
+async def upload_screenshot_file(
+    request: Request,
+    file: UploadFile = File(...),
+    time_entry_id: str = Form(...),
+    taken_at: str = Form(...),
+    app_name: Optional[str] = Form(None),
+    window_title: Optional[str] = Form(None),
+    blurred: bool = Form(False)
+):
+    """Upload a screenshot as multipart/form-data"""
+    db = request.app.state.db
+    
+    async def file_chunks():
+        while True:
+            chunk = await file.read(UPLOAD_READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
     
     try:
-        # Decode base64 image
-        image_bytes = base64.b64decode(data.image_data)
-        
-        if s3_client:
-            # Upload to S3-compatible storage
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=file_key,
-                Body=image_bytes,
-                ContentType='image/png',
-                Metadata={
-                    'time_entry_id': data.time_entry_id,
-                    'taken_at': data.taken_at,
-                    'app_name': data.app_name or '',
-                    'blurred': str(data.blurred)
-                }
-            )
-            
-            # Generate presigned URL for viewing
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': bucket_name, 'Key': file_key},
-                ExpiresIn=86400  # 24 hours
-            )
-        else:
-            # Fallback: Store reference without actual upload (for development)
-            url = f"/api/storage/screenshots/{screenshot_id}"
-            logger.warning("S3 not configured - screenshot stored as reference only")
-        
-        # Save metadata to database
-        screenshot_doc = {
-            "screenshot_id": screenshot_id,
-            "time_entry_id": data.time_entry_id,
-            "s3_key": file_key,
-            "s3_url": url,
-            "taken_at": data.taken_at,
-            "app_name": data.app_name,
-            "window_title": data.window_title,
-            "blurred": data.blurred,
-            "file_size": len(image_bytes),
-            "storage_type": "s3" if s3_client else "reference",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        
-        await db.screenshots.insert_one(screenshot_doc)
-        
-        return {
-            "screenshot_id": screenshot_id,
-            "url": url,
-            "file_key": file_key,
-            "storage_type": screenshot_doc["storage_type"]
-        }
-        
+        return await _store_screenshot(
+            db, file_chunks(), file.content_type or 'image/png',
+            time_entry_id, taken_at, app_name, window_title, blurred
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Screenshot upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to upload screenshot: {str(e)}")
+    finally:
+        await file.close()
 
 @router.post("/presigned-url")
 async def get_presigned_url(data: PresignedUrlRequest):
     """Get a presigned URL for accessing a file"""
-    s3_client = get_s3_client()
-    bucket_name = get_bucket_name()
+    uploader = get_uploader()
     
-    if not s3_client:
+    if not uploader:
         raise HTTPException(status_code=503, detail="Storage not configured")
     
     try:
-        url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket_name, 'Key': data.file_key},
-            ExpiresIn=data.expires_in
-        )
+        # Signing is a synchronous boto3 call; keep it off the event loop
+        url = await uploader.presigned_get_url(data.file_key, expires_in=data.expires_in)
         return {"url": url, "expires_in": data.expires_in}
     except ClientError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -148,20 +230,20 @@ async def get_presigned_upload_url(
     content_type: str = "image/png"
 ):
     """Get a presigned URL for direct upload from client"""
-    s3_client = get_s3_client()
-    bucket_name = get_bucket_name()
+    uploader = get_uploader()
     
-    if not s3_client:
+    if not uploader:
         raise HTTPException(status_code=503, detail="Storage not configured")
     
     # Generate unique file key
     file_key = f"uploads/{datetime.now().strftime('%Y/%m/%d')}/{uuid.uuid4().hex[:12]}_{filename}"
     
     try:
-        url = s3_client.generate_presigned_url(
+        url = await uploader.run(
+            uploader.client.generate_presigned_url,
             'put_object',
             Params={
-                'Bucket': bucket_name,
+                'Bucket': uploader.bucket,
                 'Key': file_key,
                 'ContentType': content_type
             },
@@ -182,8 +264,7 @@ async def delete_screenshot(
 ):
     """Delete a screenshot from storage"""
     db = request.app.state.db
-    s3_client = get_s3_client()
-    bucket_name = get_bucket_name()
+    uploader = get_uploader()
     
     # Get screenshot from database
     screenshot = await db.screenshots.find_one({"screenshot_id": screenshot_id})
@@ -192,14 +273,16 @@ async def delete_screenshot(
     
     try:
         # Delete from S3 if configured
-        if s3_client and screenshot.get("storage_type") == "s3":
-            s3_client.delete_object(
-                Bucket=bucket_name,
+        if uploader and screenshot.get("storage_type") == "s3":
+            await uploader.run(
+                uploader.client.delete_object,
+                Bucket=uploader.bucket,
                 Key=screenshot["s3_key"]
             )
         
         # Delete from database
-        await db.screenshots.delete_one({"screenshot_id": screenshot_id})
+        # taken_at is the partition key; with it the delete touches one partition
+        await db.screenshots.delete_one({"screenshot_id": screenshot_id, "taken_at": screenshot["taken_at"]})
         
         return {"status": "deleted", "screenshot_id": screenshot_id}
         
@@ -209,10 +292,10 @@ async def delete_screenshot(
 @router.get("/storage-status")
 async def get_storage_status():
     """Check if S3 storage is configured and accessible"""
-    s3_client = get_s3_client()
+    uploader = get_uploader()
     bucket_name = get_bucket_name()
     
-    if not s3_client:
+    if not uploader:
         return {
             "configured": False,
             "message": "S3 storage not configured. Set S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY environment variables."
@@ -220,7 +303,7 @@ async def get_storage_status():
     
     try:
         # Try to list bucket contents
-        s3_client.head_bucket(Bucket=bucket_name)
+        await uploader.run(uploader.client.head_bucket, Bucket=bucket_name)
         return {
             "configured": True,
             "accessible": True,
@@ -4,7 +4,7 @@ Team Chat & AI Support Chatbot
 Real-time team messaging with AI-powered support
 """
 
-from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, Query, status
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime, timezone
@@ -16,6 +16,11 @@ import logging
 # Import LLM for AI chatbot
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
+from auth.dependencies import current_user, websocket_user
+from utils.chat_fanout import ChatFanout
+from utils.chat_store import chat_store, read_receipts
+from utils.id_generator import generate_message_id
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = logging.getLogger(__name__)
 
@@ -27,6 +32,9 @@ class SendMessageRequest(BaseModel):
     reply_to: Optional[str] = None
     attachments: Optional[List[dict]] = None
 
+class MarkReadRequest(BaseModel):
+    message_id: str
+
 class CreateChannelRequest(BaseModel):
     name: str
     channel_type: str = "team"  # team, direct, support
@@ -41,38 +49,22 @@ class AIQueryRequest(BaseModel):
 # ==================== WEBSOCKET MANAGER ====================
 
 class ChatConnectionManager:
+    """Channel sockets; sends go through a per-connection queue (utils.chat_fanout)"""
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}  # channel_id -> connections
-        self.user_connections: Dict[str, WebSocket] = {}  # user_id -> connection
+        self.fanout = ChatFanout()
     
     async def connect(self, websocket: WebSocket, channel_id: str, user_id: str):
         await websocket.accept()
-        if channel_id not in self.active_connections:
-            self.active_connections[channel_id] = []
-        self.active_connections[channel_id].append(websocket)
-        self.user_connections[user_id] = websocket
+        self.fanout.add(websocket, channel_id, user_id)
     
     def disconnect(self, websocket: WebSocket, channel_id: str, user_id: str):
-        if channel_id in self.active_connections:
-            if websocket in self.active_connections[channel_id]:
-                self.active_connections[channel_id].remove(websocket)
-        if user_id in self.user_connections:
-            del self.user_connections[user_id]
+        self.fanout.remove(websocket, channel_id, user_id)
     
     async def broadcast_to_channel(self, channel_id: str, message: dict):
-        if channel_id in self.active_connections:
-            for connection in self.active_connections[channel_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+        self.fanout.broadcast(channel_id, message)
     
     async def send_to_user(self, user_id: str, message: dict):
-        if user_id in self.user_connections:
-            try:
-                await self.user_connections[user_id].send_json(message)
-            except:
-                pass
+        self.fanout.send_to_user(user_id, message)
 
 chat_manager = ChatConnectionManager()
 
@@ -234,53 +226,20 @@ async def get_channel_messages(
     channel_id: str,
     limit: int = 50,
     before: str = None,
+    after: str = None,
     request: Request = None
 ):
-    """Get messages from a channel"""
+    """Get messages from a channel (newest page, or `before` / `after` a cursor)"""
     db = request.app.state.db
-    
-    query = {"channel_id": channel_id}
-    if before:
-        query["created_at"] = {"$lt": before}
-    
-    messages = await db.chat_messages.find(
-        query,
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
-    
-    # Reverse to get chronological order
-    messages.reverse()
-    
-    return {"messages": messages}
+    return await chat_store.page(db, channel_id, limit, before=before, after=after)
 
 @router.post("/messages")
-async def send_message(data: SendMessageRequest, request: Request):
-    """Send a message to a channel"""
+async def send_message(data: SendMessageRequest, request: Request, user: dict = Depends(current_user)):
+    """Send a message to a channel as the authenticated user"""
     db = request.app.state.db
     
-    # Get user from auth
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    message_id = f"msg_{uuid.uuid4().hex[:12]}"
-    
-    message = {
-        "message_id": message_id,
-        "channel_id": data.channel_id,
-        "content": data.content,
-        "reply_to": data.reply_to,
-        "attachments": data.attachments,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.chat_messages.insert_one(message)
-    
-    # Update channel last message time
-    await db.chat_channels.update_one(
-        {"channel_id": data.channel_id},
-        {"$set": {"last_message_at": message["created_at"]}}
-    )
+    message = await _store_message(db, data.channel_id, user["user_id"], data.content,
+                                   reply_to=data.reply_to, attachments=data.attachments)
     
     # Broadcast to channel
     await chat_manager.broadcast_to_channel(data.channel_id, {
@@ -288,7 +247,38 @@ async def send_message(data: SendMessageRequest, request: Request):
         "message": message
     })
     
-    return {"message_id": message_id, "status": "sent"}
+    return {"message_id": message["message_id"], "status": "sent"}
+
+@router.post("/channels/{channel_id}/read")
+async def mark_channel_read(channel_id: str, data: MarkReadRequest, request: Request,
+                            user: dict = Depends(current_user)):
+    """Mark a channel read up to a message for the authenticated user (written in batches)"""
+    read_receipts.bind(request.app.state.db).mark(channel_id, user["user_id"], data.message_id)
+    return {"status": "ok"}
+
+@router.get("/unread")
+async def get_unread_counts(request: Request, channel_ids: List[str] = Query(...),
+                            user: dict = Depends(current_user)):
+    """The authenticated user's unread message counts for several channels in one call"""
+    counts = await read_receipts.bind(request.app.state.db).unread_counts(user["user_id"], channel_ids)
+    return {"unread": counts}
+
+async def _store_message(db, channel_id: str, user_id: Optional[str], content: str, **extra) -> dict:
+    channel = await chat_store.channel(db, channel_id)
+    message = {
+        "message_id": generate_message_id(),
+        "channel_id": channel_id,
+        "company_id": (channel or {}).get("company_id"),
+        "user_id": user_id,
+        "content": content,
+        **extra,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await chat_store.append(db, message)
+    if user_id:
+        # The sender has read everything up to their own message
+        read_receipts.bind(db).mark(channel_id, user_id, message["message_id"])
+    return message
 
 @router.post("/ai/query")
 async def query_ai_chatbot(data: AIQueryRequest, request: Request):
@@ -315,8 +305,13 @@ async def query_ai_chatbot(data: AIQueryRequest, request: Request):
 
 @router.websocket("/ws/{channel_id}/{user_id}")
 async def chat_websocket(websocket: WebSocket, channel_id: str, user_id: str):
-    """WebSocket endpoint for real-time chat"""
+    """WebSocket endpoint for real-time chat; user_id must be the authenticated user"""
+    user = await websocket_user(websocket)
+    if not user or user["user_id"] != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await chat_manager.connect(websocket, channel_id, user_id)
+    db = websocket.app.state.db
     
     try:
         while True:
@@ -324,13 +319,7 @@ async def chat_websocket(websocket: WebSocket, channel_id: str, user_id: str):
             
             if data.get("type") == "message":
                 # Handle new message
-                message = {
-                    "message_id": f"msg_{uuid.uuid4().hex[:12]}",
-                    "channel_id": channel_id,
-                    "user_id": user_id,
-                    "content": data.get("content"),
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                }
+                message = await _store_message(db, channel_id, user_id, data.get("content"))
                 
                 await chat_manager.broadcast_to_channel(channel_id, {
                     "type": "new_message",
@@ -344,6 +333,9 @@ async def chat_websocket(websocket: WebSocket, channel_id: str, user_id: str):
                     "user_id": user_id
                 })
                 
+            elif data.get("type") == "read" and data.get("message_id"):
+                read_receipts.bind(db).mark(channel_id, user_id, data["message_id"])
+                
             elif data.get("type") == "ping":
                 await websocket.send_json({"type": "pong"})
                 
@@ -355,15 +347,12 @@ async def delete_message(message_id: str, request: Request):
     """Delete a message"""
     db = request.app.state.db
     
-    result = await db.chat_messages.update_one(
-        {"message_id": message_id},
-        {"$set": {
-            "deleted": True,
-            "deleted_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    modified = await chat_store.update(db, message_id, {
+        "deleted": True,
+        "deleted_at": datetime.now(timezone.utc).isoformat()
+    })
     
-    if result.modified_count == 0:
+    if modified == 0:
         raise HTTPException(status_code=404, detail="Message not found")
     
     return {"status": "deleted", "message_id": message_id}
@@ -373,16 +362,13 @@ async def edit_message(message_id: str, content: str, request: Request):
     """Edit a message"""
     db = request.app.state.db
     
-    result = await db.chat_messages.update_one(
-        {"message_id": message_id},
-        {"$set": {
-            "content": content,
-            "edited": True,
-            "edited_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    modified = await chat_store.update(db, message_id, {
+        "content": content,
+        "edited": True,
+        "edited_at": datetime.now(timezone.utc).isoformat()
+    })
     
-    if result.modified_count == 0:
+    if modified == 0:
         raise HTTPException(status_code=404, detail="Message not found")
     
     return {"status": "edited", "message_id": message_id}
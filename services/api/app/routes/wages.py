@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timezone, date
 from utils.id_generator import generate_id
+from utils.batch_loader import BatchLoader
 import logging
 
 router = APIRouter()
@@ -155,9 +156,10 @@ async def get_employee_wages(request: Request, user: dict, employee_id: Optional
 
         wages = await db.employee_wages.find(query, sort=[("created_at", -1)])
 
-        # Enrich with employee names
+        # Enrich with employee names (one users query for all wages)
+        employees = await BatchLoader(db).load_many("users", "user_id", [w["employee_id"] for w in wages])
         for wage in wages:
-            employee = await db.users.find_one({"user_id": wage["employee_id"]})
+            employee = employees.get(wage["employee_id"])
             wage["employee_name"] = employee.get("name", "Unknown") if employee else "Unknown"
 
         return {"success": True, "data": wages}
@@ -210,7 +212,7 @@ async def approve_employee_wage(wage_id: str, data: EmployeeWageApproval, reques
         )
 
         # Create notifications
-        from routes.notifications import create_notification
+        from routes.notifications import create_notification, create_notifications
 
         if is_employee:
             # Notify admin
@@ -218,17 +220,16 @@ async def approve_employee_wage(wage_id: str, data: EmployeeWageApproval, reques
                 "company_id": wage["company_id"],
                 "role": "admin"
             })
-            for admin in admins:
-                await create_notification(
-                    db=db,
-                    company_id=wage["company_id"],
-                    user_id=admin["user_id"],
-                    notification_type="wage_approved",
-                    title="Employee Wage Response",
-                    message=f"Employee {'approved' if data.approved else 'rejected'} the wage agreement",
-                    data={"wage_id": wage_id},
-                    priority="normal"
-                )
+            await create_notifications(
+                db=db,
+                company_id=wage["company_id"],
+                user_ids=[admin["user_id"] for admin in admins],
+                notification_type="wage_approved",
+                title="Employee Wage Response",
+                message=f"Employee {'approved' if data.approved else 'rejected'} the wage agreement",
+                data={"wage_id": wage_id},
+                priority="normal"
+            )
         elif is_admin:
             # Notify employee
             await create_notification(
@@ -312,7 +313,7 @@ async def create_wage_change_request(data: WageChangeRequestCreate, request: Req
         await db.wage_change_requests.insert_one(request_doc)
 
         # Create notifications
-        from routes.notifications import create_notification
+        from routes.notifications import create_notification, create_notifications
 
         if is_admin:
             # Notify employee
@@ -332,17 +333,16 @@ async def create_wage_change_request(data: WageChangeRequestCreate, request: Req
                 "company_id": employee["company_id"],
                 "role": "admin"
             })
-            for admin in admins:
-                await create_notification(
-                    db=db,
-                    company_id=employee["company_id"],
-                    user_id=admin["user_id"],
-                    notification_type="wage_change_request",
-                    title="Wage Change Request",
-                    message=f"Employee {employee.get('name')} requested wage change to {data.currency} {data.new_wage_amount}/{data.new_wage_type}",
-                    data={"request_id": request_id},
-                    priority="high"
-                )
+            await create_notifications(
+                db=db,
+                company_id=employee["company_id"],
+                user_ids=[admin["user_id"] for admin in admins],
+                notification_type="wage_change_request",
+                title="Wage Change Request",
+                message=f"Employee {employee.get('name')} requested wage change to {data.currency} {data.new_wage_amount}/{data.new_wage_type}",
+                data={"request_id": request_id},
+                priority="high"
+            )
 
         return {"success": True, "request_id": request_id, "message": "Wage change request created"}
 
@@ -488,7 +488,7 @@ async def approve_wage_change_request(
         )
 
         # Create notifications
-        from routes.notifications import create_notification
+        from routes.notifications import create_notification, create_notifications
 
         if is_employee:
             # Notify admin
@@ -496,17 +496,16 @@ async def approve_wage_change_request(
                 "company_id": wage_request["company_id"],
                 "role": "admin"
             })
-            for admin in admins:
-                await create_notification(
-                    db=db,
-                    company_id=wage_request["company_id"],
-                    user_id=admin["user_id"],
-                    notification_type="wage_change_response",
-                    title="Wage Change Response",
-                    message=f"Employee {'approved' if data.approved else 'rejected'} the wage change request",
-                    data={"request_id": request_id},
-                    priority="high"
-                )
+            await create_notifications(
+                db=db,
+                company_id=wage_request["company_id"],
+                user_ids=[admin["user_id"] for admin in admins],
+                notification_type="wage_change_response",
+                title="Wage Change Response",
+                message=f"Employee {'approved' if data.approved else 'rejected'} the wage change request",
+                data={"request_id": request_id},
+                priority="high"
+            )
         elif is_admin:
             # Notify employee
             await create_notification(
@@ -248,7 +248,7 @@ async def review_submission(submission_id: str, data: WorkSubmissionReview, requ
         )
 
         # Create notification for employee
-        from routes.notifications import create_notification
+        from routes.notifications import create_notification, create_notifications
         priority = "high" if data.status == "rejected" else "normal"
         await create_notification(
             db=db,
@@ -267,17 +267,16 @@ async def review_submission(submission_id: str, data: WorkSubmissionReview, requ
                 "company_id": submission["company_id"],
                 "role": "admin"
             })
-            for admin in admins:
-                await create_notification(
-                    db=db,
-                    company_id=submission["company_id"],
-                    user_id=admin["user_id"],
-                    notification_type="work_submission",
-                    title="Work Submission Assigned to Admin",
-                    message=f"Manager assigned submission '{submission['title']}' for admin review",
-                    data={"submission_id": submission_id},
-                    priority="high"
-                )
+            await create_notifications(
+                db=db,
+                company_id=submission["company_id"],
+                user_ids=[admin["user_id"] for admin in admins],
+                notification_type="work_submission",
+                title="Work Submission Assigned to Admin",
+                message=f"Manager assigned submission '{submission['title']}' for admin review",
+                data={"submission_id": submission_id},
+                priority="high"
+            )
 
         return {"success": True, "message": "Submission reviewed successfully"}
 
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, Response, Query
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
@@ -10,16 +11,30 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
 from dateutil.relativedelta import relativedelta
-import bcrypt
 import jwt
 import httpx
 from contextlib import asynccontextmanager
 
 # Import Supabase database adapter
 from utils.db_adapter import SupabaseDatabase
+from utils.batch_loader import BatchLoader
 from db import get_db
 from utils.screenshot_scheduler import screenshot_scheduler
 from utils.screen_recording_scheduler import screen_recording_scheduler
+from utils.capture_scheduler import capture_scheduler
+from utils.principal_cache import principal_cache
+from utils.password_hasher import password_hasher, PasswordHasherBusy
+from utils.entitlements import entitlements, EntitlementScopeMiddleware
+from utils.usage_counters import usage_counters, UNLIMITED
+from utils.manager_scope import manager_scopes
+from auth.dependencies import current_user, websocket_user
+from utils.pagination import list_or_export
+from utils.payroll import generate_payroll_entries
+from utils.query_cache import query_cache
+from utils.http_client import outbound
+from utils.pdf_render import pdf_pool
+from utils.chat_store import read_receipts
+from utils.notifications import notification_inbox
 from utils.id_generator import (
     generate_entry_id, generate_screenshot_id, generate_log_id,
     generate_company_id, generate_user_id
@@ -37,8 +52,9 @@ from routes.pricing import router as pricing_router
 from routes.payment_methods import router as payment_methods_router
 from routes.team_chat import router as chat_router
 from routes.custom_reports import router as reports_router
+from routes.jobs import router as jobs_router
 from routes.outlook_calendar import router as outlook_router
-from routes.feature_gate import FeatureGate, check_screenshot_limit
+from routes.feature_gate import FeatureGate, consume_screenshot_quota
 from routes.multi_currency import router as currency_router
 from routes.white_label import router as branding_router
 from routes.video_screenshots import router as video_router
@@ -143,18 +159,32 @@ logger = logging.getLogger(__name__)
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.user_connections: Dict[str, List[WebSocket]] = {}
     
-    async def connect(self, websocket: WebSocket, company_id: str):
+    async def connect(self, websocket: WebSocket, company_id: str, user_id: Optional[str] = None):
         await websocket.accept()
         if company_id not in self.active_connections:
             self.active_connections[company_id] = []
         self.active_connections[company_id].append(websocket)
+        if user_id:
+            self.user_connections.setdefault(user_id, []).append(websocket)
         logger.info(f"WebSocket connected for company: {company_id}")
     
-    def disconnect(self, websocket: WebSocket, company_id: str):
+    def disconnect(self, websocket: WebSocket, company_id: str, user_id: Optional[str] = None):
         if company_id in self.active_connections:
             if websocket in self.active_connections[company_id]:
                 self.active_connections[company_id].remove(websocket)
+        if user_id and websocket in self.user_connections.get(user_id, []):
+            self.user_connections[user_id].remove(websocket)
+            if not self.user_connections[user_id]:
+                del self.user_connections[user_id]
+    
+    async def send_to_user(self, user_id: str, message: dict):
+        for connection in list(self.user_connections.get(user_id, [])):
+            try:
+                await connection.send_json(message)
+            except:
+                pass
     
     async def broadcast(self, company_id: str, message: dict):
         if company_id in self.active_connections:
@@ -389,11 +419,30 @@ class InvoiceUpdate(BaseModel):
     paid_date: Optional[datetime] = None
 
 # Helper Functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+async def rehash_password_if_needed(user: dict, password: str):
+    """Upgrade a verified password hash to the configured bcrypt cost (best effort)"""
+    if not password_hasher.needs_rehash(user.get("password_hash", "")):
+        return
+    try:
+        new_hash = await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        return  # Retry on a later login rather than adding load now
+    await db.users.update_one(
+        {"user_id": user["user_id"]},
+        {"$set": {"password_hash": new_hash}}
+    )
 
 def create_jwt_token(user_id: str, company_id: str, role: str) -> str:
     payload = {
@@ -420,7 +469,7 @@ async def get_current_user(request: Request) -> dict:
     # Check if it's a JWT token
     try:
         payload = jwt.decode(session_token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"user_id": payload['user_id']}, {"_id": 0})
+        user = await load_principal(payload['user_id'])
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -430,7 +479,10 @@ async def get_current_user(request: Request) -> dict:
         pass
     
     # Check if it's a session token from Google OAuth
-    session = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
+    session = await principal_cache.get_session(
+        session_token,
+        lambda: db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
+    )
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
     
@@ -442,19 +494,23 @@ async def get_current_user(request: Request) -> dict:
     if expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=401, detail="Session expired")
     
-    user = await db.users.find_one({"user_id": session['user_id']}, {"_id": 0})
+    user = await load_principal(session['user_id'])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
     return user
 
+async def load_principal(user_id: str) -> Optional[dict]:
+    """User document for an authenticated request, served from the principal cache"""
+    return await principal_cache.get_user(
+        user_id,
+        lambda: db.users.find_one({"user_id": user_id}, {"_id": 0})
+    )
+
 async def check_subscription(company_id: str) -> dict:
     """Check if company has valid subscription"""
-    subscription = await db.subscriptions.find_one(
-        {"company_id": company_id, "status": "active"},
-        {"_id": 0}
-    )
-    if not subscription:
+    subscription = await entitlements.get_subscription(db, company_id)
+    if not subscription or subscription.get("status") != "active":
         return {"valid": False, "message": "No active subscription"}
     
     expires_at = datetime.fromisoformat(subscription["expires_at"])
@@ -464,27 +520,19 @@ async def check_subscription(company_id: str) -> dict:
             {"subscription_id": subscription["subscription_id"]},
             {"$set": {"status": "expired"}}
         )
+        entitlements.invalidate(company_id)
         return {"valid": False, "message": "Subscription expired"}
     
     return {"valid": True, "subscription": subscription}
 
 async def get_users_for_manager(manager_id: str, company_id: str) -> List[str]:
     """Get list of user IDs assigned to a manager"""
-    assignment = await db.manager_assignments.find_one(
-        {"manager_id": manager_id, "company_id": company_id},
-        {"_id": 0}
-    )
-    return assignment.get("user_ids", []) if assignment else []
+    return sorted(await manager_scopes.get_assigned(db, manager_id))
 
 async def can_access_user_data(current_user: dict, target_user_id: str) -> bool:
     """Check if current user can access target user's data"""
-    if current_user["role"] == "admin":
-        return True
-    if current_user["role"] == "manager":
-        assigned_users = await get_users_for_manager(current_user["user_id"], current_user["company_id"])
-        return target_user_id in assigned_users
-    # Employee can only access own data
-    return current_user["user_id"] == target_user_id
+    # Admin: everyone; manager: assigned users; everyone: own data
+    return await manager_scopes.can_access(db, current_user, target_user_id)
 
 # App Lifespan
 @asynccontextmanager
@@ -492,7 +540,18 @@ async def lifespan(app: FastAPI):
     # Store db in app state for route access
     app.state.db = db
     logger.info("Supabase database connected")
+    # Screenshot / recording timers (recovers timers persisted by other workers)
+    await capture_scheduler.start(db)
+    read_receipts.bind(db)
+    # Unread-count pushes go to the recipient's sockets (via Redis when configured)
+    notification_inbox.configure(manager.send_to_user)
+    notification_inbox.start()
     yield
+    await capture_scheduler.stop()
+    await read_receipts.flush()
+    await notification_inbox.stop()
+    await outbound.aclose()
+    pdf_pool.shutdown()
     logger.info("Application shutdown")
 
 # Create FastAPI app
@@ -531,7 +590,7 @@ async def register(user_data: UserCreate, response: Response):
     user = {
         "user_id": user_id,
         "email": user_data.email,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password(user_data.password),
         "name": user_data.name,
         "role": "admin" if user_data.company_name else "employee",
         "company_id": company_id,
@@ -572,9 +631,11 @@ async def login(credentials: UserLogin, response: Response):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user.get("password_hash", "")):
+    if not await verify_password(credentials.password, user.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    await rehash_password_if_needed(user, credentials.password)
+    
     token = create_jwt_token(user["user_id"], user["company_id"], user["role"])
     
     response.set_cookie(
@@ -637,6 +698,7 @@ async def process_session(request: Request, response: Response):
             {"user_id": user_id},
             {"$set": {"name": name, "picture": picture}}
         )
+        principal_cache.invalidate_user(user_id)
     else:
         # Create new user and company
         user_id = generate_user_id()
@@ -725,6 +787,7 @@ async def logout(response: Response, request: Request):
     session_token = request.cookies.get('session_token')
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        principal_cache.invalidate_session(session_token)
     
     response.delete_cookie(key="session_token", path="/", samesite="none", secure=True)
     return {"message": "Logged out successfully"}
@@ -805,6 +868,7 @@ async def update_team_member(user_id: str, data: dict, user: dict = Depends(get_
         {"user_id": user_id, "company_id": user["company_id"]},
         {"$set": data}
     )
+    principal_cache.invalidate_user(user_id)
     return {"message": "Team member updated"}
 
 # Screenshot capture callback
@@ -844,6 +908,8 @@ async def capture_screenshot_callback(entry_id: str, user_id: str, company_id: s
         }
 
         await db.screenshots.insert_one(screenshot_doc)
+        # Auto-captures are not blocked by the limit but still count towards it
+        await usage_counters.bind(db).consume("screenshots", company_id, UNLIMITED, user_id=user_id)
         logger.info(f"Auto-captured screenshot {screenshot_id} for entry {entry_id}")
 
         # Create activity history entry
@@ -973,6 +1039,7 @@ async def create_time_entry(entry: TimeEntryCreate, user: dict = Depends(get_cur
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.time_entries.insert_one(doc)
+    await query_cache.invalidate(user["company_id"], "time_entries")
 
     # Start screenshot and screen recording schedulers if entry is active
     if not entry.end_time:
@@ -1008,11 +1075,16 @@ async def create_time_entry(entry: TimeEntryCreate, user: dict = Depends(get_cur
 
 @api_router.get("/time-entries")
 async def get_time_entries(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: Optional[str] = Query(None, alias="format"),
     user: dict = Depends(get_current_user)
 ):
+    """Time entries, newest first (keyset-paged via X-Next-Cursor, or ?format=ndjson|csv)"""
     query = {"company_id": user["company_id"]}
     
     # Filter by user
@@ -1030,8 +1102,10 @@ async def get_time_entries(
         else:
             query["start_time"] = {"$lte": end_date}
     
-    entries = await db.time_entries.find(query, {"_id": 0}).sort("start_time", -1).to_list(1000)
-    return entries
+    return await list_or_export(
+        db.time_entries, query, "start_time", "entry_id",
+        limit=limit, cursor=cursor, fmt=export_format, response=response, filename="time_entries"
+    )
 
 @api_router.get("/time-entries/active")
 async def get_active_entry(user: dict = Depends(get_current_user)):
@@ -1076,6 +1150,7 @@ async def update_time_entry(entry_id: str, data: TimeEntryUpdate, user: dict = D
             await screen_recording_scheduler.stop_recorder(entry_id)
 
     await db.time_entries.update_one({"entry_id": entry_id}, {"$set": update_data})
+    await query_cache.invalidate(user["company_id"], "time_entries")
 
     # Broadcast update
     await manager.broadcast(user["company_id"], {
@@ -1095,13 +1170,14 @@ async def delete_time_entry(entry_id: str, user: dict = Depends(get_current_user
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.time_entries.delete_one({"entry_id": entry_id})
+    await query_cache.invalidate(entry.get("company_id"), "time_entries")
     return {"message": "Entry deleted"}
 
 # ==================== SCREENSHOTS ROUTES ====================
 @api_router.post("/screenshots")
 async def create_screenshot(request: Request, screenshot: ScreenshotCreate, user: dict = Depends(get_current_user)):
-    # Check screenshot limit based on plan
-    limit_info = await check_screenshot_limit(db, user["company_id"], user["user_id"])
+    # Reserve against the plan's daily limit (atomic check-and-increment)
+    limit_info = await consume_screenshot_quota(db, user["company_id"], user["user_id"])
     if not limit_info["allowed"]:
         raise HTTPException(
             status_code=403, 
@@ -1126,17 +1202,26 @@ async def create_screenshot(request: Request, screenshot: ScreenshotCreate, user
         "app_name": screenshot.app_name,
         "window_title": screenshot.window_title
     }
-    await db.screenshots.insert_one(doc)
+    try:
+        await db.screenshots.insert_one(doc)
+    except Exception:
+        await usage_counters.release("screenshots", user["company_id"], user_id=user["user_id"])
+        raise
     
     return {"screenshot_id": screenshot_id, "limit_info": limit_info}
 
 @api_router.get("/screenshots")
 async def get_screenshots(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: Optional[str] = Query(None, alias="format"),
     user: dict = Depends(get_current_user)
 ):
+    """Screenshots, newest first (keyset-paged via X-Next-Cursor, or ?format=ndjson|csv)"""
     query = {"company_id": user["company_id"]}
     
     if user["role"] == "employee":
@@ -1152,8 +1237,10 @@ async def get_screenshots(
         else:
             query["taken_at"] = {"$lte": end_date}
     
-    screenshots = await db.screenshots.find(query, {"_id": 0}).sort("taken_at", -1).to_list(500)
-    return screenshots
+    return await list_or_export(
+        db.screenshots, query, "taken_at", "screenshot_id",
+        limit=limit, cursor=cursor, fmt=export_format, response=response, filename="screenshots"
+    )
 
 # ==================== ACTIVITY LOGS ROUTES ====================
 @api_router.post("/activity-logs")
@@ -1171,16 +1258,22 @@ async def create_activity_log(log: ActivityLogCreate, user: dict = Depends(get_c
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     await db.activity_logs.insert_one(doc)
+    await query_cache.invalidate(user["company_id"], "activity_logs")
     
     return {"log_id": log_id}
 
 @api_router.get("/activity-logs")
 async def get_activity_logs(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: Optional[str] = Query(None, alias="format"),
     user: dict = Depends(get_current_user)
 ):
+    """Activity logs, newest first (keyset-paged via X-Next-Cursor, or ?format=ndjson|csv)"""
     query = {"company_id": user["company_id"]}
     
     if user["role"] == "employee":
@@ -1196,8 +1289,10 @@ async def get_activity_logs(
         else:
             query["timestamp"] = {"$lte": end_date}
     
-    logs = await db.activity_logs.find(query, {"_id": 0}).sort("timestamp", -1).to_list(1000)
-    return logs
+    return await list_or_export(
+        db.activity_logs, query, "timestamp", "log_id",
+        limit=limit, cursor=cursor, fmt=export_format, response=response, filename="activity_logs"
+    )
 
 # ==================== TIMESHEETS ROUTES ====================
 @api_router.get("/timesheets")
@@ -1405,44 +1500,7 @@ async def generate_payroll(
             detail={"error": "feature_not_available", "feature": "payroll", "required_plan": "Pro", "message": "Payroll requires the Pro plan or higher."}
         )
     
-    # Get all approved timesheets in period
-    timesheets = await db.timesheets.find({
-        "company_id": user["company_id"],
-        "status": "approved",
-        "week_start": {"$gte": period_start, "$lte": period_end}
-    }, {"_id": 0}).to_list(1000)
-    
-    # Group by user
-    user_hours = {}
-    for ts in timesheets:
-        uid = ts["user_id"]
-        if uid not in user_hours:
-            user_hours[uid] = {"hours": 0, "name": ts.get("user_name", "")}
-        user_hours[uid]["hours"] += ts.get("total_hours", 0)
-    
-    # Generate payroll entries
-    payroll_entries = []
-    for uid, data in user_hours.items():
-        user_doc = await db.users.find_one({"user_id": uid}, {"_id": 0})
-        rate = user_doc.get("hourly_rate", 0) if user_doc else 0
-        
-        payroll_id = f"payroll_{uuid.uuid4().hex[:12]}"
-        entry = {
-            "payroll_id": payroll_id,
-            "user_id": uid,
-            "user_name": data["name"],
-            "company_id": user["company_id"],
-            "period_start": period_start,
-            "period_end": period_end,
-            "period": f"{period_start[:7]}",
-            "hours": round(data["hours"], 2),
-            "rate": rate,
-            "amount": round(data["hours"] * rate, 2),
-            "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.payroll.insert_one(entry)
-        payroll_entries.append(entry)
+    payroll_entries = await generate_payroll_entries(db, user["company_id"], period_start, period_end)
     
     return {"message": f"Generated {len(payroll_entries)} payroll entries", "entries": payroll_entries}
 
@@ -1460,71 +1518,81 @@ async def process_payroll(payroll_id: str, user: dict = Depends(get_current_user
 # ==================== DASHBOARD / STATS ROUTES ====================
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(user: dict = Depends(get_current_user)):
-    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
+    is_team_role = user["role"] in ["admin", "manager", "hr"]
     
-    query_base = {"company_id": user["company_id"]}
-    if user["role"] == "employee":
-        query_base["user_id"] = user["user_id"]
+    async def compute():
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
     
-    # Today's hours
-    today_entries = await db.time_entries.find({
-        **query_base,
-        "start_time": {"$gte": today.isoformat()}
-    }, {"_id": 0}).to_list(1000)
-    today_hours = sum(e.get("duration", 0) for e in today_entries) / 3600
+        query_base = {"company_id": user["company_id"]}
+        if user["role"] == "employee":
+            query_base["user_id"] = user["user_id"]
     
-    # Week hours
-    week_entries = await db.time_entries.find({
-        **query_base,
-        "start_time": {"$gte": week_start.isoformat()}
-    }, {"_id": 0}).to_list(1000)
-    week_hours = sum(e.get("duration", 0) for e in week_entries) / 3600
-    
-    # Month hours
-    month_entries = await db.time_entries.find({
-        **query_base,
-        "start_time": {"$gte": month_start.isoformat()}
-    }, {"_id": 0}).to_list(1000)
-    month_hours = sum(e.get("duration", 0) for e in month_entries) / 3600
+        # Today's hours
+        today_entries = await db.time_entries.find({
+            **query_base,
+            "start_time": {"$gte": today.isoformat()}
+        }, limit=1000)
+        today_hours = sum(e.get("duration", 0) for e in today_entries) / 3600
     
-    # Activity stats
-    activity_logs = await db.activity_logs.find({
-        **query_base,
-        "timestamp": {"$gte": today.isoformat()}
-    }, {"_id": 0}).to_list(1000)
-    avg_activity = sum(l.get("activity_level", 0) for l in activity_logs) / max(len(activity_logs), 1)
-    
-    # Team stats (for managers/admins)
-    team_online = 0
-    team_total = 0
-    if user["role"] in ["admin", "manager", "hr"]:
-        team_total = await db.users.count_documents({"company_id": user["company_id"]})
-        # Count active time entries in last 15 minutes
-        recent_cutoff = (datetime.now(timezone.utc) - timedelta(minutes=15)).isoformat()
-        team_online = len(set([
-            e["user_id"] for e in await db.time_entries.find({
-                "company_id": user["company_id"],
-                "status": "active"
-            }, {"user_id": 1, "_id": 0}).to_list(1000)
-        ]))
+        # Week hours
+        week_entries = await db.time_entries.find({
+            **query_base,
+            "start_time": {"$gte": week_start.isoformat()}
+        }, limit=1000)
+        week_hours = sum(e.get("duration", 0) for e in week_entries) / 3600
+    
+        # Month hours
+        month_entries = await db.time_entries.find({
+            **query_base,
+            "start_time": {"$gte": month_start.isoformat()}
+        }, limit=1000)
+        month_hours = sum(e.get("duration", 0) for e in month_entries) / 3600
+    
+        # Activity stats
+        activity_logs = await db.activity_logs.find({
+            **query_base,
+            "timestamp": {"$gte": today.isoformat()}
+        }, limit=1000)
+        avg_activity = sum(l.get("activity_level", 0) for l in activity_logs) / max(len(activity_logs), 1)
+    
+        # Team stats (for managers/admins)
+        team_online = 0
+        team_total = 0
+        if user["role"] in ["admin", "manager", "hr"]:
+            team_total = await db.users.count_documents({"company_id": user["company_id"]})
+            # Count active time entries in last 15 minutes
+            recent_cutoff = (datetime.now(timezone.utc) - timedelta(minutes=15)).isoformat()
+            team_online = len(set([
+                e["user_id"] for e in await db.time_entries.find({
+                    "company_id": user["company_id"],
+                    "status": "active"
+                }, limit=1000)
+            ]))
+    
+        # Pending approvals
+        pending_leaves = await db.leaves.count_documents({**query_base, "status": "pending"}) if user["role"] in ["admin", "manager", "hr"] else 0
+        pending_timesheets = await db.timesheets.count_documents({**query_base, "status": "pending"}) if user["role"] in ["admin", "manager", "hr"] else 0
     
-    # Pending approvals
-    pending_leaves = await db.leaves.count_documents({**query_base, "status": "pending"}) if user["role"] in ["admin", "manager", "hr"] else 0
-    pending_timesheets = await db.timesheets.count_documents({**query_base, "status": "pending"}) if user["role"] in ["admin", "manager", "hr"] else 0
+        return {
+            "today_hours": round(today_hours, 2),
+            "week_hours": round(week_hours, 2),
+            "month_hours": round(month_hours, 2),
+            "avg_activity": round(avg_activity, 1),
+            "team_online": team_online,
+            "team_total": team_total,
+            "pending_leaves": pending_leaves,
+            "pending_timesheets": pending_timesheets,
+            "screenshots_today": await db.screenshots.count_documents({**query_base, "taken_at": {"$gte": today.isoformat()}})
+        }
     
-    return {
-        "today_hours": round(today_hours, 2),
-        "week_hours": round(week_hours, 2),
-        "month_hours": round(month_hours, 2),
-        "avg_activity": round(avg_activity, 1),
-        "team_online": team_online,
-        "team_total": team_total,
-        "pending_leaves": pending_leaves,
-        "pending_timesheets": pending_timesheets,
-        "screenshots_today": await db.screenshots.count_documents({**query_base, "taken_at": {"$gte": today.isoformat()}})
-    }
+    # Shared by every manager/admin of the company; employees get their own entry
+    return await query_cache.get_or_compute("dashboard_stats", user["company_id"], {
+        "user_id": user["user_id"] if user["role"] == "employee" else None,
+        "team": is_team_role,
+        "day": datetime.now(timezone.utc).date()
+    }, compute)
 
 @api_router.get("/dashboard/team-status")
 async def get_team_status(user: dict = Depends(get_current_user)):
@@ -1544,15 +1612,18 @@ async def get_team_status(user: dict = Depends(get_current_user)):
             {"_id": 0}
         )
         
-        # Get latest activity
+        now = datetime.now(timezone.utc)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Get latest activity (last 24 hours, so the lookup stays in recent
+        # partitions without going blank just after midnight UTC)
         latest_activity = await db.activity_logs.find_one(
-            {"user_id": member["user_id"]},
+            {"user_id": member["user_id"], "timestamp": {"$gte": (now - timedelta(days=1)).isoformat()}},
             {"_id": 0},
             sort=[("timestamp", -1)]
         )
         
         # Get today's hours
-        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
         today_entries = await db.time_entries.find({
             "user_id": member["user_id"],
             "start_time": {"$gte": today.isoformat()}
@@ -1561,11 +1632,12 @@ async def get_team_status(user: dict = Depends(get_current_user)):
         
         status = "offline"
         if active_entry:
-            status = "active"
+            # No activity in the last day is as idle as stale activity
+            status = "idle"
             if latest_activity:
                 activity_time = datetime.fromisoformat(latest_activity["timestamp"].replace('Z', '+00:00'))
-                if datetime.now(timezone.utc) - activity_time > timedelta(minutes=5):
-                    status = "idle"
+                if datetime.now(timezone.utc) - activity_time <= timedelta(minutes=5):
+                    status = "active"
         
         result.append({
             "user_id": member["user_id"],
@@ -1583,33 +1655,40 @@ async def get_team_status(user: dict = Depends(get_current_user)):
 
 @api_router.get("/dashboard/activity-chart")
 async def get_activity_chart(days: int = 7, user: dict = Depends(get_current_user)):
-    start_date = datetime.now(timezone.utc) - timedelta(days=days)
-    
-    query = {"company_id": user["company_id"], "start_time": {"$gte": start_date.isoformat()}}
-    if user["role"] == "employee":
-        query["user_id"] = user["user_id"]
-    
-    entries = await db.time_entries.find(query, {"_id": 0}).to_list(10000)
-    
-    # Group by date
-    daily_data = {}
-    for e in entries:
-        date = e["start_time"][:10]
-        if date not in daily_data:
-            daily_data[date] = {"hours": 0, "entries": 0}
-        daily_data[date]["hours"] += e.get("duration", 0) / 3600
-        daily_data[date]["entries"] += 1
-    
-    result = []
-    for i in range(days):
-        date = (datetime.now(timezone.utc) - timedelta(days=days-1-i)).strftime("%Y-%m-%d")
-        result.append({
-            "date": date,
-            "hours": round(daily_data.get(date, {"hours": 0})["hours"], 2),
-            "entries": daily_data.get(date, {"entries": 0})["entries"]
-        })
-    
-    return result
+    async def compute():
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+    
+        query = {"company_id": user["company_id"], "start_time": {"$gte": start_date.isoformat()}}
+        if user["role"] == "employee":
+            query["user_id"] = user["user_id"]
+    
+        entries = await db.time_entries.find(query, limit=10000)
+    
+        # Group by date
+        daily_data = {}
+        for e in entries:
+            date = e["start_time"][:10]
+            if date not in daily_data:
+                daily_data[date] = {"hours": 0, "entries": 0}
+            daily_data[date]["hours"] += e.get("duration", 0) / 3600
+            daily_data[date]["entries"] += 1
+    
+        result = []
+        for i in range(days):
+            date = (datetime.now(timezone.utc) - timedelta(days=days-1-i)).strftime("%Y-%m-%d")
+            result.append({
+                "date": date,
+                "hours": round(daily_data.get(date, {"hours": 0})["hours"], 2),
+                "entries": daily_data.get(date, {"entries": 0})["entries"]
+            })
+    
+        return result
+    
+    return await query_cache.get_or_compute("activity_chart", user["company_id"], {
+        "days": days,
+        "user_id": user["user_id"] if user["role"] == "employee" else None,
+        "day": datetime.now(timezone.utc).date()
+    }, compute, depends_on=("time_entries",))
 
 # ==================== PROJECT ROUTES ====================
 @api_router.post("/projects")
@@ -1640,19 +1719,18 @@ async def get_projects(status: Optional[str] = None, user: dict = Depends(get_cu
     if status:
         query["status"] = status
     
-    projects = await db.projects.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    projects = await db.projects.find(query, sort=[("created_at", -1)], limit=100)
     
-    # Add tracked hours for each project
+    # Tracked hours and task counts for the whole page, aggregated in the database
+    rollups = await db.rpc("project_rollups", {
+        "p_company_id": user["company_id"],
+        "p_project_ids": [project["project_id"] for project in projects]
+    }) if projects else []
+    rollups = {row["project_id"]: row for row in rollups or []}
     for project in projects:
-        entries = await db.time_entries.find(
-            {"project_id": project["project_id"]},
-            {"duration": 1, "_id": 0}
-        ).to_list(10000)
-        project["tracked_hours"] = round(sum(e.get("duration", 0) for e in entries) / 3600, 2)
-        
-        # Count tasks
-        task_count = await db.tasks.count_documents({"project_id": project["project_id"]})
-        project["task_count"] = task_count
+        rollup = rollups.get(project["project_id"], {})
+        project["tracked_hours"] = round(int(rollup.get("tracked_seconds") or 0) / 3600, 2)
+        project["task_count"] = int(rollup.get("task_count") or 0)
     
     return projects
 
@@ -1731,18 +1809,17 @@ async def get_tasks(
     if assigned_to:
         query["assigned_to"] = assigned_to
     
-    tasks = await db.tasks.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
+    tasks = await db.tasks.find(query, sort=[("created_at", -1)], limit=500)
     
-    # Add tracked hours and assignee name
+    # Add tracked hours and assignee name (one time_entries and one users query)
+    loader = BatchLoader(db)
+    entries = await loader.load_groups("time_entries", "task_id", [t["task_id"] for t in tasks], "entry_id")
+    assignees = await loader.load_many("users", "user_id", [t.get("assigned_to") for t in tasks])
     for task in tasks:
-        entries = await db.time_entries.find(
-            {"task_id": task["task_id"]},
-            {"duration": 1, "_id": 0}
-        ).to_list(1000)
-        task["tracked_hours"] = round(sum(e.get("duration", 0) for e in entries) / 3600, 2)
+        task["tracked_hours"] = round(sum(e.get("duration", 0) for e in entries[task["task_id"]]) / 3600, 2)
         
         if task.get("assigned_to"):
-            assignee = await db.users.find_one({"user_id": task["assigned_to"]}, {"name": 1, "_id": 0})
+            assignee = assignees.get(task["assigned_to"])
             task["assignee_name"] = assignee.get("name") if assignee else None
     
     return tasks
@@ -1878,13 +1955,17 @@ async def get_shift_assignments(
         else:
             query["date"] = {"$lte": end_date}
     
-    assignments = await db.shift_assignments.find(query, {"_id": 0}).to_list(500)
+    assignments = await db.shift_assignments.find(query, limit=500)
     
-    # Add shift and user details
+    # Add shift and user details (one shifts and one users query, sent together)
+    loader = BatchLoader(db)
+    shifts, users = await asyncio.gather(
+        loader.load_many("shifts", "shift_id", [a["shift_id"] for a in assignments]),
+        loader.load_many("users", "user_id", [a["user_id"] for a in assignments])
+    )
     for a in assignments:
-        shift = await db.shifts.find_one({"shift_id": a["shift_id"]}, {"_id": 0})
-        a["shift"] = shift
-        user_doc = await db.users.find_one({"user_id": a["user_id"]}, {"name": 1, "picture": 1, "_id": 0})
+        a["shift"] = shifts.get(a["shift_id"])
+        user_doc = users.get(a["user_id"])
         a["user_name"] = user_doc.get("name") if user_doc else None
         a["user_picture"] = user_doc.get("picture") if user_doc else None
     
@@ -2000,9 +2081,13 @@ async def clock_out(request: Request, user: dict = Depends(get_current_user)):
 @api_router.get("/attendance")
 async def get_attendance(
     request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: Optional[str] = Query(None, alias="format"),
     user: dict = Depends(get_current_user)
 ):
     # Feature gate check for attendance
@@ -2028,8 +2113,10 @@ async def get_attendance(
         else:
             query["date"] = {"$lte": end_date}
     
-    attendance = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(500)
-    return attendance
+    return await list_or_export(
+        db.attendance, query, "date", "attendance_id",
+        limit=limit, cursor=cursor, fmt=export_format, response=response, filename="attendance"
+    )
 
 @api_router.get("/attendance/today")
 async def get_today_attendance(user: dict = Depends(get_current_user)):
@@ -2052,17 +2139,17 @@ async def get_attendance_report(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Get all team members
-    team = await db.users.find(
-        {"company_id": user["company_id"]},
-        {"_id": 0, "user_id": 1, "name": 1}
-    ).to_list(1000)
+    team = await db.users.find({"company_id": user["company_id"]}, limit=1000)
+    
+    # Every member's attendance in the range, in one query per LOADER_BATCH members
+    attendance = await BatchLoader(db).load_groups(
+        "attendance", "user_id", [member["user_id"] for member in team], "attendance_id",
+        {"date": {"$gte": start_date, "$lte": end_date}}
+    )
     
     report = []
     for member in team:
-        attendance_records = await db.attendance.find({
-            "user_id": member["user_id"],
-            "date": {"$gte": start_date, "$lte": end_date}
-        }, {"_id": 0}).to_list(100)
+        attendance_records = attendance[member["user_id"]]
         
         total_work_hours = sum(a.get("work_hours", 0) for a in attendance_records)
         total_overtime = sum(a.get("overtime", 0) for a in attendance_records)
@@ -2274,6 +2361,7 @@ async def get_subscription(user: dict = Depends(get_current_user)):
                 {"subscription_id": subscription["subscription_id"]},
                 {"$set": {"status": "expired"}}
             )
+            entitlements.invalidate(user["company_id"])
     
     return subscription
 
@@ -2325,6 +2413,7 @@ async def create_subscription(sub_data: SubscriptionCreate, user: dict = Depends
     )
     
     await db.subscriptions.insert_one(subscription)
+    entitlements.invalidate(user["company_id"])
     
     return {
         "subscription_id": subscription_id,
@@ -2358,6 +2447,7 @@ async def update_subscription(sub_data: SubscriptionUpdate, user: dict = Depends
             {"subscription_id": subscription["subscription_id"]},
             {"$set": update_data}
         )
+        entitlements.invalidate(user["company_id"])
     
     return {"message": "Subscription updated"}
 
@@ -2400,10 +2490,12 @@ async def update_user_role(user_id: str, role: str, user: dict = Depends(get_cur
         {"user_id": user_id},
         {"$set": {"role": role}}
     )
+    principal_cache.invalidate_user(user_id)
     
     # If demoted from manager, remove assignments
     if target_user["role"] == "manager" and role != "manager":
         await db.manager_assignments.delete_many({"manager_id": user_id})
+        manager_scopes.invalidate(user_id)
     
     return {"message": f"User role updated to {role}"}
 
@@ -2442,6 +2534,7 @@ async def assign_users_to_manager(manager_id: str, assignment: ManagerAssignment
         }},
         upsert=True
     )
+    manager_scopes.invalidate(manager_id)
     
     return {"message": f"Assigned {len(assignment.user_ids)} users to manager"}
 
@@ -2477,11 +2570,7 @@ async def get_all_managers(user: dict = Depends(get_current_user)):
     
     result = []
     for mgr in managers:
-        assignment = await db.manager_assignments.find_one(
-            {"manager_id": mgr["user_id"], "company_id": user["company_id"]},
-            {"_id": 0}
-        )
-        mgr["assigned_users"] = assignment.get("user_ids", []) if assignment else []
+        mgr["assigned_users"] = sorted(await manager_scopes.get_assigned(db, mgr["user_id"]))
         mgr["assigned_user_count"] = len(mgr["assigned_users"])
         result.append(mgr)
     
@@ -2533,8 +2622,12 @@ async def create_disapproval(disapproval: DisapprovalCreate, user: dict = Depend
 
 @api_router.get("/disapproval-logs")
 async def get_disapproval_logs(
+    response: Response,
     item_type: Optional[str] = None,
     manager_id: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: Optional[str] = Query(None, alias="format"),
     user: dict = Depends(get_current_user)
 ):
     """Get disapproval logs - Admin only"""
@@ -2547,8 +2640,10 @@ async def get_disapproval_logs(
     if manager_id:
         query["manager_id"] = manager_id
     
-    logs = await db.disapproval_logs.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return logs
+    return await list_or_export(
+        db.disapproval_logs, query, "created_at", "disapproval_id",
+        limit=limit, cursor=cursor, fmt=export_format, response=response, filename="disapproval_logs"
+    )
 
 # ==================== UPDATED TEAM ROUTES WITH ROLE CHECKS ====================
 @api_router.get("/team/my-users")
@@ -2580,7 +2675,11 @@ async def get_my_users(user: dict = Depends(get_current_user)):
 # ==================== WEBSOCKET ====================
 @app.websocket("/ws/{company_id}")
 async def websocket_endpoint(websocket: WebSocket, company_id: str):
-    await manager.connect(websocket, company_id)
+    # Per-user events (notification counts) only go to a verified principal
+    # of this company (session cookie, bearer header or ?token=)
+    user = await websocket_user(websocket)
+    user_id = user["user_id"] if user and user.get("company_id") == company_id else None
+    await manager.connect(websocket, company_id, user_id)
     try:
         while True:
             data = await websocket.receive_json()
@@ -2588,7 +2687,7 @@ async def websocket_endpoint(websocket: WebSocket, company_id: str):
             if data.get("type") == "ping":
                 await websocket.send_json({"type": "pong"})
     except WebSocketDisconnect:
-        manager.disconnect(websocket, company_id)
+        manager.disconnect(websocket, company_id, user_id)
 
 @api_router.get("/")
 async def root():
@@ -2661,6 +2760,7 @@ async def stripe_webhook(request: Request):
                     )
                     
                     await db.subscriptions.insert_one(subscription)
+                    entitlements.invalidate(company_id)
             
             # Record payment transaction
             await db.payment_transactions.update_one(
@@ -2746,6 +2846,7 @@ async def activate_subscription_after_payment(
         )
         
         await db.subscriptions.insert_one(subscription)
+        entitlements.invalidate(user["company_id"])
         
         # Record payment transaction
         await db.payment_transactions.update_one(
@@ -2788,6 +2889,7 @@ api_router.include_router(pricing_router)
 api_router.include_router(payment_methods_router)
 api_router.include_router(chat_router)
 api_router.include_router(reports_router)
+api_router.include_router(jobs_router)
 api_router.include_router(outlook_router)
 api_router.include_router(assignments_router)
 api_router.include_router(agreements_router)
@@ -2821,6 +2923,12 @@ api_router.include_router(analytics_router)
 # Then include api_router into app
 app.include_router(api_router)
 
+# Route modules authenticate through auth.dependencies.current_user
+app.dependency_overrides[current_user] = get_current_user
+
+# Per-request memo for subscription/feature checks
+app.add_middleware(EntitlementScopeMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -2828,4 +2936,6 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset-paged lists return their next-page cursor in this header
+    expose_headers=["X-Next-Cursor"],
 )
@@ -0,0 +1,130 @@
+"""
+Batch Loader
+Per-request batched, memoized lookups over the database adapter (DataLoader-style)
+
+List endpoints that enrich each row (an assignee per task, a shift per
+assignment) used to issue one query per row. A BatchLoader collects the
+keys instead and fetches them with one `$in` query per collection (in
+chunks of LOADER_BATCH keys). Results are memoized for the loader's
+lifetime, so create one per request and never share it across requests:
+
+    loader = BatchLoader(db)
+    users = await loader.load_many("users", "user_id", [t["assigned_to"] for t in tasks])
+
+load() returns a future. Every load() made in the same event-loop tick
+(e.g. inside asyncio.gather) for the same collection, key field and filter
+is sent as one query. load_groups() is the one-to-many form: every row
+whose key_field matches, paged through the adapter's keyset iterate().
+
+Both read through iterate(), which raises on a failed query; the adapter's
+find() returns [] instead, which would be memoized as "no such row".
+"""
+import asyncio
+import json
+import os
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+MAX_BATCH = int(os.environ.get('LOADER_BATCH', '200'))
+
+Group = Tuple[str, str, str]
+
+
+class BatchLoader:
+    """
+    Batched lookups by key for one request
+
+    Args:
+        db: Database adapter (collections by attribute / item access)
+        max_batch: Keys per `$in` query (PostgREST URLs are length-limited)
+    """
+
+    def __init__(self, db, max_batch: int = MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self._rows: Dict[Group, Dict[Hashable, Optional[Dict]]] = {}
+        self._groups: Dict[Group, Dict[Hashable, List[Dict]]] = {}
+        self._pending: Dict[Group, Dict[Hashable, asyncio.Future]] = {}
+        self.queries = 0
+
+    @staticmethod
+    def _group(collection: str, key_field: str, query: Optional[Dict]) -> Group:
+        return collection, key_field, json.dumps(query or {}, sort_keys=True, default=str)
+
+    def _chunks(self, keys: List[Hashable]) -> Iterable[List[Hashable]]:
+        for start in range(0, len(keys), self.max_batch):
+            yield keys[start:start + self.max_batch]
+
+    def load(self, collection: str, key_field: str, key: Hashable,
+             query: Optional[Dict] = None) -> "asyncio.Future[Optional[Dict]]":
+        """The row whose key_field equals key (None if missing), batched with this tick's other loads"""
+        loop = asyncio.get_running_loop()
+        group = self._group(collection, key_field, query)
+        rows = self._rows.setdefault(group, {})
+        if key in rows:
+            future = loop.create_future()
+            future.set_result(rows[key])
+            return future
+
+        pending = self._pending.setdefault(group, {})
+        if key not in pending:
+            if not pending:
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch(group, query)))
+            pending[key] = loop.create_future()
+        return pending[key]
+
+    async def load_many(self, collection: str, key_field: str, keys: Iterable[Hashable],
+                        query: Optional[Dict] = None) -> Dict[Hashable, Optional[Dict]]:
+        """{key: row or None} for every distinct non-null key"""
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        rows = await asyncio.gather(*(self.load(collection, key_field, key, query) for key in keys))
+        return dict(zip(keys, rows))
+
+    async def load_groups(self, collection: str, key_field: str, keys: Iterable[Hashable],
+                          id_field: str, query: Optional[Dict] = None) -> Dict[Hashable, List[Dict]]:
+        """
+        {key: every row whose key_field equals key} ([] if none)
+
+        id_field must be unique (the primary key); rows are read in keyset
+        batches ordered by it, so large groups are never cut off at the
+        API's row limit.
+        """
+        group = self._group(collection, key_field, query)
+        groups = self._groups.setdefault(group, {})
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        missing = [key for key in keys if key not in groups]
+
+        for chunk in self._chunks(missing):
+            self.queries += 1
+            found: Dict[Hashable, List[Dict]] = {key: [] for key in chunk}
+            async for row in self.db[collection].iterate({**(query or {}), key_field: {"$in": chunk}},
+                                                         id_field, id_field, descending=False):
+                found.setdefault(row[key_field], []).append(row)
+            groups.update(found)
+
+        return {key: groups[key] for key in keys}
+
+    async def _dispatch(self, group: Group, query: Optional[Dict]):
+        pending = self._pending.pop(group, {})
+        if not pending:
+            return
+        collection, key_field, _ = group
+        try:
+            found: Dict[Hashable, Dict] = {}
+            for chunk in self._chunks(list(pending)):
+                self.queries += 1
+                # One page when key_field is unique (at most len(chunk) rows)
+                async for row in self.db[collection].iterate({**(query or {}), key_field: {"$in": chunk}},
+                                                             key_field, key_field, len(chunk) + 1,
+                                                             descending=False):
+                    found.setdefault(row[key_field], row)
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        rows = self._rows.setdefault(group, {})
+        for key, future in pending.items():
+            rows[key] = found.get(key)
+            if not future.done():
+                future.set_result(rows[key])
@@ -0,0 +1,449 @@
+"""
+Calendar Sync
+Incremental Google Calendar / Outlook sync into a local event cache
+
+Each user's calendar is mirrored into `calendar_events`. The first sync
+lists the window (CALENDAR_SYNC_PAST_DAYS back, CALENDAR_SYNC_FUTURE_DAYS
+ahead for Outlook). After that only changes are fetched: Google
+`syncToken` and Graph `calendarView/delta` links. Both are kept in
+`calendar_sync_state`. An expired token (HTTP 410) drops the cache and
+resyncs. Providers are asked at most once per CALENDAR_SYNC_INTERVAL
+seconds per user, and concurrent requests share one sync; reads in
+between are served from the cache.
+
+Time entries are pushed in bulk: Google batch requests (50 events per
+HTTP call) and Graph JSON $batch (20 per call). Pushes are idempotent.
+Google events get an id derived from the entry id, so a repeat is a 409.
+Graph events carry the entry id as transactionId. So a retried or repeated
+push never duplicates an event.
+"""
+import base64
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from utils.http_client import outbound
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE = "google"
+OUTLOOK = "outlook"
+
+GOOGLE_CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+GOOGLE_BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
+MS_GRAPH_API = "https://graph.microsoft.com/v1.0"
+
+GOOGLE_BATCH_LIMIT = 50
+GRAPH_BATCH_LIMIT = 20
+UPSERT_BATCH = 200
+EVENT_CONFLICT = "user_id,provider,event_id"
+
+SYNC_PAST_DAYS = int(os.environ.get('CALENDAR_SYNC_PAST_DAYS', '30'))
+SYNC_FUTURE_DAYS = int(os.environ.get('CALENDAR_SYNC_FUTURE_DAYS', '180'))
+SYNC_INTERVAL = float(os.environ.get('CALENDAR_SYNC_INTERVAL', '60'))
+
+# Push outcomes
+CREATED = "created"
+EXISTS = "exists"
+FAILED = "failed"
+
+
+class SyncTokenExpired(Exception):
+    """The provider no longer accepts the stored sync token / delta link"""
+
+
+class CalendarError(Exception):
+    """A calendar provider answered with an unexpected status"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def utc_wall_time(value) -> str:
+    """'2026-01-05T09:00:00' in UTC, the form both APIs take next to timeZone=UTC"""
+    return _parse_time(value).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def google_event_id(entry_id: str) -> str:
+    """Deterministic Google event id for a time entry (base32hex: a-v, 0-9)"""
+    return "tt" + base64.b32hexencode(entry_id.encode()).decode().lower().rstrip("=")
+
+
+def entry_event(entry: Dict, title: str, description: str) -> Dict:
+    """Provider-neutral event for a time entry"""
+    return {
+        "entry_id": entry["entry_id"],
+        "title": title,
+        "description": description,
+        "start": utc_wall_time(entry["start_time"]),
+        "end": utc_wall_time(entry.get("end_time") or _now()),
+    }
+
+
+class GoogleCalendar:
+    """Google Calendar API: syncToken deltas and multipart batch inserts"""
+    provider = GOOGLE
+    needs_window_end = False
+
+    async def delta(self, access_token: str, state: Dict, window_start: datetime,
+                    window_end: datetime) -> Tuple[List[Dict], List[str], str]:
+        """(changed events, removed event ids, next sync token)"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+        params = {"singleEvents": "true", "maxResults": 250}
+        if state.get("sync_token"):
+            params["syncToken"] = state["sync_token"]
+        else:
+            params["timeMin"] = window_start.isoformat()
+
+        changed, removed = [], []
+        while True:
+            response = await outbound.get("google_calendar", f"{GOOGLE_CALENDAR_API}/calendars/primary/events",
+                                          headers=headers, params=params)
+            if response.status_code == 410:
+                raise SyncTokenExpired()
+            if response.status_code != 200:
+                raise CalendarError(f"Google events: HTTP {response.status_code}")
+            body = response.json()
+            for item in body.get("items", []):
+                if item.get("status") == "cancelled":
+                    removed.append(item["id"])
+                else:
+                    changed.append(self.normalize(item))
+            if body.get("nextPageToken"):
+                params = {**params, "pageToken": body["nextPageToken"]}
+                continue
+            return changed, removed, body.get("nextSyncToken")
+
+    @staticmethod
+    def normalize(item: Dict) -> Dict:
+        start, end = item.get("start") or {}, item.get("end") or {}
+        private = (item.get("extendedProperties") or {}).get("private") or {}
+        return {
+            "event_id": item["id"],
+            "summary": item.get("summary"),
+            "description": item.get("description"),
+            "start_at": start.get("dateTime") or start.get("date"),
+            "end_at": end.get("dateTime") or end.get("date"),
+            "location": item.get("location"),
+            "status": item.get("status"),
+            "web_link": item.get("htmlLink"),
+            "entry_id": private.get("entry_id"),
+        }
+
+    @staticmethod
+    def body(event: Dict) -> Dict:
+        return {
+            "id": google_event_id(event["entry_id"]),
+            "summary": event["title"],
+            "description": event["description"],
+            "start": {"dateTime": event["start"], "timeZone": "UTC"},
+            "end": {"dateTime": event["end"], "timeZone": "UTC"},
+            "reminders": {"useDefault": False, "overrides": []},
+            "extendedProperties": {"private": {"entry_id": event["entry_id"]}},
+        }
+
+    async def push(self, access_token: str, events: List[Dict]) -> List[Dict]:
+        """Insert events, GOOGLE_BATCH_LIMIT per multipart batch request"""
+        results = []
+        for start in range(0, len(events), GOOGLE_BATCH_LIMIT):
+            chunk = events[start:start + GOOGLE_BATCH_LIMIT]
+            boundary = f"batch_{uuid.uuid4().hex}"
+            parts = []
+            for i, event in enumerate(chunk):
+                parts.append(
+                    f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <item{i}>\r\n\r\n"
+                    f"POST /calendar/v3/calendars/primary/events\r\nContent-Type: application/json\r\n\r\n"
+                    f"{json.dumps(self.body(event))}\r\n"
+                )
+            response = await outbound.post(
+                "google_calendar", GOOGLE_BATCH_URL, idempotent=True,
+                headers={"Authorization": f"Bearer {access_token}",
+                         "Content-Type": f"multipart/mixed; boundary={boundary}"},
+                content="".join(parts) + f"--{boundary}--\r\n"
+            )
+            if response.status_code != 200:
+                raise CalendarError(f"Google batch: HTTP {response.status_code}")
+            answers = parse_batch_response(response.headers.get("Content-Type", ""), response.text)
+            for i, event in enumerate(chunk):
+                status, body = answers.get(f"item{i}", (0, None))
+                results.append(_push_result(event, status, body and "id" in body and self.normalize(body)))
+        return results
+
+
+def parse_batch_response(content_type: str, text: str) -> Dict[str, Tuple[int, Optional[Dict]]]:
+    """{content id: (status, json body)} from a multipart/mixed batch response"""
+    boundary = content_type.split("boundary=", 1)[-1].strip().strip('"')
+    answers = {}
+    for part in text.split(f"--{boundary}"):
+        part = part.strip()
+        if not part or part == "--":
+            continue
+        head, _, http = part.partition("\r\n\r\n") if "\r\n\r\n" in part else part.partition("\n\n")
+        content_id = next((line.split(":", 1)[1].strip().strip("<>") for line in head.splitlines()
+                           if line.lower().startswith("content-id:")), None)
+        if content_id is None:
+            continue
+        content_id = content_id.replace("response-", "", 1)
+        status_line, _, rest = http.partition("\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            status = 0
+        body_text = rest.split("\r\n\r\n", 1)[-1] if "\r\n\r\n" in rest else rest.split("\n\n", 1)[-1]
+        try:
+            body = json.loads(body_text)
+        except ValueError:
+            body = None
+        answers[content_id] = (status, body)
+    return answers
+
+
+class OutlookCalendar:
+    """Microsoft Graph: calendarView delta links and JSON $batch inserts"""
+    provider = OUTLOOK
+    needs_window_end = True  # calendarView delta is bounded at both ends
+    headers_prefer = 'odata.maxpagesize=100, outlook.timezone="UTC"'
+
+    async def delta(self, access_token: str, state: Dict, window_start: datetime,
+                    window_end: datetime) -> Tuple[List[Dict], List[str], str]:
+        """(changed events, removed event ids, next delta link)"""
+        headers = {"Authorization": f"Bearer {access_token}", "Prefer": self.headers_prefer}
+        url, params = state.get("sync_token"), None
+        if not url:
+            url = f"{MS_GRAPH_API}/me/calendarView/delta"
+            params = {"startDateTime": utc_wall_time(window_start) + "Z",
+                      "endDateTime": utc_wall_time(window_end) + "Z"}
+
+        changed, removed = [], []
+        while True:
+            response = await outbound.get("outlook_calendar", url, headers=headers, params=params)
+            if response.status_code == 410:
+                raise SyncTokenExpired()
+            if response.status_code != 200:
+                raise CalendarError(f"Graph calendar delta: HTTP {response.status_code}")
+            body = response.json()
+            for item in body.get("value", []):
+                if "@removed" in item:
+                    removed.append(item["id"])
+                else:
+                    changed.append(self.normalize(item))
+            if body.get("@odata.nextLink"):
+                url, params = body["@odata.nextLink"], None
+                continue
+            return changed, removed, body.get("@odata.deltaLink")
+
+    @staticmethod
+    def normalize(item: Dict) -> Dict:
+        def utc(value):
+            value = (value or {}).get("dateTime")
+            return f"{value[:19]}+00:00" if value else None
+        return {
+            "event_id": item["id"],
+            "summary": item.get("subject"),
+            "description": item.get("bodyPreview"),
+            "start_at": utc(item.get("start")),
+            "end_at": utc(item.get("end")),
+            "location": (item.get("location") or {}).get("displayName"),
+            "status": "cancelled" if item.get("isCancelled") else "confirmed",
+            "web_link": item.get("webLink"),
+            "is_online_meeting": item.get("isOnlineMeeting"),
+            "entry_id": item.get("transactionId"),
+        }
+
+    @staticmethod
+    def body(event: Dict) -> Dict:
+        return {
+            "subject": event["title"],
+            "body": {"contentType": "text", "content": event["description"]},
+            "start": {"dateTime": event["start"], "timeZone": "UTC"},
+            "end": {"dateTime": event["end"], "timeZone": "UTC"},
+            "transactionId": event["entry_id"],
+        }
+
+    async def push(self, access_token: str, events: List[Dict]) -> List[Dict]:
+        """Create events, GRAPH_BATCH_LIMIT per $batch request"""
+        results = []
+        for start in range(0, len(events), GRAPH_BATCH_LIMIT):
+            chunk = events[start:start + GRAPH_BATCH_LIMIT]
+            response = await outbound.post(
+                "outlook_calendar", f"{MS_GRAPH_API}/$batch", idempotent=True,
+                headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
+                json={"requests": [
+                    {"id": str(i), "method": "POST", "url": "/me/events",
+                     "headers": {"Content-Type": "application/json"}, "body": self.body(event)}
+                    for i, event in enumerate(chunk)
+                ]}
+            )
+            if response.status_code != 200:
+                raise CalendarError(f"Graph batch: HTTP {response.status_code}")
+            answers = {answer["id"]: answer for answer in response.json().get("responses", [])}
+            for i, event in enumerate(chunk):
+                answer = answers.get(str(i)) or {}
+                body = answer.get("body") if isinstance(answer.get("body"), dict) else None
+                results.append(_push_result(event, answer.get("status", 0),
+                                            body and "id" in body and self.normalize(body)))
+        return results
+
+
+def _push_result(event: Dict, status: int, cached: Optional[Dict]) -> Dict:
+    if status in (200, 201):
+        outcome = CREATED
+    elif status == 409:
+        outcome = EXISTS
+    else:
+        outcome = FAILED
+    return {"entry_id": event["entry_id"], "status": outcome, "http_status": status,
+            "event": cached if outcome == CREATED else None}
+
+
+PROVIDERS = {GOOGLE: GoogleCalendar(), OUTLOOK: OutlookCalendar()}
+
+# In-process single-flight for provider syncs, per user
+_syncs = TTLCache('calendar_sync', SYNC_INTERVAL, 10000)
+
+
+class CalendarSync:
+    """
+    Local event cache for one provider
+
+    Args:
+        db: Database
+        provider: GOOGLE or OUTLOOK
+        interval: Seconds between provider syncs per user
+    """
+
+    def __init__(self, db, provider: str, interval: float = SYNC_INTERVAL):
+        self.db = db
+        self.provider = provider
+        self.api = PROVIDERS[provider]
+        self.interval = interval
+
+    def window(self, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        now = now or _now()
+        return now - timedelta(days=SYNC_PAST_DAYS), now + timedelta(days=SYNC_FUTURE_DAYS)
+
+    async def state(self, user_id: str) -> Dict:
+        return await self.db.calendar_sync_state.find_one(
+            {"user_id": user_id, "provider": self.provider}
+        ) or {}
+
+    async def sync(self, user_id: str, access_token: str, force: bool = False) -> Dict:
+        """
+        Bring the cache up to date; the sync state
+
+        Skips the provider when the last sync is younger than the interval
+        (unless forced). Concurrent callers for one user share a sync.
+        """
+        async def run():
+            return await self._sync(user_id, access_token, force)
+        if force or self.interval <= 0:
+            return await run()
+        return await _syncs.get_or_load(f"{self.provider}:{user_id}", run)
+
+    async def _sync(self, user_id: str, access_token: str, force: bool) -> Dict:
+        state = await self.state(user_id)
+        synced_at = _parse_time(state.get("synced_at"))
+        if not force and synced_at and (_now() - synced_at).total_seconds() < self.interval:
+            return state
+
+        window_start, window_end = _parse_time(state.get("window_start")), _parse_time(state.get("window_end"))
+        full = not state.get("sync_token")
+        # A bounded window (Graph) is re-based once half its future has elapsed
+        if not full and self.api.needs_window_end and window_end - _now() < timedelta(days=SYNC_FUTURE_DAYS / 2):
+            full = True
+        if full:
+            window_start, window_end = self.window()
+            state = {}
+
+        try:
+            changed, removed, token = await self.api.delta(access_token, state, window_start, window_end)
+        except SyncTokenExpired:
+            logger.info(f"{self.provider} sync token expired for {user_id}; resyncing")
+            full, state = True, {}
+            window_start, window_end = self.window()
+            changed, removed, token = await self.api.delta(access_token, state, window_start, window_end)
+
+        if full:
+            await self.db.calendar_events.delete_many({"user_id": user_id, "provider": self.provider})
+        await self._store(user_id, changed)
+        if removed:
+            await self.db.calendar_events.delete_many(
+                {"user_id": user_id, "provider": self.provider, "event_id": {"$in": removed}}
+            )
+
+        new_state = {
+            "user_id": user_id,
+            "provider": self.provider,
+            "sync_token": token,
+            "window_start": window_start.isoformat(),
+            "window_end": window_end.isoformat() if self.api.needs_window_end else None,
+            "synced_at": _now().isoformat(),
+        }
+        await self.db.calendar_sync_state.upsert_many([new_state], on_conflict="user_id,provider")
+        new_state.update(changed=len(changed), removed=len(removed), full=full)
+        return new_state
+
+    async def _store(self, user_id: str, events: List[Dict]):
+        synced_at = _now().isoformat()
+        rows = [{**event, "user_id": user_id, "provider": self.provider, "synced_at": synced_at}
+                for event in events]
+        for start in range(0, len(rows), UPSERT_BATCH):
+            await self.db.calendar_events.upsert_many(rows[start:start + UPSERT_BATCH], on_conflict=EVENT_CONFLICT)
+
+    @staticmethod
+    def covers(state: Dict, start: datetime, end: datetime) -> bool:
+        """Whether the cached window holds every event overlapping [start, end]"""
+        window_start, window_end = _parse_time(state.get("window_start")), _parse_time(state.get("window_end"))
+        if not state.get("sync_token") or window_start is None or start < window_start:
+            return False
+        return window_end is None or end <= window_end
+
+    async def cached_events(self, user_id: str, start: datetime, end: datetime) -> List[Dict]:
+        """Cached events overlapping [start, end], by start time"""
+        return await self.db.calendar_events.find(
+            {"user_id": user_id, "provider": self.provider,
+             "start_at": {"$lt": end.isoformat()}, "end_at": {"$gt": start.isoformat()}},
+            sort=[("start_at", 1)]
+        )
+
+    async def push_entries(self, user_id: str, access_token: str, events: List[Dict]) -> List[Dict]:
+        """
+        Create one calendar event per time entry, in provider batches
+
+        Entries already linked to a cached event are skipped (status
+        "exists") without calling the provider; created events go straight
+        into the cache.
+        """
+        linked = await self.db.calendar_events.find({
+            "user_id": user_id, "provider": self.provider,
+            "entry_id": {"$in": [event["entry_id"] for event in events]}
+        })
+        linked_ids = {row["entry_id"]: row for row in linked}
+        pending = [event for event in events if event["entry_id"] not in linked_ids]
+
+        pushed = await self.api.push(access_token, pending) if pending else []
+        await self._store(user_id, [result["event"] for result in pushed if result["event"]])
+
+        by_entry = {result["entry_id"]: result for result in pushed}
+        results = []
+        for event in events:
+            if event["entry_id"] in linked_ids:
+                results.append({"entry_id": event["entry_id"], "status": EXISTS, "http_status": None,
+                                "event": linked_ids[event["entry_id"]]})
+            else:
+                results.append(by_entry[event["entry_id"]])
+        return results
@@ -0,0 +1,370 @@
+"""
+Capture Scheduler
+Single-timer scheduler for screenshot and screen recording captures
+
+All active entries share one min-heap of due times and one dispatcher task,
+instead of one sleeping asyncio.Task per entry. Due times are persisted in
+the `scheduled_captures` table together with an ownership lease, so timers
+survive restarts and exactly one worker fires each entry.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CaptureCallback = Callable[..., Awaitable[Any]]
+
+
+def _to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _from_iso(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+class CaptureKind:
+    """Callback and random interval range for one kind of capture"""
+
+    def __init__(self, min_interval: int, max_interval: int, **callback_kwargs):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.callback_kwargs = callback_kwargs
+        self.callback: Optional[CaptureCallback] = None
+
+    def next_delay(self) -> int:
+        return random.randint(self.min_interval, self.max_interval)
+
+
+class ScheduledCapture:
+    """In-memory state for one active entry (kept small: 100k+ live at once)"""
+
+    __slots__ = ('job_id', 'kind', 'entry_id', 'user_id', 'company_id',
+                 'interval', 'started_at', 'due_at', 'version')
+
+    def __init__(self, kind: str, entry_id: str, user_id: str, company_id: str,
+                 interval: Optional[int], started_at: str, due_at: float):
+        self.job_id = f"{kind}:{entry_id}"
+        self.kind = kind
+        self.entry_id = entry_id
+        self.user_id = user_id
+        self.company_id = company_id
+        self.interval = interval
+        self.started_at = started_at
+        self.due_at = due_at
+        self.version = 0
+
+    def to_doc(self, owner: str, lease_expires_at: float) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "entry_id": self.entry_id,
+            "user_id": self.user_id,
+            "company_id": self.company_id,
+            "interval_seconds": self.interval,
+            "started_at": self.started_at,
+            "due_at": _to_iso(self.due_at),
+            "lease_owner": owner,
+            "lease_expires_at": _to_iso(lease_expires_at)
+        }
+
+    @classmethod
+    def from_doc(cls, doc: Dict) -> 'ScheduledCapture':
+        return cls(
+            kind=doc["kind"],
+            entry_id=doc["entry_id"],
+            user_id=doc["user_id"],
+            company_id=doc["company_id"],
+            interval=doc.get("interval_seconds"),
+            started_at=doc.get("started_at"),
+            due_at=_from_iso(doc["due_at"])
+        )
+
+
+class CaptureScheduler:
+    """
+    Heap-based capture scheduler with persistent due times and leases
+
+    - One dispatcher sleeps until the earliest due time
+    - Due captures go through a bounded queue to a fixed pool of workers
+    - Each worker process owns the entries it leases; leases are renewed in
+      bulk and expired leases (crashed/stopped workers) are claimed by others
+    """
+
+    LEASE_SECONDS = 90
+    LEASE_RENEW_INTERVAL = 30
+    RECOVER_BATCH_SIZE = 500
+
+    def __init__(self, workers: int = 32, queue_size: int = 1000):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.kinds: Dict[str, CaptureKind] = {}
+        self.jobs: Dict[str, ScheduledCapture] = {}
+        self.db = None
+
+        self._heap: List[Tuple[float, int, str, int]] = []  # (due_at, seq, job_id, version)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"fired": 0, "failed": 0, "lost_lease": 0, "recovered": 0}
+
+    def register_kind(self, kind: str, min_interval: int, max_interval: int, **callback_kwargs):
+        """Register a capture kind with its random interval range (seconds)"""
+        self.kinds[kind] = CaptureKind(min_interval, max_interval, **callback_kwargs)
+
+    def set_callback(self, kind: str, callback: CaptureCallback):
+        """Set the coroutine called as callback(entry_id, user_id, company_id, **kwargs)"""
+        self.kinds[kind].callback = callback
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, db=None):
+        """Start dispatcher, worker pool and lease keeper; recover orphaned timers"""
+        if self.running:
+            return
+
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        try:
+            await self.recover_expired()
+        except Exception as e:
+            # The lease loop retries every LEASE_RENEW_INTERVAL
+            logger.error(f"Capture timer recovery failed at startup: {e}")
+
+        self._tasks = [asyncio.create_task(self._dispatch_loop())]
+        self._tasks += [asyncio.create_task(self._worker_loop()) for _ in range(self.worker_count)]
+        if self.db is not None:
+            self._tasks.append(asyncio.create_task(self._lease_loop()))
+
+        logger.info(f"Capture scheduler {self.worker_id} started with {self.worker_count} workers")
+
+    async def stop(self):
+        """Stop all tasks and hand leases back so other workers take over immediately"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self.db is not None and self.jobs:
+            await self.db.scheduled_captures.update_many(
+                {"lease_owner": self.worker_id},
+                {"$set": {"lease_expires_at": _to_iso(time.time())}}
+            )
+
+        self.jobs.clear()
+        self._heap.clear()
+        logger.info(f"Capture scheduler {self.worker_id} stopped")
+
+    async def schedule(self, kind: str, entry_id: str, user_id: str, company_id: str,
+                       interval: Optional[int] = None) -> bool:
+        """Start captures for an entry; returns False if already scheduled"""
+        job_id = f"{kind}:{entry_id}"
+        if job_id in self.jobs:
+            return False
+
+        now = time.time()
+        job = ScheduledCapture(
+            kind=kind,
+            entry_id=entry_id,
+            user_id=user_id,
+            company_id=company_id,
+            interval=interval,
+            started_at=_to_iso(now),
+            due_at=now + self.kinds[kind].next_delay()
+        )
+
+        if self.db is not None:
+            await self.db.scheduled_captures.insert_one(
+                job.to_doc(self.worker_id, now + self.LEASE_SECONDS)
+            )
+
+        self._push(job)
+        return True
+
+    async def cancel(self, kind: str, entry_id: str) -> bool:
+        """Stop captures for an entry (on any worker, not only the lease owner)"""
+        job_id = f"{kind}:{entry_id}"
+        job = self.jobs.pop(job_id, None)
+
+        # Heap entry is dropped lazily when it reaches the top; the owning
+        # worker (if remote) drops it when its lease-checked update fails
+        deleted = False
+        if self.db is not None:
+            result = await self.db.scheduled_captures.delete_one({"job_id": job_id})
+            deleted = bool(result.get("deleted_count"))
+
+        return job is not None or deleted
+
+    def is_scheduled(self, kind: str, entry_id: str) -> bool:
+        return f"{kind}:{entry_id}" in self.jobs
+
+    def get_jobs(self, kind: str) -> Dict[str, Dict]:
+        """Active entries of one kind: entry_id -> info"""
+        return {
+            job.entry_id: {
+                "user_id": job.user_id,
+                "company_id": job.company_id,
+                "interval": job.interval,
+                "started_at": job.started_at,
+                "next_capture_at": _to_iso(job.due_at)
+            }
+            for job in self.jobs.values() if job.kind == kind
+        }
+
+    def _push(self, job: ScheduledCapture):
+        job.version += 1
+        self.jobs[job.job_id] = job
+
+        is_earliest = not self._heap or job.due_at < self._heap[0][0]
+        heapq.heappush(self._heap, (job.due_at, next(self._seq), job.job_id, job.version))
+
+        if is_earliest and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _dispatch_loop(self):
+        """Sleep until the earliest due time, then hand due jobs to the workers"""
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            due_at, _, job_id, version = self._heap[0]
+            delay = due_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is None or job.version != version:
+                continue  # Cancelled or rescheduled
+
+            # Blocks when the queue is full - backpressure instead of unbounded tasks
+            await self._queue.put(job)
+
+    async def _worker_loop(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._fire(job)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Error firing {job.job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _fire(self, job: ScheduledCapture):
+        if self.jobs.get(job.job_id) is not job:
+            return
+
+        kind = self.kinds[job.kind]
+        now = time.time()
+        next_due = now + kind.next_delay()
+
+        # Advance the persisted due time - only succeeds while we hold the lease
+        if self.db is not None:
+            result = await self.db.scheduled_captures.update_one(
+                {"job_id": job.job_id, "lease_owner": self.worker_id},
+                {"$set": {
+                    "due_at": _to_iso(next_due),
+                    "lease_expires_at": _to_iso(now + self.LEASE_SECONDS)
+                }}
+            )
+            if not result.get("modified_count"):
+                self.jobs.pop(job.job_id, None)
+                self.stats["lost_lease"] += 1
+                logger.warning(f"Lost lease for {job.job_id}, dropping local timer")
+                return
+
+        job.due_at = next_due
+        self._push(job)
+
+        if kind.callback:
+            await kind.callback(job.entry_id, job.user_id, job.company_id, **kind.callback_kwargs)
+            self.stats["fired"] += 1
+
+    async def _lease_loop(self):
+        """Renew our leases in one bulk update and pick up expired ones"""
+        while True:
+            await asyncio.sleep(self.LEASE_RENEW_INTERVAL)
+            try:
+                if self.jobs:
+                    await self.db.scheduled_captures.update_many(
+                        {"lease_owner": self.worker_id},
+                        {"$set": {"lease_expires_at": _to_iso(time.time() + self.LEASE_SECONDS)}}
+                    )
+                await self.recover_expired()
+            except Exception as e:
+                logger.error(f"Capture lease maintenance failed: {e}")
+
+    async def recover_expired(self) -> int:
+        """
+        Claim timers whose owner stopped renewing its lease
+
+        Every expired row is visited, a keyset page at a time, however many
+        timers a crashed worker left behind.
+        """
+        if self.db is None:
+            return 0
+
+        now = time.time()
+        expired = self.db.scheduled_captures.iterate(
+            {"lease_expires_at": {"$lt": _to_iso(now)}}, "lease_expires_at", "job_id",
+            batch_size=self.RECOVER_BATCH_SIZE, descending=False
+        )
+
+        recovered = 0
+        async for doc in expired:
+            if doc["kind"] not in self.kinds or doc["job_id"] in self.jobs:
+                continue
+
+            # Compare-and-swap on the previous lease so only one worker wins
+            result = await self.db.scheduled_captures.update_one(
+                {
+                    "job_id": doc["job_id"],
+                    "lease_owner": doc["lease_owner"],
+                    "lease_expires_at": doc["lease_expires_at"]
+                },
+                {"$set": {
+                    "lease_owner": self.worker_id,
+                    "lease_expires_at": _to_iso(now + self.LEASE_SECONDS)
+                }}
+            )
+            if not result.get("modified_count"):
+                continue
+
+            job = ScheduledCapture.from_doc(doc)
+            job.due_at = max(job.due_at, now)
+            self._push(job)
+            recovered += 1
+
+        if recovered:
+            self.stats["recovered"] += recovered
+            logger.info(f"Recovered {recovered} capture timers from expired leases")
+        return recovered
+
+
+# Global scheduler instance shared by screenshots and screen recordings
+capture_scheduler = CaptureScheduler()
+capture_scheduler.register_kind("screenshot", min_interval=30, max_interval=600)
+capture_scheduler.register_kind("recording", min_interval=60, max_interval=900, duration=30)
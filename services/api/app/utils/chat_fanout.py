@@ -0,0 +1,137 @@
+"""
+Chat Fan-out
+Per-connection send queues for broadcasting to chat channels
+
+A broadcast serializes the event once and drops the text into each
+member's queue without awaiting any socket; every connection has a writer
+task that drains its own queue. So one slow or stalled client never delays
+the sender or the rest of the channel. A client that falls
+CHAT_SEND_QUEUE messages behind is disconnected (close code 1013). It
+reconnects and catches up with the messages `after` cursor.
+"""
+import asyncio
+import json
+import os
+from typing import Dict, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE = int(os.environ.get('CHAT_SEND_QUEUE', '256'))
+SLOW_CONSUMER_CLOSE = 1013  # Try again later
+
+_CLOSE = object()
+
+
+class ConnectionSender:
+    """Queue and writer task for one websocket"""
+
+    def __init__(self, websocket, user_id: str, max_queue: int = SEND_QUEUE):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.closed = False
+        self.sent = 0
+        self.task = asyncio.create_task(self._run())
+
+    def offer(self, text: str) -> bool:
+        """Queue text for sending; False if the connection is closed or too far behind"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _run(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                if text is _CLOSE:
+                    return
+                await self.websocket.send_text(text)
+                self.sent += 1
+            except Exception:
+                self.closed = True
+                return
+            finally:
+                self.queue.task_done()
+
+    async def close(self, code: int = None):
+        """Stop the writer (after draining what is queued unless code is given)"""
+        self.closed = True
+        if code is not None:
+            self.task.cancel()
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+            return
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except asyncio.QueueFull:
+            self.task.cancel()
+
+
+class ChatFanout:
+    """Channel and user membership of live connections"""
+
+    def __init__(self, max_queue: int = SEND_QUEUE):
+        self.max_queue = max_queue
+        self.channels: Dict[str, Dict[object, ConnectionSender]] = {}
+        self.users: Dict[str, Set[ConnectionSender]] = {}
+        self.dropped = 0
+
+    def add(self, websocket, channel_id: str, user_id: str) -> ConnectionSender:
+        sender = ConnectionSender(websocket, user_id, self.max_queue)
+        self.channels.setdefault(channel_id, {})[websocket] = sender
+        self.users.setdefault(user_id, set()).add(sender)
+        return sender
+
+    def remove(self, websocket, channel_id: str, user_id: str):
+        sender = self.channels.get(channel_id, {}).pop(websocket, None)
+        if not self.channels.get(channel_id):
+            self.channels.pop(channel_id, None)
+        if sender is None:
+            return
+        senders = self.users.get(user_id)
+        if senders is not None:
+            senders.discard(sender)
+            if not senders:
+                self.users.pop(user_id, None)
+        asyncio.ensure_future(sender.close())
+
+    def broadcast(self, channel_id: str, event: dict) -> int:
+        """Queue event for every connection in the channel; the number queued"""
+        members = self.channels.get(channel_id)
+        if not members:
+            return 0
+        text = json.dumps(event, default=str)
+        queued = 0
+        for websocket, sender in list(members.items()):
+            if sender.offer(text):
+                queued += 1
+            else:
+                self._drop(websocket, channel_id, sender)
+        return queued
+
+    def send_to_user(self, user_id: str, event: dict) -> int:
+        """Queue event for every connection the user has open"""
+        text = json.dumps(event, default=str)
+        return sum(sender.offer(text) for sender in list(self.users.get(user_id, ())))
+
+    def _drop(self, websocket, channel_id: str, sender: ConnectionSender):
+        self.dropped += 1
+        if not sender.closed:
+            logger.warning(f"Dropping slow chat connection for {sender.user_id} in {channel_id}")
+        self.remove(websocket, channel_id, sender.user_id)
+        asyncio.ensure_future(sender.close(code=SLOW_CONSUMER_CLOSE))
+
+    def connection_count(self, channel_id: str) -> int:
+        return len(self.channels.get(channel_id, {}))
+
+    async def drain(self):
+        """Wait until every queue is empty (tests, benchmarks)"""
+        senders = [sender for members in self.channels.values() for sender in members.values()]
+        await asyncio.gather(*(sender.queue.join() for sender in senders if not sender.closed))
@@ -0,0 +1,280 @@
+"""
+Chat Store
+Keyset-paged chat history, per-channel recent-message rings and batched read receipts
+
+Messages are paged by (created_at, message_id) with opaque `before` /
+`after` cursors. `before` scrolls back and `after` catches up after a
+reconnect. Message ids are time-ordered (generate_message_id), so the
+tiebreak follows send order too.
+
+Opening a channel (no cursor) is served from an in-process ring of its
+newest CHAT_RING_SIZE messages. Each open costs one indexed seek for
+messages from the last few seconds the ring holds onward (normally a
+handful of rows). That seek picks up sends from other workers, including
+ones that committed slightly out of timestamp order. A ring is rebuilt
+after CHAT_RING_TTL seconds, so edits and deletes made elsewhere show up
+too.
+
+Read receipts are buffered per (channel, user), latest wins, and written
+by one `chat_mark_read` call per flush. The flush runs CHAT_READ_FLUSH
+seconds after the first buffered receipt, or at shutdown. A receipt
+in a failed batch is retried with the next flush once, then dropped, so
+one bad receipt cannot wedge the buffer. Unread counts for many channels
+come from one `chat_unread_counts` call.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from utils.pagination import decode_cursor, encode_cursor
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELD = "created_at"
+ID_FIELD = "message_id"
+MAX_PAGE = 200
+
+RING_SIZE = int(os.environ.get('CHAT_RING_SIZE', '100'))
+RING_TTL = float(os.environ.get('CHAT_RING_TTL', '60'))
+RING_CHANNELS = int(os.environ.get('CHAT_RING_CHANNELS', '2000'))
+READ_FLUSH = float(os.environ.get('CHAT_READ_FLUSH', '2'))
+# Catch-up seeks re-read this much before the newest ringed message
+CATCHUP_OVERLAP = timedelta(seconds=5)
+
+
+def _key(message: Dict) -> Tuple[str, str]:
+    return message[SORT_FIELD], message[ID_FIELD]
+
+
+class ChannelRing:
+    """Newest messages of one channel, oldest first"""
+
+    def __init__(self, messages: List[Dict], size: int, complete: bool):
+        self.messages = deque(messages, maxlen=size)
+        self.complete = complete  # Holds the channel's entire history
+        self.loaded_at = time.monotonic()
+
+    def newest(self) -> Optional[Dict]:
+        return self.messages[-1] if self.messages else None
+
+    def merge(self, messages: List[Dict]):
+        """Add messages not held yet, keeping key order (idempotent)"""
+        held = {message[ID_FIELD] for message in self.messages}
+        new = [message for message in messages if message[ID_FIELD] not in held]
+        if not new:
+            return
+        newest = self.newest()
+        if newest is not None and all(_key(message) > _key(newest) for message in new):
+            combined = sorted(new, key=_key)
+        else:
+            combined = sorted(list(self.messages) + new, key=_key)
+            self.messages.clear()
+        if len(self.messages) + len(combined) > self.messages.maxlen:
+            self.complete = False
+        self.messages.extend(combined)
+
+    def update(self, message_id: str, changes: Dict):
+        for message in self.messages:
+            if message[ID_FIELD] == message_id:
+                message.update(changes)
+                return
+
+
+class ChatStore:
+    """
+    Message paging over `chat_messages` with a ring cache per channel
+
+    Args:
+        ring_size: Messages kept per channel
+        ring_ttl: Seconds before a ring is rebuilt from the database
+        max_channels: Rings kept (least recently opened evicted)
+    """
+
+    def __init__(self, ring_size: int = RING_SIZE, ring_ttl: float = RING_TTL,
+                 max_channels: int = RING_CHANNELS):
+        self.ring_size = ring_size
+        self.ring_ttl = ring_ttl
+        self.max_channels = max_channels
+        self._rings: "OrderedDict[str, ChannelRing]" = OrderedDict()
+        self._channels = TTLCache('chat_channel', 300, 10000)
+        self.ring_hits = 0
+        self.ring_loads = 0
+
+    async def channel(self, db, channel_id: str) -> Optional[Dict]:
+        """Channel row, cached briefly (sends look up its company)"""
+        return await self._channels.get_or_load(
+            channel_id, lambda: db.chat_channels.find_one({"channel_id": channel_id})
+        )
+
+    async def page(self, db, channel_id: str, limit: int = 50, before: Optional[str] = None,
+                   after: Optional[str] = None) -> Dict:
+        """
+        One page of messages in chronological order
+
+        Returns {"messages", "has_more", "cursors": {"before", "after"}}.
+        Pass cursors.before to scroll back and cursors.after to fetch what
+        arrived since. has_more refers to the direction requested (older
+        messages unless `after` was given).
+        """
+        limit = max(1, min(limit, MAX_PAGE))
+        query = {"channel_id": channel_id}
+
+        if after:
+            rows = await db.chat_messages.find_page(query, SORT_FIELD, ID_FIELD, decode_cursor(after),
+                                                    limit + 1, descending=False)
+            return self._result(rows[:limit], len(rows) > limit, after_cursor=after)
+
+        if before:
+            rows = await db.chat_messages.find_page(query, SORT_FIELD, ID_FIELD, decode_cursor(before), limit + 1)
+            return self._result(list(reversed(rows[:limit])), len(rows) > limit, before_cursor=before)
+
+        ring = await self._ring(db, channel_id)
+        if limit <= len(ring.messages) or ring.complete:
+            self.ring_hits += 1
+            messages = list(ring.messages)[-limit:]
+            has_more = len(ring.messages) > limit or not ring.complete
+            return self._result([dict(m) for m in messages], has_more)
+
+        rows = await db.chat_messages.find_page(query, SORT_FIELD, ID_FIELD, None, limit + 1)
+        return self._result(list(reversed(rows[:limit])), len(rows) > limit)
+
+    @staticmethod
+    def _result(messages: List[Dict], has_more: bool, before_cursor: Optional[str] = None,
+                after_cursor: Optional[str] = None) -> Dict:
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "cursors": {
+                "before": encode_cursor(messages[0], SORT_FIELD, ID_FIELD) if messages else before_cursor,
+                "after": encode_cursor(messages[-1], SORT_FIELD, ID_FIELD) if messages else after_cursor,
+            }
+        }
+
+    async def _ring(self, db, channel_id: str) -> ChannelRing:
+        ring = self._rings.get(channel_id)
+        if ring is not None and time.monotonic() - ring.loaded_at < self.ring_ttl:
+            self._rings.move_to_end(channel_id)
+            newest = ring.newest()
+            if newest is None:
+                return await self._load(db, channel_id)
+            # Catch up on messages sent through other workers
+            since = datetime.fromisoformat(newest[SORT_FIELD].replace('Z', '+00:00')) - CATCHUP_OVERLAP
+            rows = await db.chat_messages.find_page({"channel_id": channel_id}, SORT_FIELD, ID_FIELD,
+                                                    (since.isoformat(), ""), self.ring_size + 1,
+                                                    descending=False)
+            if len(rows) > self.ring_size:
+                return await self._load(db, channel_id)
+            ring.merge(rows)
+            return ring
+        return await self._load(db, channel_id)
+
+    async def _load(self, db, channel_id: str) -> ChannelRing:
+        self.ring_loads += 1
+        rows = await db.chat_messages.find_page({"channel_id": channel_id}, SORT_FIELD, ID_FIELD,
+                                                None, self.ring_size + 1)
+        ring = ChannelRing(reversed(rows[:self.ring_size]), self.ring_size, len(rows) <= self.ring_size)
+        self._rings[channel_id] = ring
+        self._rings.move_to_end(channel_id)
+        while len(self._rings) > self.max_channels:
+            self._rings.popitem(last=False)
+        return ring
+
+    async def append(self, db, message: Dict) -> Dict:
+        """Store a new message and add it to the channel's ring"""
+        await db.chat_messages.insert_one(message)
+        await db.chat_channels.update_one(
+            {"channel_id": message["channel_id"]},
+            {"$set": {"last_message_at": message[SORT_FIELD]}}
+        )
+        ring = self._rings.get(message["channel_id"])
+        if ring is not None:
+            ring.merge([dict(message)])
+        return message
+
+    async def update(self, db, message_id: str, changes: Dict) -> int:
+        """Edit / soft-delete a message; the number of rows changed"""
+        result = await db.chat_messages.update_one({"message_id": message_id}, {"$set": changes})
+        for ring in self._rings.values():
+            ring.update(message_id, changes)
+        return result["modified_count"]
+
+    def forget(self, channel_id: str):
+        self._rings.pop(channel_id, None)
+        self._channels.invalidate(channel_id)
+
+
+class ReadReceipts:
+    """Buffered read positions and batched unread counts"""
+
+    def __init__(self, flush_after: float = READ_FLUSH):
+        self.flush_after = flush_after
+        self.db = None
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._retrying: Dict[Tuple[str, str], str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+
+    def bind(self, db) -> 'ReadReceipts':
+        self.db = db
+        return self
+
+    def mark(self, channel_id: str, user_id: str, message_id: str):
+        """Record that user has read channel up to message_id (written on the next flush)"""
+        self._pending[(channel_id, user_id)] = message_id
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_after)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Read receipt flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Write every buffered receipt in one call; the number written"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        receipts = [{"channel_id": channel_id, "user_id": user_id, "message_id": message_id}
+                    for (channel_id, user_id), message_id in pending.items()]
+        try:
+            await self.db.rpc("chat_mark_read", {"p_receipts": receipts})
+        except Exception:
+            # Retry each receipt once with the next flush (unless a newer one
+            # replaced it); a receipt that failed before is dropped
+            retrying, self._retrying = self._retrying, {}
+            for key, message_id in pending.items():
+                if retrying.get(key) == message_id:
+                    logger.warning(f"Dropping read receipt {key} -> {message_id} after a failed retry")
+                elif key not in self._pending:
+                    self._pending[key] = message_id
+                    self._retrying[key] = message_id
+            raise
+        self._retrying = {}
+        self.flushes += 1
+        return len(receipts)
+
+    async def unread_counts(self, user_id: str, channel_ids: List[str]) -> Dict[str, int]:
+        """{channel_id: unread messages} in one round trip"""
+        if any(user == user_id for _, user in self._pending):
+            try:
+                await self.flush()
+            except Exception as e:
+                # Counts from the last written position beat no counts
+                logger.error(f"Read receipt flush failed: {e}")
+        rows = await self.db.rpc("chat_unread_counts", {"p_user_id": user_id, "p_channel_ids": channel_ids})
+        counts = {channel_id: 0 for channel_id in channel_ids}
+        for row in rows or []:
+            counts[row["channel_id"]] = int(row["unread"])
+        return counts
+
+
+# Global instances
+chat_store = ChatStore()
+read_receipts = ReadReceipts()
@@ -2,10 +2,37 @@
 Database Adapter - MongoDB-like interface for Supabase
 Provides MongoDB-style operations using Supabase PostgreSQL
 """
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from supabase import Client
 from datetime import datetime, timezone
+import asyncio
 import json
+import os
+
+
+class QueryRecorder:
+    """
+    Appends every query the adapter sends (table, filters, sort, limit) to a
+    JSON-lines file, for scripts/explain_queries.py to EXPLAIN
+
+    Enabled by setting QUERY_CAPTURE_FILE; meant for staging / load tests,
+    not production (one write per query).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record(self, table: str, operation: str, query: Optional[Dict],
+               sort: Optional[List] = None, limit: Optional[int] = None, after: Optional[Tuple] = None):
+        entry = {"table": table, "operation": operation, "query": query or {},
+                 "sort": [list(item) for item in sort or []], "limit": limit,
+                 "after": list(after) if after is not None else None}
+        with open(self.path, "a") as capture:
+            capture.write(json.dumps(entry, default=str) + "\n")
+
+
+_capture_path = os.environ.get('QUERY_CAPTURE_FILE')
+query_recorder: Optional[QueryRecorder] = QueryRecorder(_capture_path) if _capture_path else None
 
 
 class SupabaseCollection:
@@ -15,26 +42,15 @@ class SupabaseCollection:
         self.client = client
         self.table_name = table_name
 
-    async def find_one(self, query: Dict, projection: Optional[Dict] = None) -> Optional[Dict]:
-        """Find single document matching query"""
+    async def find_one(self, query: Dict, projection: Optional[Dict] = None,
+                       sort: Optional[List] = None) -> Optional[Dict]:
+        """Find single document matching query (the first in `sort` order, if given)"""
         try:
-            select_query = self.client.table(self.table_name).select("*")
-
-            # Apply filters
-            for key, value in query.items():
-                if isinstance(value, dict):
-                    # Handle special operators like $in, $gte, etc.
-                    for op, op_value in value.items():
-                        if op == "$in":
-                            select_query = select_query.in_(key, op_value)
-                        elif op == "$gte":
-                            select_query = select_query.gte(key, op_value)
-                        elif op == "$lte":
-                            select_query = select_query.lte(key, op_value)
-                        elif op == "$ne":
-                            select_query = select_query.neq(key, op_value)
-                else:
-                    select_query = select_query.eq(key, value)
+            self._capture("find_one", query, sort, 1)
+            select_query = self._apply_filters(self.client.table(self.table_name).select("*"), query)
+
+            for field, direction in sort or []:
+                select_query = select_query.order(field, desc=direction == -1)
 
             result = select_query.limit(1).execute()
 
@@ -49,27 +65,8 @@ class SupabaseCollection:
                    sort: Optional[List] = None, limit: Optional[int] = None) -> List[Dict]:
         """Find multiple documents matching query"""
         try:
-            select_query = self.client.table(self.table_name).select("*")
-
-            # Apply filters
-            if query:
-                for key, value in query.items():
-                    if isinstance(value, dict):
-                        for op, op_value in value.items():
-                            if op == "$in":
-                                select_query = select_query.in_(key, op_value)
-                            elif op == "$gte":
-                                select_query = select_query.gte(key, op_value)
-                            elif op == "$lte":
-                                select_query = select_query.lte(key, op_value)
-                            elif op == "$ne":
-                                select_query = select_query.neq(key, op_value)
-                            elif op == "$gt":
-                                select_query = select_query.gt(key, op_value)
-                            elif op == "$lt":
-                                select_query = select_query.lt(key, op_value)
-                    else:
-                        select_query = select_query.eq(key, value)
+            self._capture("find", query, sort, limit)
+            select_query = self._apply_filters(self.client.table(self.table_name).select("*"), query)
 
             # Apply sorting
             if sort:
@@ -89,6 +86,45 @@ class SupabaseCollection:
             print(f"Error in find: {e}")
             return []
 
+    async def find_page(self, query: Optional[Dict], sort_field: str, id_field: str,
+                        after: Optional[Tuple[Any, Any]] = None, limit: int = 100,
+                        descending: bool = True) -> List[Dict]:
+        """
+        One keyset (seek) page ordered by (sort_field, id_field)
+
+        `after` is the (sort value, id) of the last row already returned;
+        the next page starts strictly past it, so pages stay stable under
+        inserts and cost the same at any depth. Runs off the event loop.
+        """
+        self._capture("find_page", query, [(sort_field, -1 if descending else 1), (id_field, -1 if descending else 1)],
+                      limit, after)
+        select_query = self._apply_filters(self.client.table(self.table_name).select("*"), query)
+
+        if after is not None:
+            op = "lt" if descending else "gt"
+            value, row_id = (self._quote(part) for part in after)
+            select_query = select_query.or_(
+                f"{sort_field}.{op}.{value},and({sort_field}.eq.{value},{id_field}.{op}.{row_id})"
+            )
+
+        select_query = select_query.order(sort_field, desc=descending) \
+            .order(id_field, desc=descending) \
+            .limit(limit)
+        result = await asyncio.to_thread(select_query.execute)
+        return result.data if result.data else []
+
+    async def iterate(self, query: Optional[Dict], sort_field: str, id_field: str,
+                      batch_size: int = 1000, descending: bool = True) -> AsyncIterator[Dict]:
+        """Yield every matching row, fetched in keyset batches (bounded memory)"""
+        after = None
+        while True:
+            rows = await self.find_page(query, sort_field, id_field, after, batch_size, descending)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1][sort_field], rows[-1][id_field])
+
     async def insert_one(self, document: Dict) -> Dict:
         """Insert a single document"""
         try:
@@ -110,6 +146,16 @@ class SupabaseCollection:
             print(f"Error in insert_many: {e}")
             raise
 
+    async def upsert_many(self, documents: List[Dict], on_conflict: str) -> Dict:
+        """Insert documents, updating rows that collide on the on_conflict columns"""
+        try:
+            docs = [self._serialize_dates(doc) for doc in documents]
+            result = self.client.table(self.table_name).upsert(docs, on_conflict=on_conflict).execute()
+            return {"acknowledged": True, "upserted_count": len(result.data) if result.data else 0}
+        except Exception as e:
+            print(f"Error in upsert_many: {e}")
+            raise
+
     async def update_one(self, query: Dict, update: Dict) -> Dict:
         """Update a single document"""
         try:
@@ -126,9 +172,8 @@ class SupabaseCollection:
             # Build update query
             update_query = self.client.table(self.table_name).update(update_data)
 
-            # Apply filters
-            for key, value in query.items():
-                update_query = update_query.eq(key, value)
+            self._capture("update", query)
+            update_query = self._apply_filters(update_query, query)
 
             result = update_query.execute()
             return {"acknowledged": True, "modified_count": len(result.data) if result.data else 0}
@@ -143,11 +188,8 @@ class SupabaseCollection:
     async def delete_one(self, query: Dict) -> Dict:
         """Delete a single document"""
         try:
-            delete_query = self.client.table(self.table_name).delete()
-
-            # Apply filters
-            for key, value in query.items():
-                delete_query = delete_query.eq(key, value)
+            self._capture("delete", query)
+            delete_query = self._apply_filters(self.client.table(self.table_name).delete(), query)
 
             result = delete_query.execute()
             return {"acknowledged": True, "deleted_count": len(result.data) if result.data else 0}
@@ -162,11 +204,10 @@ class SupabaseCollection:
     async def count_documents(self, query: Optional[Dict] = None) -> int:
         """Count documents matching query"""
         try:
-            select_query = self.client.table(self.table_name).select("*", count="exact")
-
-            if query:
-                for key, value in query.items():
-                    select_query = select_query.eq(key, value)
+            self._capture("count", query)
+            select_query = self._apply_filters(
+                self.client.table(self.table_name).select("*", count="exact"), query
+            )
 
             result = select_query.execute()
             return result.count if hasattr(result, 'count') else 0
@@ -184,6 +225,39 @@ class SupabaseCollection:
         """Create index (no-op for Supabase, indexes created in migrations)"""
         pass
 
+    def _capture(self, operation: str, query: Optional[Dict], sort: Optional[List] = None,
+                 limit: Optional[int] = None, after: Optional[Tuple] = None):
+        if query_recorder is not None:
+            query_recorder.record(self.table_name, operation, query, sort, limit, after)
+
+    @staticmethod
+    def _apply_filters(select_query, query: Optional[Dict]):
+        """Apply a MongoDB-style filter dict to a PostgREST query"""
+        for key, value in (query or {}).items():
+            if isinstance(value, dict):
+                for op, op_value in value.items():
+                    if op == "$in":
+                        select_query = select_query.in_(key, op_value)
+                    elif op == "$gte":
+                        select_query = select_query.gte(key, op_value)
+                    elif op == "$lte":
+                        select_query = select_query.lte(key, op_value)
+                    elif op == "$ne":
+                        select_query = select_query.neq(key, op_value)
+                    elif op == "$gt":
+                        select_query = select_query.gt(key, op_value)
+                    elif op == "$lt":
+                        select_query = select_query.lt(key, op_value)
+            else:
+                select_query = select_query.eq(key, value)
+        return select_query
+
+    @staticmethod
+    def _quote(value: Any) -> str:
+        """Quote a value for a PostgREST or=() filter (timestamps contain reserved characters)"""
+        text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{text}"'
+
     def _serialize_dates(self, doc: Dict) -> Dict:
         """Convert datetime objects to ISO format strings"""
         result = {}
@@ -218,3 +292,8 @@ class SupabaseDatabase:
     def __getattr__(self, collection_name: str) -> SupabaseCollection:
         """Get collection by attribute access"""
         return self[collection_name]
+
+    async def rpc(self, function_name: str, params: Optional[Dict] = None) -> Any:
+        """Call a Postgres function (for atomic operations the collection API can't express)"""
+        result = self.client.rpc(function_name, params or {}).execute()
+        return result.data
@@ -0,0 +1,103 @@
+"""
+Entitlement Resolver
+Cached subscription and plan-feature lookups per company
+
+A company's current subscription is read once and served from an in-process
+TTL cache (companies without a subscription are cached too). Routes that
+change subscriptions, and the Stripe webhook, invalidate the company.
+
+Within one request the resolved subscription is also memoized in a context
+variable (set up by EntitlementScopeMiddleware), so repeated feature and
+limit checks in the same request cost nothing and see one consistent plan.
+"""
+import contextvars
+import os
+from typing import Dict, Optional
+import logging
+
+from monitoring.metrics import entitlement_cache_requests_total
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CURRENT_STATUSES = ["active", "trialing"]
+
+# company_id -> {"subscription": dict | None} for the current request
+_request_scope: contextvars.ContextVar[Optional[Dict[str, Dict]]] = contextvars.ContextVar(
+    'entitlement_request_scope', default=None
+)
+
+
+class EntitlementResolver:
+    """
+    Resolves a company's subscription and plan features
+
+    Args:
+        ttl: Seconds a resolved subscription is served from cache
+        max_entries: Companies kept in cache (least recently used evicted)
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.cache = TTLCache('subscription', ttl, max_entries, metric=entitlement_cache_requests_total)
+
+    async def get_subscription(self, db, company_id: str) -> Optional[Dict]:
+        """Current (active or trialing) subscription, or None"""
+        scope = _request_scope.get()
+        if scope is not None and company_id in scope:
+            return scope[company_id]["subscription"]
+
+        async def load():
+            subscription = await db.subscriptions.find_one(
+                {"company_id": company_id, "status": {"$in": CURRENT_STATUSES}},
+                {"_id": 0}
+            )
+            return {"subscription": subscription}
+
+        resolved = await self.cache.get_or_load(company_id, load)
+        if scope is not None:
+            scope[company_id] = resolved
+        return resolved["subscription"]
+
+    async def get_features(self, db, company_id: str) -> Dict:
+        """Plan features for a company (starter features without a subscription)"""
+        subscription = await self.get_subscription(db, company_id)
+        if subscription and "features" in subscription:
+            return subscription["features"]
+
+        from routes.pricing import PRICING_PLANS
+        return PRICING_PLANS["starter"]["features"]
+
+    def invalidate(self, company_id: str):
+        """Call after creating, updating or expiring a company's subscription"""
+        self.cache.invalidate(company_id)
+        scope = _request_scope.get()
+        if scope is not None:
+            scope.pop(company_id, None)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
+class EntitlementScopeMiddleware:
+    """ASGI middleware giving each HTTP request its own entitlement memo"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+# Global instance
+entitlements = EntitlementResolver(ttl=float(os.environ.get('ENTITLEMENT_CACHE_TTL', '60')))
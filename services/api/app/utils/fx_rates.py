@@ -0,0 +1,242 @@
+"""
+FX Rates
+Exchange rates held as a cross-rate matrix, refreshed in the background
+
+One fetch (USD base) yields every supported rate against USD; any pair is
+then usd[to] / usd[from], so requests for a different base never evict the
+cache or go back to the provider. Rates are served from memory for
+FX_RATES_TTL seconds; after that the stale matrix keeps being served while
+one background refresh runs (single-flight, so concurrent requests never
+stampede the provider). Fetches go through the shared outbound HTTP layer
+(utils.http_client) and are rate-limited: after a failed fetch the provider
+is not called again for FX_RATES_RETRY_AFTER seconds.
+
+Every successful fetch is persisted to `exchange_rates`, so a cold worker
+starts from the last known rates (and skips the fetch if they are still
+fresh) and a provider outage falls back to them before the static table.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+import logging
+
+import numpy as np
+
+from utils.http_client import outbound
+
+logger = logging.getLogger(__name__)
+
+# Supported currencies with symbols
+SUPPORTED_CURRENCIES = {
+    "USD": {"symbol": "$", "name": "US Dollar"},
+    "EUR": {"symbol": "€", "name": "Euro"},
+    "GBP": {"symbol": "£", "name": "British Pound"},
+    "CAD": {"symbol": "C$", "name": "Canadian Dollar"},
+    "AUD": {"symbol": "A$", "name": "Australian Dollar"},
+    "INR": {"symbol": "₹", "name": "Indian Rupee"},
+    "JPY": {"symbol": "¥", "name": "Japanese Yen"},
+    "CNY": {"symbol": "¥", "name": "Chinese Yuan"},
+    "BRL": {"symbol": "R$", "name": "Brazilian Real"},
+    "MXN": {"symbol": "$", "name": "Mexican Peso"},
+    "SGD": {"symbol": "S$", "name": "Singapore Dollar"},
+    "CHF": {"symbol": "CHF", "name": "Swiss Franc"},
+    "NZD": {"symbol": "NZ$", "name": "New Zealand Dollar"},
+    "SEK": {"symbol": "kr", "name": "Swedish Krona"},
+    "NOK": {"symbol": "kr", "name": "Norwegian Krone"},
+    "DKK": {"symbol": "kr", "name": "Danish Krone"},
+    "ZAR": {"symbol": "R", "name": "South African Rand"},
+    "AED": {"symbol": "د.إ", "name": "UAE Dirham"},
+    "PHP": {"symbol": "₱", "name": "Philippine Peso"},
+    "PLN": {"symbol": "zł", "name": "Polish Zloty"},
+}
+
+# Approximate USD rates, used only when neither the provider nor the store answers
+FALLBACK_USD_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "CAD": 1.36,
+    "AUD": 1.53, "INR": 83.12, "JPY": 149.50, "CNY": 7.24,
+    "BRL": 4.97, "MXN": 17.15, "SGD": 1.34, "CHF": 0.88,
+    "NZD": 1.63, "SEK": 10.42, "NOK": 10.52, "DKK": 6.87,
+    "ZAR": 18.62, "AED": 3.67, "PHP": 55.50, "PLN": 4.02
+}
+
+PIVOT = "USD"
+
+# Where the matrix came from
+LIVE = "live"
+STORED = "stored"
+FALLBACK = "fallback"
+
+
+class RateMatrix:
+    """
+    Immutable cross-rate matrix over the supported currencies
+
+    Built from one vector of rates against the pivot (USD); rate(a, b) is
+    usd[b] / usd[a].
+    """
+
+    def __init__(self, usd_rates: Dict[str, float], fetched_at: datetime, source: str = LIVE):
+        self.currencies = [code for code in SUPPORTED_CURRENCIES if usd_rates.get(code)]
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+        self.usd = np.array([float(usd_rates[code]) for code in self.currencies])
+        # cross[i, j]: units of currency j per unit of currency i
+        self.cross = self.usd[np.newaxis, :] / self.usd[:, np.newaxis]
+        self.fetched_at = fetched_at
+        self.source = source
+
+    def _position(self, currency: str) -> int:
+        try:
+            return self.index[currency]
+        except KeyError:
+            raise ValueError(f"Unsupported currency: {currency}")
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        return float(self.cross[self._position(from_currency), self._position(to_currency)])
+
+    def rates_for(self, base: str) -> Dict[str, float]:
+        """Every supported currency against base, like the provider's /latest/{base}"""
+        row = self.cross[self._position(base)]
+        return {code: float(row[i]) for i, code in enumerate(self.currencies)}
+
+    def convert_many(self, amounts: Sequence[float], from_currencies, to_currencies,
+                     decimals: Optional[int] = 2) -> np.ndarray:
+        """
+        Convert many amounts in one vectorized pass
+
+        from_currencies / to_currencies are a single code or one code per
+        amount. Returns a float array (rounded to `decimals` unless None).
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        rows = self._positions(from_currencies, len(amounts))
+        columns = self._positions(to_currencies, len(amounts))
+        converted = amounts * self.cross[rows, columns]
+        return np.round(converted, decimals) if decimals is not None else converted
+
+    def _positions(self, currencies, count: int) -> np.ndarray:
+        if isinstance(currencies, str):
+            return np.full(count, self._position(currencies))
+        positions = np.fromiter((self._position(code) for code in currencies), dtype=int)
+        if len(positions) != count:
+            raise ValueError("Need one currency per amount")
+        return positions
+
+    def age(self) -> float:
+        return (datetime.now(timezone.utc) - self.fetched_at).total_seconds()
+
+    def to_document(self) -> Dict:
+        return {
+            "base": PIVOT,
+            "rates": {code: float(self.usd[i]) for i, code in enumerate(self.currencies)},
+            "fetched_at": self.fetched_at.isoformat(),
+        }
+
+
+def _parse_time(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+class FxRateService:
+    """
+    Serves RateMatrix snapshots with background refresh and persisted fallback
+
+    Args:
+        fetch: async callable returning {currency: rate against USD};
+            defaults to the exchangerate-api.com provider via `outbound`
+        ttl: Seconds a matrix is fresh
+        retry_after: Seconds between provider calls after a failed fetch
+    """
+
+    def __init__(self, fetch: Optional[Callable[[], Awaitable[Dict[str, float]]]] = None,
+                 ttl: float = 3600, retry_after: float = 60,
+                 provider_url: str = "https://api.exchangerate-api.com/v4/latest/USD"):
+        self.fetch = fetch or self._fetch_provider
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.provider_url = provider_url
+        self._matrix: Optional[RateMatrix] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self._next_attempt = 0.0
+
+    async def _fetch_provider(self) -> Dict[str, float]:
+        response = await outbound.get("exchange_rates", self.provider_url)
+        response.raise_for_status()
+        return response.json()["rates"]
+
+    async def matrix(self, db=None) -> RateMatrix:
+        """
+        Current rates
+
+        Never waits on the provider when any rates are in memory; a stale
+        matrix triggers a background refresh. db (optional) persists and
+        restores the last known rates.
+        """
+        matrix = self._matrix
+        if matrix is None:
+            return await self._start_refresh(db, cold=True)
+        if matrix.source == FALLBACK or matrix.age() >= self.ttl:
+            self._start_refresh(db)
+        return matrix
+
+    def _start_refresh(self, db, cold: bool = False) -> Awaitable[RateMatrix]:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._refresh_matrix(db, cold))
+        return asyncio.shield(self._refresh) if cold else self._refresh
+
+    async def _refresh_matrix(self, db, cold: bool) -> RateMatrix:
+        stored = await self._load(db) if cold else None
+        if stored is not None and stored.age() < self.ttl:
+            self._matrix = stored
+            return stored
+
+        if time.monotonic() >= self._next_attempt:
+            try:
+                matrix = RateMatrix(await self.fetch(), datetime.now(timezone.utc), LIVE)
+                self._matrix = matrix
+                await self._save(db, matrix)
+                return matrix
+            except Exception as e:
+                self._next_attempt = time.monotonic() + self.retry_after
+                logger.warning(f"Exchange rate fetch failed: {e}")
+
+        if self._matrix is None:
+            self._matrix = stored or RateMatrix(
+                FALLBACK_USD_RATES, datetime.now(timezone.utc), FALLBACK
+            )
+        return self._matrix
+
+    async def _load(self, db) -> Optional[RateMatrix]:
+        if db is None:
+            return None
+        try:
+            row = await db.exchange_rates.find_one({"base": PIVOT})
+            if row and row.get("rates"):
+                return RateMatrix(row["rates"], _parse_time(row["fetched_at"]), STORED)
+        except Exception as e:
+            logger.warning(f"Could not load stored exchange rates: {e}")
+        return None
+
+    async def _save(self, db, matrix: RateMatrix):
+        if db is None:
+            return
+        try:
+            document = matrix.to_document()
+            result = await db.exchange_rates.update_one({"base": PIVOT}, {"$set": document})
+            if not result.get("modified_count"):
+                await db.exchange_rates.insert_one(document)
+        except Exception as e:
+            logger.warning(f"Could not persist exchange rates: {e}")
+
+    def reset(self):
+        self._matrix = None
+        self._next_attempt = 0.0
+
+
+# Global instance
+fx_rates = FxRateService(
+    ttl=float(os.environ.get('FX_RATES_TTL', '3600')),
+    retry_after=float(os.environ.get('FX_RATES_RETRY_AFTER', '60'))
+)
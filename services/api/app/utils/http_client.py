@@ -0,0 +1,281 @@
+"""
+Outbound HTTP
+One pooled, resilient HTTP layer for calls to integration providers
+
+Every provider call (Jira, Asana, Slack, Google, Microsoft Graph, ...) goes
+through the process-wide `outbound` instance instead of opening a client per
+call, so connections (and TLS sessions) are kept alive and reused:
+- one httpx.AsyncClient per origin (scheme://host:port), HTTP/2 when the
+  h2 package is installed, with connect/read timeouts
+- retries with full-jitter exponential backoff on connection errors, 429
+  and 502/503/504; Retry-After is honoured. Non-idempotent methods (POST,
+  PATCH) are only retried when the request never reached the provider
+  (connect errors) or was rejected with 429
+- a concurrency limit per provider, so one slow provider cannot take every
+  connection or trip its rate limits
+- a circuit breaker per provider host: after OUTBOUND_FAILURE_THRESHOLD
+  consecutive failures calls fail fast with CircuitOpenError for
+  OUTBOUND_RESET_TIMEOUT seconds, then one probe decides whether it closes
+
+Latency, outcomes and retries are exported per provider
+(integration_request_duration_seconds, integration_requests_total,
+integration_retries_total).
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import time
+from typing import Dict, Optional, Tuple
+import logging
+
+import httpx
+
+from monitoring.metrics import (
+    integration_request_duration, integration_requests_total, integration_retries_total
+)
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, provider: str, host: str, retry_in: float):
+        super().__init__(f"{provider} ({host}) is unavailable; retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after `failure_threshold` failures in a row; open ->
+    half-open after `reset_timeout` seconds, when a single probe is let
+    through: success closes the circuit, failure re-opens it. A probe that
+    ends without an outcome (cancelled, or an error that says nothing about
+    the host) is released so the next call can probe.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def retry_in(self) -> float:
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        if self.state == OPEN and self.retry_in() == 0:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """The allowed call ended without a success or failure to record"""
+        self._probing = False
+
+
+def _origin(url: str) -> Tuple[str, str, int]:
+    parsed = httpx.URL(url)
+    return parsed.scheme, parsed.host, parsed.port or (443 if parsed.scheme == "https" else 80)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+class OutboundHttp:
+    """
+    Pooled, retrying, rate-limited HTTP client for integration providers
+
+    Args:
+        timeout: Read/write/pool timeout in seconds
+        connect_timeout: Connect timeout in seconds
+        max_connections: Connection pool size per origin
+        retries: Retries after the first attempt
+        backoff: Base delay (seconds) of the exponential backoff
+        max_backoff: Longest delay between attempts; a longer Retry-After
+            is not waited out and the response is returned as is
+        concurrency: In-flight requests per provider
+        failure_threshold: Consecutive failures that open a circuit
+        reset_timeout: Seconds a circuit stays open before a probe
+    """
+
+    def __init__(self, timeout: float = 15.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 10.0, concurrency: int = 8,
+                 failure_threshold: int = 5, reset_timeout: float = 30):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.concurrency = concurrency
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clients: Dict[Tuple[str, str, int], httpx.AsyncClient] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """The pooled client for url's origin"""
+        origin = _origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=self.timeout, limits=self.limits)
+            self._clients[origin] = client
+        return client
+
+    def breaker(self, provider: str, url: str) -> CircuitBreaker:
+        key = (provider, _origin(url)[1])
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def _limit(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._limits.get(provider)
+        if semaphore is None:
+            semaphore = self._limits[provider] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to stop retrying"""
+        if response is not None:
+            server_delay = _retry_after(response)
+            if server_delay is not None:
+                return server_delay if server_delay <= self.max_backoff else None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def request(self, provider: str, method: str, url: str,
+                      idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request to a provider
+
+        Returns the final response (any status); raises CircuitOpenError
+        when the provider host is failing, or the last httpx error once
+        retries are exhausted. idempotent overrides the method-based retry
+        policy (e.g. True for a POST that is safe to repeat).
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        breaker = self.breaker(provider, url)
+        client = self.client(url)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                integration_requests_total.labels(provider=provider, outcome="circuit_open").inc()
+                raise CircuitOpenError(provider, _origin(url)[1], breaker.retry_in())
+
+            response, error = None, None
+            started = time.perf_counter()
+            try:
+                async with self._limit(provider):
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # Cancelled, or e.g. InvalidURL / DecodingError: no verdict on the host
+                breaker.release()
+                raise
+            integration_request_duration.labels(provider=provider).observe(time.perf_counter() - started)
+
+            if error is not None:
+                outcome = "transport_error"
+                retryable = idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+            elif response.status_code >= 500 or response.status_code == 429:
+                outcome = "server_error" if response.status_code >= 500 else "throttled"
+                retryable = response.status_code in RETRY_STATUSES and (
+                    idempotent or response.status_code == 429
+                )
+            else:
+                outcome = "client_error" if response.status_code >= 400 else "success"
+                retryable = False
+            integration_requests_total.labels(provider=provider, outcome=outcome).inc()
+
+            if outcome in ("transport_error", "server_error", "throttled"):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            delay = self._delay(attempt, response) if retryable and attempt < self.retries else None
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            integration_retries_total.labels(provider=provider).inc()
+            logger.info(f"Retrying {provider} {method} {url} in {delay:.2f}s ({outcome})")
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def get(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "GET", url, **kwargs)
+
+    async def post(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "POST", url, **kwargs)
+
+    async def patch(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "PATCH", url, **kwargs)
+
+    async def delete(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "DELETE", url, **kwargs)
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+
+# Global instance
+outbound = OutboundHttp(
+    timeout=float(os.environ.get('OUTBOUND_TIMEOUT', '15')),
+    retries=int(os.environ.get('OUTBOUND_RETRIES', '2')),
+    concurrency=int(os.environ.get('OUTBOUND_CONCURRENCY', '8')),
+    failure_threshold=int(os.environ.get('OUTBOUND_FAILURE_THRESHOLD', '5')),
+    reset_timeout=float(os.environ.get('OUTBOUND_RESET_TIMEOUT', '30'))
+)
@@ -4,6 +4,7 @@ Generates unique IDs with custom prefixes for Supabase
 """
 import uuid
 import secrets
+import time
 
 def generate_id(prefix: str) -> str:
     """
@@ -14,6 +15,14 @@ def generate_id(prefix: str) -> str:
     random_part = secrets.token_hex(6)
     return f"{prefix}_{random_part}"
 
+def generate_sortable_id(prefix: str) -> str:
+    """
+    Generate a unique ID that sorts by creation time
+    Format: prefix_<12 hex ms timestamp><8 hex random>
+    Example: msg_019b8f3a2c1d9e4f7a21
+    """
+    return f"{prefix}_{int(time.time() * 1000):012x}{secrets.token_hex(4)}"
+
 def generate_user_id() -> str:
     return generate_id("user")
 
@@ -63,4 +72,4 @@ def generate_channel_id() -> str:
     return generate_id("channel")
 
 def generate_message_id() -> str:
-    return generate_id("msg")
+    return generate_sortable_id("msg")
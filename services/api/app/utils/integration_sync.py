@@ -0,0 +1,656 @@
+"""
+Integration Sync
+Incremental, paginated import from project-management and code providers
+
+Each integration keeps one watermark per entity type in
+`integrations.sync_cursors`. A run asks the provider only for what changed
+since then: Jira `updated >=` JQL, Asana `modified_since`, and GitHub
+`since` with If-None-Match ETags, where a 304 costs nothing against the
+rate limit. Offset-paged APIs (Jira) fetch PAGE_CONCURRENCY pages at a
+time; cursor-paged ones (Asana, GitHub) follow their next links, with
+several projects/repositories in flight at once. Every provider call goes
+through the shared outbound client, so its per-provider concurrency limit
+and circuit breaker also bound a sync.
+
+Changed entities are upserted into `integration_entities` in batches of
+INTEGRATION_SYNC_BATCH_SIZE, and `integrations.sync_status` is updated
+after every batch. A watermark only advances once its entity type has been
+fully imported, so a failed run resumes where the last good one left off
+(upserts make the overlap harmless). Each run also leaves a row in
+`integration_sync_logs`.
+
+Jira integrations can also export time entries as worklogs (opt-in with
+`config.export_worklogs`). Stopped entries whose notes mention an imported
+issue key (e.g. "PROJ-42 fix login") are posted concurrently and recorded
+in `integration_worklogs`, so each entry is exported once. A worklog Jira
+rejects outright (a 4xx other than 401/408/429) is recorded there too,
+with `rejected_status`, and never retried. The first run after export is
+enabled only sets the watermark to now: existing history is never
+backfilled into the customer's Jira.
+"""
+import asyncio
+import base64
+import copy
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Union
+import logging
+
+from utils.http_client import outbound
+from utils.id_generator import generate_id
+
+logger = logging.getLogger(__name__)
+
+SYNC_BATCH_SIZE = int(os.environ.get('INTEGRATION_SYNC_BATCH_SIZE', '200'))
+PAGE_SIZE = 100
+PAGE_CONCURRENCY = 4
+
+# Watermarks are set from the run's start time minus this overlap, so
+# provider clock skew and minute-precision filters never drop a change
+WATERMARK_OVERLAP = timedelta(minutes=2)
+
+# A "running" status older than this is a crashed run, not a live one
+STALE_RUN = timedelta(hours=1)
+
+# Jira rejects worklogs shorter than a minute
+MIN_WORKLOG_SECONDS = 60
+
+# Client errors that may succeed on retry (expired token, timeout, rate limit)
+RETRYABLE_STATUSES = {401, 408, 429}
+
+ISSUE_KEY = re.compile(r"\b([A-Z][A-Z0-9]+-\d+)\b")
+
+ENTITY_CONFLICT = "integration_id,entity_type,external_id"
+
+# Sync states
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+PARTIAL = "partial"
+FAILED = "failed"
+
+_LOG_STATUS = {SUCCEEDED: "success", PARTIAL: "partial", FAILED: "failed"}
+
+
+class SyncError(Exception):
+    """A provider answered a sync request with an unexpected status"""
+
+
+class WorklogRejected(SyncError):
+    """Jira refused a worklog for good (retrying would fail the same way)"""
+
+    def __init__(self, issue_key: str, status: int):
+        super().__init__(f"Jira worklog on {issue_key}: HTTP {status}")
+        self.status = status
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def _check(response, what: str):
+    if response.status_code >= 400:
+        raise SyncError(f"{what}: HTTP {response.status_code}")
+
+
+def _entity(entity_type: str, external_id, title: Optional[str], status: Optional[str],
+            updated_at: Optional[str], data: Dict, external_key: Optional[str] = None) -> Dict:
+    return {
+        "entity_type": entity_type,
+        "external_id": str(external_id),
+        "external_key": external_key,
+        "title": title,
+        "status": status,
+        "external_updated_at": updated_at,
+        "data": data,
+    }
+
+
+async def _merge(streams: Sequence[AsyncIterator[List[Dict]]], limit: int = PAGE_CONCURRENCY):
+    """Pages from several cursor-paged streams, at most `limit` of them in flight"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=limit)
+    semaphore = asyncio.Semaphore(limit)
+    done = object()
+
+    async def drain(stream):
+        try:
+            async with semaphore:
+                async for page in stream:
+                    await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    tasks = [asyncio.ensure_future(drain(stream)) for stream in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class JiraSource:
+    """Jira Cloud: projects and issues; exports worklogs"""
+    provider = "jira"
+    entity_types = ("projects", "issues")
+
+    def __init__(self, base_url: str, email: str, api_token: str,
+                 project_keys: Optional[List[str]] = None):
+        self.base_url = base_url.rstrip('/')
+        auth = base64.b64encode(f"{email}:{api_token}".encode()).decode()
+        self.headers = {"Authorization": f"Basic {auth}", "Accept": "application/json"}
+        self.project_keys = project_keys or []
+
+    @classmethod
+    def from_integration(cls, integration: Dict) -> "JiraSource":
+        credentials = integration.get("credentials") or {}
+        config = integration.get("config") or {}
+        return cls(credentials["base_url"], credentials["email"], credentials["api_token"],
+                   config.get("projects"))
+
+    async def _get(self, path: str, params: Dict) -> Dict:
+        response = await outbound.get(self.provider, f"{self.base_url}{path}",
+                                      params=params, headers=self.headers)
+        _check(response, f"Jira {path}")
+        return response.json()
+
+    async def _offset_pages(self, path: str, params: Dict, items_key: str) -> AsyncIterator[List[Dict]]:
+        """
+        Every page of an offset-paged endpoint
+
+        The first page gives the total; the rest are fetched PAGE_CONCURRENCY
+        at a time and yielded in order.
+        """
+        first = await self._get(path, {**params, "startAt": 0, "maxResults": PAGE_SIZE})
+        yield first.get(items_key, [])
+        page_size = first.get("maxResults") or PAGE_SIZE  # Jira may cap below what was asked
+        starts = list(range(page_size, first.get("total", 0), page_size))
+        for i in range(0, len(starts), PAGE_CONCURRENCY):
+            pages = await asyncio.gather(*[
+                self._get(path, {**params, "startAt": start, "maxResults": page_size})
+                for start in starts[i:i + PAGE_CONCURRENCY]
+            ])
+            for page in pages:
+                yield page.get(items_key, [])
+
+    async def search(self, jql: str, fields: str = "summary,status,updated,project,assignee"
+                     ) -> AsyncIterator[List[Dict]]:
+        """Pages of issues matching jql"""
+        async for page in self._offset_pages("/rest/api/3/search", {"jql": jql, "fields": fields}, "issues"):
+            yield page
+
+    def issue_jql(self, updated_since: Optional[datetime] = None, project_keys: Optional[List[str]] = None) -> str:
+        """
+        JQL for issues changed since a point in time
+
+        Relative minutes ("-90m") sidestep JQL dates being read in the API
+        user's timezone. Ordered by key, which updates do not reorder, so
+        concurrently fetched offset pages never skip an issue.
+        """
+        clauses = []
+        project_keys = project_keys if project_keys is not None else self.project_keys
+        if project_keys:
+            clauses.append(f"project in ({', '.join(project_keys)})")
+        if updated_since is not None:
+            minutes = math.ceil((_now() - updated_since).total_seconds() / 60)
+            clauses.append(f"updated >= -{max(minutes, 1)}m")
+        return f"{' AND '.join(clauses)} ORDER BY key ASC".strip()
+
+    async def changes(self, entity_type: str, cursor: Dict) -> AsyncIterator[List[Dict]]:
+        started = _now()
+        if entity_type == "projects":
+            async for page in self._offset_pages("/rest/api/3/project/search", {}, "values"):
+                yield [_entity("projects", p["id"], p.get("name"), None, None, p, p.get("key"))
+                       for p in page]
+        elif entity_type == "issues":
+            jql = self.issue_jql(_parse_time(cursor.get("updated_since")))
+            async for page in self.search(jql):
+                yield [self._issue(issue) for issue in page]
+            cursor["updated_since"] = (started - WATERMARK_OVERLAP).isoformat()
+        else:
+            raise SyncError(f"Jira cannot sync {entity_type}")
+
+    @staticmethod
+    def _issue(issue: Dict) -> Dict:
+        fields = issue.get("fields") or {}
+        status = (fields.get("status") or {}).get("name")
+        return _entity("issues", issue["id"], fields.get("summary"), status,
+                       fields.get("updated"), issue, issue.get("key"))
+
+    async def add_worklog(self, issue_key: str, seconds: int, started: datetime,
+                          comment: str = "") -> Optional[str]:
+        """
+        Log time on an issue; the new worklog's id, or None if it failed
+
+        Raises WorklogRejected when Jira refuses it permanently.
+        """
+        body = {
+            "timeSpentSeconds": seconds,
+            "started": started.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+        }
+        if comment:
+            body["comment"] = {"type": "doc", "version": 1, "content": [
+                {"type": "paragraph", "content": [{"type": "text", "text": comment}]}
+            ]}
+        response = await outbound.post(
+            self.provider, f"{self.base_url}/rest/api/3/issue/{issue_key}/worklog",
+            headers={**self.headers, "Content-Type": "application/json"}, json=body
+        )
+        if response.status_code != 201:
+            if 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_STATUSES:
+                raise WorklogRejected(issue_key, response.status_code)
+            logger.warning(f"Jira worklog on {issue_key} failed: HTTP {response.status_code}")
+            return None
+        return str(response.json().get("id"))
+
+    async def add_worklogs(self, worklogs: List[Dict]) -> List[Union[str, None, WorklogRejected]]:
+        """
+        Post many worklogs ({"issue_key", "seconds", "started", "comment"})
+        concurrently; one result per input, in order: the worklog id, None
+        (failed, retry later) or the WorklogRejected error
+        """
+        async def post(worklog):
+            try:
+                return await self.add_worklog(worklog["issue_key"], worklog["seconds"],
+                                              worklog["started"], worklog.get("comment", ""))
+            except WorklogRejected as e:
+                logger.warning(f"{e}; not retried")
+                return e
+            except Exception as e:
+                logger.warning(f"Jira worklog on {worklog['issue_key']} failed: {e}")
+                return None
+        return await asyncio.gather(*[post(worklog) for worklog in worklogs])
+
+
+class AsanaSource:
+    """Asana: projects and tasks"""
+    provider = "asana"
+    entity_types = ("projects", "tasks")
+    base_url = "https://app.asana.com/api/1.0"
+
+    def __init__(self, access_token: str, workspace_gid: Optional[str] = None,
+                 project_gids: Optional[List[str]] = None):
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+        self.workspace_gid = workspace_gid
+        self.project_gids = project_gids or []
+
+    @classmethod
+    def from_integration(cls, integration: Dict) -> "AsanaSource":
+        credentials = integration.get("credentials") or {}
+        config = integration.get("config") or {}
+        return cls(credentials["access_token"], config.get("workspace"), config.get("projects"))
+
+    async def _pages(self, path: str, params: Dict) -> AsyncIterator[List[Dict]]:
+        """Follow next_page offsets of a cursor-paged endpoint"""
+        params = {**params, "limit": PAGE_SIZE}
+        while True:
+            response = await outbound.get(self.provider, f"{self.base_url}{path}",
+                                          params=params, headers=self.headers)
+            _check(response, f"Asana {path}")
+            body = response.json()
+            yield body.get("data", [])
+            next_page = body.get("next_page")
+            if not next_page or not next_page.get("offset"):
+                return
+            params = {**params, "offset": next_page["offset"]}
+
+    async def _projects(self) -> AsyncIterator[List[Dict]]:
+        if not self.workspace_gid:
+            raise SyncError("Asana sync needs config.workspace")
+        async for page in self._pages("/projects", {
+            "workspace": self.workspace_gid, "opt_fields": "name,archived,modified_at"
+        }):
+            yield page
+
+    async def changes(self, entity_type: str, cursor: Dict) -> AsyncIterator[List[Dict]]:
+        started = _now()
+        if entity_type == "projects":
+            async for page in self._projects():
+                yield [_entity("projects", p["gid"], p.get("name"),
+                               "archived" if p.get("archived") else "active", p.get("modified_at"), p)
+                       for p in page]
+        elif entity_type == "tasks":
+            project_gids = self.project_gids
+            if not project_gids:
+                project_gids = [p["gid"] async for page in self._projects() for p in page]
+            params = {"opt_fields": "name,completed,modified_at,assignee,projects"}
+            if cursor.get("modified_since"):
+                params["modified_since"] = cursor["modified_since"]
+            streams = [self._pages("/tasks", {**params, "project": gid}) for gid in project_gids]
+            async for page in _merge(streams):
+                yield [_entity("tasks", t["gid"], t.get("name"),
+                               "completed" if t.get("completed") else "open", t.get("modified_at"), t)
+                       for t in page]
+            cursor["modified_since"] = (started - WATERMARK_OVERLAP).isoformat()
+        else:
+            raise SyncError(f"Asana cannot sync {entity_type}")
+
+
+class GitHubSource:
+    """GitHub: commits of the configured repositories"""
+    provider = "github"
+    entity_types = ("commits",)
+    base_url = "https://api.github.com"
+
+    def __init__(self, access_token: str, repositories: Optional[List[str]] = None):
+        self.headers = {"Authorization": f"token {access_token}", "Accept": "application/vnd.github+json"}
+        self.repositories = repositories or []
+
+    @classmethod
+    def from_integration(cls, integration: Dict) -> "GitHubSource":
+        credentials = integration.get("credentials") or {}
+        config = integration.get("config") or {}
+        return cls(credentials["access_token"], config.get("repositories"))
+
+    async def _commits(self, repository: str, state: Dict) -> AsyncIterator[List[Dict]]:
+        """
+        Commits of one repository since its watermark
+
+        The first page is a conditional request: until something is pushed
+        the URL (same `since`) and ETag stay the same and GitHub answers 304.
+        `since` only moves when new commits arrive, which resets the ETag.
+        """
+        started = _now()
+        params = {"per_page": PAGE_SIZE}
+        if state.get("since"):
+            params["since"] = state["since"]
+        headers = dict(self.headers)
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+
+        url = f"{self.base_url}/repos/{repository}/commits"
+        response = await outbound.get(self.provider, url, params=params, headers=headers)
+        if response.status_code == 304:
+            return
+        _check(response, f"GitHub {repository} commits")
+
+        first_etag, changed = response.headers.get("ETag"), False
+        while True:
+            page = response.json()
+            changed = changed or bool(page)
+            yield [self._commit(repository, commit) for commit in page]
+            next_url = response.links.get("next", {}).get("url")
+            if not next_url:
+                break
+            response = await outbound.get(self.provider, next_url, headers=self.headers)
+            _check(response, f"GitHub {repository} commits")
+
+        if changed:
+            state["since"] = (started - WATERMARK_OVERLAP).isoformat()
+            state.pop("etag", None)
+        else:
+            state["etag"] = first_etag
+
+    @staticmethod
+    def _commit(repository: str, commit: Dict) -> Dict:
+        details = commit.get("commit") or {}
+        committed_at = (details.get("committer") or {}).get("date")
+        title = (details.get("message") or "").split("\n", 1)[0]
+        return _entity("commits", f"{repository}@{commit['sha']}", title, None, committed_at,
+                       {"repository": repository, "sha": commit["sha"], "author": details.get("author"),
+                        "html_url": commit.get("html_url")}, commit["sha"][:7])
+
+    async def changes(self, entity_type: str, cursor: Dict) -> AsyncIterator[List[Dict]]:
+        if entity_type != "commits":
+            raise SyncError(f"GitHub cannot sync {entity_type}")
+        repositories = cursor.setdefault("repositories", {})
+        streams = [self._commits(repo, repositories.setdefault(repo, {})) for repo in self.repositories]
+        async for page in _merge(streams):
+            yield page
+
+
+SOURCES = {
+    "jira": JiraSource,
+    "asana": AsanaSource,
+    "github": GitHubSource,
+}
+
+
+def source_for(integration: Dict):
+    source_class = SOURCES.get(integration.get("integration_type"))
+    if source_class is None:
+        raise SyncError(f"Sync is not supported for {integration.get('integration_type')} integrations")
+    return source_class.from_integration(integration)
+
+
+def is_running(integration: Dict) -> bool:
+    """Whether another (live) run holds this integration"""
+    status = integration.get("sync_status") or {}
+    started = _parse_time(status.get("started_at"))
+    return status.get("state") == RUNNING and started is not None and _now() - started < STALE_RUN
+
+
+class IntegrationSync:
+    """
+    One sync run of an integration
+
+    Args:
+        db: Database
+        integration: The `integrations` row
+        source: Provider source (defaults to the one for the integration type)
+        batch_size: Entities per upsert
+    """
+
+    def __init__(self, db, integration: Dict, source=None, batch_size: int = SYNC_BATCH_SIZE):
+        self.db = db
+        self.integration = integration
+        self.integration_id = integration["integration_id"]
+        self.source = source or source_for(integration)
+        self.batch_size = batch_size
+        self.cursors = dict(integration.get("sync_cursors") or {})
+        self.status = {"state": RUNNING, "started_at": _now().isoformat(), "entities": {}}
+
+    async def run(self, entity_types: Optional[List[str]] = None,
+                  export_worklogs: Optional[bool] = None) -> Dict:
+        """
+        Import every entity type (then export worklogs if enabled); the final sync_status
+
+        export_worklogs defaults to the integration's `config.export_worklogs` (off).
+        """
+        started = time.monotonic()
+        await self._save_status()
+        if export_worklogs is None:
+            export_worklogs = bool((self.integration.get("config") or {}).get("export_worklogs"))
+
+        steps = [(entity_type, self._import) for entity_type in entity_types or self.source.entity_types]
+        if export_worklogs and hasattr(self.source, "add_worklogs"):
+            steps.append(("worklogs", self._export_worklogs))
+
+        for name, step in steps:
+            progress = self.status["entities"][name] = {"state": RUNNING, "fetched": 0, "synced": 0}
+            cursor = copy.deepcopy(self.cursors.get(name) or {})
+            try:
+                await step(name, cursor, progress)
+                progress["state"] = SUCCEEDED
+                self.cursors[name] = cursor
+                await self.db.integrations.update_one(
+                    {"integration_id": self.integration_id}, {"$set": {"sync_cursors": self.cursors}}
+                )
+            except Exception as e:
+                logger.warning(f"Sync of {name} for integration {self.integration_id} failed: {e}")
+                progress.update(state=FAILED, error=str(e))
+
+        states = [progress["state"] for progress in self.status["entities"].values()]
+        if all(state == SUCCEEDED for state in states):
+            self.status["state"] = SUCCEEDED
+        elif any(state == SUCCEEDED for state in states):
+            self.status["state"] = PARTIAL
+        else:
+            self.status["state"] = FAILED
+        self.status["finished_at"] = _now().isoformat()
+        await self._finish(int((time.monotonic() - started) * 1000))
+        return self.status
+
+    async def _import(self, entity_type: str, cursor: Dict, progress: Dict):
+        batch: Dict = {}
+        async for page in self.source.changes(entity_type, cursor):
+            progress["fetched"] += len(page)
+            # Keyed by external id: overlapping pages must not put the same
+            # row twice into one upsert statement
+            for entity in page:
+                batch[entity["external_id"]] = entity
+            if len(batch) >= self.batch_size:
+                await self._upsert(list(batch.values()), progress)
+                batch = {}
+        if batch:
+            await self._upsert(list(batch.values()), progress)
+
+    async def _upsert(self, entities: List[Dict], progress: Dict):
+        synced_at = _now().isoformat()
+        company_id = self.integration["company_id"]
+        for start in range(0, len(entities), self.batch_size):
+            rows = [
+                {**entity, "integration_id": self.integration_id, "company_id": company_id,
+                 "synced_at": synced_at}
+                for entity in entities[start:start + self.batch_size]
+            ]
+            await self.db.integration_entities.upsert_many(rows, on_conflict=ENTITY_CONFLICT)
+            progress["synced"] += len(rows)
+        await self._save_status()
+
+    async def _export_worklogs(self, name: str, cursor: Dict, progress: Dict):
+        """
+        Post stopped time entries that mention an imported issue key as
+        worklogs, a batch at a time
+
+        The watermark only advances when every candidate was exported or
+        rejected for good; entries already in integration_worklogs (either
+        way) are never posted twice.
+        The first run (no watermark) exports nothing and starts it at now.
+        """
+        started = _now()
+        if not cursor.get("since"):
+            cursor["since"] = started.isoformat()
+            return
+
+        failures = 0
+        seen = set()
+        # Entries stopped since the last run, and back-dated manual entries
+        # created since then (time_entries has no maintained updated_at)
+        for field in ("end_time", "created_at"):
+            query = {"company_id": self.integration["company_id"], "status": "stopped",
+                     field: {"$gte": cursor["since"]}}
+            candidates = []
+            async for entry in self.db.time_entries.iterate(query, field, "entry_id",
+                                                            batch_size=self.batch_size * 2, descending=False):
+                if entry["entry_id"] in seen:
+                    continue
+                seen.add(entry["entry_id"])
+                match = ISSUE_KEY.search(entry.get("notes") or "")
+                if match and (entry.get("duration") or 0) >= MIN_WORKLOG_SECONDS:
+                    candidates.append((match.group(1), entry))
+                if len(candidates) >= self.batch_size:
+                    failures += await self._post_worklogs(candidates, progress)
+                    candidates = []
+            if candidates:
+                failures += await self._post_worklogs(candidates, progress)
+
+        if failures:
+            raise SyncError(f"{failures} worklogs could not be exported; they are retried next run")
+        cursor["since"] = (started - WATERMARK_OVERLAP).isoformat()
+
+    async def _post_worklogs(self, candidates: List, progress: Dict) -> int:
+        """Export one batch; the number of worklogs that failed"""
+        entry_ids = [entry["entry_id"] for _, entry in candidates]
+        exported = await self.db.integration_worklogs.find(
+            {"integration_id": self.integration_id, "entry_id": {"$in": entry_ids}}
+        )
+        known = await self.db.integration_entities.find({
+            "integration_id": self.integration_id, "entity_type": "issues",
+            "external_key": {"$in": sorted({key for key, _ in candidates})}
+        })
+        exported_ids = {row["entry_id"] for row in exported}
+        known_keys = {row["external_key"] for row in known}
+
+        pending = [(key, entry) for key, entry in candidates
+                   if key in known_keys and entry["entry_id"] not in exported_ids]
+        progress["fetched"] += len(pending)
+        if not pending:
+            return 0
+
+        results = await self.source.add_worklogs([
+            {"issue_key": key, "seconds": int(entry["duration"]),
+             "started": _parse_time(entry["start_time"]), "comment": entry.get("notes") or ""}
+            for key, entry in pending
+        ])
+        exported_at = _now().isoformat()
+        rows = []
+        for (key, entry), result in zip(pending, results):
+            if result is None:
+                continue
+            rejected = isinstance(result, WorklogRejected)
+            rows.append({"integration_id": self.integration_id, "entry_id": entry["entry_id"],
+                         "issue_key": key, "worklog_id": None if rejected else result,
+                         "rejected_status": result.status if rejected else None,
+                         "seconds": int(entry["duration"]), "exported_at": exported_at})
+        if rows:
+            await self.db.integration_worklogs.insert_many(rows)
+        progress["synced"] += sum(1 for row in rows if row["worklog_id"] is not None)
+        await self._save_status()
+        return len(pending) - len(rows)
+
+    async def _save_status(self):
+        await self.db.integrations.update_one(
+            {"integration_id": self.integration_id}, {"$set": {"sync_status": self.status}}
+        )
+
+    async def _finish(self, duration_ms: int):
+        errors = [f"{name}: {progress['error']}" for name, progress in self.status["entities"].items()
+                  if progress.get("error")]
+        await self.db.integrations.update_one({"integration_id": self.integration_id}, {"$set": {
+            "sync_status": self.status,
+            "last_sync_at": self.status["finished_at"],
+            "status": "error" if self.status["state"] == FAILED else "active",
+            "error_message": "; ".join(errors) or None,
+        }})
+        await self.db.integration_sync_logs.insert_one({
+            "log_id": generate_id('synclog'),
+            "integration_id": self.integration_id,
+            "sync_type": "incremental",
+            "status": _LOG_STATUS[self.status["state"]],
+            "records_synced": sum(p["synced"] for p in self.status["entities"].values()),
+            "error_message": "; ".join(errors) or None,
+            "sync_duration_ms": duration_ms,
+            "metadata": {"entities": self.status["entities"]},
+        })
+
+
+async def sync_integration(db, integration_id: str, entity_types: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Run an incremental sync of one integration
+
+    Returns the final sync_status, or None when the integration does not
+    exist or another run is still in progress.
+    """
+    integration = await db.integrations.find_one({"integration_id": integration_id})
+    if not integration or is_running(integration):
+        return None
+    try:
+        return await IntegrationSync(db, integration).run(entity_types)
+    except Exception as e:
+        logger.error(f"Sync of integration {integration_id} failed: {e}")
+        await db.integrations.update_one({"integration_id": integration_id}, {"$set": {
+            "sync_status": {"state": FAILED, "finished_at": _now().isoformat(), "error": str(e)},
+            "status": "error",
+            "error_message": str(e),
+        }})
+        return None
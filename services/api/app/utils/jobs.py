@@ -0,0 +1,241 @@
+"""
+Background Jobs
+Queue heavy endpoint work onto the Celery workers
+
+An endpoint submits a job and returns 202 with the job id; the worker runs
+it and stores the result on the `jobs` row, which clients poll
+(GET /jobs/{id}) or watch (WebSocket /jobs/{id}/ws).
+
+Jobs are keyed by a hash of (kind, company, parameters):
+- an identical job that is still queued or running is reused instead of
+  enqueued again (a partial unique index on job_key backs this up)
+- a succeeded job is served from its stored result until expires_at
+- a job still queued or running after JOB_TIME_LIMIT (the Celery
+  task_time_limit) is presumed lost (worker killed, message dropped) and
+  marked failed, so it stops absorbing identical requests
+
+Interactive work (single PDFs, AI analysis, short reports) goes to the
+`interactive` queue and bulk work to `bulk`, so a long export never sits
+in front of a request someone is waiting on.
+"""
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+IN_FLIGHT = (QUEUED, RUNNING)
+TERMINAL = (SUCCEEDED, FAILED)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Seconds a job may stay queued or running; matches the workers' task_time_limit
+JOB_TIME_LIMIT = int(os.environ.get('JOB_TIME_LIMIT', '3600'))
+STALE_ERROR = "Job did not finish within the time limit"
+
+# kind -> (celery task name, default queue, result cache seconds)
+JOB_KINDS: Dict[str, Tuple[str, str, int]] = {
+    "custom_report": ("run_custom_report_job", BULK, 900),
+    "productivity_analysis": ("run_productivity_analysis_job", INTERACTIVE, 600),
+    "invoice_pdf": ("render_invoice_pdf_job", INTERACTIVE, 3600),
+    "timesheet_pdf": ("render_timesheet_pdf_job", INTERACTIVE, 3600),
+}
+
+PUBLIC_FIELDS = ("job_id", "kind", "status", "queue", "result", "error",
+                 "created_at", "started_at", "completed_at")
+
+
+def job_key(kind: str, params: Dict, company_id: Optional[str] = None) -> str:
+    """Stable hash of a job's identity; parameter order does not matter"""
+    raw = json.dumps([kind, company_id, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def public_view(job: Dict) -> Dict:
+    return {field: job.get(field) for field in PUBLIC_FIELDS}
+
+
+def job_response(job: Dict, links: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """200 with the result for a cached job, otherwise 202 with where to look"""
+    content = public_view(job)
+    content["links"] = {
+        "status": f"/jobs/{job['job_id']}",
+        "ws": f"/jobs/{job['job_id']}/ws",
+        **(links or {})
+    }
+    return JSONResponse(status_code=200 if job["status"] == SUCCEEDED else 202, content=content)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _stale_cutoff() -> str:
+    return (_now() - timedelta(seconds=JOB_TIME_LIMIT)).isoformat()
+
+
+def _is_stale(job: Dict) -> bool:
+    created_at = datetime.fromisoformat(str(job["created_at"]).replace('Z', '+00:00'))
+    return created_at < _now() - timedelta(seconds=JOB_TIME_LIMIT)
+
+
+class CeleryProducer:
+    """
+    Publishes job tasks by name
+
+    Only the broker connection is needed to enqueue, so the API does not
+    import the worker package (whose task modules use the app.* import root).
+    """
+
+    def __init__(self):
+        self._app = None
+
+    def send(self, task_name: str, job_id: str, queue: str):
+        if self._app is None:
+            from celery import Celery
+            self._app = Celery(
+                'workingtracker',
+                broker=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+            )
+        self._app.send_task(task_name, args=[job_id], queue=queue)
+
+
+class JobQueue:
+    """
+    Submits, deduplicates and records background jobs
+
+    Args:
+        producer: Object with send(task_name, job_id, queue); Celery by default
+    """
+
+    def __init__(self, producer=None):
+        self.producer = producer or CeleryProducer()
+
+    async def get(self, db, job_id: str) -> Optional[Dict]:
+        return await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+    async def submit(self, db, kind: str, params: Dict, *,
+                     company_id: Optional[str] = None, user_id: Optional[str] = None,
+                     queue: Optional[str] = None,
+                     prepare: Optional[Callable[[Dict], Awaitable[Any]]] = None) -> Dict:
+        """
+        Return a cached, in-flight or newly enqueued job for these parameters
+
+        prepare runs once, for a new job only, before it is enqueued (e.g. to
+        create the row the worker will fill in, or to charge a quota). An
+        HTTPException it raises is passed through and the job is not enqueued.
+        """
+        task_name, default_queue, cache_ttl = JOB_KINDS[kind]
+        key = job_key(kind, params, company_id)
+
+        cached = await db.jobs.find_one(
+            {"job_key": key, "status": SUCCEEDED, "expires_at": {"$gte": _now().isoformat()}},
+            {"_id": 0}
+        )
+        if cached:
+            return cached
+
+        existing = await self._find_in_flight(db, key)
+        if existing:
+            return existing
+
+        job = {
+            "job_id": f"job_{uuid.uuid4().hex[:12]}",
+            "job_key": key,
+            "kind": kind,
+            "company_id": company_id,
+            "user_id": user_id,
+            "params": params,
+            "queue": queue or default_queue,
+            "status": QUEUED,
+            "cache_ttl": cache_ttl,
+            "created_at": _now().isoformat()
+        }
+        try:
+            await db.jobs.insert_one(job)
+        except Exception:
+            # Lost the race to an identical submission
+            existing = await self._find_in_flight(db, key)
+            if existing:
+                return existing
+            raise
+
+        try:
+            if prepare is not None:
+                await prepare(job)
+            self.producer.send(task_name, job["job_id"], job["queue"])
+        except HTTPException as e:
+            await self._finish(db, job["job_id"], FAILED, error=str(e.detail))
+            raise
+        except Exception as e:
+            logger.error(f"Failed to enqueue job {job['job_id']} ({kind}): {e}")
+            await self._finish(db, job["job_id"], FAILED, error=f"Could not enqueue job: {e}")
+            raise HTTPException(status_code=503, detail="Background job queue unavailable")
+        return job
+
+    async def _find_in_flight(self, db, key: str) -> Optional[Dict]:
+        job = await db.jobs.find_one({"job_key": key, "status": {"$in": list(IN_FLIGHT)}}, {"_id": 0})
+        if job and _is_stale(job):
+            # Frees the in-flight key for a new job
+            await db.jobs.update_one(
+                {"job_id": job["job_id"], "status": job["status"]},
+                {"$set": {"status": FAILED, "completed_at": _now().isoformat(), "error": STALE_ERROR}}
+            )
+            logger.warning(f"Job {job['job_id']} ({job['kind']}) exceeded the time limit; marked failed")
+            return None
+        return job
+
+    async def fail_stale(self, db) -> None:
+        """Mark every job queued or running past JOB_TIME_LIMIT as failed (periodic cleanup)"""
+        await db.jobs.update_many(
+            {"status": {"$in": list(IN_FLIGHT)}, "created_at": {"$lt": _stale_cutoff()}},
+            {"$set": {"status": FAILED, "completed_at": _now().isoformat(), "error": STALE_ERROR}}
+        )
+
+    async def run(self, db, job_id: str, handler: Callable[[Any, Dict], Awaitable[Any]]) -> str:
+        """
+        Worker side: run handler(db, job) and store its result on the job
+
+        Returns the final status. Jobs that already finished (a redelivered
+        message) are not run again.
+        """
+        job = await self.get(db, job_id)
+        if job is None:
+            logger.warning(f"Job {job_id} not found")
+            return FAILED
+        if job["status"] in TERMINAL:
+            return job["status"]
+
+        await db.jobs.update_one({"job_id": job_id}, {"$set": {"status": RUNNING, "started_at": _now().isoformat()}})
+        try:
+            result = await handler(db, job)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {e}")
+            await self._finish(db, job_id, FAILED, error=str(e))
+            return FAILED
+
+        expires_at = _now() + timedelta(seconds=job.get("cache_ttl") or 0)
+        await self._finish(db, job_id, SUCCEEDED, result=result, expires_at=expires_at.isoformat())
+        return SUCCEEDED
+
+    async def _finish(self, db, job_id: str, status: str, **fields):
+        await db.jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": status, "completed_at": _now().isoformat(), **fields}}
+        )
+
+
+# Global instance
+job_queue = JobQueue()
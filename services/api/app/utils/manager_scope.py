@@ -0,0 +1,82 @@
+"""
+Manager Scope
+Cached resolution of which employees a manager may access
+
+A manager's assigned employees are loaded once from `manager_assignments`
+into a frozenset and served from an in-process TTL cache, so access checks
+are O(1) membership tests and list endpoints can filter a batch of user ids
+without touching the database. Routes that change assignments invalidate
+the manager; the TTL bounds staleness on other worker processes.
+"""
+import os
+from typing import FrozenSet, Iterable, List
+import logging
+
+from monitoring.metrics import manager_scope_cache_requests_total
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Roles that see every user in their company
+COMPANY_WIDE_ROLES = ("admin",)
+
+
+class ManagerScopeService:
+    """
+    Resolves and caches manager -> assigned employee sets
+
+    Args:
+        ttl: Seconds an assignment set is served from cache
+        max_entries: Managers kept in cache (least recently used evicted)
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.cache = TTLCache('manager', ttl, max_entries, metric=manager_scope_cache_requests_total)
+
+    async def get_assigned(self, db, manager_id: str) -> FrozenSet[str]:
+        """Employee ids assigned to a manager"""
+
+        async def load():
+            rows = await db.manager_assignments.find({"manager_id": manager_id}, {"_id": 0})
+            assigned = set()
+            for row in rows:
+                if not row.get("active", True):
+                    continue
+                if row.get("employee_id"):
+                    assigned.add(row["employee_id"])
+                # Older documents keep the whole assignment as a list
+                assigned.update(row.get("user_ids") or [])
+            return frozenset(assigned)
+
+        return await self.cache.get_or_load(manager_id, load)
+
+    async def can_access(self, db, user: dict, target_user_id: str) -> bool:
+        """Whether user may see target_user_id's data (same rules as can_access_user_data)"""
+        if user["role"] in COMPANY_WIDE_ROLES or user["user_id"] == target_user_id:
+            return True
+        if user["role"] == "manager":
+            return target_user_id in await self.get_assigned(db, user["user_id"])
+        return False
+
+    async def filter_accessible(self, db, user: dict, user_ids: Iterable[str]) -> List[str]:
+        """The subset of user_ids that user may access, in input order"""
+        if user["role"] in COMPANY_WIDE_ROLES:
+            return list(user_ids)
+        allowed = {user["user_id"]}
+        if user["role"] == "manager":
+            allowed |= await self.get_assigned(db, user["user_id"])
+        return [user_id for user_id in user_ids if user_id in allowed]
+
+    def invalidate(self, manager_id: str):
+        """Call after assigning or unassigning employees for a manager"""
+        self.cache.invalidate(manager_id)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+# Global instance
+manager_scopes = ManagerScopeService(ttl=float(os.environ.get('MANAGER_SCOPE_CACHE_TTL', '60')))
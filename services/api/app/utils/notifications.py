@@ -0,0 +1,190 @@
+"""
+Notification Inbox
+Bulk notification writes, cursor-paged inboxes and pushed unread counts
+
+Unread counts live in `notification_counters`, one row per (user,
+company). Statement-level triggers on `notifications` keep it in step in
+the same transaction as every insert, read-flag update and delete. So
+reading a count is a primary-key lookup and a bulk insert costs one
+counter upsert per recipient.
+
+Count changes are pushed over the realtime websocket (`/ws/{company_id}`,
+authenticated with `?token=`) as {"type": "notification_count", "delta",
+"unread"?} events, so clients no longer need to poll. With NOTIFICATIONS_REDIS_URL
+set, events are relayed through Redis pub/sub and reach sockets on every
+worker. Without it, only sockets on the worker that made the change get
+them. Clients fetch /unread-count when they (re)connect.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import logging
+
+from utils.id_generator import generate_id
+from utils.pagination import paginate
+
+logger = logging.getLogger(__name__)
+
+COUNT_EVENT = "notification_count"
+INSERT_BATCH = 500
+
+Deliver = Callable[[str, Dict], Awaitable[None]]
+
+
+class RedisRelay:
+    """Fans count events out to every API worker over Redis pub/sub"""
+
+    def __init__(self, url: str, channel: str = "notifications:events"):
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _redis(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    async def publish(self, user_id: str, event: Dict):
+        await self._redis().publish(self.channel, json.dumps({"user_id": user_id, "event": event}))
+
+    def start(self, deliver: Deliver):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(deliver))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self, deliver: Deliver):
+        while True:
+            try:
+                pubsub = self._redis().pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    await deliver(payload["user_id"], payload["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification relay error, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+
+class NotificationInbox:
+    """
+    Notification writes and reads for every route
+
+    Args:
+        relay: Optional RedisRelay shared by all workers
+    """
+
+    def __init__(self, relay: Optional[RedisRelay] = None):
+        self.relay = relay
+        self.deliver: Optional[Deliver] = None
+
+    def configure(self, deliver: Deliver):
+        """Set how events reach this worker's sockets (the server's connection manager)"""
+        self.deliver = deliver
+
+    def start(self):
+        if self.relay is not None and self.deliver is not None:
+            self.relay.start(self.deliver)
+
+    async def stop(self):
+        if self.relay is not None:
+            await self.relay.stop()
+
+    async def publish(self, user_id: str, delta: int, unread: Optional[int] = None, **extra):
+        """Push a count change; failures are logged, never raised"""
+        event = {"type": COUNT_EVENT, "delta": delta, **extra}
+        if unread is not None:
+            event["unread"] = unread
+        try:
+            if self.relay is not None:
+                await self.relay.publish(user_id, event)
+            elif self.deliver is not None:
+                await self.deliver(user_id, event)
+        except Exception as e:
+            logger.warning(f"Could not push notification count to {user_id}: {e}")
+
+    async def create_many(self, db, company_id: str, user_ids: Iterable[str], notification_type: str,
+                          title: str, message: str, data: Optional[Dict] = None,
+                          priority: str = "normal") -> List[str]:
+        """Notify every recipient with one insert (per INSERT_BATCH); the new ids"""
+        recipients = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        if not recipients:
+            return []
+        created_at = datetime.now(timezone.utc).isoformat()
+        docs = [{
+            "notification_id": generate_id("notification"),
+            "company_id": company_id,
+            "user_id": user_id,
+            "notification_type": notification_type,
+            "title": title,
+            "message": message,
+            "data": data or {},
+            "read": False,
+            "priority": priority,
+            "created_at": created_at
+        } for user_id in recipients]
+        for start in range(0, len(docs), INSERT_BATCH):
+            await db.notifications.insert_many(docs[start:start + INSERT_BATCH])
+
+        summary = {"notification_type": notification_type, "title": title, "priority": priority}
+        await asyncio.gather(*(
+            self.publish(doc["user_id"], 1, notification_id=doc["notification_id"], **summary)
+            for doc in docs
+        ))
+        return [doc["notification_id"] for doc in docs]
+
+    async def unread_count(self, db, user_id: str, company_id: str) -> int:
+        row = await db.notification_counters.find_one({"user_id": user_id, "company_id": company_id})
+        return int(row["unread"]) if row else 0
+
+    async def mark_read(self, db, user_id: str, company_id: str,
+                        notification_ids: Optional[List[str]] = None) -> int:
+        """Mark some (or all) unread notifications read in one statement; the number changed"""
+        changed = await db.rpc("mark_notifications_read", {
+            "p_user_id": user_id,
+            "p_company_id": company_id,
+            "p_notification_ids": notification_ids
+        })
+        changed = int(changed or 0)
+        if changed:
+            await self.publish(user_id, -changed, await self.unread_count(db, user_id, company_id))
+        return changed
+
+    async def delete(self, db, user_id: str, notification_id: str) -> int:
+        notification = await db.notifications.find_one(
+            {"notification_id": notification_id, "user_id": user_id}
+        )
+        if not notification:
+            return 0
+        result = await db.notifications.delete_one({"notification_id": notification_id, "user_id": user_id})
+        if not notification.get("read"):
+            await self.publish(user_id, -1, await self.unread_count(db, user_id, notification["company_id"]))
+        return result["deleted_count"]
+
+    async def page(self, db, user_id: str, company_id: str, limit: int, cursor: Optional[str],
+                   response, unread_only: bool = False) -> List[Dict]:
+        """Newest-first inbox page; the next cursor goes in X-Next-Cursor"""
+        query = {"user_id": user_id, "company_id": company_id}
+        if unread_only:
+            query["read"] = False
+        return await paginate(db.notifications, query, "created_at", "notification_id", limit, cursor, response)
+
+
+def _create_notification_inbox() -> NotificationInbox:
+    redis_url = os.environ.get('NOTIFICATIONS_REDIS_URL')
+    return NotificationInbox(relay=RedisRelay(redis_url) if redis_url else None)
+
+
+# Global instance
+notification_inbox = _create_notification_inbox()
@@ -0,0 +1,213 @@
+"""
+Object Storage Uploader
+Non-blocking uploads to S3-compatible storage (Contabo, MinIO, AWS S3)
+
+boto3 is synchronous, so every call runs on a dedicated thread pool and a
+semaphore caps how many uploads are in flight per process. Bodies are
+spooled first (in memory up to the part size, then to a temporary file), so
+a slow client never holds an upload slot; the slot covers only the S3
+calls. Small bodies go up with one put_object, larger ones as a multipart
+upload with a few parts in flight.
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+# S3 requires every part except the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def create_s3_client(max_pool_connections: int = 10):
+    """S3-compatible client from environment, or None if not configured"""
+    endpoint_url = os.environ.get('S3_ENDPOINT_URL')  # e.g., https://eu2.contabostorage.com
+    access_key = os.environ.get('S3_ACCESS_KEY')
+    secret_key = os.environ.get('S3_SECRET_KEY')
+    region = os.environ.get('S3_REGION', 'eu2')
+
+    if not all([endpoint_url, access_key, secret_key]):
+        return None
+
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
+        config=Config(
+            signature_version='s3v4',
+            s3={'addressing_style': 'path'},
+            max_pool_connections=max_pool_connections
+        )
+    )
+
+
+class UploadResult:
+    def __init__(self, key: str, size: int, parts: int):
+        self.key = key
+        self.size = size
+        self.parts = parts
+
+
+class ObjectUploader:
+    """
+    Concurrency-capped uploader running boto3 calls off the event loop
+
+    Args:
+        client: boto3 S3 client (thread-safe, shared by all uploads)
+        bucket: Target bucket
+        max_concurrent_uploads: Uploads in flight per process
+        part_size: Multipart part size (bodies below this use a single PUT)
+        max_parts_in_flight: Parts of one upload sent concurrently
+    """
+
+    def __init__(self, client, bucket: str, max_concurrent_uploads: int = 8,
+                 part_size: int = 8 * 1024 * 1024, max_parts_in_flight: int = 4):
+        self.client = client
+        self.bucket = bucket
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_parts_in_flight = max_parts_in_flight
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_uploads * max_parts_in_flight,
+            thread_name_prefix='s3-upload'
+        )
+        self._slots = asyncio.Semaphore(max_concurrent_uploads)
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking boto3 call on the upload pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def upload_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str,
+                            metadata: Optional[Dict[str, str]] = None) -> UploadResult:
+        """Upload an async stream of byte chunks (spooled, then sent under an upload slot)"""
+        spool = tempfile.SpooledTemporaryFile(max_size=self.part_size)
+        try:
+            size = 0
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.part_size:
+                    # Past max_size the spool is on disk
+                    await self.run(spool.write, chunk)
+                else:
+                    spool.write(chunk)
+            spool.seek(0)
+
+            async with self._slots:
+                return await self._upload_spooled(key, spool, size, content_type, metadata)
+        finally:
+            spool.close()
+
+    async def _upload_spooled(self, key: str, spool, size: int, content_type: str,
+                              metadata: Optional[Dict[str, str]]) -> UploadResult:
+        if size < self.part_size:
+            await self.run(
+                self.client.put_object,
+                Bucket=self.bucket, Key=key, Body=spool.read(),
+                ContentType=content_type, Metadata=metadata or {}
+            )
+            return UploadResult(key, size, parts=1)
+
+        upload_id = await self._create_multipart(key, content_type, metadata)
+        pending: List[asyncio.Task] = []
+        try:
+            while True:
+                body = await self.run(spool.read, self.part_size)
+                if not body:
+                    break
+                pending.append(asyncio.ensure_future(
+                    self._upload_part(key, upload_id, len(pending) + 1, body)
+                ))
+
+                # Bound memory: wait for the oldest part when too many are in flight
+                in_flight = [task for task in pending if not task.done()]
+                if len(in_flight) >= self.max_parts_in_flight:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+            parts = list(await asyncio.gather(*pending))
+            await self.run(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            return UploadResult(key, size, parts=len(parts))
+
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await self._abort_multipart(key, upload_id)
+            raise
+
+    async def upload_bytes(self, key: str, body: bytes, content_type: str,
+                           metadata: Optional[Dict[str, str]] = None) -> UploadResult:
+        """Upload an in-memory body (still off the event loop and concurrency-capped)"""
+        async def single_chunk():
+            yield body
+
+        return await self.upload_stream(key, single_chunk(), content_type, metadata)
+
+    async def presigned_get_url(self, key: str, expires_in: int = 86400) -> str:
+        return await self.run(
+            self.client.generate_presigned_url,
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=expires_in
+        )
+
+    async def _create_multipart(self, key: str, content_type: str,
+                                metadata: Optional[Dict[str, str]]) -> str:
+        response = await self.run(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket, Key=key, ContentType=content_type, Metadata=metadata or {}
+        )
+        return response['UploadId']
+
+    async def _upload_part(self, key: str, upload_id: str, part_number: int, body: bytes) -> Dict:
+        response = await self.run(
+            self.client.upload_part,
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            PartNumber=part_number, Body=body
+        )
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    async def _abort_multipart(self, key: str, upload_id: str):
+        try:
+            await self.run(
+                self.client.abort_multipart_upload,
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload {upload_id} for {key}: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_uploader: Optional[ObjectUploader] = None
+
+
+def get_uploader() -> Optional[ObjectUploader]:
+    """Process-wide uploader, or None if storage is not configured"""
+    global _uploader
+    if _uploader is None:
+        max_uploads = int(os.environ.get('S3_MAX_CONCURRENT_UPLOADS', '8'))
+        parts_in_flight = int(os.environ.get('S3_MAX_PARTS_IN_FLIGHT', '4'))
+        client = create_s3_client(max_pool_connections=max_uploads * parts_in_flight)
+        if client is None:
+            return None
+        _uploader = ObjectUploader(
+            client,
+            os.environ.get('S3_BUCKET_NAME', 'workmonitor-screenshots'),
+            max_concurrent_uploads=max_uploads,
+            part_size=int(os.environ.get('S3_MULTIPART_PART_SIZE', str(8 * 1024 * 1024))),
+            max_parts_in_flight=parts_in_flight
+        )
+    return _uploader
@@ -0,0 +1,112 @@
+"""
+Pagination
+Opaque keyset cursors and streaming NDJSON/CSV exports for list endpoints
+
+Pages are ordered by (timestamp, id), newest first. The cursor encodes the
+last row's (timestamp, id), so the next page is a seek instead of an OFFSET
+and stays correct while new rows arrive. Export mode walks the same keyset
+in batches and streams rows out as they are fetched.
+"""
+import base64
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def encode_cursor(row: Dict, sort_field: str, id_field: str) -> str:
+    """Opaque cursor pointing just past row"""
+    raw = json.dumps([row[sort_field], row[id_field]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """(sort value, id) from a cursor; 400 if it was not produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(collection, query: Dict, sort_field: str, id_field: str,
+                   limit: int, cursor: Optional[str], response: Response) -> List[Dict]:
+    """
+    One page of rows; the next cursor goes in the X-Next-Cursor header
+
+    Responses stay plain lists, so existing clients keep working and simply
+    ignore the header.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = await collection.find_page(query, sort_field, id_field, after, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1], sort_field, id_field)
+    return rows
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return "" if value is None else value
+
+
+async def _ndjson_lines(rows: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+async def _csv_lines(rows: AsyncIterator[Dict], fields: Optional[Sequence[str]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = None
+    async for row in rows:
+        if writer is None:
+            # Header from the first row unless the caller fixed the columns
+            writer = csv.DictWriter(buffer, fieldnames=list(fields or row.keys()), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream_rows(rows: AsyncIterator[Dict], fmt: str, filename: str,
+                fields: Optional[Sequence[str]] = None) -> StreamingResponse:
+    """NDJSON or CSV download of an async row iterator, encoded as rows arrive"""
+    if fmt == "csv":
+        body, media_type = _csv_lines(rows, fields), "text/csv"
+    else:
+        body, media_type = _ndjson_lines(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
+def export_response(collection, query: Dict, sort_field: str, id_field: str, fmt: str,
+                    filename: str, fields: Optional[Sequence[str]] = None) -> StreamingResponse:
+    """Stream every matching row as NDJSON or CSV without materializing the result"""
+    rows = collection.iterate(query, sort_field, id_field, batch_size=EXPORT_BATCH_SIZE)
+    return stream_rows(rows, fmt, filename, fields)
+
+
+async def list_or_export(collection, query: Dict, sort_field: str, id_field: str, *,
+                         limit: int, cursor: Optional[str], fmt: Optional[str],
+                         response: Response, filename: str):
+    """Shared body of the list endpoints: a keyset page, or a streamed export"""
+    if fmt:
+        if fmt not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        return export_response(collection, query, sort_field, id_field, fmt, filename)
+    return await paginate(collection, query, sort_field, id_field, limit, cursor, response)
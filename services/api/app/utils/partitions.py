@@ -0,0 +1,66 @@
+"""
+Time Partitions
+Monthly partition upkeep for the high-volume event tables
+
+activity_logs, screenshots and gps_locations are range-partitioned by
+calendar month on their timestamp column. Partitions are created a few
+months ahead, and retention drops whole expired partitions
+(DETACH + DROP) instead of deleting rows, so expiry leaves no dead tuples
+or index bloat behind. Both run as Postgres functions; see migration
+20260107090000_partition_high_volume_tables.sql.
+
+Reads prune to the matching partitions only when they filter on the
+partition column, so queries on these tables should carry a time range.
+"""
+import os
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition column
+PARTITIONED_TABLES = {
+    "activity_logs": "timestamp",
+    "screenshots": "taken_at",
+    "gps_locations": "timestamp",
+}
+
+# Partitioned table -> (setting, default retention in days); same names as config.Settings
+RETENTION_SETTINGS = {
+    "activity_logs": ("ACTIVITY_RETENTION_DAYS", 365),
+    "screenshots": ("SCREENSHOT_RETENTION_DAYS", 90),
+    "gps_locations": ("GPS_RETENTION_DAYS", 365),
+}
+
+# Months of partitions kept ready beyond the current one
+MONTHS_AHEAD = 3
+
+
+def retention_days(table: str) -> int:
+    setting, default = RETENTION_SETTINGS[table]
+    return int(os.environ.get(setting, default))
+
+
+async def maintain_partitions(db, months_ahead: int = MONTHS_AHEAD) -> Dict[str, Dict]:
+    """
+    Create upcoming partitions and drop expired ones for every partitioned table
+
+    Returns {table: {"created": n, "dropped": [partition names]}}.
+    A failing table is logged and does not stop the others.
+    """
+    summary = {}
+    for table in PARTITIONED_TABLES:
+        try:
+            created = await db.rpc("create_monthly_partitions", {
+                "p_table": table, "p_months_ahead": months_ahead
+            })
+            dropped: List[str] = await db.rpc("drop_expired_partitions", {
+                "p_table": table, "p_retain_days": retention_days(table)
+            }) or []
+            summary[table] = {"created": created or 0, "dropped": dropped}
+            if dropped:
+                logger.info(f"Dropped expired {table} partitions: {', '.join(dropped)}")
+        except Exception as e:
+            logger.error(f"Partition maintenance failed for {table}: {e}")
+            summary[table] = {"error": str(e)}
+    return summary
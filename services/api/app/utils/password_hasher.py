@@ -0,0 +1,98 @@
+"""
+Password Hasher
+bcrypt hashing and verification off the event loop
+
+bcrypt releases the GIL while hashing, so a small thread pool gives real
+parallelism without pickling or worker processes. Admission is bounded:
+once `max_pending` operations are queued or running, new ones are refused
+with PasswordHasherBusy so callers can shed load (503) instead of queueing
+logins behind a growing backlog.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+import logging
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt executor
+
+    Args:
+        rounds: bcrypt cost factor for new hashes
+        max_workers: Hashes computed in parallel
+        max_pending: Queued + running operations before shedding
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 4, max_pending: int = 64):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {"completed": 0, "rejected": 0}
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound password function on the pool, or raise PasswordHasherBusy"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PasswordHasherBusy(f"{self._pending} password operations pending")
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._stats["completed"] += 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(self._hash_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self.run(self._verify_sync, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if hashed was made with a different cost factor than configured"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def _hash_sync(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify_sync(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        except ValueError:
+            # Missing or malformed hash (e.g. OAuth-only accounts)
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "pending": self._pending, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Global instance shared by all password operations in this process
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 4))),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+)
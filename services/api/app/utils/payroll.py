@@ -0,0 +1,56 @@
+"""
+Payroll
+Build payroll entries from approved timesheets
+
+Used by POST /payroll/generate and by the weekly payroll worker task.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List
+import uuid
+
+
+async def generate_payroll_entries(db, company_id: str, period_start: str, period_end: str) -> List[Dict]:
+    """Create one pending payroll entry per user with approved hours in the period"""
+    # Get all approved timesheets in period
+    timesheets = await db.timesheets.find({
+        "company_id": company_id,
+        "status": "approved",
+        "week_start": {"$gte": period_start, "$lte": period_end}
+    }, {"_id": 0})
+
+    # Group by user
+    user_hours = {}
+    for ts in timesheets:
+        uid = ts["user_id"]
+        if uid not in user_hours:
+            user_hours[uid] = {"hours": 0, "name": ts.get("user_name", "")}
+        user_hours[uid]["hours"] += ts.get("total_hours", 0)
+
+    if not user_hours:
+        return []
+
+    # Rates for every user in one query
+    users = await db.users.find({"user_id": {"$in": list(user_hours)}}, {"_id": 0, "password_hash": 0})
+    rates = {u["user_id"]: u.get("hourly_rate", 0) or 0 for u in users}
+
+    # Generate payroll entries
+    payroll_entries = []
+    for uid, data in user_hours.items():
+        rate = rates.get(uid, 0)
+        payroll_entries.append({
+            "payroll_id": f"payroll_{uuid.uuid4().hex[:12]}",
+            "user_id": uid,
+            "user_name": data["name"],
+            "company_id": company_id,
+            "period_start": period_start,
+            "period_end": period_end,
+            "period": f"{period_start[:7]}",
+            "hours": round(data["hours"], 2),
+            "rate": rate,
+            "amount": round(data["hours"] * rate, 2),
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    await db.payroll.insert_many(payroll_entries)
+    return payroll_entries
@@ -0,0 +1,487 @@
+"""
+PDF Rendering
+Invoice and timesheet documents (reportlab)
+
+Shared by the /pdf download endpoints, which render in a process pool
+(reportlab is CPU-bound and would otherwise block the event loop), and the
+PDF jobs, which render on the interactive worker queue.
+
+Paragraph and table styles are compiled once per company branding
+(white-label colors) and reused; bulk exports stream a zip of one document
+per timesheet or invoice, rendering a few ahead of the writer, so only
+those are ever held in memory.
+"""
+from pydantic import BaseModel
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from io import BytesIO, RawIOBase
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+import asyncio
+import base64
+import multiprocessing
+import os
+import re
+import zipfile
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class InvoiceItem(BaseModel):
+    description: str
+    quantity: float
+    unit_price: float
+    total: float
+
+class InvoicePDFRequest(BaseModel):
+    invoice_number: str
+    invoice_date: str
+    due_date: str
+    company_name: str
+    company_address: Optional[str] = ""
+    company_email: Optional[str] = ""
+    client_name: str
+    client_address: Optional[str] = ""
+    client_email: Optional[str] = ""
+    items: List[InvoiceItem]
+    subtotal: float
+    tax_rate: float
+    tax_amount: float
+    total: float
+    notes: Optional[str] = ""
+    currency: str = "USD"
+    company_id: Optional[str] = None  # Selects the company's white-label branding
+
+class TimesheetPDFRequest(BaseModel):
+    user_name: str
+    week_start: str
+    week_end: str
+    entries: List[dict]  # [{date, project, hours, description}]
+    total_hours: float
+    company_name: str
+    company_id: Optional[str] = None  # Selects the company's white-label branding
+
+INVOICE = "invoice"
+TIMESHEET = "timesheet"
+
+_HEX_COLOR = re.compile(r"^#[0-9a-fA-F]{6}$")
+
+@dataclass(frozen=True)
+class Branding:
+    """The parts of a company's white-label settings that affect documents"""
+    primary_color: str = "#10b981"
+    text_color: str = "#27272a"
+    hide_powered_by: bool = False
+
+    @classmethod
+    def from_settings(cls, settings: Optional[dict]) -> "Branding":
+        if not settings:
+            return DEFAULT_BRANDING
+        color = lambda key, default: settings.get(key) if _HEX_COLOR.match(settings.get(key) or "") else default
+        return cls(
+            primary_color=color("primary_color", cls.primary_color),
+            text_color=color("text_color", cls.text_color),
+            hide_powered_by=bool(settings.get("hide_powered_by"))
+        )
+
+DEFAULT_BRANDING = Branding()
+
+async def load_branding(db, company_id: Optional[str]) -> Branding:
+    """Branding for a company's documents (defaults when it has none)"""
+    if not company_id:
+        return DEFAULT_BRANDING
+    settings = await db.branding_settings.find_one({"company_id": company_id}, {"_id": 0})
+    return Branding.from_settings(settings)
+
+class Theme:
+    """Compiled styles for one branding; build via compiled_theme()"""
+
+    def __init__(self, branding: Branding):
+        styles = getSampleStyleSheet()
+        primary = colors.HexColor(branding.primary_color)
+        text = colors.HexColor(branding.text_color)
+        self.branding = branding
+        self.primary = primary
+
+        self.invoice_title = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=28, textColor=primary, spaceAfter=20)
+        self.invoice_heading = ParagraphStyle('Heading', parent=styles['Heading2'], fontSize=12,
+                                              textColor=colors.HexColor('#71717a'), spaceAfter=5)
+        self.invoice_normal = ParagraphStyle('Normal', parent=styles['Normal'], fontSize=10, textColor=text)
+        self.footer = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=9,
+                                     textColor=colors.HexColor('#a1a1aa'), alignment=TA_CENTER)
+        self.timesheet_title = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=24, textColor=primary)
+        self.timesheet_heading = ParagraphStyle('Heading', parent=styles['Heading2'], fontSize=12,
+                                                textColor=colors.HexColor('#71717a'))
+        self.timesheet_normal = ParagraphStyle('Normal', parent=styles['Normal'], fontSize=10)
+
+        self.header_table = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        # Alternating row backgrounds depend on the row count and are added per document
+        self.items_table_commands = [
+            # Header
+            ('BACKGROUND', (0, 0), (-1, 0), primary),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('TOPPADDING', (0, 0), (-1, 0), 12),
+            # Body
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            # Grid
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e4e4e7')),
+            ('LINEBELOW', (0, 0), (-1, 0), 2, primary),
+        ]
+        self.totals_table = TableStyle([
+            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (2, -1), (-1, -1), 12),
+            ('TEXTCOLOR', (2, -1), (-1, -1), primary),
+            ('LINEABOVE', (2, -1), (-1, -1), 2, primary),
+            ('TOPPADDING', (0, -1), (-1, -1), 10),
+        ])
+        self.info_table = TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ])
+        self.entries_table = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), primary),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e4e4e7')),
+            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+        ])
+
+@lru_cache(maxsize=256)
+def compiled_theme(branding: Branding = DEFAULT_BRANDING) -> Theme:
+    """Theme for a branding, compiled on first use (per process)"""
+    return Theme(branding)
+
+def _document(buffer: BytesIO) -> SimpleDocTemplate:
+    return SimpleDocTemplate(buffer, pagesize=letter, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
+
+def generate_invoice_pdf(data: InvoicePDFRequest, branding: Branding = DEFAULT_BRANDING) -> bytes:
+    """Generate a professional invoice PDF"""
+    buffer = BytesIO()
+    doc = _document(buffer)
+    theme = compiled_theme(branding)
+    normal_style = theme.invoice_normal
+    heading_style = theme.invoice_heading
+
+    elements = []
+
+    # Header
+    elements.append(Paragraph("INVOICE", theme.invoice_title))
+    elements.append(Spacer(1, 10))
+
+    # Invoice details and Company info side by side
+    header_data = [
+        [
+            Paragraph(f"<b>{data.company_name}</b>", normal_style),
+            Paragraph(f"<b>Invoice #:</b> {data.invoice_number}", normal_style)
+        ],
+        [
+            Paragraph(data.company_address.replace('\n', '<br/>'), normal_style) if data.company_address else "",
+            Paragraph(f"<b>Date:</b> {data.invoice_date}", normal_style)
+        ],
+        [
+            Paragraph(data.company_email, normal_style) if data.company_email else "",
+            Paragraph(f"<b>Due Date:</b> {data.due_date}", normal_style)
+        ]
+    ]
+
+    header_table = Table(header_data, colWidths=[3.5*inch, 3*inch])
+    header_table.setStyle(theme.header_table)
+    elements.append(header_table)
+    elements.append(Spacer(1, 30))
+
+    # Bill To
+    elements.append(Paragraph("BILL TO", heading_style))
+    elements.append(Paragraph(f"<b>{data.client_name}</b>", normal_style))
+    if data.client_address:
+        elements.append(Paragraph(data.client_address.replace('\n', '<br/>'), normal_style))
+    if data.client_email:
+        elements.append(Paragraph(data.client_email, normal_style))
+    elements.append(Spacer(1, 20))
+
+    # Items table
+    currency_symbol = "$" if data.currency == "USD" else data.currency
+
+    items_data = [['Description', 'Qty', 'Unit Price', 'Total']]
+    for item in data.items:
+        items_data.append([
+            item.description,
+            f"{item.quantity:.2f}",
+            f"{currency_symbol}{item.unit_price:.2f}",
+            f"{currency_symbol}{item.total:.2f}"
+        ])
+
+    items_table = Table(items_data, colWidths=[3.5*inch, 1*inch, 1.25*inch, 1.25*inch])
+    items_table.setStyle(TableStyle([
+        *theme.items_table_commands,
+        # Alternating rows
+        *[('BACKGROUND', (0, i), (-1, i), colors.HexColor('#fafafa')) for i in range(2, len(items_data), 2)]
+    ]))
+    elements.append(items_table)
+    elements.append(Spacer(1, 20))
+
+    # Totals
+    totals_data = [
+        ['', '', 'Subtotal:', f"{currency_symbol}{data.subtotal:.2f}"],
+        ['', '', f"Tax ({data.tax_rate}%):", f"{currency_symbol}{data.tax_amount:.2f}"],
+        ['', '', 'TOTAL:', f"{currency_symbol}{data.total:.2f}"]
+    ]
+
+    totals_table = Table(totals_data, colWidths=[3.5*inch, 1*inch, 1.25*inch, 1.25*inch])
+    totals_table.setStyle(theme.totals_table)
+    elements.append(totals_table)
+
+    # Notes
+    if data.notes:
+        elements.append(Spacer(1, 30))
+        elements.append(Paragraph("NOTES", heading_style))
+        elements.append(Paragraph(data.notes, normal_style))
+
+    # Footer
+    elements.append(Spacer(1, 40))
+    elements.append(Paragraph("Thank you for your business!", theme.footer))
+    if not branding.hide_powered_by:
+        elements.append(Paragraph(f"Generated by Working Tracker • {datetime.now().strftime('%Y-%m-%d %H:%M')}", theme.footer))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+def generate_timesheet_pdf(data: TimesheetPDFRequest, branding: Branding = DEFAULT_BRANDING) -> bytes:
+    """Generate a timesheet PDF"""
+    buffer = BytesIO()
+    doc = _document(buffer)
+    theme = compiled_theme(branding)
+    normal_style = theme.timesheet_normal
+
+    elements = []
+
+    # Header
+    elements.append(Paragraph("TIMESHEET", theme.timesheet_title))
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(f"<b>{data.company_name}</b>", normal_style))
+    elements.append(Spacer(1, 20))
+
+    # Employee info
+    info_data = [
+        ['Employee:', data.user_name],
+        ['Period:', f"{data.week_start} to {data.week_end}"],
+        ['Total Hours:', f"{data.total_hours:.2f}"]
+    ]
+    info_table = Table(info_data, colWidths=[1.5*inch, 4*inch])
+    info_table.setStyle(theme.info_table)
+    elements.append(info_table)
+    elements.append(Spacer(1, 20))
+
+    # Time entries
+    entries_data = [['Date', 'Project', 'Hours', 'Description']]
+    for entry in data.entries:
+        entries_data.append([
+            entry.get('date', ''),
+            entry.get('project', '-'),
+            f"{entry.get('hours', 0):.2f}",
+            entry.get('description', '')[:50]
+        ])
+
+    entries_table = Table(entries_data, colWidths=[1.25*inch, 1.5*inch, 0.75*inch, 3*inch])
+    entries_table.setStyle(theme.entries_table)
+    elements.append(entries_table)
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+def invoice_filename(data: InvoicePDFRequest) -> str:
+    return f"invoice_{data.invoice_number}.pdf"
+
+def timesheet_filename(data: TimesheetPDFRequest) -> str:
+    return f"timesheet_{data.user_name}_{data.week_start}.pdf"
+
+def encode_pdf(pdf_bytes: bytes, filename: str) -> dict:
+    """JSON payload for a rendered PDF"""
+    return {
+        "pdf_base64": base64.b64encode(pdf_bytes).decode('utf-8'),
+        "filename": filename,
+        "size_bytes": len(pdf_bytes)
+    }
+
+def render_document(kind: str, payload: dict, branding: Branding = DEFAULT_BRANDING) -> bytes:
+    """Render from plain data; the process-pool entry point"""
+    if kind == INVOICE:
+        return generate_invoice_pdf(InvoicePDFRequest(**payload), branding)
+    if kind == TIMESHEET:
+        return generate_timesheet_pdf(TimesheetPDFRequest(**payload), branding)
+    raise ValueError(f"Unknown document kind: {kind}")
+
+class PdfRenderPool:
+    """
+    Renders documents in worker processes
+
+    Args:
+        workers: Process count; 0 renders in a thread of this process
+            instead (tests, single-core hosts)
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs threads can deadlock
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def render(self, kind: str, payload: dict, branding: Branding = DEFAULT_BRANDING) -> bytes:
+        if self.workers <= 0:
+            return await asyncio.to_thread(render_document, kind, payload, branding)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), render_document, kind, payload, branding)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+class _ZipSink(RawIOBase):
+    """Unseekable sink for ZipFile whose output is drained chunk by chunk"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def iter_pdf_zip(documents: AsyncIterator[Tuple[str, str, dict]], pool: PdfRenderPool,
+                       branding: Branding = DEFAULT_BRANDING, window: int = 4) -> AsyncIterator[bytes]:
+    """
+    Stream a zip of rendered documents
+
+    documents yields (filename, kind, payload). Up to `window` documents
+    render concurrently ahead of the writer; each is written and released
+    before more are read, so memory stays bounded for any period.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    pending: deque = deque()
+    names: Dict[str, int] = {}
+
+    def unique(filename: str) -> str:
+        count = names.get(filename, 0)
+        names[filename] = count + 1
+        if not count:
+            return filename
+        stem, dot, extension = filename.rpartition(".")
+        return f"{stem}_{count + 1}{dot}{extension}"
+
+    try:
+        async for filename, kind, payload in documents:
+            pending.append((unique(filename), asyncio.ensure_future(pool.render(kind, payload, branding))))
+            if len(pending) >= window:
+                name, rendering = pending.popleft()
+                archive.writestr(name, await rendering)
+                yield sink.drain()
+        while pending:
+            name, rendering = pending.popleft()
+            archive.writestr(name, await rendering)
+            yield sink.drain()
+        archive.close()
+        yield sink.drain()
+    finally:
+        for _, rendering in pending:
+            rendering.cancel()
+
+async def timesheet_documents(db, company_id: str, start_date: str, end_date: str,
+                              company_name: str) -> AsyncIterator[Tuple[str, str, dict]]:
+    """Every timesheet of a company whose week starts in the period"""
+    names: Dict[str, str] = {}
+    query = {"company_id": company_id, "week_start": {"$gte": start_date, "$lte": end_date}}
+    async for row in db.timesheets.iterate(query, "week_start", "timesheet_id", batch_size=200, descending=False):
+        user_id = row.get("user_id")
+        if user_id not in names:
+            user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+            names[user_id] = (user or {}).get("name") or user_id
+        payload = {
+            "user_name": names[user_id],
+            "week_start": str(row.get("week_start") or ""),
+            "week_end": str(row.get("week_end") or ""),
+            "entries": [_timesheet_line(entry) for entry in row.get("entries") or [] if isinstance(entry, dict)],
+            "total_hours": float(row.get("total_hours") or 0),
+            "company_name": company_name,
+            "company_id": company_id
+        }
+        try:
+            filename = timesheet_filename(TimesheetPDFRequest(**payload))
+        except ValueError as e:
+            logger.warning(f"Skipping timesheet {row.get('timesheet_id')} in bulk export: {e}")
+            continue
+        yield filename, TIMESHEET, payload
+
+def _timesheet_line(entry: dict) -> dict:
+    """Stored timesheet entries may only carry entry_id and duration (seconds)"""
+    return {
+        "date": entry.get("date", ""),
+        "project": entry.get("project", "-"),
+        "hours": entry.get("hours", (entry.get("duration") or 0) / 3600),
+        "description": entry.get("description") or entry.get("entry_id", "")
+    }
+
+async def invoice_documents(db, company: dict, start_date: str,
+                            end_date: str) -> AsyncIterator[Tuple[str, str, dict]]:
+    """Every invoice of a company issued in the period"""
+    query = {"company_id": company["company_id"], "issue_date": {"$gte": start_date, "$lte": end_date}}
+    async for row in db.invoices.iterate(query, "issue_date", "invoice_id", batch_size=200, descending=False):
+        subtotal = float(row.get("subtotal") or 0)
+        tax = float(row.get("tax") or 0)
+        payload = {
+            "invoice_number": row["invoice_number"],
+            "invoice_date": str(row.get("issue_date") or ""),
+            "due_date": str(row.get("due_date") or ""),
+            "company_name": company.get("name", ""),
+            "client_name": row.get("client_name", ""),
+            "client_email": row.get("client_email") or "",
+            "items": row.get("items") or [],
+            "subtotal": subtotal,
+            "tax_rate": round(tax / subtotal * 100, 2) if subtotal else 0,
+            "tax_amount": tax,
+            "total": float(row.get("total") or 0),
+            "notes": row.get("notes") or "",
+            "company_id": company["company_id"]
+        }
+        try:
+            filename = invoice_filename(InvoicePDFRequest(**payload))
+        except ValueError as e:
+            logger.warning(f"Skipping invoice {row.get('invoice_id')} in bulk export: {e}")
+            continue
+        yield filename, INVOICE, payload
+
+# Global instance (PDF_RENDER_WORKERS=0 renders in a thread)
+pdf_pool = PdfRenderPool(int(os.environ.get('PDF_RENDER_WORKERS', str(min(2, os.cpu_count() or 1)))))
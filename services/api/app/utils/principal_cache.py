@@ -0,0 +1,84 @@
+"""
+Principal Cache
+Short-lived cache of authenticated users for get_current_user
+
+Two levels, both with a short TTL:
+- sessions: sha256(OAuth session token) -> (user_id, session expiry)
+- users: user_id -> user document
+
+JWTs are decoded locally and go straight to the users level. Concurrent
+misses for the same key share one database fetch. Role changes and logout
+invalidate explicitly; the TTL bounds staleness on other worker processes.
+"""
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+from monitoring.metrics import auth_principal_cache_requests_total
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    """Cache key for a session token (raw tokens are never kept as keys)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    """
+    Cache of authenticated principals
+
+    Args:
+        user_ttl: Seconds a user document is served from cache
+        session_ttl: Seconds an OAuth session lookup is served from cache
+        max_entries: Upper bound per level (least recently used evicted)
+    """
+
+    def __init__(self, user_ttl: float = 30, session_ttl: float = 60, max_entries: int = 10000):
+        self.users = TTLCache('user', user_ttl, max_entries, metric=auth_principal_cache_requests_total)
+        self.sessions = TTLCache('session', session_ttl, max_entries, metric=auth_principal_cache_requests_total)
+
+    async def get_user(self, user_id: str, loader: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """User document by id (a copy, so callers may mutate it)"""
+        user = await self.users.get_or_load(user_id, loader)
+        return dict(user) if user is not None else None
+
+    async def get_session(self, session_token: str,
+                          loader: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """
+        OAuth session for a token, as {"user_id", "expires_at"}
+
+        Expiry is checked by the caller on every request, so a cached
+        session never outlives its expires_at.
+        """
+        async def load_session():
+            session = await loader()
+            if not session:
+                return None
+            return {"user_id": session["user_id"], "expires_at": session.get("expires_at")}
+
+        return await self.sessions.get_or_load(hash_token(session_token), load_session)
+
+    def invalidate_user(self, user_id: str):
+        """Call after changing a user's role, company or status"""
+        self.users.invalidate(user_id)
+
+    def invalidate_session(self, session_token: str):
+        """Call on logout"""
+        self.sessions.invalidate(hash_token(session_token))
+
+    def clear(self):
+        self.users.clear()
+        self.sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'users': self.users.stats(), 'sessions': self.sessions.stats()}
+
+
+# Global instance used by server.get_current_user (TTL 0 disables caching)
+principal_cache = PrincipalCache(
+    user_ttl=float(os.environ.get('PRINCIPAL_CACHE_USER_TTL', '30')),
+    session_ttl=float(os.environ.get('PRINCIPAL_CACHE_SESSION_TTL', '60'))
+)
@@ -0,0 +1,217 @@
+"""
+Productivity Analysis
+Metrics and LLM insights for the AI productivity analysis job
+
+Runs on the interactive worker queue; the /ai/analyze-productivity
+endpoint only enqueues it.
+"""
+from fastapi import HTTPException
+from typing import Optional
+import os
+from datetime import datetime, timezone, timedelta
+import json
+
+# Import LLM chat from emergentintegrations
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+async def get_llm_chat() -> LlmChat:
+    """Initialize LLM chat with OpenAI GPT-5.2"""
+    api_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not api_key:
+        raise HTTPException(status_code=500, detail="LLM API key not configured")
+    
+    return LlmChat(
+        api_key=api_key,
+        session_id=f"productivity-analysis-{datetime.now().timestamp()}",
+        system_message="""You are an AI productivity analyst for an employee monitoring system. 
+        Your role is to analyze employee activity data and provide actionable insights about:
+        - Work patterns and productivity trends
+        - Time allocation and efficiency
+        - Potential areas for improvement
+        - Team performance comparisons
+        - Anomaly detection (unusual patterns, potential burnout, etc.)
+        
+        Always be constructive and helpful in your analysis. Focus on actionable recommendations.
+        Respond with structured JSON when requested."""
+    ).with_model("openai", "gpt-5.2")
+
+def calculate_productivity_metrics(time_entries: list, activity_logs: list, screenshots: list) -> dict:
+    """Calculate productivity metrics from raw data"""
+    total_tracked_hours = sum(e.get("duration", 0) for e in time_entries) / 3600
+    total_idle_time = sum(e.get("idle_time", 0) for e in time_entries) / 3600
+    active_hours = total_tracked_hours - total_idle_time
+    
+    # Calculate activity level
+    if activity_logs:
+        avg_activity = sum(a.get("activity_level", 0) for a in activity_logs) / len(activity_logs)
+    else:
+        avg_activity = 0
+    
+    # App usage breakdown
+    app_usage = {}
+    for log in activity_logs:
+        app = log.get("app_name", "Unknown")
+        if app not in app_usage:
+            app_usage[app] = 0
+        app_usage[app] += 1
+    
+    # Sort by usage
+    sorted_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:10]
+    
+    # Calculate productivity score (0-100)
+    if total_tracked_hours > 0:
+        productivity_score = min(100, (active_hours / total_tracked_hours) * 100 * (avg_activity / 100 + 0.5))
+    else:
+        productivity_score = 0
+    
+    return {
+        "total_tracked_hours": round(total_tracked_hours, 2),
+        "active_hours": round(active_hours, 2),
+        "idle_hours": round(total_idle_time, 2),
+        "average_activity_level": round(avg_activity, 1),
+        "productivity_score": round(productivity_score, 1),
+        "top_apps": dict(sorted_apps),
+        "screenshot_count": len(screenshots),
+        "entries_count": len(time_entries)
+    }
+
+async def run_productivity_analysis(
+    db,
+    user_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    analysis_type: str = "general"
+) -> dict:
+    """Analyze productivity data using AI"""
+    # Build date query
+    date_query = {}
+    if start_date:
+        date_query["$gte"] = start_date
+    if end_date:
+        if "$gte" in date_query:
+            date_query["$lte"] = end_date
+        else:
+            date_query["$lte"] = end_date
+    
+    # Default to last 30 days if no dates provided
+    if not date_query:
+        period_end = datetime.now(timezone.utc)
+        period_start = period_end - timedelta(days=30)
+        date_query = {
+            "$gte": period_start.isoformat(),
+            "$lte": period_end.isoformat()
+        }
+    
+    # Build user query based on analysis type and user_id
+    time_query = {"start_time": date_query}
+    activity_query = {"timestamp": date_query}
+    screenshot_query = {"taken_at": date_query}
+    
+    if user_id:
+        time_query["user_id"] = user_id
+        activity_query["user_id"] = user_id
+        screenshot_query["user_id"] = user_id
+    
+    # Fetch data
+    time_entries = await db.time_entries.find(time_query, {"_id": 0}, limit=10000)
+    activity_logs = await db.activity_logs.find(activity_query, {"_id": 0}, limit=10000)
+    screenshots = await db.screenshots.find(screenshot_query, {"_id": 0}, limit=1000)
+    
+    # Calculate metrics
+    metrics = calculate_productivity_metrics(time_entries, activity_logs, screenshots)
+    
+    # Get user info for context
+    users_info = []
+    if user_id:
+        user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0})
+        if user:
+            users_info.append({"name": user.get("name"), "role": user.get("role")})
+    
+    # Prepare data summary for AI analysis
+    data_summary = {
+        "period": {
+            "start": start_date or date_query.get("$gte"),
+            "end": end_date or date_query.get("$lte")
+        },
+        "metrics": metrics,
+        "users_analyzed": len(users_info) if users_info else "all team members",
+        "analysis_type": analysis_type
+    }
+    
+    # Generate AI insights
+    try:
+        llm_chat = await get_llm_chat()
+        
+        prompt = f"""Analyze this employee productivity data and provide insights:
+
+Data Summary:
+{json.dumps(data_summary, indent=2)}
+
+Please provide a comprehensive analysis including:
+1. Overall productivity assessment
+2. Key observations and patterns
+3. Areas of concern (if any)
+4. Specific recommendations for improvement
+5. Positive highlights
+
+Respond in JSON format with the following structure:
+{{
+    "overall_score": <number 0-100>,
+    "assessment": "<brief overall assessment>",
+    "key_observations": ["<observation1>", "<observation2>", ...],
+    "concerns": ["<concern1>", "<concern2>", ...],
+    "recommendations": ["<rec1>", "<rec2>", ...],
+    "highlights": ["<highlight1>", "<highlight2>", ...],
+    "trend_analysis": "<analysis of trends if applicable>",
+    "burnout_risk": "<low/medium/high with explanation>"
+}}"""
+
+        response = await llm_chat.send_message(UserMessage(text=prompt))
+        
+        # Try to parse JSON from response
+        try:
+            # Find JSON in response
+            response_text = response
+            if "```json" in response_text:
+                response_text = response_text.split("```json")[1].split("```")[0]
+            elif "```" in response_text:
+                response_text = response_text.split("```")[1].split("```")[0]
+            
+            ai_insights = json.loads(response_text.strip())
+        except json.JSONDecodeError:
+            ai_insights = {
+                "overall_score": metrics["productivity_score"],
+                "assessment": response,
+                "key_observations": [],
+                "concerns": [],
+                "recommendations": [],
+                "highlights": [],
+                "trend_analysis": "Unable to parse detailed analysis",
+                "burnout_risk": "unknown"
+            }
+        
+        return {
+            "success": True,
+            "metrics": metrics,
+            "ai_insights": ai_insights,
+            "data_summary": data_summary
+        }
+        
+    except Exception as e:
+        # Return metrics even if AI fails
+        return {
+            "success": False,
+            "metrics": metrics,
+            "ai_insights": {
+                "overall_score": metrics["productivity_score"],
+                "assessment": f"AI analysis unavailable: {str(e)}",
+                "key_observations": [],
+                "concerns": [],
+                "recommendations": [],
+                "highlights": [],
+                "trend_analysis": "Not available",
+                "burnout_risk": "unknown"
+            },
+            "data_summary": data_summary,
+            "error": str(e)
+        }
@@ -0,0 +1,187 @@
+"""
+Query Cache
+Tenant-scoped read-through cache for analytics and dashboard results
+
+Results are cached per endpoint, keyed by tenant and normalized parameters,
+in an in-process LRU tier (single-flight, so a burst of identical requests
+computes once) and optionally in Redis, which shares results between API
+workers.
+
+Invalidation is by version rather than by key: every (tenant, source
+table) pair has a counter that is part of the cache key, and writes to
+`time_entries`, `activity_logs` or `productivity_scores` bump it. Entries
+computed from the old data are then simply never looked up again and age
+out of the LRU / Redis TTL. With Redis configured the counters live there
+too, so a write on one worker invalidates every worker; without it other
+workers see the write once their entry expires (QUERY_CACHE_TTL).
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from monitoring.metrics import analytics_cache_requests_total, analytics_cache_result_age_seconds
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes invalidate analytics results
+ANALYTICS_SOURCES = ("time_entries", "activity_logs", "productivity_scores")
+
+# Tenant for endpoints that are not company-scoped; bumped by every write
+GLOBAL_TENANT = "*"
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Order-independent digest of endpoint parameters (None values dropped)"""
+    canonical = json.dumps(
+        {key: value for key, value in params.items() if value is not None},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class RedisTier:
+    """
+    Shared result and version store
+
+    Errors are logged and treated as misses, so a Redis outage degrades to
+    the in-process tier instead of failing requests.
+    """
+
+    def __init__(self, url: str, prefix: str = "qc"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    def _redis(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    async def get(self, key: str) -> Optional[Dict]:
+        try:
+            raw = await self._redis().get(f"{self.prefix}:r:{key}")
+            return json.loads(raw) if raw is not None else None
+        except Exception as e:
+            logger.warning(f"Query cache Redis get failed: {e}")
+            return None
+
+    async def set(self, key: str, entry: Dict, ttl: float):
+        try:
+            await self._redis().set(f"{self.prefix}:r:{key}", json.dumps(entry, default=str), ex=max(1, int(ttl)))
+        except Exception as e:
+            logger.warning(f"Query cache Redis set failed: {e}")
+
+    async def versions(self, names: List[str]) -> Optional[List[int]]:
+        try:
+            values = await self._redis().mget([f"{self.prefix}:v:{name}" for name in names])
+            return [int(value or 0) for value in values]
+        except Exception as e:
+            logger.warning(f"Query cache Redis version read failed: {e}")
+            return None
+
+    async def bump(self, names: List[str]):
+        try:
+            pipe = self._redis().pipeline()
+            for name in names:
+                pipe.incr(f"{self.prefix}:v:{name}")
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Query cache Redis invalidation failed: {e}")
+
+
+class QueryCache:
+    """
+    Read-through cache for analytics endpoints
+
+    Args:
+        ttl: Seconds a result is served (bounds staleness for sources
+            that do not send invalidation events, e.g. users or leaves)
+        max_entries: Results kept in process per endpoint (LRU)
+        remote: Optional RedisTier shared by all workers
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 2000, remote: Optional[RedisTier] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.remote = remote
+        self._tiers: Dict[str, TTLCache] = {}
+        self._versions: Dict[str, int] = {}
+
+    def _tier(self, endpoint: str) -> TTLCache:
+        tier = self._tiers.get(endpoint)
+        if tier is None:
+            tier = self._tiers[endpoint] = TTLCache(
+                endpoint, self.ttl, self.max_entries, metric=analytics_cache_requests_total
+            )
+        return tier
+
+    async def _current_versions(self, tenant: str, depends_on: Iterable[str]) -> str:
+        names = [f"{tenant}:{table}" for table in depends_on]
+        if self.remote is not None:
+            versions = await self.remote.versions(names)
+            if versions is not None:
+                return ".".join(map(str, versions))
+        return ".".join(str(self._versions.get(name, 0)) for name in names)
+
+    async def get_or_compute(self, endpoint: str, company_id: Optional[str], params: Dict[str, Any],
+                             compute: Callable[[], Awaitable[Any]],
+                             depends_on: Tuple[str, ...] = ANALYTICS_SOURCES) -> Any:
+        """
+        Cached result of compute() for this endpoint, tenant and parameters
+
+        depends_on lists the source tables whose invalidation events should
+        discard the result.
+        """
+        tenant = company_id or GLOBAL_TENANT
+        versions = await self._current_versions(tenant, depends_on)
+        key = f"{tenant}:{versions}:{normalize_params(params)}"
+
+        async def load():
+            if self.remote is not None:
+                entry = await self.remote.get(f"{endpoint}:{key}")
+                if entry is not None:
+                    analytics_cache_requests_total.labels(cache=endpoint, result='remote_hit').inc()
+                    return entry
+            entry = {"computed_at": time.time(), "value": await compute()}
+            if self.remote is not None:
+                await self.remote.set(f"{endpoint}:{key}", entry, self.ttl)
+            return entry
+
+        entry = await self._tier(endpoint).get_or_load(key, load)
+        analytics_cache_result_age_seconds.labels(cache=endpoint).observe(
+            max(0.0, time.time() - entry["computed_at"])
+        )
+        return entry["value"]
+
+    async def invalidate(self, company_id: Optional[str], table: str):
+        """Call after writing rows of a source table for a company"""
+        names = [f"{company_id}:{table}", f"{GLOBAL_TENANT}:{table}"] if company_id else [f"{GLOBAL_TENANT}:{table}"]
+        for name in names:
+            self._versions[name] = self._versions.get(name, 0) + 1
+        if self.remote is not None:
+            await self.remote.bump(names)
+
+    def clear(self):
+        for tier in self._tiers.values():
+            tier.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {endpoint: tier.stats() for endpoint, tier in self._tiers.items()}
+
+
+def _create_query_cache() -> QueryCache:
+    redis_url = os.environ.get('QUERY_CACHE_REDIS_URL')
+    return QueryCache(
+        ttl=float(os.environ.get('QUERY_CACHE_TTL', '60')),
+        max_entries=int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', '2000')),
+        remote=RedisTier(redis_url) if redis_url else None
+    )
+
+
+# Global instance
+query_cache = _create_query_cache()
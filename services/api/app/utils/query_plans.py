@@ -0,0 +1,136 @@
+"""
+Query Plans
+Render captured adapter queries as SQL and check their plans for index use
+
+The adapter records each query it sends when QUERY_CAPTURE_FILE is set
+(see db_adapter.QueryRecorder). Queries are grouped by shape (table,
+filtered columns and operators, sort); each shape is rendered back to the
+SELECT PostgREST would run and EXPLAINed with sequential scans disabled,
+so a Seq Scan that remains means no index can serve the filter at all.
+Updates, deletes and counts are checked as the SELECT of their filter.
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+OPERATORS = {"$gte": ">=", "$lte": "<=", "$gt": ">", "$lt": "<", "$ne": "<>"}
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _ident(name: str) -> str:
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Unexpected identifier in captured query: {name!r}")
+    return f'"{name}"'
+
+
+def query_shape(entry: Dict) -> str:
+    """Value-free description of a captured query, e.g. `time_entries find company_id=,start_time>= order start_time-`"""
+    filters = []
+    for column, value in sorted(entry["query"].items()):
+        if isinstance(value, dict):
+            filters.extend(f"{column}{'in' if op == '$in' else OPERATORS.get(op, op)}" for op in sorted(value))
+        else:
+            filters.append(f"{column}=")
+    shape = f"{entry['table']} {entry['operation']} {','.join(filters) or '*'}"
+    if entry.get("sort"):
+        shape += " order " + ",".join(f"{field}{'-' if direction == -1 else '+'}" for field, direction in entry["sort"])
+    if entry.get("after"):
+        shape += " after"
+    return shape
+
+
+def group_shapes(entries: Iterable[Dict]) -> List[Tuple[str, int, Dict]]:
+    """[(shape, calls, first sample)], most frequent first"""
+    grouped: Dict[str, List] = {}
+    for entry in entries:
+        shape = query_shape(entry)
+        if shape in grouped:
+            grouped[shape][0] += 1
+        else:
+            grouped[shape] = [1, entry]
+    return sorted(((shape, calls, sample) for shape, (calls, sample) in grouped.items()),
+                  key=lambda item: -item[1])
+
+
+def render_sql(entry: Dict) -> Tuple[str, List[Any]]:
+    """SELECT equivalent of a captured query, with %s placeholders for psycopg2"""
+    conditions, params = [], []
+    for column, value in entry["query"].items():
+        if isinstance(value, dict):
+            for op, op_value in value.items():
+                if op == "$in":
+                    conditions.append(f"{_ident(column)} = ANY(%s)")
+                elif op in OPERATORS:
+                    conditions.append(f"{_ident(column)} {OPERATORS[op]} %s")
+                else:
+                    continue
+                params.append(op_value)
+        else:
+            conditions.append(f"{_ident(column)} = %s")
+            params.append(value)
+
+    sort = entry.get("sort") or []
+    if entry.get("after") and len(sort) == 2:
+        # Keyset continuation (find_page past a previous page)
+        (sort_field, direction), (id_field, _) = sort
+        value, row_id = entry["after"]
+        op = "<" if direction == -1 else ">"
+        conditions.append(f"({_ident(sort_field)} {op} %s OR ({_ident(sort_field)} = %s AND {_ident(id_field)} {op} %s))")
+        params.extend([value, value, row_id])
+
+    columns = "count(*)" if entry["operation"] == "count" else "*"
+    sql = f"SELECT {columns} FROM public.{_ident(entry['table'])}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if sort and entry["operation"] in ("find", "find_one", "find_page"):
+        sql += " ORDER BY " + ", ".join(
+            f"{_ident(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in sort
+        )
+    if entry.get("limit"):
+        sql += f" LIMIT {int(entry['limit'])}"
+    return sql, params
+
+
+def _walk(node: Dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def plan_findings(plan: Dict) -> List[str]:
+    """
+    Problems in an EXPLAIN (FORMAT JSON) plan, empty if fully index-served
+
+    - seq scan: no index matches the filter
+    - sort: rows are sorted after the scan instead of read in index order
+    - filter: an index narrows the scan but other predicates are checked
+      row by row (the index is missing a column)
+    """
+    findings = []
+    for node in _walk(plan["Plan"] if "Plan" in plan else plan):
+        node_type = node.get("Node Type")
+        relation = node.get("Relation Name")
+        if node_type == "Seq Scan":
+            findings.append(f"seq scan on {relation}")
+        elif node_type in ("Sort", "Incremental Sort"):
+            findings.append(f"sort on {', '.join(node.get('Sort Key', []))}")
+        elif node_type in ("Index Scan", "Index Only Scan", "Bitmap Heap Scan") and node.get("Filter"):
+            findings.append(f"filter after {node.get('Index Name') or node_type} on {relation}: {node['Filter']}")
+    return findings
+
+
+def explain(cursor, entry: Dict) -> List[str]:
+    """EXPLAIN a captured query on a psycopg2 cursor and return plan_findings"""
+    sql, params = render_sql(entry)
+    cursor.execute("SET LOCAL enable_seqscan = off")
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan_findings(plan[0])
+
+
+def load_capture(path: str) -> List[Dict]:
+    with open(path) as capture:
+        return [json.loads(line) for line in capture if line.strip()]
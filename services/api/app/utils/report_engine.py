@@ -0,0 +1,338 @@
+"""
+Report Engine
+Streaming, chunked generation for custom reports
+
+Source rows are read in keyset batches and folded into per-group
+accumulators as they arrive, so memory is bounded by the number of groups
+(or one chunk, for row-level reports) rather than the date range. Results
+are written to `generated_report_chunks` in fixed-size chunks; the
+`generated_reports` row is the handle and carries status and progress.
+
+Reports run on the Celery workers as `custom_report` jobs (or as local
+background tasks via start()). Cancellation is requested on the handle
+(so any worker can cancel) and also cancels a local task directly.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class Sum:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def add(self, value):
+        self.value += value
+
+    def result(self):
+        return self.value
+
+
+class Count(Sum):
+    def add(self, value):
+        self.value += 1
+
+
+class Avg:
+    __slots__ = ("total", "count")
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        self.total += value
+        self.count += 1
+
+    def result(self):
+        return self.total / self.count if self.count else 0
+
+
+class Min:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None
+
+    def add(self, value):
+        if self.value is None or value < self.value:
+            self.value = value
+
+    def result(self):
+        return self.value
+
+
+class Max(Min):
+    def add(self, value):
+        if self.value is None or value > self.value:
+            self.value = value
+
+
+AGGREGATIONS = {"sum": Sum, "count": Count, "avg": Avg, "min": Min, "max": Max}
+
+
+class GroupBy:
+    """
+    Incremental group-by
+
+    Args:
+        key: Group column name in the output
+        key_fn: row -> group key
+        columns: output column -> (aggregation, row -> value)
+        finalize: Optional hook turning a group's aggregates into the output row
+    """
+
+    def __init__(self, key: str, key_fn: Callable[[Dict], Any],
+                 columns: Dict[str, Tuple[str, Callable[[Dict], Any]]],
+                 finalize: Optional[Callable[[Dict], Dict]] = None):
+        self.key = key
+        self.key_fn = key_fn
+        self.columns = columns
+        self.finalize = finalize
+        self.groups: Dict[Any, Dict[str, Any]] = {}
+
+    def add(self, row: Dict):
+        group_key = self.key_fn(row)
+        group = self.groups.get(group_key)
+        if group is None:
+            group = self.groups[group_key] = {
+                name: AGGREGATIONS[aggregation]() for name, (aggregation, _) in self.columns.items()
+            }
+        for name, (_, value_fn) in self.columns.items():
+            group[name].add(value_fn(row))
+
+    def results(self) -> List[Dict]:
+        rows = []
+        for group_key, aggregates in self.groups.items():
+            row = {self.key: group_key}
+            row.update({name: aggregate.result() for name, aggregate in aggregates.items()})
+            rows.append(self.finalize(row) if self.finalize else row)
+        return rows
+
+
+def _hours(field: str) -> Callable[[Dict], float]:
+    return lambda row: (row.get(field) or 0) / 3600
+
+
+def _user_summary(row: Dict) -> Dict:
+    total, idle = row["total_hours"], row["idle_hours"]
+    active = total - idle
+    productivity = (active / total * 100) if total > 0 else 0
+    return {
+        "user_id": row["user_id"],
+        "total_hours": round(total, 2),
+        "active_hours": round(active, 2),
+        "idle_hours": round(idle, 2),
+        "entries_count": row["entries_count"],
+        "productivity_score": round(productivity, 1)
+    }
+
+
+def user_summary_groups() -> GroupBy:
+    return GroupBy(
+        "user_id",
+        lambda row: row.get("user_id", "unknown"),
+        {
+            "total_hours": ("sum", _hours("duration")),
+            "idle_hours": ("sum", _hours("idle_time")),
+            "entries_count": ("count", lambda row: 1),
+        },
+        finalize=_user_summary
+    )
+
+
+def project_groups() -> GroupBy:
+    return GroupBy(
+        "project_id",
+        lambda row: row.get("project_id") or "no_project",
+        {
+            "hours": ("sum", _hours("duration")),
+            "entries": ("count", lambda row: 1),
+        }
+    )
+
+
+# report_type -> (source table, date field, id field, group-by factory or None for row-level)
+REPORT_SOURCES: Dict[str, Tuple[str, str, str, Optional[Callable[[], GroupBy]]]] = {
+    "time_summary": ("time_entries", "start_time", "entry_id", user_summary_groups),
+    "productivity": ("time_entries", "start_time", "entry_id", user_summary_groups),
+    "project_time": ("time_entries", "start_time", "entry_id", project_groups),
+    "attendance": ("attendance", "date", "attendance_id", None),
+}
+
+
+class ChunkWriter:
+    """Buffers result rows and writes them to the report store in chunks"""
+
+    def __init__(self, db, report_id: str, chunk_size: int):
+        self.db = db
+        self.report_id = report_id
+        self.chunk_size = chunk_size
+        self.buffer: List[Dict] = []
+        self.chunks = 0
+        self.rows = 0
+
+    async def add(self, row: Dict):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        await self.db.generated_report_chunks.insert_one({
+            "report_id": self.report_id,
+            "chunk_index": self.chunks,
+            "rows": self.buffer
+        })
+        self.chunks += 1
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+
+class ReportEngine:
+    """
+    Runs reports in the background and serves their chunks
+
+    Args:
+        chunk_size: Result rows per stored chunk (and per page)
+        batch_size: Source rows fetched per round trip; progress and
+            cancellation are checked once per batch
+    """
+
+    def __init__(self, chunk_size: int = 500, batch_size: int = 1000):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def source_query(self, report_type: str, start_date: str, end_date: str,
+                     user_ids: Optional[List[str]] = None,
+                     project_ids: Optional[List[str]] = None,
+                     company_id: Optional[str] = None) -> Dict:
+        """Filter on the report's source table for the requested range"""
+        _, date_field, _, _ = REPORT_SOURCES[report_type]
+        query: Dict[str, Any] = {date_field: {"$gte": start_date, "$lte": end_date}}
+        if company_id:
+            query["company_id"] = company_id
+        if user_ids:
+            query["user_id"] = {"$in": user_ids}
+        if project_ids and date_field == "start_time":
+            query["project_id"] = {"$in": project_ids}
+        return query
+
+    async def create_handle(self, db, report_id: str, report_type: str, start_date: str, end_date: str,
+                            config: Optional[Dict] = None, company_id: Optional[str] = None) -> Dict:
+        """Insert the handle a report is generated into"""
+        handle = {
+            "report_id": report_id,
+            "company_id": company_id,
+            "report_type": report_type,
+            "start_date": start_date,
+            "end_date": end_date,
+            "config": config or {},
+            "status": RUNNING,
+            "rows_processed": 0,
+            "total_records": 0,
+            "chunk_count": 0,
+            "generated_at": datetime.now(timezone.utc).isoformat()
+        }
+        await db.generated_reports.insert_one(handle)
+        return handle
+
+    def start(self, db, report_id: str, report_type: str, query: Dict) -> asyncio.Task:
+        """Run a report in the background (the handle row must already exist)"""
+        task = asyncio.create_task(self.run(db, report_id, report_type, query))
+        self._tasks[report_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(report_id, None))
+        return task
+
+    async def run(self, db, report_id: str, report_type: str, query: Dict):
+        """Stream the source through the accumulators and store the result in chunks"""
+        writer = ChunkWriter(db, report_id, self.chunk_size)
+        processed = 0
+        try:
+            if report_type in REPORT_SOURCES:
+                table, date_field, id_field, groups_factory = REPORT_SOURCES[report_type]
+                groups = groups_factory() if groups_factory else None
+
+                async for row in db[table].iterate(query, date_field, id_field, batch_size=self.batch_size):
+                    if groups is not None:
+                        groups.add(row)
+                    else:
+                        await writer.add(row)
+                    processed += 1
+                    if processed % self.batch_size == 0:
+                        await self._checkpoint(db, report_id, processed)
+
+                for result in (groups.results() if groups is not None else []):
+                    await writer.add(result)
+            await writer.flush()
+
+            await db.generated_reports.update_one({"report_id": report_id}, {"$set": {
+                "status": COMPLETED,
+                "rows_processed": processed,
+                "total_records": writer.rows,
+                "chunk_count": writer.chunks,
+                "completed_at": datetime.now(timezone.utc).isoformat()
+            }})
+        except asyncio.CancelledError:
+            await self._discard(db, report_id, CANCELLED, processed)
+            logger.info(f"Report {report_id} cancelled after {processed} rows")
+        except Exception as e:
+            logger.error(f"Report {report_id} failed: {e}")
+            await self._discard(db, report_id, FAILED, processed, error=str(e))
+
+    async def _checkpoint(self, db, report_id: str, processed: int):
+        """Record progress; stop if cancellation was requested on the handle"""
+        handle = await db.generated_reports.find_one({"report_id": report_id}, {"_id": 0})
+        if handle and handle.get("cancel_requested"):
+            raise asyncio.CancelledError()
+        await db.generated_reports.update_one(
+            {"report_id": report_id},
+            {"$set": {"rows_processed": processed}}
+        )
+
+    async def _discard(self, db, report_id: str, status: str, processed: int, error: Optional[str] = None):
+        await db.generated_report_chunks.delete_many({"report_id": report_id})
+        update = {"status": status, "rows_processed": processed, "completed_at": datetime.now(timezone.utc).isoformat()}
+        if error:
+            update["error"] = error
+        await db.generated_reports.update_one({"report_id": report_id}, {"$set": update})
+
+    async def cancel(self, db, report_id: str) -> bool:
+        """Request cancellation; returns False if the report already finished"""
+        handle = await db.generated_reports.find_one({"report_id": report_id}, {"_id": 0})
+        if not handle or handle.get("status") != RUNNING:
+            return False
+        await db.generated_reports.update_one({"report_id": report_id}, {"$set": {"cancel_requested": True}})
+        task = self._tasks.get(report_id)
+        if task is not None:
+            task.cancel()
+        return True
+
+    async def get_chunk(self, db, report_id: str, chunk_index: int) -> List[Dict]:
+        chunk = await db.generated_report_chunks.find_one(
+            {"report_id": report_id, "chunk_index": chunk_index},
+            {"_id": 0}
+        )
+        return chunk["rows"] if chunk else []
+
+    async def iter_rows(self, db, report_id: str, chunk_count: int) -> AsyncIterator[Dict]:
+        """All result rows in order, one stored chunk in memory at a time"""
+        for chunk_index in range(chunk_count):
+            for row in await self.get_chunk(db, report_id, chunk_index):
+                yield row
+
+
+# Global instance
+report_engine = ReportEngine()
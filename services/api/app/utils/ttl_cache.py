@@ -0,0 +1,121 @@
+"""
+TTL Cache
+In-process LRU cache with expiry and single-flight loading for async loaders
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    LRU-bounded TTL cache with single-flight loading
+
+    Args:
+        name: Label for metrics
+        ttl: Seconds an entry is served (0 disables caching)
+        max_entries: Upper bound (least recently used evicted)
+        metric: Optional Prometheus counter with `cache` and `result` labels
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, metric=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metric = metric
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for key, or the result of loader()
+
+        Exceptions from loader (e.g. 401s) propagate to every waiter and
+        are not cached. None results are not cached either.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._record('hit')
+                return value
+            self._entries.pop(key, None)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._record('shared')
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # We were cancelled, not the fetch
+            return await self.get_or_load(key, loader)
+
+        self._record('miss')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation.get(key, 0)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            # Skip storing if invalidated while the fetch was in flight
+            if value is not None and self._generation.get(key, 0) == generation:
+                self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._generation.pop(key, None)
+
+    def _store(self, key: str, value: Any):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+        if key in self._inflight:
+            self._generation[key] = self._generation.get(key, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+        self._generation.clear()
+
+    def _record(self, result: str):
+        if result == 'hit':
+            self.hits += 1
+        elif result == 'shared':
+            self.shared += 1
+        else:
+            self.misses += 1
+        if self.metric is not None:
+            self.metric.labels(cache=self.name, result=result).inc()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses + self.shared
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared': self.shared,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
@@ -0,0 +1,217 @@
+"""
+Usage Counters
+Atomic per-company / per-user usage counters for plan limits
+
+Limits are enforced with one check-and-increment round trip when a resource
+is created, instead of counting the source table on every request:
+- Redis backend (REDIS_URL set): a Lua script increments only if the result
+  stays within the limit; keys expire after their period
+- Postgres backend: the `consume_usage_quota` function upserts the
+  `usage_counters` row under a row lock
+
+Periods are part of the key ('YYYY-MM-DD', 'YYYY-MM' or 'all'), so daily and
+monthly rollover needs no job. `reconcile` recomputes counters from the
+source tables to repair drift (e.g. rows deleted outside the API).
+"""
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+UNLIMITED = -1
+
+# resource -> (period, per_user)
+RESOURCES = {
+    "screenshots": ("day", True),
+    "report_exports": ("month", False),
+    "integrations": ("all", False),
+}
+
+# Seconds a Redis counter outlives its period
+PERIOD_TTL = {"day": 2 * 86400, "month": 32 * 86400, "all": None}
+
+# Counter rows read (and Redis writes pipelined) per round trip when reconciling
+RECONCILE_BATCH_SIZE = 1000
+
+
+def period_key(period: str, now: Optional[datetime] = None) -> str:
+    """Counter period for a timestamp (UTC)"""
+    now = now or datetime.now(timezone.utc)
+    if period == "day":
+        return now.strftime("%Y-%m-%d")
+    if period == "month":
+        return now.strftime("%Y-%m")
+    return "all"
+
+
+class PostgresCounterBackend:
+    """Counters in the `usage_counters` table via Postgres functions"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def consume(self, company_id: str, user_id: str, resource: str, period: str,
+                      amount: int, limit: int) -> Tuple[bool, int]:
+        rows = await self.db.rpc("consume_usage_quota", {
+            "p_company_id": company_id,
+            "p_user_id": user_id,
+            "p_resource": resource,
+            "p_period": period,
+            "p_amount": amount,
+            "p_limit": limit
+        })
+        row = rows[0] if rows else {"allowed": False, "used": 0}
+        return bool(row["allowed"]), int(row["used"] or 0)
+
+    async def get(self, company_id: str, user_id: str, resource: str, period: str) -> int:
+        row = await self.db.usage_counters.find_one({
+            "company_id": company_id,
+            "user_id": user_id,
+            "resource": resource,
+            "period": period
+        })
+        return int(row["count"]) if row else 0
+
+    async def reconcile(self, day: date) -> int:
+        return await self.db.rpc("reconcile_usage_counters", {"p_day": day.isoformat()})
+
+
+class RedisCounterBackend:
+    """Counters as Redis integers, checked and incremented by one Lua script"""
+
+    # KEYS[1]=counter  ARGV: amount, limit (-1 unlimited), ttl seconds (0 = none)
+    CONSUME_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local amount = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+if limit >= 0 and current + amount > limit then
+    return {0, current}
+end
+local updated = current + amount
+if updated < 0 then updated = 0 end
+redis.call('SET', KEYS[1], updated)
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, updated}
+"""
+
+    def __init__(self, redis_client, db=None, prefix: str = "usage"):
+        self.redis = redis_client
+        self.db = db
+        self.prefix = prefix
+        self._consume = redis_client.register_script(self.CONSUME_SCRIPT)
+
+    def _key(self, company_id: str, user_id: str, resource: str, period: str) -> str:
+        return f"{self.prefix}:{resource}:{period}:{company_id}:{user_id}"
+
+    async def consume(self, company_id: str, user_id: str, resource: str, period: str,
+                      amount: int, limit: int) -> Tuple[bool, int]:
+        ttl = PERIOD_TTL[RESOURCES[resource][0]] or 0
+        allowed, used = await self._consume(
+            keys=[self._key(company_id, user_id, resource, period)],
+            args=[amount, limit, ttl]
+        )
+        return bool(allowed), int(used)
+
+    async def get(self, company_id: str, user_id: str, resource: str, period: str) -> int:
+        value = await self.redis.get(self._key(company_id, user_id, resource, period))
+        return int(value) if value else 0
+
+    async def reconcile(self, day: date) -> int:
+        """Recompute in Postgres, then copy the authoritative counts into Redis"""
+        if self.db is None:
+            return 0
+        changed = await self.db.rpc("reconcile_usage_counters", {"p_day": day.isoformat()})
+
+        periods = {
+            "screenshots": day.strftime("%Y-%m-%d"),
+            "report_exports": day.strftime("%Y-%m"),
+            "integrations": "all",
+        }
+        pipe = self.redis.pipeline(transaction=False)
+        for resource, period in periods.items():
+            ttl = PERIOD_TTL[RESOURCES[resource][0]]
+            # Keyset-paged: every counter row, not just the first page
+            async for row in self.db.usage_counters.iterate(
+                {"resource": resource, "period": period}, "company_id", "user_id",
+                batch_size=RECONCILE_BATCH_SIZE, descending=False
+            ):
+                pipe.set(self._key(row["company_id"], row["user_id"], resource, period), row["count"], ex=ttl)
+                if len(pipe) >= RECONCILE_BATCH_SIZE:
+                    await pipe.execute()
+        await pipe.execute()
+        return changed
+
+
+class UsageCounters:
+    """Plan-limit counters for the resources in RESOURCES"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def configure(self, backend):
+        self.backend = backend
+
+    def bind(self, db) -> 'UsageCounters':
+        """Use the default backend for db unless one is already configured"""
+        if self.backend is None:
+            self.backend = create_backend(db)
+        return self
+
+    def _scope(self, resource: str, company_id: str, user_id: Optional[str]) -> Tuple[str, str]:
+        period, per_user = RESOURCES[resource]
+        return (user_id or "") if per_user else "", period_key(period)
+
+    async def consume(self, resource: str, company_id: str, limit: int,
+                      user_id: Optional[str] = None, amount: int = 1) -> Dict:
+        """
+        Reserve `amount` units if within `limit` (-1 unlimited, 0 disabled)
+
+        Returns the same shape as the feature_gate limit checks:
+        {"allowed", "limit", "used", "remaining"}
+        """
+        if limit == 0:
+            return {"allowed": False, "limit": 0, "used": 0, "remaining": 0}
+
+        user_key, period = self._scope(resource, company_id, user_id)
+        allowed, used = await self.backend.consume(company_id, user_key, resource, period, amount, limit)
+        return {
+            "allowed": allowed,
+            "limit": limit,
+            "used": used,
+            "remaining": UNLIMITED if limit == UNLIMITED else max(0, limit - used)
+        }
+
+    async def release(self, resource: str, company_id: str,
+                      user_id: Optional[str] = None, amount: int = 1):
+        """Give back units (resource creation failed, or an integration was removed)"""
+        user_key, period = self._scope(resource, company_id, user_id)
+        await self.backend.consume(company_id, user_key, resource, period, -amount, UNLIMITED)
+
+    async def usage(self, resource: str, company_id: str, user_id: Optional[str] = None) -> int:
+        """Current count for this period (single key lookup)"""
+        user_key, period = self._scope(resource, company_id, user_id)
+        return await self.backend.get(company_id, user_key, resource, period)
+
+    async def reconcile(self, day: Optional[date] = None) -> int:
+        """Recompute counters for day (default today, UTC) from the source tables"""
+        day = day or datetime.now(timezone.utc).date()
+        changed = await self.backend.reconcile(day)
+        logger.info(f"Reconciled usage counters for {day}: {changed} rows changed")
+        return changed
+
+
+def create_backend(db):
+    """Redis backend when REDIS_URL is set, otherwise Postgres"""
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        import redis.asyncio as redis
+        return RedisCounterBackend(redis.from_url(redis_url), db=db)
+    return PostgresCounterBackend(db)
+
+
+# Global instance (backend chosen on first bind(db))
+usage_counters = UsageCounters()
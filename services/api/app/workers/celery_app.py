@@ -5,6 +5,7 @@ Handles asynchronous tasks: emails, reports, AI processing
 
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 import os
 
 # Initialize Celery
@@ -17,6 +18,8 @@ celery_app = Celery(
         'app.workers.tasks.report_tasks',
         'app.workers.tasks.ai_tasks',
         'app.workers.tasks.payroll_tasks',
+        'app.workers.tasks.pdf_tasks',
+        'app.workers.tasks.maintenance_tasks',
     ]
 )
 
@@ -28,28 +31,42 @@ celery_app.conf.update(
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
-    task_time_limit=3600,  # 1 hour
+    task_time_limit=int(os.getenv('JOB_TIME_LIMIT', '3600')),  # 1 hour; jobs older than this are presumed lost
     worker_prefetch_multiplier=4,
     worker_max_tasks_per_child=1000,
+    # Interactive work (someone is waiting on the result) never queues behind
+    # bulk work. Run separate workers per queue, e.g.
+    #   celery -A app.workers.celery_app worker -Q interactive --prefetch-multiplier=1
+    #   celery -A app.workers.celery_app worker -Q bulk
+    task_queues=(Queue('interactive'), Queue('bulk')),
+    task_default_queue='bulk',
 )
 
 # Scheduled tasks (cron jobs)
 celery_app.conf.beat_schedule = {
     'generate-daily-reports': {
-        'task': 'app.workers.tasks.report_tasks.generate_daily_reports',
+        'task': 'generate_daily_reports',
         'schedule': crontab(hour=6, minute=0),  # 6 AM daily
     },
     'run-weekly-payroll': {
-        'task': 'app.workers.tasks.payroll_tasks.run_weekly_payroll',
+        'task': 'run_weekly_payroll',
         'schedule': crontab(day_of_week=5, hour=14, minute=0),  # Friday 2 PM
     },
     'train-ai-models': {
-        'task': 'app.workers.tasks.ai_tasks.train_models_weekly',
+        'task': 'train_models_weekly',
         'schedule': crontab(day_of_week=0, hour=2, minute=0),  # Sunday 2 AM
     },
+    'reconcile-usage-counters': {
+        'task': 'reconcile_usage_counters',
+        'schedule': crontab(minute=15),  # Hourly
+    },
     'cleanup-old-sessions': {
-        'task': 'app.workers.tasks.maintenance_tasks.cleanup_expired_sessions',
-        'schedule': crontab(hour='*/6'),  # Every 6 hours
+        'task': 'cleanup_expired_sessions',
+        'schedule': crontab(minute=0, hour='*/6'),  # Every 6 hours
+    },
+    'maintain-partitions': {
+        'task': 'maintain_partitions',
+        'schedule': crontab(hour=3, minute=30),  # 3:30 AM daily
     },
 }
 
@@ -4,23 +4,60 @@ Train and run AI models asynchronously
 """
 
 from app.workers.celery_app import celery_app
-from app.ai_engines.performance import performance_predictor
-from app.ai_engines.forecasting import turnover_predictor
+from app.ai_engines.performance.performance_predictor import PerformancePredictor, performance_predictor
+from app.ai_engines.forecasting.turnover_predictor import TurnoverPredictor
+from app.ai_engines.model_manager import model_manager
+from app.utils.db_adapter import SupabaseDatabase
+from app.utils.jobs import job_queue
+from app.utils.productivity_analysis import run_productivity_analysis
+from app.db import get_db
+from datetime import datetime
+import asyncio
+import hashlib
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Validation metric each model must reach to be promoted after training
+PROMOTION_GATES = {
+    'performance': ('test_score', float(os.environ.get('AI_PERFORMANCE_MIN_R2', '0.5'))),  # Held-out R²
+    'turnover': ('accuracy', float(os.environ.get('AI_TURNOVER_MIN_ACCURACY', '0.7'))),
+}
+
+def _register_trained_model(model_name: str, predictor, results: dict, training_data: list):
+    """
+    Save a freshly trained model as a new version and promote it if it
+    passes validation (see ModelManager.promote_if_validated)
+    
+    Returns (version, promoted); serving switches over on promotion.
+    """
+    version = datetime.utcnow().strftime('v%Y%m%d%H%M%S')
+    path = f'models/{model_name}_{version}.pkl'
+    predictor.save_model(path)
+    
+    dataset_hash = hashlib.sha256(
+        json.dumps(training_data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    metrics = {k: v for k, v in results.items() if isinstance(v, (int, float))}
+    model_manager.register_model(model_name, version, path, metrics, dataset_hash)
+    metric, minimum = PROMOTION_GATES[model_name]
+    promoted = model_manager.promote_if_validated(model_name, version, metric, minimum)
+    return version, promoted
+
 @celery_app.task(name='train_performance_model')
 def train_performance_model(training_data: list):
     """Train performance prediction model"""
     logger.info(f"Training performance model with {len(training_data)} samples")
     
     try:
-        results = performance_predictor.train(training_data)
-        performance_predictor.save_model('models/performance_latest.pkl')
+        predictor = PerformancePredictor()
+        results = predictor.train(training_data)
+        version, promoted = _register_trained_model('performance', predictor, results, training_data)
         
-        logger.info(f"Performance model trained: {results}")
-        return results
+        logger.info(f"Performance model trained ({version}, promoted={promoted}): {results}")
+        return {**results, 'version': version, 'promoted': promoted}
     except Exception as e:
         logger.error(f"Failed to train performance model: {e}")
         raise
@@ -31,11 +68,12 @@ def train_turnover_model(training_data: list):
     logger.info(f"Training turnover model with {len(training_data)} samples")
     
     try:
-        results = turnover_predictor.train(training_data)
-        turnover_predictor.save_model('models/turnover_latest.pkl')
+        predictor = TurnoverPredictor()
+        results = predictor.train(training_data)
+        version, promoted = _register_trained_model('turnover', predictor, results, training_data)
         
-        logger.info(f"Turnover model trained: {results}")
-        return results
+        logger.info(f"Turnover model trained ({version}, promoted={promoted}): {results}")
+        return {**results, 'version': version, 'promoted': promoted}
     except Exception as e:
         logger.error(f"Failed to train turnover model: {e}")
         raise
@@ -46,6 +84,7 @@ def predict_employee_performance(employee_id: int, employee_data: dict):
     logger.info(f"Predicting performance for employee {employee_id}")
     
     try:
+        # Served from the process-wide model cache (loaded once per worker)
         prediction = performance_predictor.predict(employee_data)
         logger.info(f"Performance prediction for {employee_id}: {prediction}")
         return {'employee_id': employee_id, 'prediction': prediction}
@@ -53,6 +92,15 @@ def predict_employee_performance(employee_id: int, employee_data: dict):
         logger.error(f"Failed to predict performance: {e}")
         raise
 
+async def _run_productivity_analysis(db, job: dict) -> dict:
+    return await run_productivity_analysis(db, **job["params"])
+
+@celery_app.task(name='run_productivity_analysis_job')
+def run_productivity_analysis_job(job_id: str):
+    """Run a queued AI productivity analysis job"""
+    db = SupabaseDatabase(get_db())
+    return asyncio.run(job_queue.run(db, job_id, _run_productivity_analysis))
+
 @celery_app.task(name='train_models_weekly')
 def train_models_weekly():
     """Weekly scheduled task to retrain all AI models"""
@@ -0,0 +1,80 @@
+"""
+Maintenance Background Tasks
+Periodic housekeeping jobs
+"""
+
+from app.workers.celery_app import celery_app
+from app.utils.db_adapter import SupabaseDatabase
+from app.utils.usage_counters import UsageCounters, create_backend
+from app.utils.jobs import FAILED, job_queue
+from app.utils.partitions import maintain_partitions as maintain_table_partitions
+from app.db import get_db
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name='reconcile_usage_counters')
+def reconcile_usage_counters():
+    """
+    Recompute plan usage counters from the source tables
+    Covers today and yesterday so late writes around midnight are counted
+    """
+    db = SupabaseDatabase(get_db())
+    counters = UsageCounters(create_backend(db))
+    today = datetime.now(timezone.utc).date()
+    
+    async def reconcile_days():
+        changed = 0
+        for day in (today - timedelta(days=1), today):
+            changed += await counters.reconcile(day) or 0
+        return changed
+    
+    try:
+        changed = asyncio.run(reconcile_days())
+        logger.info(f"Usage counters reconciled: {changed} rows changed")
+        return {'success': True, 'changed': changed}
+    except Exception as e:
+        logger.error(f"Usage counter reconciliation failed: {e}")
+        raise
+
+# Failed jobs are kept this long for inspection; succeeded jobs until their cache expires
+FAILED_JOB_RETENTION = timedelta(days=7)
+
+@celery_app.task(name='cleanup_expired_sessions')
+def cleanup_expired_sessions():
+    """Delete expired login sessions and finished background jobs; fail jobs stuck in flight"""
+    db = SupabaseDatabase(get_db())
+    now = datetime.now(timezone.utc)
+    
+    async def cleanup():
+        await db.user_sessions.delete_many({"expires_at": {"$lte": now.isoformat()}})
+        await job_queue.fail_stale(db)
+        await db.jobs.delete_many({"expires_at": {"$lte": now.isoformat()}})
+        await db.jobs.delete_many({"status": FAILED, "completed_at": {"$lte": (now - FAILED_JOB_RETENTION).isoformat()}})
+    
+    try:
+        asyncio.run(cleanup())
+        logger.info("Expired sessions and jobs cleaned up")
+        return {'success': True}
+    except Exception as e:
+        logger.error(f"Session cleanup failed: {e}")
+        raise
+
+@celery_app.task(name='maintain_partitions')
+def maintain_partitions():
+    """
+    Keep monthly partitions ready ahead of time and drop expired ones
+    Retention drops whole partitions (DETACH + DROP), never rows
+    """
+    db = SupabaseDatabase(get_db())
+    
+    try:
+        summary = asyncio.run(maintain_table_partitions(db))
+        failed = [table for table, result in summary.items() if "error" in result]
+        logger.info(f"Partitions maintained: {summary}")
+        return {'success': not failed, 'tables': summary}
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
+        raise
@@ -0,0 +1,52 @@
+"""
+Payroll Background Tasks
+Scheduled payroll generation
+"""
+
+from app.workers.celery_app import celery_app
+from app.utils.db_adapter import SupabaseDatabase
+from app.utils.payroll import generate_payroll_entries
+from app.db import get_db
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+CURRENT_STATUSES = ["active", "trialing"]
+
+@celery_app.task(name='run_weekly_payroll')
+def run_weekly_payroll():
+    """
+    Generate pending payroll for last week (Monday to Sunday)
+    Only companies whose plan includes payroll; a company that already has
+    payroll for the period (e.g. run by hand) is skipped.
+    """
+    db = SupabaseDatabase(get_db())
+    today = datetime.now(timezone.utc).date()
+    period_start = today - timedelta(days=today.weekday() + 7)
+    period_end = period_start + timedelta(days=6)
+    start, end = period_start.isoformat(), period_end.isoformat()
+
+    async def run_companies():
+        subscriptions = await db.subscriptions.find({"status": {"$in": CURRENT_STATUSES}}, {"_id": 0})
+        companies = {s["company_id"] for s in subscriptions if (s.get("features") or {}).get("payroll")}
+
+        generated = 0
+        for company_id in sorted(companies):
+            existing = await db.payroll.find_one(
+                {"company_id": company_id, "period_start": start, "period_end": end},
+                {"_id": 0}
+            )
+            if existing:
+                continue
+            generated += len(await generate_payroll_entries(db, company_id, start, end))
+        return len(companies), generated
+
+    try:
+        companies, generated = asyncio.run(run_companies())
+        logger.info(f"Weekly payroll {start}..{end}: {generated} entries for {companies} companies")
+        return {'success': True, 'companies': companies, 'entries': generated}
+    except Exception as e:
+        logger.error(f"Weekly payroll failed: {e}")
+        raise
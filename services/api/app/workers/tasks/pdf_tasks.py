@@ -0,0 +1,40 @@
+"""
+PDF Background Tasks
+Render invoice and timesheet PDF jobs
+"""
+
+from app.workers.celery_app import celery_app
+from app.utils.db_adapter import SupabaseDatabase
+from app.utils.jobs import job_queue
+from app.utils.pdf_render import (
+    InvoicePDFRequest, TimesheetPDFRequest,
+    generate_invoice_pdf, generate_timesheet_pdf, invoice_filename, timesheet_filename, encode_pdf,
+    load_branding
+)
+from app.db import get_db
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _render_invoice(db, job: dict) -> dict:
+    data = InvoicePDFRequest(**job["params"])
+    branding = await load_branding(db, data.company_id)
+    return encode_pdf(generate_invoice_pdf(data, branding), invoice_filename(data))
+
+async def _render_timesheet(db, job: dict) -> dict:
+    data = TimesheetPDFRequest(**job["params"])
+    branding = await load_branding(db, data.company_id)
+    return encode_pdf(generate_timesheet_pdf(data, branding), timesheet_filename(data))
+
+@celery_app.task(name='render_invoice_pdf_job')
+def render_invoice_pdf_job(job_id: str):
+    """Render a queued invoice PDF job"""
+    db = SupabaseDatabase(get_db())
+    return asyncio.run(job_queue.run(db, job_id, _render_invoice))
+
+@celery_app.task(name='render_timesheet_pdf_job')
+def render_timesheet_pdf_job(job_id: str):
+    """Render a queued timesheet PDF job"""
+    db = SupabaseDatabase(get_db())
+    return asyncio.run(job_queue.run(db, job_id, _render_timesheet))
@@ -0,0 +1,95 @@
+"""
+Report Background Tasks
+Custom report jobs and scheduled daily reports
+"""
+
+from app.workers.celery_app import celery_app
+from app.utils.db_adapter import SupabaseDatabase
+from app.utils.jobs import job_queue, BULK
+from app.utils.report_engine import report_engine, REPORT_SOURCES, COMPLETED, CANCELLED
+from app.db import get_db
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _run_custom_report(db, job: dict) -> dict:
+    """Stream a report into the chunks of its handle (report id == job id)"""
+    params = job["params"]
+    report_id = job["job_id"]
+
+    handle = await db.generated_reports.find_one({"report_id": report_id}, {"_id": 0})
+    if not handle:
+        raise RuntimeError(f"Report handle {report_id} not found")
+    if handle.get("cancel_requested"):
+        # Cancelled while still queued
+        await db.generated_reports.update_one(
+            {"report_id": report_id},
+            {"$set": {"status": CANCELLED, "completed_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        raise RuntimeError("Report cancelled")
+
+    query = {}
+    if params["report_type"] in REPORT_SOURCES:
+        query = report_engine.source_query(
+            params["report_type"], params["start_date"], params["end_date"],
+            params.get("user_ids"), params.get("project_ids"), company_id=job.get("company_id")
+        )
+    await report_engine.run(db, report_id, params["report_type"], query)
+
+    handle = await db.generated_reports.find_one({"report_id": report_id}, {"_id": 0})
+    if handle["status"] != COMPLETED:
+        raise RuntimeError(handle.get("error") or f"Report {handle['status']}")
+    return {
+        "report_id": report_id,
+        "total_records": handle.get("total_records", 0),
+        "chunk_count": handle.get("chunk_count", 0)
+    }
+
+@celery_app.task(name='run_custom_report_job')
+def run_custom_report_job(job_id: str):
+    """Run a queued custom report job"""
+    db = SupabaseDatabase(get_db())
+    return asyncio.run(job_queue.run(db, job_id, _run_custom_report))
+
+@celery_app.task(name='generate_daily_reports')
+def generate_daily_reports():
+    """
+    Queue yesterday's time summary for every company
+    Each report is an ordinary custom_report job on the bulk queue, so a
+    re-run of the schedule reuses jobs that are still in flight or cached.
+    """
+    db = SupabaseDatabase(get_db())
+    day = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+    params = {
+        "report_type": "time_summary",
+        "start_date": day,
+        "end_date": f"{day}T23:59:59.999999+00:00",
+        "user_ids": [],
+        "project_ids": [],
+        "config": {"schedule": "daily"}
+    }
+
+    async def queue_reports():
+        companies = await db.companies.find({}, {"_id": 0})
+        for company in companies:
+            company_id = company["company_id"]
+
+            async def create_handle(job: dict, company_id=company_id):
+                await report_engine.create_handle(
+                    db, job["job_id"], params["report_type"], params["start_date"], params["end_date"],
+                    config=params["config"], company_id=company_id
+                )
+
+            await job_queue.submit(db, "custom_report", params, company_id=company_id,
+                                   queue=BULK, prepare=create_handle)
+        return len(companies)
+
+    try:
+        queued = asyncio.run(queue_reports())
+        logger.info(f"Daily reports queued for {queued} companies ({day})")
+        return {'success': True, 'companies': queued, 'day': day}
+    except Exception as e:
+        logger.error(f"Failed to queue daily reports: {e}")
+        raise
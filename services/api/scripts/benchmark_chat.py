@@ -0,0 +1,139 @@
+"""
+Chat Fan-out Benchmark
+Broadcasting to 1k-member channels: sequential awaits vs per-connection send queues
+
+The baseline reproduces the previous broadcast_to_channel (await
+send_json on each socket in turn, serializing per socket). "queued" is
+ChatFanout: serialize once, enqueue for every member, and let each
+connection's writer task send. Sockets take --send-ms per send; --slow
+of them take --slow-ms. "sender wait" is how long the sending request is
+held; "delivered" is until every member has the message.
+
+Read receipts: one write per receipt vs ReadReceipts' buffered flush.
+
+Usage:
+    python scripts/benchmark_chat.py --members 1000 --messages 20
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import argparse
+import asyncio
+import json
+import time
+
+from utils.chat_fanout import ChatFanout
+from utils.chat_store import ReadReceipts
+
+
+class SimulatedSocket:
+    def __init__(self, send_seconds):
+        self.send_seconds = send_seconds
+        self.received = 0
+
+    async def send_json(self, message):
+        await self.send_text(json.dumps(message))
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.send_seconds)
+        self.received += 1
+
+
+class CountingDB:
+    def __init__(self):
+        self.calls = 0
+
+    async def rpc(self, name, params):
+        self.calls += 1
+        return []
+
+
+def sockets(args):
+    return [SimulatedSocket((args.slow_ms if i < args.slow else args.send_ms) / 1000)
+            for i in range(args.members)]
+
+
+def event(n):
+    return {"type": "new_message", "message": {"message_id": f"msg_{n}", "content": "x" * 200}}
+
+
+async def legacy(args):
+    members = sockets(args)
+    wait = 0.0
+    started = time.perf_counter()
+    for n in range(args.messages):
+        sent = time.perf_counter()
+        for socket in members:
+            try:
+                await socket.send_json(event(n))
+            except Exception:
+                pass
+        wait += time.perf_counter() - sent
+    return wait / args.messages, time.perf_counter() - started, members
+
+
+async def queued(args):
+    members = sockets(args)
+    fanout = ChatFanout(max_queue=max(args.messages, 1) + 1)
+    for i, socket in enumerate(members):
+        fanout.add(socket, "ch_bench", f"user_{i}")
+    wait = 0.0
+    started = time.perf_counter()
+    for n in range(args.messages):
+        sent = time.perf_counter()
+        fanout.broadcast("ch_bench", event(n))
+        wait += time.perf_counter() - sent
+        await asyncio.sleep(0)
+    await fanout.drain()
+    return wait / args.messages, time.perf_counter() - started, members
+
+
+async def receipts(args):
+    db = CountingDB()
+    for i in range(args.members):
+        await db.rpc("chat_mark_read", {"p_receipts": [{"channel_id": "ch_bench", "user_id": f"user_{i}"}]})
+    unbatched = db.calls
+
+    db = CountingDB()
+    buffer = ReadReceipts(flush_after=3600).bind(db)
+    for n in range(args.messages):
+        for i in range(args.members):
+            buffer.mark("ch_bench", f"user_{i}", f"msg_{n}")
+    await buffer.flush()
+    return unbatched * args.messages, db.calls
+
+
+def report(label, wait, total, members, args):
+    delivered = sum(socket.received for socket in members)
+    print(f"{label:<8} sender wait {wait * 1000:9.2f} ms/msg   delivered in {total:7.2f}s   "
+          f"{delivered / total:10.0f} deliveries/s   ({delivered}/{args.members * args.messages})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--send-ms", type=float, default=0.2)
+    parser.add_argument("--slow", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=20)
+    parser.add_argument("--skip-legacy", action="store_true", help="legacy is slow with many members")
+    args = parser.parse_args()
+
+    print(f"{args.members} members, {args.messages} messages, {args.send_ms} ms/send, "
+          f"{args.slow} slow members at {args.slow_ms} ms")
+    if not args.skip_legacy:
+        old_wait, old_total, members = asyncio.run(legacy(args))
+        report("legacy", old_wait, old_total, members, args)
+    new_wait, new_total, members = asyncio.run(queued(args))
+    report("queued", new_wait, new_total, members, args)
+    if not args.skip_legacy:
+        print(f"speedup  sender {old_wait / new_wait:.0f}x, delivery {old_total / new_total:.1f}x")
+
+    writes, batched = asyncio.run(receipts(args))
+    print(f"receipts {args.members * args.messages} marks: {writes} writes unbatched, {batched} batched")
+
+
+if __name__ == "__main__":
+    main()
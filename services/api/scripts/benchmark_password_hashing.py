@@ -0,0 +1,94 @@
+"""
+Password Hashing Benchmark
+200 concurrent logins alongside normal traffic, inline bcrypt vs the bounded pool
+
+"Normal traffic" is a stream of cheap requests (a short await every 10 ms);
+its p50/p99 latency shows how much the login burst stalls the event loop.
+
+Usage:
+    python scripts/benchmark_password_hashing.py --logins 200 --rounds 12
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import bcrypt
+
+from utils.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def normal_traffic(stop: asyncio.Event, latencies: list):
+    """Cheap requests due every 10 ms; latency counts from when each was due"""
+    while not stop.is_set():
+        due = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        await asyncio.sleep(0.001)  # e.g. a cached DB read
+        latencies.append(time.perf_counter() - due)
+
+
+async def inline_login(password: str, hashed: str):
+    """Previous behaviour: bcrypt directly inside the async handler"""
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+async def scenario(label: str, login, logins: int):
+    latencies = []
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(normal_traffic(stop, latencies))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[login() for _ in range(logins)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await traffic
+
+    ok = sum(1 for result in results if result is True)
+    shed = sum(1 for result in results if isinstance(result, PasswordHasherBusy))
+    print(
+        f"  {label:<9} logins ok={ok:<4} shed={shed:<4} {elapsed:6.2f}s | "
+        f"normal traffic p50={statistics.median(latencies) * 1000:7.1f} ms "
+        f"p99={percentile(latencies, 99) * 1000:7.1f} ms max={max(latencies) * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--max-pending', type=int, default=64)
+    args = parser.parse_args()
+
+    password = 'correct horse battery staple'
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=args.rounds)).decode()
+
+    unbounded = PasswordHasher(args.rounds, max_workers=args.workers, max_pending=args.logins)
+    bounded = PasswordHasher(args.rounds, max_workers=args.workers, max_pending=args.max_pending)
+
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.workers} workers")
+
+    async def run_all():
+        await scenario('inline', lambda: inline_login(password, hashed), args.logins)
+        await scenario('pool', lambda: unbounded.verify(password, hashed), args.logins)
+        await scenario('pool+shed', lambda: bounded.verify(password, hashed), args.logins)
+
+    asyncio.run(run_all())
+    unbounded.shutdown()
+    bounded.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+RBAC Permission Check Benchmark
+1M permission checks: role-string parsing and set lookups vs compiled bitmasks
+
+The baseline reproduces the previous has_permission (Role(role_name) and a
+set membership test per role, per check). "compiled" looks the mask up in
+the per-shape memo on each check, as every principal check does.
+
+Usage:
+    python scripts/benchmark_rbac.py --checks 1000000
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import argparse
+import time
+
+from auth.rbac import Permission, Role, rbac
+
+
+def legacy_has_permission(user_roles, required_permission):
+    for role_name in user_roles:
+        try:
+            role = Role(role_name)
+            if required_permission in rbac.role_permissions.get(role, set()):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def run(label, check, checks, cases):
+    granted = 0
+    started = time.perf_counter()
+    for i in range(checks):
+        user, permission = cases[i % len(cases)]
+        granted += check(user, permission)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {elapsed:7.3f}s  {elapsed / checks * 1e9:7.1f} ns/check  granted={granted}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    principals = [
+        {'roles': [Role.EMPLOYEE.value]},
+        {'roles': [Role.MANAGER.value, Role.HR.value]},
+        {'roles': ['contractor', Role.AUDITOR.value]},
+        {'roles': [Role.ADMIN.value]},
+    ]
+    cases = [(user, permission) for user in principals for permission in Permission]
+
+    legacy = run("legacy", lambda user, permission: legacy_has_permission(user['roles'], permission),
+                 args.checks, cases)
+    compiled = run("compiled", rbac.check, args.checks, cases)
+    print(f"speedup    compiled {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Screenshot Upload Benchmark
+Measures upload throughput and event-loop responsiveness against a mocked S3 (moto)
+
+Usage:
+    python scripts/benchmark_storage_upload.py --uploads 200 --size-kb 512
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import argparse
+import asyncio
+import time
+
+import boto3
+from moto import mock_aws
+
+from utils.object_storage import ObjectUploader
+
+BUCKET = 'benchmark-screenshots'
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Worst delay between scheduled ticks while uploads run"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def blocking_uploads(client, bodies):
+    """Baseline: synchronous put_object on the event loop (previous behaviour)"""
+    for index, body in enumerate(bodies):
+        client.put_object(Bucket=BUCKET, Key=f'blocking/{index}.png', Body=body, ContentType='image/png')
+
+
+async def pooled_uploads(uploader: ObjectUploader, bodies, chunk_size: int):
+    async def stream(body):
+        for offset in range(0, len(body), chunk_size):
+            yield body[offset:offset + chunk_size]
+            await asyncio.sleep(0)  # Simulate chunks arriving from the network
+
+    await asyncio.gather(*[
+        uploader.upload_stream(f'pooled/{index}.png', stream(body), 'image/png')
+        for index, body in enumerate(bodies)
+    ])
+
+
+async def run(label: str, coro_factory):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)  # Let the lag probe start ticking
+    start = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag_task
+    return label, elapsed, worst_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--chunk-kb', type=int, default=64)
+    args = parser.parse_args()
+
+    bodies = [os.urandom(args.size_kb * 1024) for _ in range(args.uploads)]
+
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        uploader = ObjectUploader(client, BUCKET, max_concurrent_uploads=args.concurrency)
+
+        async def scenario():
+            return [
+                await run('blocking', lambda: blocking_uploads(client, bodies)),
+                await run('pooled', lambda: pooled_uploads(uploader, bodies, args.chunk_kb * 1024))
+            ]
+
+        results = asyncio.run(scenario())
+        uploader.shutdown()
+
+    total_mb = args.uploads * args.size_kb / 1024
+    print(f"{args.uploads} uploads x {args.size_kb} KiB ({total_mb:.1f} MiB)")
+    for label, elapsed, worst_lag in results:
+        print(
+            f"  {label:<9} {elapsed:7.2f}s  {args.uploads / elapsed:8.1f} uploads/s  "
+            f"max event-loop lag {worst_lag * 1000:7.1f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
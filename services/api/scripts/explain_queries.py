@@ -0,0 +1,66 @@
+"""
+Index Coverage Report
+EXPLAINs the queries captured from the database adapter and lists the
+query shapes that are not served by an index
+
+Capture by running the API (or a load test) with QUERY_CAPTURE_FILE set;
+every adapter query is appended to that file. Then point this script at a
+database with the production schema (and ideally realistic statistics):
+
+Usage:
+    QUERY_CAPTURE_FILE=/tmp/queries.jsonl uvicorn server:app ...
+    python scripts/explain_queries.py /tmp/queries.jsonl --dsn "$DATABASE_URL"
+
+Exits 1 when any shape has findings, so it can gate CI.
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import argparse
+
+import psycopg2
+
+from utils.query_plans import explain, group_shapes, load_capture, render_sql
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", help="JSON-lines file written via QUERY_CAPTURE_FILE")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="Postgres connection string")
+    parser.add_argument("--show-sql", action="store_true", help="Print the SQL of each flagged shape")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    shapes = group_shapes(load_capture(args.capture))
+    flagged = 0
+
+    connection = psycopg2.connect(args.dsn)
+    try:
+        for shape, calls, sample in shapes:
+            with connection.cursor() as cursor:
+                try:
+                    findings = explain(cursor, sample)
+                except psycopg2.Error as e:
+                    findings = [f"explain failed: {str(e).strip()}"]
+                connection.rollback()
+
+            status = "ok  " if not findings else "MISS"
+            print(f"{status} {calls:>7}x  {shape}")
+            for finding in findings:
+                print(f"             - {finding}")
+            if findings:
+                flagged += 1
+                if args.show_sql:
+                    print(f"             {render_sql(sample)[0]}")
+    finally:
+        connection.close()
+
+    print(f"\n{len(shapes)} query shapes, {flagged} not fully index-served")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,220 @@
 """
 Pytest Configuration for Working Tracker Tests
 100% Coverage Configuration
+
+Unit tests share one in-memory database (FakeCollection / FakeDB) with the
+call surface and filter semantics of utils.db_adapter.SupabaseCollection:
+
+    from conftest import FakeDB
+    db = FakeDB(time_entries=[...])
 """
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 import sys
 import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add backend to path: the app directory (its modules import siblings as
+# top-level packages: utils, routes) ahead of the legacy modules next to it,
+# and both after the standard library (app/email.py would shadow it)
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(API_DIR, 'app'), API_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def matches(row: Dict, query: Optional[Dict]) -> bool:
+    """
+    Whether row satisfies a filter dict the way PostgREST applies it
+
+    Equality plus $in, $ne, $gt, $gte, $lt and $lte. Like SQL, a NULL
+    (missing) column satisfies no comparison, $ne included.
+    """
+    for field, condition in (query or {}).items():
+        value = row.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == "$in":
+                if value not in operand:
+                    return False
+            elif value is None:
+                return False
+            elif op == "$ne" and not value != operand:
+                return False
+            elif op == "$gt" and not value > operand:
+                return False
+            elif op == "$gte" and not value >= operand:
+                return False
+            elif op == "$lt" and not value < operand:
+                return False
+            elif op == "$lte" and not value <= operand:
+                return False
+    return True
+
+
+def _order(rows: List[Dict], sort: List[Tuple[str, int]]) -> List[Dict]:
+    # NULLS LAST ascending, NULLS FIRST descending (PostgreSQL's default)
+    for field, direction in reversed(sort):
+        rows = sorted(rows, key=lambda row: (row.get(field) is None, row.get(field)), reverse=direction == -1)
+    return rows
+
+
+class FakeCollection:
+    """
+    In-memory table behaving like SupabaseCollection
+
+    Every operation is recorded in `calls` as (operation, query). With
+    `fail` set the table is unreachable: find / find_one / count_documents
+    swallow the error like the adapter (no rows), everything else raises.
+    """
+
+    def __init__(self, rows=None):
+        self.rows: List[Dict] = list(rows or [])
+        self.calls: List[Tuple[str, Optional[Dict]]] = []
+        self.pages: List[Tuple[Any, int, bool]] = []  # (after, limit, descending) per find_page
+        self.updates: List[Dict] = []  # $set of every update
+        self.upserts: List[int] = []  # Rows per upsert_many
+        self.inserts = 0  # insert_one / insert_many calls
+        self.fail = False
+
+    def _call(self, operation: str, query: Optional[Dict] = None):
+        self.calls.append((operation, query))
+        if self.fail:
+            raise RuntimeError(f"{operation}: database unavailable")
+
+    def _matching(self, query: Optional[Dict]) -> List[Dict]:
+        return [row for row in self.rows if matches(row, query)]
+
+    async def find(self, query=None, projection=None, sort=None, limit=None) -> List[Dict]:
+        try:
+            self._call("find", query)
+        except RuntimeError:
+            return []
+        rows = _order(self._matching(query), sort or [])
+        return [dict(row) for row in rows[:limit or None]]
+
+    async def find_one(self, query, projection=None, sort=None) -> Optional[Dict]:
+        try:
+            self._call("find_one", query)
+        except RuntimeError:
+            return None
+        rows = _order(self._matching(query), sort or [])
+        return dict(rows[0]) if rows else None
+
+    async def find_page(self, query, sort_field, id_field, after=None, limit=100, descending=True) -> List[Dict]:
+        self._call("find_page", query)
+        self.pages.append((after, limit, descending))
+        await asyncio.sleep(0)
+        key = lambda row: (row[sort_field], row[id_field])
+        rows = sorted(self._matching(query), key=key, reverse=descending)
+        if after is not None:
+            after = tuple(after)
+            rows = [row for row in rows if (key(row) < after if descending else key(row) > after)]
+        return [dict(row) for row in rows[:limit]]
+
+    async def iterate(self, query, sort_field, id_field, batch_size=1000, descending=True):
+        after = None
+        while True:
+            rows = await self.find_page(query, sort_field, id_field, after, batch_size, descending)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1][sort_field], rows[-1][id_field])
+
+    async def count_documents(self, query=None) -> int:
+        try:
+            self._call("count", query)
+        except RuntimeError:
+            return 0
+        return len(self._matching(query))
+
+    async def insert_one(self, document: Dict) -> Dict:
+        self._call("insert", None)
+        self.inserts += 1
+        self.rows.append(dict(document))
+        return {"acknowledged": True, "inserted_id": dict(document)}
+
+    async def insert_many(self, documents: List[Dict]) -> Dict:
+        self._call("insert", None)
+        self.inserts += 1
+        self.rows.extend(dict(doc) for doc in documents)
+        return {"acknowledged": True, "inserted_ids": [dict(doc) for doc in documents]}
+
+    async def upsert_many(self, documents: List[Dict], on_conflict: str) -> Dict:
+        self._call("upsert", None)
+        columns = on_conflict.split(",")
+        keys = [tuple(doc[c] for c in columns) for doc in documents]
+        if len(set(keys)) != len(keys):
+            raise RuntimeError("ON CONFLICT DO UPDATE command cannot affect row a second time")
+        self.upserts.append(len(documents))
+        existing = {tuple(row.get(c) for c in columns): i for i, row in enumerate(self.rows)}
+        for key, doc in zip(keys, documents):
+            if key in existing:
+                self.rows[existing[key]] = dict(doc)
+            else:
+                self.rows.append(dict(doc))
+        return {"acknowledged": True, "upserted_count": len(documents)}
+
+    async def update_one(self, query: Dict, update: Dict) -> Dict:
+        # Like the adapter, every matching row is updated
+        self._call("update", query)
+        changes = {**update.get("$set", {}), **update.get("$inc", {})}
+        self.updates.append(update.get("$set", {}))
+        matched = self._matching(query)
+        for row in matched:
+            row.update(changes)
+        return {"acknowledged": True, "modified_count": len(matched)}
+
+    async def update_many(self, query: Dict, update: Dict) -> Dict:
+        return await self.update_one(query, update)
+
+    async def delete_one(self, query: Dict) -> Dict:
+        # Like the adapter, every matching row is deleted
+        self._call("delete", query)
+        kept = [row for row in self.rows if not matches(row, query)]
+        deleted, self.rows = len(self.rows) - len(kept), kept
+        return {"acknowledged": True, "deleted_count": deleted}
+
+    async def delete_many(self, query: Dict) -> Dict:
+        return await self.delete_one(query)
+
+
+class FakeDB:
+    """
+    Tables by attribute / item access, like SupabaseDatabase
+
+    FakeDB(users=[...]) seeds tables from row lists (or FakeCollection
+    instances); any other table starts empty on first use.
+    """
+
+    def __init__(self, **tables):
+        self._collections: Dict[str, FakeCollection] = {}
+        for name, rows in tables.items():
+            self._collections[name] = rows if isinstance(rows, FakeCollection) else FakeCollection(rows)
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection()
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
 
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    async def rpc(self, name: str, params: Optional[Dict] = None) -> Any:
+        raise NotImplementedError(f"rpc {name}")
 
-from server import app
 
 @pytest.fixture
 def client():
     """Test client for API testing"""
+    from server import app
     return TestClient(app)
 
 @pytest.fixture
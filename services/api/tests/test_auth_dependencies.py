@@ -0,0 +1,52 @@
+"""
+Unit Tests for the Route-Module Auth Dependencies
+"""
+
+import os
+import sys
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.testclient import TestClient
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from auth.dependencies import current_user, websocket_user
+
+
+async def token_user(request: Request):
+    if request.headers.get("Authorization") != "Bearer good":
+        raise HTTPException(status_code=401, detail="Invalid session")
+    return {"user_id": "u1", "company_id": "comp_1"}
+
+
+def websocket_app(bound=True):
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        user = await websocket_user(websocket)
+        await websocket.accept()
+        await websocket.send_json({"user": user})
+        await websocket.close()
+
+    if bound:
+        app.dependency_overrides[current_user] = token_user
+    return TestClient(app)
+
+
+def receive(client, url, **kwargs):
+    with client.websocket_connect(url, **kwargs) as websocket:
+        return websocket.receive_json()["user"]
+
+
+def test_websocket_user_from_header_or_token_parameter():
+    client = websocket_app()
+
+    assert receive(client, "/ws", headers={"Authorization": "Bearer good"})["user_id"] == "u1"
+    assert receive(client, "/ws?token=good")["user_id"] == "u1"
+
+
+def test_websocket_user_none_without_valid_credentials():
+    assert receive(websocket_app(), "/ws") is None
+    assert receive(websocket_app(), "/ws?token=forged") is None
+    assert receive(websocket_app(bound=False), "/ws?token=good") is None
@@ -0,0 +1,132 @@
+"""
+Unit Tests for the Batch Loader (query counts for list enrichment)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.batch_loader import BatchLoader
+
+from conftest import FakeDB
+
+
+def queries(db, name):
+    return len(db[name].calls)
+
+
+def company(tasks):
+    users = [{"user_id": f"user_{n}", "name": f"User {n}"} for n in range(20)]
+    rows = [{"task_id": f"task_{n:03d}", "assigned_to": f"user_{n % 25}" if n % 4 else None}
+            for n in range(tasks)]
+    entries = [{"entry_id": f"entry_{n:04d}", "task_id": f"task_{n % tasks:03d}", "duration": 1800}
+               for n in range(tasks * 3)]
+    return FakeDB(users=users, tasks=rows, time_entries=entries)
+
+
+async def enrich_tasks(db, tasks):
+    """The get_tasks enrichment"""
+    loader = BatchLoader(db)
+    entries = await loader.load_groups("time_entries", "task_id", [t["task_id"] for t in tasks], "entry_id")
+    assignees = await loader.load_many("users", "user_id", [t.get("assigned_to") for t in tasks])
+    for task in tasks:
+        task["tracked_hours"] = round(sum(e.get("duration", 0) for e in entries[task["task_id"]]) / 3600, 2)
+        if task.get("assigned_to"):
+            assignee = assignees.get(task["assigned_to"])
+            task["assignee_name"] = assignee.get("name") if assignee else None
+    return tasks
+
+
+@pytest.mark.parametrize("size", [10, 150])
+def test_enrichment_query_count_does_not_grow_with_rows(size):
+    db = company(size)
+    tasks = [dict(row) for row in db.tasks.rows]
+
+    enriched = asyncio.run(enrich_tasks(db, tasks))
+
+    assert queries(db, "users") == 1 and queries(db, "time_entries") == 1
+    assert all(task["tracked_hours"] == 1.5 for task in enriched)
+    assert enriched[1]["assignee_name"] == "User 1"
+    assert "assignee_name" not in enriched[0]
+    if size > 21:
+        # user_21 does not exist
+        assert enriched[21]["assignee_name"] is None
+
+
+def test_same_tick_loads_share_one_query_per_collection_and_are_memoized():
+    db = company(10)
+    loader = BatchLoader(db)
+
+    async def scenario():
+        first = await asyncio.gather(*(
+            [loader.load("users", "user_id", f"user_{n % 7}") for n in range(30)]
+            + [loader.load("tasks", "task_id", f"task_{n:03d}") for n in range(5)]
+            + [loader.load("users", "user_id", "ghost")]
+        ))
+        again = await loader.load_many("users", "user_id", ["user_3", "ghost", None])
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert queries(db, "users") == 1 and queries(db, "tasks") == 1
+    assert first[0]["name"] == "User 0" and first[-1] is None
+    assert again == {"user_3": {"user_id": "user_3", "name": "User 3"}, "ghost": None}
+
+
+def test_keys_are_chunked_and_groups_page_past_row_limits():
+    db = company(400)
+    loader = BatchLoader(db, max_batch=400)
+    chunked = BatchLoader(db, max_batch=30)
+
+    async def scenario():
+        users = await chunked.load_many("users", "user_id", [f"user_{n}" for n in range(70)])
+        entries = await loader.load_groups("time_entries", "task_id",
+                                           [f"task_{n:03d}" for n in range(400)], "entry_id")
+        return users, entries
+
+    users, entries = asyncio.run(scenario())
+
+    assert queries(db, "users") == 3
+    assert sum(1 for user in users.values() if user) == 20
+    # 400 tasks x 3 entries = 1200 rows read in two keyset pages
+    assert queries(db, "time_entries") == 2 and all(len(rows) == 3 for rows in entries.values())
+
+
+def test_filters_are_part_of_the_batch_key():
+    db = FakeDB(attendance=[
+        {"attendance_id": f"att_{n}", "user_id": f"user_{n % 2}", "date": f"2026-01-{n + 1:02d}"}
+        for n in range(10)
+    ])
+    loader = BatchLoader(db)
+
+    async def scenario():
+        early = await loader.load_groups("attendance", "user_id", ["user_0", "user_1"], "attendance_id",
+                                         {"date": {"$gte": "2026-01-01", "$lte": "2026-01-04"}})
+        everything = await loader.load_groups("attendance", "user_id", ["user_0", "user_1"], "attendance_id")
+        return early, everything
+
+    early, everything = asyncio.run(scenario())
+
+    assert [len(early[u]) for u in ("user_0", "user_1")] == [2, 2]
+    assert [len(everything[u]) for u in ("user_0", "user_1")] == [5, 5]
+    assert queries(db, "attendance") == 2
+
+
+def test_failed_batches_raise_and_are_not_memoized():
+    db = company(5)
+    loader = BatchLoader(db)
+
+    async def scenario():
+        db.users.fail = True
+        with pytest.raises(RuntimeError):
+            await loader.load_many("users", "user_id", ["user_1", "user_2"])
+        db.users.fail = False
+        return await loader.load_many("users", "user_id", ["user_1"])
+
+    assert asyncio.run(scenario())["user_1"]["name"] == "User 1"
+    assert queries(db, "users") == 2
@@ -0,0 +1,224 @@
+"""
+Unit Tests for Calendar Sync
+"""
+
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+import httpx
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+import utils.calendar_sync as calendar_sync
+import routes.google_calendar as google_calendar
+from utils.calendar_sync import CalendarSync, GOOGLE, OUTLOOK, google_event_id, entry_event
+from utils.http_client import OutboundHttp
+
+from conftest import FakeDB
+
+
+def mock_outbound(monkeypatch, handler):
+    http = OutboundHttp(retries=0)
+    transport = httpx.MockTransport(handler)
+    for host in ("www.googleapis.com", "graph.microsoft.com", "oauth2.googleapis.com"):
+        http._clients[("https", host, 443)] = httpx.AsyncClient(transport=transport)
+    monkeypatch.setattr(calendar_sync, "outbound", http)
+    monkeypatch.setattr(google_calendar, "outbound", http)
+    return http
+
+
+def google_item(event_id, status="confirmed"):
+    return {"id": event_id, "status": status, "summary": f"Event {event_id}",
+            "start": {"dateTime": "2026-01-05T09:00:00Z"}, "end": {"dateTime": "2026-01-05T10:00:00Z"}}
+
+
+def test_google_sync_is_incremental_and_resyncs_on_expired_token(monkeypatch):
+    calls = []
+
+    def handler(request):
+        params = dict(request.url.params)
+        calls.append(params)
+        token = params.get("syncToken")
+        if token is None and "pageToken" not in params:
+            return httpx.Response(200, json={"items": [google_item("a"), google_item("b")], "nextPageToken": "p2"})
+        if token is None:
+            return httpx.Response(200, json={"items": [google_item("c")], "nextSyncToken": "s1"})
+        if token == "s1":
+            return httpx.Response(200, json={"items": [google_item("a", "cancelled"), google_item("d")],
+                                             "nextSyncToken": "s2"})
+        return httpx.Response(410, json={"error": {"code": 410}})
+
+    http = mock_outbound(monkeypatch, handler)
+    db = FakeDB()
+    calendar = CalendarSync(db, GOOGLE, interval=0)
+
+    async def scenario():
+        first = await calendar.sync("u1", "tok")
+        second = await calendar.sync("u1", "tok")
+        db.calendar_sync_state.rows[0]["sync_token"] = "revoked"
+        third = await calendar.sync("u1", "tok")
+        await http.aclose()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first["full"] and first["changed"] == 3 and "timeMin" in calls[0]
+    assert not second["full"] and second["changed"] == 1 and second["removed"] == 1
+    assert "timeMin" not in calls[2] and calls[2]["syncToken"] == "s1"
+    assert third["full"] and db.calendar_sync_state.rows[0]["sync_token"] == "s1"
+    assert sorted(row["event_id"] for row in db.calendar_events.rows) == ["a", "b", "c"]
+    assert CalendarSync.covers(third, datetime.now(timezone.utc), datetime.now(timezone.utc) + timedelta(days=400))
+
+
+def test_sync_interval_serves_the_cache(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, json={"items": [google_item("a")], "nextSyncToken": "s1"})
+
+    http = mock_outbound(monkeypatch, handler)
+    calendar_sync._syncs.clear()
+    db = FakeDB()
+    calendar = CalendarSync(db, GOOGLE, interval=300)
+
+    async def scenario():
+        results = await asyncio.gather(*(calendar.sync("u1", "tok") for _ in range(5)))
+        calendar_sync._syncs.clear()
+        again = await calendar.sync("u1", "tok")
+        await http.aclose()
+        return results, again
+
+    results, again = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result["sync_token"] == "s1" for result in results)
+    assert again["synced_at"] == results[0]["synced_at"]
+
+
+def _batch_reply(request, statuses):
+    boundary = request.headers["Content-Type"].split("boundary=")[1]
+    parts = request.content.decode().split(f"--{boundary}")[1:-1]
+    out = []
+    for i, part in enumerate(parts):
+        body = json.loads(part.strip().split("\r\n\r\n")[-1])
+        status = statuses(body)
+        payload = {**body, "htmlLink": f"https://cal/{body['id']}"} if status == 200 else {"error": {"code": status}}
+        out.append(f"--resp\r\nContent-Type: application/http\r\nContent-ID: <response-item{i}>\r\n\r\n"
+                   f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n")
+    return httpx.Response(200, headers={"Content-Type": "multipart/mixed; boundary=resp"},
+                          content="".join(out) + "--resp--\r\n")
+
+
+def test_google_push_batches_and_is_idempotent(monkeypatch):
+    batches = []
+    duplicate = google_event_id("te_2")
+
+    def handler(request):
+        assert request.url.path == "/batch/calendar/v3"
+        batches.append(request)
+        return _batch_reply(request, lambda body: 409 if body["id"] == duplicate else 200)
+
+    http = mock_outbound(monkeypatch, handler)
+    db = FakeDB()
+    entries = [{"entry_id": f"te_{n}", "start_time": "2026-01-05T09:00:00+00:00",
+                "end_time": "2026-01-05T10:00:00+00:00"} for n in range(60)]
+    events = [entry_event(entry, "Work", "notes") for entry in entries]
+    calendar = CalendarSync(db, GOOGLE)
+
+    async def scenario():
+        first = await calendar.push_entries("u1", "tok", events)
+        second = await calendar.push_entries("u1", "tok", events[3:8])
+        await http.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert len(batches) == 2
+    assert [r["status"] for r in first].count("created") == 59
+    assert first[2] == {"entry_id": "te_2", "status": "exists", "http_status": 409, "event": None}
+    assert first[0]["event"]["web_link"] == f"https://cal/{google_event_id('te_0')}"
+    assert len(db.calendar_events.rows) == 59
+    assert db.calendar_events.rows[0]["entry_id"] == "te_0"
+    assert [r["status"] for r in second] == ["exists"] * 5
+    assert len(batches) == 2  # nothing new to push
+    assert set(google_event_id("entry_ab12_Z")) <= set("0123456789abcdefghijklmnopqrstuv")
+
+
+def test_outlook_delta_and_json_batch(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.path.endswith("/$batch"):
+            requests = json.loads(request.content)["requests"]
+            assert len(requests) <= calendar_sync.GRAPH_BATCH_LIMIT
+            return httpx.Response(200, json={"responses": [
+                {"id": r["id"], "status": 201, "body": {
+                    "id": f"ev-{r['body']['transactionId']}", "subject": r["body"]["subject"],
+                    "start": {"dateTime": r["body"]["start"]["dateTime"] + ".0000000"},
+                    "end": {"dateTime": r["body"]["end"]["dateTime"] + ".0000000"},
+                    "transactionId": r["body"]["transactionId"]}}
+                for r in requests]})
+        if "deltatoken" in str(request.url):
+            return httpx.Response(200, json={"value": [{"id": "ev-1", "@removed": {"reason": "deleted"}}],
+                                             "@odata.deltaLink": "https://graph.microsoft.com/v1.0/d?deltatoken=2"})
+        if "skiptoken" in str(request.url):
+            return httpx.Response(200, json={"value": [],
+                                             "@odata.deltaLink": "https://graph.microsoft.com/v1.0/d?deltatoken=1"})
+        assert request.headers["Prefer"].startswith("odata.maxpagesize=")
+        return httpx.Response(200, json={"value": [{"id": "ev-1", "subject": "Standup",
+                                                    "start": {"dateTime": "2026-01-05T09:00:00.0000000"},
+                                                    "end": {"dateTime": "2026-01-05T09:15:00.0000000"}}],
+                                         "@odata.nextLink": "https://graph.microsoft.com/v1.0/d?skiptoken=x"})
+
+    http = mock_outbound(monkeypatch, handler)
+    db = FakeDB()
+    calendar = CalendarSync(db, OUTLOOK, interval=0)
+    events = [entry_event({"entry_id": f"te_{n}", "start_time": "2026-01-06T09:00:00Z",
+                           "end_time": "2026-01-06T10:00:00Z"}, "Work", "") for n in range(25)]
+
+    async def scenario():
+        await calendar.sync("u1", "tok")
+        assert db.calendar_events.rows[0]["start_at"] == "2026-01-05T09:00:00+00:00"
+        second = await calendar.sync("u1", "tok")
+        pushed = await calendar.push_entries("u1", "tok", events)
+        await http.aclose()
+        return second, pushed
+
+    second, pushed = asyncio.run(scenario())
+
+    assert "calendarView/delta?startDateTime=" in calls[0]
+    assert second["removed"] == 1 and second["sync_token"].endswith("deltatoken=2")
+    assert sum("$batch" in call for call in calls) == 2
+    assert all(result["status"] == "created" for result in pushed)
+    assert {row["entry_id"] for row in db.calendar_events.rows} == {f"te_{n}" for n in range(25)}
+
+
+def test_token_refresh_is_single_flight(monkeypatch):
+    refreshes = []
+
+    async def handler(request):
+        refreshes.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"access_token": "fresh", "expires_in": 3600})
+
+    http = mock_outbound(monkeypatch, handler)
+    db = FakeDB()
+    connection = {"google_email": "a@b.c", "access_token": "stale", "refresh_token": "r",
+                  "token_expiry": "2000-01-01T00:00:00+00:00"}
+
+    async def scenario():
+        tokens = await asyncio.gather(*(google_calendar.refresh_token_if_needed(db, connection)
+                                        for _ in range(10)))
+        await http.aclose()
+        return tokens
+
+    tokens = asyncio.run(scenario())
+
+    assert tokens == ["fresh"] * 10
+    assert len(refreshes) == 1
+    assert len(db.calendar_connections.updates) == 1
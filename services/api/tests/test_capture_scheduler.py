@@ -0,0 +1,104 @@
+"""
+Unit Tests for Capture Scheduler
+"""
+
+import asyncio
+import os
+import pytest
+import sys
+import time
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.capture_scheduler import CaptureScheduler, ScheduledCapture
+
+from conftest import FakeDB
+
+
+def make_scheduler(fired):
+    scheduler = CaptureScheduler(workers=4)
+    scheduler.register_kind("screenshot", min_interval=0, max_interval=0)
+
+    async def callback(entry_id, user_id, company_id):
+        fired.append((scheduler.worker_id, entry_id))
+
+    scheduler.set_callback("screenshot", callback)
+    return scheduler
+
+
+class TestCaptureScheduler:
+    """Test single-heap scheduling, persistence and lease handoff"""
+
+    def test_fires_and_reschedules(self):
+        async def scenario():
+            fired = []
+            db = FakeDB()
+            scheduler = make_scheduler(fired)
+            await scheduler.start(db)
+            await scheduler.schedule("screenshot", "e1", "u1", "c1")
+            await asyncio.sleep(0.05)
+            await scheduler.cancel("screenshot", "e1")
+            await scheduler.stop()
+            return fired, db
+
+        fired, db = asyncio.run(scenario())
+        assert len(fired) >= 2
+        assert db.scheduled_captures.rows == []
+
+    def test_stopped_worker_hands_timers_to_another(self):
+        async def scenario():
+            fired = []
+            db = FakeDB()
+            first = make_scheduler(fired)
+            await first.start(db)
+            await first.schedule("screenshot", "e1", "u1", "c1")
+            await first.stop()
+
+            second = make_scheduler(fired)
+            await second.start(db)
+            await asyncio.sleep(0.05)
+            await second.stop()
+            return fired, first, second, db
+
+        fired, first, second, db = asyncio.run(scenario())
+        assert second.stats["recovered"] == 1
+        assert (second.worker_id, "e1") in fired
+        assert [row["lease_owner"] for row in db.scheduled_captures.rows] == [second.worker_id]
+
+    def test_cancel_elsewhere_drops_local_timer(self):
+        async def scenario():
+            fired = []
+            db = FakeDB()
+            scheduler = make_scheduler(fired)
+            scheduler.kinds["screenshot"].min_interval = 1
+            scheduler.kinds["screenshot"].max_interval = 1
+            await scheduler.start(db)
+            await scheduler.schedule("screenshot", "e1", "u1", "c1")
+            # Another worker stops the entry
+            await db.scheduled_captures.delete_one({"job_id": "screenshot:e1"})
+            await asyncio.sleep(1.1)
+            await scheduler.stop()
+            return fired, scheduler
+
+        fired, scheduler = asyncio.run(scenario())
+        assert fired == []
+        assert scheduler.stats["lost_lease"] == 1
+
+    def test_recovers_every_expired_timer_page_by_page(self):
+        now = time.time()
+        rows = [ScheduledCapture("screenshot", f"e{i}", "u1", "c1", 600, None, now + 3600)
+                .to_doc("dead-worker", now - 60 - i) for i in range(25)]
+
+        async def scenario():
+            db = FakeDB(scheduled_captures=rows)
+            scheduler = make_scheduler([])
+            scheduler.RECOVER_BATCH_SIZE = 10
+            await scheduler.start(db)
+            await scheduler.stop()
+            return scheduler, db
+
+        scheduler, db = asyncio.run(scenario())
+        assert scheduler.stats["recovered"] == 25
+        assert len(db.scheduled_captures.pages) == 3
+        assert {row["lease_owner"] for row in db.scheduled_captures.rows} == {scheduler.worker_id}
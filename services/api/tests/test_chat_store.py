@@ -0,0 +1,191 @@
+"""
+Unit Tests for the Chat Store and Fan-out
+"""
+
+import asyncio
+import os
+import sys
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.chat_fanout import ChatFanout, SLOW_CONSUMER_CLOSE
+from utils.chat_store import ChatStore, ReadReceipts
+from utils.id_generator import generate_message_id
+
+from conftest import FakeDB
+
+
+class ChatDB(FakeDB):
+    def __init__(self):
+        super().__init__()
+        self.rpcs = []
+        self.reject = False
+
+    async def rpc(self, name, params):
+        self.rpcs.append((name, params))
+        if name == "chat_mark_read" and self.reject:
+            raise RuntimeError("insert or update on table \"chat_read_state\" violates foreign key constraint")
+        if name == "chat_unread_counts":
+            return [{"channel_id": params["p_channel_ids"][0], "unread": 3}]
+        return len(params["p_receipts"])
+
+
+def message(n, channel_id="ch_1"):
+    return {"message_id": f"msg_{n:04d}", "channel_id": channel_id, "content": f"m{n}",
+            "created_at": f"2026-01-10T10:{n // 60:02d}:{n % 60:02d}+00:00"}
+
+
+def test_cursor_paging_both_directions():
+    db, store = ChatDB(), ChatStore(ring_size=10)
+    db.chat_messages.rows = [message(n) for n in range(25)]
+
+    async def scenario():
+        newest = await store.page(db, "ch_1", limit=10)
+        older = await store.page(db, "ch_1", limit=10, before=newest["cursors"]["before"])
+        oldest = await store.page(db, "ch_1", limit=10, before=older["cursors"]["before"])
+        await store.append(db, message(25))
+        await store.append(db, message(26))
+        since = await store.page(db, "ch_1", limit=10, after=newest["cursors"]["after"])
+        return newest, older, oldest, since
+
+    newest, older, oldest, since = asyncio.run(scenario())
+
+    assert [m["content"] for m in newest["messages"]] == [f"m{n}" for n in range(15, 25)]
+    assert [m["content"] for m in older["messages"]] == [f"m{n}" for n in range(5, 15)]
+    assert [m["content"] for m in oldest["messages"]] == [f"m{n}" for n in range(5)]
+    assert newest["has_more"] and older["has_more"] and not oldest["has_more"]
+    assert [m["content"] for m in since["messages"]] == ["m25", "m26"] and not since["has_more"]
+
+
+def test_channel_open_served_from_ring_and_catches_up():
+    db, store = ChatDB(), ChatStore(ring_size=20)
+    db.chat_messages.rows = [message(n) for n in range(30)]
+
+    async def scenario():
+        first = await store.page(db, "ch_1", limit=15)
+        # Sent through another worker: only the database has it
+        db.chat_messages.rows.append(message(30))
+        await store.append(db, message(31))
+        second = await store.page(db, "ch_1", limit=15)
+        await store.update(db, "msg_0031", {"content": "edited", "edited": True})
+        third = await store.page(db, "ch_1", limit=5)
+        deep = await store.page(db, "ch_1", limit=25)
+        return first, second, third, deep
+
+    first, second, third, deep = asyncio.run(scenario())
+
+    assert store.ring_loads == 1 and store.ring_hits == 3
+    assert [m["content"] for m in second["messages"]][-3:] == ["m29", "m30", "m31"]
+    assert third["messages"][-1]["content"] == "edited"
+    assert len(deep["messages"]) == 25 and deep["has_more"]
+    # Opens after the first cost one catch-up seek each, never a full reload
+    assert [page for page in db.chat_messages.pages if page[0] is None] == [(None, 21, True), (None, 26, True)]
+
+
+def test_small_channel_ring_is_complete():
+    db, store = ChatDB(), ChatStore(ring_size=50)
+    db.chat_messages.rows = [message(n) for n in range(3)] + [message(0, "ch_2")]
+
+    page = asyncio.run(store.page(db, "ch_1", limit=50))
+
+    assert [m["content"] for m in page["messages"]] == ["m0", "m1", "m2"]
+    assert not page["has_more"]
+
+
+def test_read_receipts_are_batched_latest_wins():
+    db = ChatDB()
+    receipts = ReadReceipts(flush_after=0.01).bind(db)
+
+    async def scenario():
+        for n in range(100):
+            receipts.mark("ch_1", "u1", f"msg_{n:04d}")
+            receipts.mark(f"ch_{n % 5}", "u2", f"msg_{n:04d}")
+        await asyncio.sleep(0.05)
+        receipts.mark("ch_9", "u3", "msg_0001")
+        counts = await receipts.unread_counts("u3", ["ch_9", "ch_8"])
+        return counts
+
+    counts = asyncio.run(scenario())
+
+    marks = [params["p_receipts"] for name, params in db.rpcs if name == "chat_mark_read"]
+    assert len(marks) == 2 and receipts.flushes == 2
+    assert {"channel_id": "ch_1", "user_id": "u1", "message_id": "msg_0099"} in marks[0]
+    assert len(marks[0]) == 6
+    assert counts == {"ch_9": 3, "ch_8": 0}
+
+
+def test_rejected_receipts_are_retried_once_then_dropped():
+    db = ChatDB()
+    db.reject = True
+    receipts = ReadReceipts(flush_after=60).bind(db)
+
+    async def scenario():
+        receipts.mark("ch_1", "ghost", "msg_0001")
+        first = await receipts.unread_counts("ghost", ["ch_1"])
+        receipts.mark("ch_2", "ghost", "msg_0002")
+        second = await receipts.unread_counts("ghost", ["ch_1"])
+        db.reject = False
+        return first, second, await receipts.flush()
+
+    first, second, written = asyncio.run(scenario())
+
+    marks = [params["p_receipts"] for name, params in db.rpcs if name == "chat_mark_read"]
+    assert first == second == {"ch_1": 3}
+    assert [len(batch) for batch in marks] == [1, 2, 1]
+    # ch_1 failed twice and was dropped; ch_2 gets its one retry
+    assert marks[-1] == [{"channel_id": "ch_2", "user_id": "ghost", "message_id": "msg_0002"}]
+    assert written == 1 and receipts.flushes == 1
+
+
+def test_message_ids_sort_by_time():
+    ids = []
+    for _ in range(3):
+        ids.append(generate_message_id())
+        asyncio.run(asyncio.sleep(0.002))
+    assert ids == sorted(ids) and all(len(i) == len(ids[0]) for i in ids)
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, stall=False):
+        self.delay = delay
+        self.stall = stall
+        self.received = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        self.received.append(text)
+
+    async def close(self, code=None):
+        self.closed_with = code
+
+
+def test_broadcast_does_not_wait_for_slow_members():
+    async def scenario():
+        fanout = ChatFanout(max_queue=4)
+        fast = [FakeSocket() for _ in range(50)]
+        stalled = FakeSocket(stall=True)
+        for i, socket in enumerate(fast):
+            fanout.add(socket, "ch_1", f"u{i}")
+        fanout.add(stalled, "ch_1", "slow")
+
+        loop = asyncio.get_running_loop()
+        enqueue = 0.0
+        for n in range(10):
+            started = loop.time()
+            fanout.broadcast("ch_1", {"type": "new_message", "n": n})
+            enqueue += loop.time() - started
+            await asyncio.sleep(0.001)
+        await fanout.drain()
+        await asyncio.sleep(0)
+        return fanout, fast, stalled, enqueue
+
+    fanout, fast, stalled, enqueue = asyncio.run(scenario())
+
+    assert enqueue < 0.05
+    assert all(len(socket.received) == 10 for socket in fast)
+    assert stalled.closed_with == SLOW_CONSUMER_CLOSE
+    assert fanout.connection_count("ch_1") == 50 and fanout.dropped == 1
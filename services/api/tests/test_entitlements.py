@@ -0,0 +1,89 @@
+"""
+Unit Tests for Entitlement Resolver
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.entitlements import EntitlementResolver, EntitlementScopeMiddleware
+
+
+class FakeSubscriptions:
+    def __init__(self, subscription=None):
+        self.subscription = subscription
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return dict(self.subscription) if self.subscription else None
+
+
+class FakeDB:
+    def __init__(self, subscription=None):
+        self.subscriptions = FakeSubscriptions(subscription)
+
+
+class TestEntitlementResolver:
+    """Test caching, invalidation and per-request memoization"""
+
+    def test_features_cached_across_checks(self):
+        """Many gated checks cost one subscription read"""
+        db = FakeDB({"company_id": "c1", "status": "active", "features": {"payroll": True}})
+        resolver = EntitlementResolver()
+
+        async def scenario():
+            return [await resolver.get_features(db, "c1") for _ in range(10)]
+
+        results = asyncio.run(scenario())
+
+        assert all(features == {"payroll": True} for features in results)
+        assert db.subscriptions.reads == 1
+
+    def test_missing_subscription_cached(self):
+        """Companies without a subscription are not re-queried on every check"""
+        db = FakeDB()
+        resolver = EntitlementResolver()
+
+        async def scenario():
+            await resolver.get_subscription(db, "c1")
+            return await resolver.get_subscription(db, "c1")
+
+        assert asyncio.run(scenario()) is None
+        assert db.subscriptions.reads == 1
+
+    def test_invalidate_picks_up_plan_change(self):
+        """Webhook/route invalidation makes the new plan visible immediately"""
+        db = FakeDB({"company_id": "c1", "status": "active", "features": {"payroll": False}})
+        resolver = EntitlementResolver()
+
+        async def scenario():
+            await resolver.get_features(db, "c1")
+            db.subscriptions.subscription["features"] = {"payroll": True}
+            resolver.invalidate("c1")
+            return await resolver.get_features(db, "c1")
+
+        assert asyncio.run(scenario()) == {"payroll": True}
+        assert db.subscriptions.reads == 2
+
+    def test_request_scope_memoizes_without_cache(self):
+        """Inside one request, repeated checks are free even with caching disabled"""
+        db = FakeDB({"company_id": "c1", "status": "active", "features": {}})
+        resolver = EntitlementResolver(ttl=0)
+
+        async def endpoint(scope, receive, send):
+            for _ in range(5):
+                await resolver.get_subscription(db, "c1")
+
+        middleware = EntitlementScopeMiddleware(endpoint)
+
+        async def scenario():
+            await middleware({"type": "http"}, None, None)
+            await middleware({"type": "http"}, None, None)
+
+        asyncio.run(scenario())
+        assert db.subscriptions.reads == 2
@@ -0,0 +1,132 @@
+"""
+Unit Tests for the FX Rate Service
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.fx_rates import FxRateService, RateMatrix, LIVE, STORED, FALLBACK
+
+USD_RATES = {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "JPY": 150.0}
+
+
+class Provider:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("provider down")
+        return dict(USD_RATES)
+
+
+class FakeTable:
+    def __init__(self, row=None):
+        self.row = row
+
+    async def find_one(self, query, projection=None):
+        return dict(self.row) if self.row else None
+
+    async def update_one(self, query, update):
+        if self.row is None:
+            return {"modified_count": 0}
+        self.row.update(update["$set"])
+        return {"modified_count": 1}
+
+    async def insert_one(self, document):
+        self.row = dict(document)
+
+
+class FakeDB:
+    def __init__(self, row=None):
+        self.exchange_rates = FakeTable(row)
+
+
+class TestRateMatrix:
+    """Test cross rates and vectorized conversion"""
+
+    def test_cross_rates_derived_from_one_base(self):
+        matrix = RateMatrix(USD_RATES, datetime.now(timezone.utc))
+
+        assert matrix.rate("EUR", "GBP") == pytest.approx(0.8 / 0.9)
+        assert matrix.rates_for("GBP")["USD"] == pytest.approx(1.25)
+        assert matrix.rates_for("GBP")["GBP"] == pytest.approx(1.0)
+
+    def test_convert_many_matches_one_by_one(self):
+        matrix = RateMatrix(USD_RATES, datetime.now(timezone.utc))
+        amounts = [100.0, 2500.5, 10.0]
+        targets = ["EUR", "JPY", "USD"]
+
+        converted = matrix.convert_many(amounts, "GBP", targets)
+
+        assert list(converted) == [round(a * matrix.rate("GBP", t), 2) for a, t in zip(amounts, targets)]
+        with pytest.raises(ValueError):
+            matrix.convert_many([1.0], "GBP", ["XXX"])
+
+
+class TestFxRateService:
+    """Test single-flight refresh and fallbacks"""
+
+    def test_concurrent_cold_requests_fetch_once_and_persist(self):
+        provider, db = Provider(), FakeDB()
+        service = FxRateService(fetch=provider.fetch)
+
+        async def burst():
+            return await asyncio.gather(*[service.matrix(db) for _ in range(20)])
+
+        matrices = asyncio.run(burst())
+
+        assert provider.calls == 1
+        assert all(matrix is matrices[0] and matrix.source == LIVE for matrix in matrices)
+        assert db.exchange_rates.row["rates"]["JPY"] == 150.0
+
+    def test_stale_rates_served_while_refreshing_in_background(self):
+        provider = Provider()
+        service = FxRateService(fetch=provider.fetch, ttl=60)
+
+        async def scenario():
+            first = await service.matrix()
+            first.fetched_at -= timedelta(seconds=120)
+            served = await service.matrix()
+            await service._refresh
+            return first, served, await service.matrix()
+
+        first, served, refreshed = asyncio.run(scenario())
+
+        assert served is first
+        assert refreshed is not first
+        assert provider.calls == 2
+
+    def test_outage_falls_back_to_stored_then_static_rates(self):
+        stored_at = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+        db = FakeDB({"base": "USD", "rates": {"USD": 1.0, "EUR": 0.95}, "fetched_at": stored_at})
+        provider = Provider(fail=True)
+
+        stored = asyncio.run(FxRateService(fetch=provider.fetch).matrix(db))
+        static = asyncio.run(FxRateService(fetch=provider.fetch).matrix(FakeDB()))
+
+        assert stored.source == STORED and stored.rate("USD", "EUR") == 0.95
+        assert static.source == FALLBACK and static.rate("USD", "INR") > 1
+
+    def test_failed_fetch_not_retried_before_retry_after(self):
+        provider = Provider(fail=True)
+        service = FxRateService(fetch=provider.fetch, retry_after=300)
+
+        async def scenario():
+            await service.matrix()
+            for _ in range(5):
+                await service.matrix()
+                await service._refresh
+
+        asyncio.run(scenario())
+
+        assert provider.calls == 1
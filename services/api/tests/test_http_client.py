@@ -0,0 +1,164 @@
+"""
+Unit Tests for the Outbound HTTP Layer
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.http_client import OutboundHttp, CircuitOpenError, CLOSED, OPEN
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    """Answers with the next queued status (200 once the queue is empty)"""
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            server.ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProvider)
+    server.lock = threading.Lock()
+    server.hits, server.ports, server.statuses = 0, set(), []
+    server.in_flight, server.max_in_flight, server.delay = 0, 0, 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run(http, coroutine):
+    async def scenario():
+        try:
+            return await coroutine
+        finally:
+            await http.aclose()
+    return asyncio.run(scenario())
+
+
+def test_connections_are_reused_across_calls(stub):
+    http = OutboundHttp()
+
+    async def calls():
+        return [(await http.get("jira", stub.url)).status_code for _ in range(5)]
+
+    assert run(http, calls()) == [200] * 5
+    assert stub.hits == 5
+    assert len(stub.ports) == 1
+
+
+def test_transient_failures_retried_with_backoff(stub):
+    stub.statuses = [503, 429]
+    http = OutboundHttp(retries=2, backoff=0.01)
+
+    response = run(http, http.get("asana", stub.url))
+
+    assert response.status_code == 200
+    assert stub.hits == 3
+
+
+def test_non_idempotent_post_not_retried_on_server_error(stub):
+    stub.statuses = [503]
+    http = OutboundHttp(retries=2, backoff=0.01)
+
+    response = run(http, http.post("slack", stub.url, json={"text": "hi"}))
+
+    assert response.status_code == 503
+    assert stub.hits == 1
+
+
+def test_circuit_opens_then_recovers_after_probe(stub):
+    stub.statuses = [500] * 3
+    http = OutboundHttp(retries=0, failure_threshold=3, reset_timeout=0.2)
+
+    async def scenario():
+        for _ in range(3):
+            await http.get("github", stub.url)
+        with pytest.raises(CircuitOpenError):
+            await http.get("github", stub.url)
+        opened = http.breaker("github", stub.url).state
+        await asyncio.sleep(0.25)
+        probe = await http.get("github", stub.url)
+        return opened, probe
+
+    opened, probe = run(http, scenario())
+
+    assert opened == OPEN
+    assert probe.status_code == 200
+    assert http.breaker("github", stub.url).state == CLOSED
+    assert stub.hits == 4
+
+
+def test_probe_without_outcome_does_not_wedge_half_open(stub):
+    stub.statuses = [500]
+    stub.delay = 0.2
+    http = OutboundHttp(retries=0, failure_threshold=1, reset_timeout=0.05)
+
+    async def scenario():
+        await http.get("hubspot", stub.url)
+        await asyncio.sleep(0.1)
+        # The probe's caller goes away mid-request
+        probe = asyncio.ensure_future(http.get("hubspot", stub.url))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        stub.delay = 0.0
+        return await http.get("hubspot", stub.url)
+
+    response = run(http, scenario())
+
+    assert response.status_code == 200
+    assert http.breaker("hubspot", stub.url).state == CLOSED
+
+
+def test_concurrency_limited_per_provider(stub):
+    stub.delay = 0.05
+    http = OutboundHttp(concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*[http.get("salesforce", stub.url) for _ in range(6)])
+
+    responses = run(http, burst())
+
+    assert all(response.status_code == 200 for response in responses)
+    assert stub.max_in_flight <= 2
@@ -0,0 +1,283 @@
+"""
+Unit Tests for the Integration Sync Engine
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+import utils.integration_sync as integration_sync
+from utils.http_client import OutboundHttp
+from auth.dependencies import current_user
+from routes import integrations as integration_routes
+from utils.integration_sync import IntegrationSync, JiraSource, SUCCEEDED, PARTIAL, SyncError, WorklogRejected
+
+from conftest import FakeDB
+
+
+def sync_db(integration, time_entries=()):
+    return FakeDB(integrations=[integration], time_entries=time_entries)
+
+
+class FakeSource:
+    """Two pages of issues (overlapping by one) and a failing 'projects' type"""
+    entity_types = ("issues", "projects")
+
+    def __init__(self):
+        self.posted = []
+        self.refuse = set()
+        self.reject = set()
+
+    async def changes(self, entity_type, cursor):
+        if entity_type == "projects":
+            raise SyncError("Jira /project/search: HTTP 503")
+        for page in (["1", "2", "3"], ["3", "4", "5"]):
+            yield [{"entity_type": "issues", "external_id": i, "external_key": f"APP-{i}",
+                    "title": f"Issue {i}", "status": "open", "external_updated_at": None, "data": {}}
+                   for i in page]
+        cursor["updated_since"] = "2026-01-10T00:00:00+00:00"
+
+    async def add_worklogs(self, worklogs):
+        self.posted.extend(worklogs)
+        return [None if w["issue_key"] in self.refuse
+                else WorklogRejected(w["issue_key"], 400) if w["issue_key"] in self.reject
+                else f"wl-{w['issue_key']}" for w in worklogs]
+
+
+def integration():
+    return {"integration_id": "integ_1", "company_id": "comp_1", "integration_type": "jira",
+            "sync_cursors": {"projects": {"marker": "old"}}, "sync_status": {}}
+
+
+def entry(entry_id, notes, duration=3600):
+    return {"entry_id": entry_id, "company_id": "comp_1", "status": "stopped", "notes": notes,
+            "duration": duration, "start_time": "2026-01-09T09:00:00+00:00",
+            "end_time": "2026-01-09T10:00:00+00:00", "created_at": "2026-01-09T08:00:00+00:00"}
+
+
+def test_changes_upserted_in_deduplicated_batches():
+    db = sync_db(integration())
+
+    status = asyncio.run(IntegrationSync(db, integration(), FakeSource(), batch_size=4).run(
+        ["issues"], export_worklogs=False))
+
+    assert status["state"] == SUCCEEDED
+    assert sorted(row["external_id"] for row in db.integration_entities.rows) == ["1", "2", "3", "4", "5"]
+    assert db.integration_entities.upserts == [4, 1]
+    assert db.integration_entities.rows[0]["company_id"] == "comp_1"
+    saved = db.integrations.rows[0]
+    assert saved["sync_cursors"]["issues"] == {"updated_since": "2026-01-10T00:00:00+00:00"}
+    assert saved["sync_status"]["entities"]["issues"] == {"state": SUCCEEDED, "fetched": 6, "synced": 5}
+    assert db.integration_sync_logs.rows[0]["status"] == "success"
+
+
+def test_failed_entity_type_keeps_its_watermark():
+    db = sync_db(integration())
+
+    status = asyncio.run(IntegrationSync(db, integration(), FakeSource()).run(export_worklogs=False))
+
+    assert status["state"] == PARTIAL
+    saved = db.integrations.rows[0]
+    assert saved["sync_cursors"]["projects"] == {"marker": "old"}
+    assert "HTTP 503" in saved["error_message"]
+    assert db.integration_sync_logs.rows[0]["status"] == "partial"
+
+
+def exporting_integration(since="2026-01-09T00:00:00+00:00"):
+    row = {**integration(), "config": {"export_worklogs": True}}
+    if since:
+        row["sync_cursors"] = {**row["sync_cursors"], "worklogs": {"since": since}}
+    return row
+
+
+def test_worklog_export_is_opt_in_and_never_backfills_history():
+    entries = [entry("te_1", "APP-1 login bug")]
+    source = FakeSource()
+
+    db = sync_db(integration(), entries)
+    status = asyncio.run(IntegrationSync(db, integration(), source).run(["issues"]))
+    assert "worklogs" not in status["entities"]
+
+    db = sync_db(exporting_integration(since=None), entries)
+    status = asyncio.run(IntegrationSync(db, db.integrations.rows[0], source).run(["issues"]))
+
+    assert status["entities"]["worklogs"]["state"] == SUCCEEDED
+    assert source.posted == [] and db.integration_worklogs.rows == []
+    assert db.integrations.rows[0]["sync_cursors"]["worklogs"]["since"] > entries[0]["end_time"]
+
+
+def test_worklogs_exported_once_for_known_issues():
+    entries = [entry("te_1", "APP-1 login bug"), entry("te_2", "APP-9 unknown issue"),
+               entry("te_3", "no issue key"), entry("te_4", "APP-2 too short", duration=30),
+               entry("te_5", "APP-3 already exported"), entry("te_6", "APP-4 refused")]
+    db = sync_db(exporting_integration(), entries)
+    db.integration_worklogs.rows.append({"integration_id": "integ_1", "entry_id": "te_5"})
+    source = FakeSource()
+    source.refuse = {"APP-4"}
+
+    status = asyncio.run(IntegrationSync(db, db.integrations.rows[0], source).run(["issues"]))
+
+    assert [w["issue_key"] for w in source.posted] == ["APP-1", "APP-4"]
+    assert {row["entry_id"] for row in db.integration_worklogs.rows} == {"te_1", "te_5"}
+    assert status["entities"]["worklogs"]["state"] == "failed"
+    assert db.integrations.rows[0]["sync_cursors"]["worklogs"] == {"since": "2026-01-09T00:00:00+00:00"}
+
+    # The refused worklog is retried; the exported one is not posted again
+    source.posted, source.refuse = [], set()
+    status = asyncio.run(IntegrationSync(db, db.integrations.rows[0], source).run(["issues"]))
+
+    assert [w["issue_key"] for w in source.posted] == ["APP-4"]
+    assert status["state"] == SUCCEEDED
+    assert "since" in db.integrations.rows[0]["sync_cursors"]["worklogs"]
+
+
+def test_rejected_worklog_recorded_and_not_retried():
+    entries = [entry("te_1", "APP-1 login bug"), entry("te_2", "APP-2 closed issue")]
+    db = sync_db(exporting_integration(), entries)
+    source = FakeSource()
+    source.reject = {"APP-2"}
+
+    status = asyncio.run(IntegrationSync(db, db.integrations.rows[0], source).run(["issues"]))
+
+    assert status["state"] == SUCCEEDED
+    assert status["entities"]["worklogs"]["synced"] == 1
+    rejected = next(row for row in db.integration_worklogs.rows if row["entry_id"] == "te_2")
+    assert rejected["worklog_id"] is None and rejected["rejected_status"] == 400
+    assert db.integrations.rows[0]["sync_cursors"]["worklogs"]["since"] > entries[1]["end_time"]
+
+    # Moving the watermark back still never reposts the rejected entry
+    db.integrations.rows[0]["sync_cursors"]["worklogs"] = {"since": "2026-01-09T00:00:00+00:00"}
+    source.posted = []
+    asyncio.run(IntegrationSync(db, db.integrations.rows[0], source).run(["issues"]))
+    assert source.posted == []
+
+
+def test_jira_worklog_rejection_depends_on_status(monkeypatch):
+    statuses = iter([400, 429])
+
+    async def handler(request):
+        return httpx.Response(next(statuses), json={})
+
+    http = OutboundHttp()
+    http._clients[("https", "jira.test", 443)] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(integration_sync, "outbound", http)
+    source = JiraSource("https://jira.test", "a@b.c", "token")
+    worklog = {"issue_key": "APP-1", "seconds": 600, "started": datetime.now(timezone.utc)}
+
+    async def post_twice():
+        results = [(await source.add_worklogs([worklog]))[0] for _ in range(2)]
+        await http.aclose()
+        return results
+
+    rejected, throttled = asyncio.run(post_twice())
+
+    assert isinstance(rejected, WorklogRejected) and rejected.status == 400
+    assert throttled is None
+
+
+USERS = {"token-1": {"user_id": "u1", "company_id": "comp_1", "role": "admin"},
+         "token-2": {"user_id": "u2", "company_id": "comp_2", "role": "admin"}}
+
+
+@pytest.fixture
+def sync_client(monkeypatch):
+    async def token_user(request: Request):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token not in USERS:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return USERS[token]
+
+    async def no_sync(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(integration_routes, "run_integration_sync", no_sync)
+    app = FastAPI()
+    app.include_router(integration_routes.router)
+    app.state.db = FakeDB(integrations=[integration()])
+    app.dependency_overrides[current_user] = token_user
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method,path", [("post", "/api/integrations/integ_1/sync/run"),
+                                         ("get", "/api/integrations/integ_1/sync/status")])
+def test_sync_endpoints_scoped_to_the_callers_company(sync_client, method, path):
+    call = getattr(sync_client, method)
+
+    assert call(path).status_code == 401
+    assert call(path, headers={"Authorization": "Bearer token-2"}).status_code == 404
+    assert call(path, headers={"Authorization": "Bearer token-1"}).status_code == 200
+
+
+@pytest.fixture
+def quota(monkeypatch):
+    slots = {"limit": 1, "used": 0}
+
+    async def consume(db, company_id):
+        allowed = slots["used"] < slots["limit"]
+        slots["used"] += allowed
+        return {"allowed": allowed, "limit": slots["limit"], "used": slots["used"], "remaining": 0}
+
+    async def release(db, company_id):
+        slots["used"] -= 1
+
+    monkeypatch.setattr(integration_routes, "consume_integration_quota", consume)
+    monkeypatch.setattr(integration_routes, "release_integration_quota", release)
+    return slots
+
+
+def test_integration_create_and_delete_hold_a_quota_slot(sync_client, quota):
+    headers = {"Authorization": "Bearer token-2"}
+    body = {"integration_type": "jira", "name": "Jira"}
+
+    created = sync_client.post("/api/integrations", json=body, headers=headers)
+    assert created.status_code == 200 and quota["used"] == 1
+    assert sync_client.post("/api/integrations", json=body, headers=headers).status_code == 403
+
+    integration_id = created.json()["integration_id"]
+    assert sync_client.delete("/api/integrations/integ_1", headers=headers).status_code == 404
+    assert sync_client.delete(f"/api/integrations/{integration_id}", headers=headers).status_code == 200
+    assert quota["used"] == 0
+    assert sync_client.post("/api/integrations", json=body, headers=headers).status_code == 200
+
+
+def test_jira_pages_fetched_concurrently_after_the_first(monkeypatch):
+    in_flight, peak, starts = 0, 0, []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        start = int(request.url.params["startAt"])
+        starts.append(start)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        issues = [{"id": str(n), "key": f"APP-{n}", "fields": {"summary": "x"}}
+                  for n in range(start, min(start + 50, 420))]
+        return httpx.Response(200, json={"startAt": start, "maxResults": 50, "total": 420, "issues": issues})
+
+    http = OutboundHttp()
+    http._clients[("https", "jira.test", 443)] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(integration_sync, "outbound", http)
+    source = JiraSource("https://jira.test", "a@b.c", "token")
+
+    async def collect():
+        cursor = {"updated_since": (datetime.now(timezone.utc) - timedelta(minutes=90)).isoformat()}
+        pages = [page async for page in source.changes("issues", cursor)]
+        await http.aclose()
+        return pages, cursor
+
+    pages, cursor = asyncio.run(collect())
+
+    assert [row["external_key"] for page in pages for row in page] == [f"APP-{n}" for n in range(420)]
+    assert starts[0] == 0 and sorted(starts) == list(range(0, 420, 50))
+    assert 1 < peak <= integration_sync.PAGE_CONCURRENCY
+    assert "updated >= -9" in source.issue_jql(datetime.now(timezone.utc) - timedelta(minutes=90))
+    assert cursor["updated_since"] > (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
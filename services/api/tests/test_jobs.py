@@ -0,0 +1,148 @@
+"""
+Unit Tests for Background Jobs
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+import sys
+from fastapi import HTTPException
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.jobs import (
+    JobQueue, job_key, job_response, QUEUED, RUNNING, SUCCEEDED, FAILED, INTERACTIVE, BULK, JOB_TIME_LIMIT
+)
+
+from conftest import FakeDB
+
+
+class FakeProducer:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    def send(self, task_name, job_id, queue):
+        if self.fail:
+            raise ConnectionError("broker down")
+        self.sent.append((task_name, job_id, queue))
+
+
+def test_job_key_ignores_parameter_order_but_not_company():
+    assert job_key("invoice_pdf", {"a": 1, "b": 2}, "c1") == job_key("invoice_pdf", {"b": 2, "a": 1}, "c1")
+    assert job_key("invoice_pdf", {"a": 1}, "c1") != job_key("invoice_pdf", {"a": 1}, "c2")
+
+
+class TestJobQueue:
+    """Test deduplication, result caching and worker execution"""
+
+    def test_identical_in_flight_jobs_are_enqueued_once(self):
+        db, producer = FakeDB(), FakeProducer()
+        jobs = JobQueue(producer)
+        prepared = []
+
+        async def prepare(job):
+            prepared.append(job["job_id"])
+
+        async def scenario():
+            first = await jobs.submit(db, "custom_report", {"report_type": "attendance"}, prepare=prepare)
+            second = await jobs.submit(db, "custom_report", {"report_type": "attendance"}, prepare=prepare)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert first["job_id"] == second["job_id"]
+        assert first["status"] == QUEUED
+        assert producer.sent == [("run_custom_report_job", first["job_id"], BULK)]
+        assert prepared == [first["job_id"]]
+
+    def test_succeeded_result_is_served_until_it_expires(self):
+        db, producer = FakeDB(), FakeProducer()
+        jobs = JobQueue(producer)
+
+        async def handler(db, job):
+            return {"pdf_base64": "JVBER", "filename": "invoice_1.pdf"}
+
+        async def scenario():
+            job = await jobs.submit(db, "invoice_pdf", {"invoice_number": "1"})
+            assert await jobs.run(db, job["job_id"], handler) == SUCCEEDED
+            cached = await jobs.submit(db, "invoice_pdf", {"invoice_number": "1"})
+
+            # Expire the cached result; the next request runs again
+            db.jobs.rows[0]["expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+            fresh = await jobs.submit(db, "invoice_pdf", {"invoice_number": "1"})
+            return job, cached, fresh
+
+        job, cached, fresh = asyncio.run(scenario())
+
+        assert cached["job_id"] == job["job_id"]
+        assert cached["result"]["filename"] == "invoice_1.pdf"
+        assert job_response(cached).status_code == 200
+        assert fresh["job_id"] != job["job_id"]
+        assert job_response(fresh).status_code == 202
+        assert [queue for _, _, queue in producer.sent] == [INTERACTIVE, INTERACTIVE]
+
+    def test_failed_handler_marks_job_failed(self):
+        db = FakeDB()
+        jobs = JobQueue(FakeProducer())
+
+        async def handler(db, job):
+            raise ValueError("no data")
+
+        async def scenario():
+            job = await jobs.submit(db, "productivity_analysis", {"user_id": "u1"})
+            status = await jobs.run(db, job["job_id"], handler)
+            return status, await jobs.get(db, job["job_id"])
+
+        status, job = asyncio.run(scenario())
+
+        assert status == FAILED
+        assert job["error"] == "no data"
+        assert "expires_at" not in job
+
+    def test_broker_failure_is_503_and_not_left_in_flight(self):
+        db = FakeDB()
+        jobs = JobQueue(FakeProducer(fail=True))
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(jobs.submit(db, "timesheet_pdf", {"user_name": "Ada"}))
+
+        assert exc.value.status_code == 503
+        assert db.jobs.rows[0]["status"] == FAILED
+
+    def test_jobs_stuck_past_the_time_limit_are_failed_not_reused(self):
+        db, producer = FakeDB(), FakeProducer()
+        jobs = JobQueue(producer)
+        lost = (datetime.now(timezone.utc) - timedelta(seconds=JOB_TIME_LIMIT + 60)).isoformat()
+
+        async def scenario():
+            stuck = await jobs.submit(db, "invoice_pdf", {"invoice_number": "7"})
+            db.jobs.rows[0].update(status=RUNNING, created_at=lost)
+            retried = await jobs.submit(db, "invoice_pdf", {"invoice_number": "7"})
+
+            other = await jobs.submit(db, "invoice_pdf", {"invoice_number": "8"})
+            db.jobs.rows[-1]["created_at"] = lost
+            await jobs.fail_stale(db)
+            return stuck, retried, other
+
+        stuck, retried, other = asyncio.run(scenario())
+
+        statuses = {row["job_id"]: row["status"] for row in db.jobs.rows}
+        assert retried["job_id"] != stuck["job_id"]
+        assert statuses == {stuck["job_id"]: FAILED, retried["job_id"]: QUEUED, other["job_id"]: FAILED}
+        assert len(producer.sent) == 3
+
+    def test_prepare_rejection_passes_through_and_is_not_enqueued(self):
+        db, producer = FakeDB(), FakeProducer()
+        jobs = JobQueue(producer)
+
+        async def over_quota(job):
+            raise HTTPException(status_code=403, detail="export_limit_reached")
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(jobs.submit(db, "custom_report", {"report_type": "time"}, prepare=over_quota))
+
+        assert exc.value.status_code == 403
+        assert db.jobs.rows[0]["status"] == FAILED and producer.sent == []
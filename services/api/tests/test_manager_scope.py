@@ -0,0 +1,92 @@
+"""
+Unit Tests for Manager Scope
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.manager_scope import ManagerScopeService
+
+
+class FakeAssignments:
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = 0
+
+    async def find(self, query, projection=None):
+        self.reads += 1
+        return [dict(row) for row in self.rows if row["manager_id"] == query["manager_id"]]
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.manager_assignments = FakeAssignments(rows)
+
+
+MANAGER = {"user_id": "m1", "role": "manager", "company_id": "c1"}
+
+
+class TestManagerScope:
+    """Test assignment resolution, caching and bulk filtering"""
+
+    def test_assignments_loaded_once(self):
+        """Repeated access checks cost one assignment read"""
+        db = FakeDB([
+            {"manager_id": "m1", "employee_id": "e1"},
+            {"manager_id": "m1", "employee_id": "e2"},
+            {"manager_id": "m2", "employee_id": "e3"},
+        ])
+        scopes = ManagerScopeService()
+
+        async def scenario():
+            return [await scopes.can_access(db, MANAGER, target) for target in ("e1", "e2", "e3", "m1")]
+
+        assert asyncio.run(scenario()) == [True, True, False, True]
+        assert db.manager_assignments.reads == 1
+
+    def test_inactive_and_legacy_rows(self):
+        """Inactive rows are ignored; user_ids lists are still honoured"""
+        db = FakeDB([
+            {"manager_id": "m1", "employee_id": "e1", "active": False},
+            {"manager_id": "m1", "user_ids": ["e2", "e3"]},
+        ])
+        scopes = ManagerScopeService()
+
+        assert asyncio.run(scopes.get_assigned(db, "m1")) == frozenset({"e2", "e3"})
+
+    def test_filter_accessible(self):
+        """Bulk filtering keeps order and applies role rules"""
+        db = FakeDB([{"manager_id": "m1", "employee_id": "e2"}])
+        scopes = ManagerScopeService()
+        ids = ["e1", "e2", "m1", "e3"]
+
+        async def scenario():
+            return (
+                await scopes.filter_accessible(db, MANAGER, ids),
+                await scopes.filter_accessible(db, {"user_id": "a1", "role": "admin"}, ids),
+                await scopes.filter_accessible(db, {"user_id": "e1", "role": "employee"}, ids),
+            )
+
+        manager, admin, employee = asyncio.run(scenario())
+
+        assert manager == ["e2", "m1"]
+        assert admin == ids
+        assert employee == ["e1"]
+
+    def test_invalidate_picks_up_new_assignment(self):
+        """Assigning an employee is visible immediately after invalidation"""
+        db = FakeDB([])
+        scopes = ManagerScopeService()
+
+        async def scenario():
+            before = await scopes.can_access(db, MANAGER, "e1")
+            db.manager_assignments.rows.append({"manager_id": "m1", "employee_id": "e1"})
+            scopes.invalidate("m1")
+            return before, await scopes.can_access(db, MANAGER, "e1")
+
+        assert asyncio.run(scenario()) == (False, True)
@@ -0,0 +1,100 @@
+"""
+Unit Tests for Model Artifact Cache
+"""
+
+import joblib
+import os
+import numpy as np
+import pytest
+import sys
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from ai_engines.model_manager import ModelManager
+from ai_engines.model_cache import ModelCache
+
+class TestModelCache:
+    """Test lazy loading, hot-swap and metrics"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        manager = ModelManager(str(tmp_path))
+        for version, scale in [('v1', 1), ('v2', 2)]:
+            path = str(tmp_path / f'{version}.pkl')
+            joblib.dump({'weights': np.arange(4) * scale}, path)
+            manager.register_model('demo', version, path, {}, 'hash')
+        return manager
+
+    @pytest.fixture
+    def cache(self, manager):
+        cache = ModelCache(manager)
+        cache.register('demo', lambda artifact: artifact)
+        return cache
+
+    def test_loads_once_and_memory_maps(self, manager, cache):
+        """Second lookup is a cache hit and arrays are memory-mapped"""
+        manager.promote_to_production('demo', 'v1')
+
+        first = cache.get('demo')
+        second = cache.get('demo')
+
+        assert first is second
+        assert isinstance(first['weights'], np.memmap)
+        assert cache.stats()['loads'] == 1
+        assert cache.stats()['hits'] == 1
+
+    def test_hot_swap_on_promote_and_rollback(self, manager, cache):
+        """Promotion and rollback switch the served version"""
+        manager.promote_to_production('demo', 'v1')
+        assert list(cache.get('demo')['weights']) == [0, 1, 2, 3]
+
+        manager.promote_to_production('demo', 'v2')
+        assert list(cache.get('demo')['weights']) == [0, 2, 4, 6]
+        assert cache.stats()['cached_models'] == ['demo:v2']
+
+        manager.rollback('demo')
+        assert list(cache.get('demo')['weights']) == [0, 1, 2, 3]
+
+    def test_disabled_model_is_not_served(self, manager, cache):
+        """Kill switch blocks cached model"""
+        manager.promote_to_production('demo', 'v1')
+        cache.get('demo')
+        manager.disable_model('demo')
+
+        with pytest.raises(RuntimeError):
+            cache.get('demo')
+
+
+class TestPromoteIfValidated:
+    """Test the validation gate trained models pass to go live"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        manager = ModelManager(str(tmp_path))
+        for version, score in [('v1', 0.8), ('v2', 0.6), ('v3', 0.9), ('v4', 0.3)]:
+            path = str(tmp_path / f'{version}.pkl')
+            joblib.dump({}, path)
+            manager.register_model('demo', version, path, {'test_score': score}, 'hash')
+        return manager
+
+    def test_promotes_only_passing_versions_no_worse_than_live(self, manager):
+        assert manager.promote_if_validated('demo', 'v1', 'test_score', 0.5)
+        assert not manager.promote_if_validated('demo', 'v2', 'test_score', 0.5)
+        assert not manager.promote_if_validated('demo', 'v4', 'test_score', 0.2)
+        assert manager.get_active_version('demo') == 'v1'
+
+        assert manager.promote_if_validated('demo', 'v3', 'test_score', 0.5)
+        assert manager.get_active_version('demo') == 'v3'
+
+    def test_below_minimum_or_missing_metric_not_promoted(self, manager):
+        assert not manager.promote_if_validated('demo', 'v4', 'test_score', 0.5)
+        assert not manager.promote_if_validated('demo', 'v1', 'accuracy', 0.5)
+        assert manager.get_active_version('demo') is None
+
+    def test_disabled_model_stays_disabled(self, manager):
+        manager.promote_to_production('demo', 'v1')
+        manager.disable_model('demo')
+
+        assert not manager.promote_if_validated('demo', 'v3', 'test_score', 0.5)
+        assert not manager.is_enabled('demo')
@@ -0,0 +1,158 @@
+"""
+Unit Tests for the Notification Inbox
+"""
+
+import asyncio
+import os
+import sys
+
+from starlette.responses import Response
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.notifications import COUNT_EVENT, NotificationInbox
+
+from conftest import FakeCollection, FakeDB, matches
+
+
+class NotificationsTable(FakeCollection):
+    """notifications; keeps counters the way the migration's triggers do"""
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    async def insert_many(self, documents):
+        result = await super().insert_many(documents)
+        for doc in documents:
+            self.db.count(doc, 1)
+        return result
+
+    async def delete_one(self, query):
+        doomed = [row for row in self.rows if matches(row, query)]
+        result = await super().delete_one(query)
+        for row in doomed:
+            if not row["read"]:
+                self.db.count(row, -1)
+        return result
+
+
+class InboxDB(FakeDB):
+    def __init__(self):
+        super().__init__(notifications=NotificationsTable(self))
+
+    def count(self, row, delta):
+        counters = self.notification_counters.rows
+        key = {"user_id": row["user_id"], "company_id": row["company_id"]}
+        counter = next((c for c in counters if matches(c, key)), None)
+        if counter is None:
+            counters.append({**key, "unread": delta})
+        else:
+            counter["unread"] += delta
+
+    async def rpc(self, name, params):
+        assert name == "mark_notifications_read"
+        changed = 0
+        for row in self.notifications.rows:
+            if (row["user_id"] == params["p_user_id"] and row["company_id"] == params["p_company_id"]
+                    and not row["read"]
+                    and (params["p_notification_ids"] is None
+                         or row["notification_id"] in params["p_notification_ids"])):
+                row["read"] = True
+                self.count(row, -1)
+                changed += 1
+        return changed
+
+
+def inbox_with_events():
+    events = []
+
+    async def deliver(user_id, event):
+        events.append((user_id, event))
+
+    inbox = NotificationInbox()
+    inbox.configure(deliver)
+    return inbox, events
+
+
+def test_bulk_create_is_one_insert_and_pushes_counts():
+    db = InboxDB()
+    inbox, events = inbox_with_events()
+    admins = [f"admin_{n}" for n in range(40)]
+
+    async def scenario():
+        ids = await inbox.create_many(db, "comp_1", admins + ["admin_0", None], "wage_approved",
+                                      "Employee Wage Response", "approved", {"wage_id": "w1"})
+        counts = [await inbox.unread_count(db, user, "comp_1") for user in ("admin_0", "admin_39", "nobody")]
+        return ids, counts
+
+    ids, counts = asyncio.run(scenario())
+
+    assert len(ids) == 40 and len(set(ids)) == 40
+    assert db.notifications.inserts == 1
+    assert counts == [1, 1, 0]
+    assert sorted(user for user, _ in events) == sorted(admins)
+    assert all(event["type"] == COUNT_EVENT and event["delta"] == 1 for _, event in events)
+
+
+def test_mark_read_pushes_the_new_count():
+    db = InboxDB()
+    inbox, events = inbox_with_events()
+
+    async def scenario():
+        ids = []
+        for n in range(5):
+            ids += await inbox.create_many(db, "comp_1", ["u1"], "t", f"n{n}", "m")
+        events.clear()
+        some = await inbox.mark_read(db, "u1", "comp_1", ids[:2])
+        again = await inbox.mark_read(db, "u1", "comp_1", ids[:2])
+        deleted = await inbox.delete(db, "u1", ids[2])
+        rest = await inbox.mark_read(db, "u1", "comp_1")
+        return some, again, deleted, rest, await inbox.unread_count(db, "u1", "comp_1")
+
+    some, again, deleted, rest, unread = asyncio.run(scenario())
+
+    assert (some, again, deleted, rest, unread) == (2, 0, 1, 2, 0)
+    assert [(event["delta"], event["unread"]) for _, event in events] == [(-2, 3), (-1, 2), (-2, 0)]
+
+
+def test_inbox_pages_newest_first_with_cursor():
+    db = InboxDB()
+    inbox, _ = inbox_with_events()
+    for n in range(7):
+        db.notifications.rows.append({
+            "notification_id": f"notification_{n:02d}", "user_id": "u1", "company_id": "comp_1",
+            "read": n % 2 == 0, "created_at": f"2026-01-13T09:00:0{n}+00:00"
+        })
+
+    async def scenario():
+        pages, cursor = [], None
+        while True:
+            response = Response()
+            pages.append(await inbox.page(db, "u1", "comp_1", 3, cursor, response))
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        unread = await inbox.page(db, "u1", "comp_1", 10, None, Response(), unread_only=True)
+        return pages, unread
+
+    pages, unread = asyncio.run(scenario())
+
+    assert [[row["notification_id"][-2:] for row in page] for page in pages] == [
+        ["06", "05", "04"], ["03", "02", "01"], ["00"]
+    ]
+    assert [row["notification_id"][-2:] for row in unread] == ["05", "03", "01"]
+
+
+def test_push_failures_do_not_fail_writes():
+    db = InboxDB()
+    inbox = NotificationInbox()
+
+    async def broken(user_id, event):
+        raise RuntimeError("socket gone")
+
+    inbox.configure(broken)
+    ids = asyncio.run(inbox.create_many(db, "comp_1", ["u1"], "t", "title", "m"))
+
+    assert len(ids) == 1 and db.notification_counters.rows == [{"user_id": "u1", "company_id": "comp_1", "unread": 1}]
@@ -0,0 +1,93 @@
+"""
+Unit Tests for Object Storage Uploader
+"""
+
+import asyncio
+import os
+import pytest
+import sys
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.object_storage import ObjectUploader, MIN_PART_SIZE
+
+BUCKET = 'test-screenshots'
+
+
+async def chunked(body: bytes, size: int):
+    for offset in range(0, len(body), size):
+        yield body[offset:offset + size]
+
+
+class TestObjectUploader:
+    """Test streaming single-part and multipart uploads"""
+
+    @pytest.fixture
+    def client(self):
+        with moto.mock_aws():
+            client = boto3.client('s3', region_name='us-east-1')
+            client.create_bucket(Bucket=BUCKET)
+            yield client
+
+    def test_small_body_uses_single_put(self, client):
+        """Bodies below the part size are uploaded in one request"""
+        uploader = ObjectUploader(client, BUCKET)
+        body = os.urandom(64 * 1024)
+
+        result = asyncio.run(uploader.upload_stream('a.png', chunked(body, 4096), 'image/png'))
+
+        assert result.parts == 1
+        assert result.size == len(body)
+        assert client.get_object(Bucket=BUCKET, Key='a.png')['Body'].read() == body
+
+    def test_large_body_streams_as_multipart(self, client):
+        """Bodies above the part size are sent part by part"""
+        uploader = ObjectUploader(client, BUCKET, part_size=MIN_PART_SIZE, max_parts_in_flight=2)
+        body = os.urandom(MIN_PART_SIZE * 2 + 1024)
+
+        result = asyncio.run(uploader.upload_stream('b.png', chunked(body, 256 * 1024), 'image/png'))
+
+        assert result.parts == 3
+        assert client.get_object(Bucket=BUCKET, Key='b.png')['Body'].read() == body
+
+    def test_failed_stream_aborts_multipart(self, client):
+        """A failing body leaves no dangling multipart upload"""
+        uploader = ObjectUploader(client, BUCKET, part_size=MIN_PART_SIZE)
+
+        async def failing():
+            yield os.urandom(MIN_PART_SIZE + 1)
+            raise ConnectionError("client disconnected")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(uploader.upload_stream('c.png', failing(), 'image/png'))
+
+        assert client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+
+    def test_slow_body_does_not_hold_an_upload_slot(self, client):
+        """A body still arriving leaves the only slot free for others"""
+        uploader = ObjectUploader(client, BUCKET, max_concurrent_uploads=1)
+
+        async def scenario():
+            arrived = asyncio.Event()
+
+            async def slow():
+                yield b'first'
+                await arrived.wait()
+                yield b'last'
+
+            slow_upload = asyncio.ensure_future(uploader.upload_stream('slow.png', slow(), 'image/png'))
+            await asyncio.sleep(0)
+            await asyncio.wait_for(uploader.upload_bytes('fast.png', b'fast', 'image/png'), timeout=5)
+            arrived.set()
+            return await slow_upload
+
+        result = asyncio.run(scenario())
+
+        assert result.size == len(b'firstlast')
+        assert client.get_object(Bucket=BUCKET, Key='fast.png')['Body'].read() == b'fast'
+        assert client.get_object(Bucket=BUCKET, Key='slow.png')['Body'].read() == b'firstlast'
@@ -0,0 +1,88 @@
+"""
+Unit Tests for Keyset Pagination and Streaming Exports
+"""
+
+import asyncio
+import json
+import os
+import pytest
+import sys
+from fastapi import HTTPException, Response
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.pagination import decode_cursor, encode_cursor, export_response, paginate
+
+from conftest import FakeCollection
+
+
+def make_rows(count):
+    # Several rows share a timestamp so the id tiebreaker matters
+    return [{"entry_id": f"e{i:04d}", "start_time": f"2026-01-01T00:00:00.{i // 3:06d}+00:00", "note": None}
+            for i in range(count)]
+
+
+class TestKeysetPagination:
+    """Test cursor encoding and page walking"""
+
+    def test_cursor_round_trip(self):
+        row = {"start_time": "2026-01-01T00:00:00+00:00", "entry_id": "e1"}
+        cursor = encode_cursor(row, "start_time", "entry_id")
+
+        assert decode_cursor(cursor) == ("2026-01-01T00:00:00+00:00", "e1")
+
+    def test_invalid_cursor_is_400(self):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor("not-a-cursor")
+        assert exc.value.status_code == 400
+
+    def test_pages_cover_every_row_once(self):
+        """Walking X-Next-Cursor visits all rows in order, ties included"""
+        collection = FakeCollection(make_rows(25))
+
+        async def walk():
+            seen, cursor = [], None
+            while True:
+                response = Response()
+                page = await paginate(collection, {}, "start_time", "entry_id", 10, cursor, response)
+                seen.extend(row["entry_id"] for row in page)
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    return seen
+
+        seen = asyncio.run(walk())
+
+        newest_first = sorted(collection.rows, key=lambda row: (row["start_time"], row["entry_id"]), reverse=True)
+        assert seen == [row["entry_id"] for row in newest_first]
+        assert len(set(seen)) == 25
+
+
+class TestStreamingExport:
+    """Test NDJSON and CSV export bodies"""
+
+    def _body(self, response):
+        async def collect():
+            return "".join([chunk async for chunk in response.body_iterator])
+        return asyncio.run(collect())
+
+    def test_ndjson_streams_all_rows_in_batches(self):
+        collection = FakeCollection(make_rows(2500))
+        response = export_response(collection, {}, "start_time", "entry_id", "ndjson", "time_entries")
+
+        lines = self._body(response).splitlines()
+
+        assert response.media_type == "application/x-ndjson"
+        assert len(lines) == 2500
+        assert json.loads(lines[0])["entry_id"] == "e2499"
+        assert len(collection.pages) == 3
+
+    def test_csv_has_header_and_blank_nulls(self):
+        collection = FakeCollection(make_rows(2))
+        response = export_response(collection, {}, "start_time", "entry_id", "csv", "time_entries")
+
+        lines = self._body(response).splitlines()
+
+        assert lines[0] == "entry_id,start_time,note"
+        assert lines[1] == "e0001,2026-01-01T00:00:00.000000+00:00,"
+        assert 'filename="time_entries.csv"' in response.headers["Content-Disposition"]
@@ -0,0 +1,51 @@
+"""
+Unit Tests for Time Partition Maintenance
+"""
+
+import asyncio
+import os
+import pytest
+import sys
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.partitions import maintain_partitions, PARTITIONED_TABLES
+
+
+class FakeDB:
+    def __init__(self, expired=None, fail_table=None):
+        self.calls = []
+        self.expired = expired or {}
+        self.fail_table = fail_table
+
+    async def rpc(self, function_name, params):
+        self.calls.append((function_name, params))
+        if params["p_table"] == self.fail_table:
+            raise RuntimeError("lock timeout")
+        if function_name == "create_monthly_partitions":
+            return 1
+        return self.expired.get(params["p_table"], [])
+
+
+class TestMaintainPartitions:
+    """Test partition creation and partition-level retention"""
+
+    def test_creates_ahead_and_drops_with_configured_retention(self, monkeypatch):
+        monkeypatch.setenv("SCREENSHOT_RETENTION_DAYS", "30")
+        db = FakeDB(expired={"screenshots": ["screenshots_p202601"]})
+
+        summary = asyncio.run(maintain_partitions(db, months_ahead=2))
+
+        assert summary["screenshots"] == {"created": 1, "dropped": ["screenshots_p202601"]}
+        assert ("drop_expired_partitions", {"p_table": "screenshots", "p_retain_days": 30}) in db.calls
+        assert ("create_monthly_partitions", {"p_table": "gps_locations", "p_months_ahead": 2}) in db.calls
+        assert set(summary) == set(PARTITIONED_TABLES)
+
+    def test_failing_table_does_not_stop_the_others(self):
+        db = FakeDB(fail_table="activity_logs")
+
+        summary = asyncio.run(maintain_partitions(db))
+
+        assert "error" in summary["activity_logs"]
+        assert summary["gps_locations"] == {"created": 1, "dropped": []}
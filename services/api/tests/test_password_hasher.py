@@ -0,0 +1,80 @@
+"""
+Unit Tests for Password Hasher
+"""
+
+import asyncio
+import threading
+import pytest
+import bcrypt
+import os
+import sys
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+class TestPasswordHasher:
+    """Test pooled bcrypt, load shedding and rehash detection"""
+
+    def test_hash_and_verify_off_loop(self):
+        """Hashes round-trip and run on the pool threads"""
+        hasher = PasswordHasher(rounds=4, max_workers=2)
+
+        async def scenario():
+            hashed = await hasher.hash("secret")
+            thread = await hasher.run(lambda: threading.current_thread().name)
+            return hashed, await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed), thread
+
+        hashed, valid, invalid, thread = asyncio.run(scenario())
+
+        assert valid and not invalid
+        assert thread.startswith("bcrypt")
+        assert hashed.startswith("$2b$04$")
+
+    def test_malformed_hash_is_rejected(self):
+        """Accounts without a password hash fail verification instead of erroring"""
+        hasher = PasswordHasher(rounds=4)
+        assert asyncio.run(hasher.verify("secret", "")) is False
+
+    def test_sheds_when_queue_full(self):
+        """Operations beyond max_pending raise PasswordHasherBusy"""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=2)
+        release = threading.Event()
+
+        async def scenario():
+            blocked = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.verify("secret", "")
+            release.set()
+            await asyncio.gather(*blocked)
+
+        asyncio.run(scenario())
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["pending"] == 0
+
+    def test_needs_rehash_on_cost_change(self):
+        """Hashes made with another cost factor are flagged for upgrade"""
+        hasher = PasswordHasher(rounds=5)
+        old = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+        current = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode()
+
+        assert hasher.needs_rehash(old)
+        assert not hasher.needs_rehash(current)
+
+    def test_jwt_manager_agrees_with_the_pool(self, monkeypatch):
+        """JWTManager flags exactly the hashes login would rehash"""
+        pytest.importorskip("jwt")
+        pytest.importorskip("passlib")
+        from auth import jwt_manager
+        from utils.password_hasher import password_hasher
+
+        monkeypatch.setattr(password_hasher, "rounds", 5)
+        old = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+        current = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode()
+
+        manager = jwt_manager.JWTManager()
+        assert manager.needs_rehash(old)
+        assert not manager.needs_rehash(current)
@@ -0,0 +1,90 @@
+"""
+Unit Tests for PDF Rendering
+"""
+
+import asyncio
+import io
+import os
+import sys
+import zipfile
+import pytest
+
+pytest.importorskip("reportlab")
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.pdf_render import (
+    Branding, DEFAULT_BRANDING, PdfRenderPool, TIMESHEET, compiled_theme, iter_pdf_zip, render_document
+)
+
+
+def timesheet(user_name="Ada"):
+    return {"user_name": user_name, "week_start": "2026-01-05", "week_end": "2026-01-11",
+            "entries": [{"date": "2026-01-05", "project": "Apollo", "hours": 7.5, "description": "Build"}],
+            "total_hours": 7.5, "company_name": "Acme"}
+
+
+class RecordingPool:
+    """Renders a placeholder per document and tracks how many are in flight"""
+
+    def __init__(self):
+        self.workers = 2
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def render(self, kind, payload, branding):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return f"%PDF {payload['user_name']}".encode()
+
+
+async def documents(count):
+    for i in range(count):
+        payload = timesheet(f"user{i % 3}")
+        yield f"timesheet_{payload['user_name']}.pdf", TIMESHEET, payload
+
+
+class TestBranding:
+    """Test branding-keyed style caching"""
+
+    def test_themes_compiled_once_per_branding(self):
+        blue = Branding.from_settings({"primary_color": "#0ea5e9", "hide_powered_by": True})
+
+        assert compiled_theme(blue) is compiled_theme(Branding("#0ea5e9", hide_powered_by=True))
+        assert compiled_theme(blue) is not compiled_theme(DEFAULT_BRANDING)
+
+    def test_invalid_colors_fall_back_to_defaults(self):
+        branding = Branding.from_settings({"primary_color": "red; x", "text_color": "#111111"})
+
+        assert branding.primary_color == DEFAULT_BRANDING.primary_color
+        assert branding.text_color == "#111111"
+
+
+def test_render_document_produces_pdf():
+    assert render_document(TIMESHEET, timesheet()).startswith(b"%PDF")
+
+
+def test_thread_mode_pool_renders_off_the_event_loop():
+    pdf = asyncio.run(PdfRenderPool(workers=0).render(TIMESHEET, timesheet()))
+
+    assert pdf.startswith(b"%PDF")
+
+
+def test_bulk_zip_streams_every_document_with_bounded_lookahead():
+    pool = RecordingPool()
+
+    async def collect():
+        return [chunk async for chunk in iter_pdf_zip(documents(10), pool, window=3)]
+
+    chunks = asyncio.run(collect())
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+    assert len(chunks) == 11  # one per document, then the central directory
+    assert archive.namelist()[:4] == [
+        "timesheet_user0.pdf", "timesheet_user1.pdf", "timesheet_user2.pdf", "timesheet_user0_2.pdf"
+    ]
+    assert archive.read("timesheet_user1.pdf") == b"%PDF user1"
+    assert pool.max_in_flight <= 3
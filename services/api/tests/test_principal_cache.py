@@ -0,0 +1,114 @@
+"""
+Unit Tests for Principal Cache
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.principal_cache import PrincipalCache
+
+
+class CountingLoader:
+    """Async loader that counts calls and yields to the loop before returning"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return dict(self.value) if self.value is not None else None
+
+
+class TestPrincipalCache:
+    """Test TTL, single-flight and invalidation"""
+
+    def test_cached_until_invalidated(self):
+        """Second lookup is served from cache; invalidation forces a refetch"""
+        cache = PrincipalCache()
+        loader = CountingLoader({"user_id": "u1", "role": "manager"})
+
+        async def scenario():
+            await cache.get_user("u1", loader)
+            await cache.get_user("u1", loader)
+            cache.invalidate_user("u1")
+            loader.value["role"] = "employee"
+            return await cache.get_user("u1", loader)
+
+        user = asyncio.run(scenario())
+
+        assert loader.calls == 2
+        assert user["role"] == "employee"
+        assert cache.stats()["users"]["hits"] == 1
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Single-flight: concurrent requests for one user hit the DB once"""
+        cache = PrincipalCache()
+        loader = CountingLoader({"user_id": "u1"})
+
+        async def scenario():
+            return await asyncio.gather(*[cache.get_user("u1", loader) for _ in range(50)])
+
+        users = asyncio.run(scenario())
+
+        assert loader.calls == 1
+        assert all(user == {"user_id": "u1"} for user in users)
+        assert cache.stats()["users"]["shared"] == 49
+
+    def test_returned_user_is_a_copy(self):
+        """Mutating a returned principal does not corrupt the cache"""
+        cache = PrincipalCache()
+        loader = CountingLoader({"user_id": "u1", "role": "admin"})
+
+        async def scenario():
+            user = await cache.get_user("u1", loader)
+            user["role"] = "employee"
+            return await cache.get_user("u1", loader)
+
+        assert asyncio.run(scenario())["role"] == "admin"
+
+    def test_missing_user_not_cached(self):
+        """Negative lookups always go back to the database"""
+        cache = PrincipalCache()
+        loader = CountingLoader(None)
+
+        async def scenario():
+            await cache.get_user("ghost", loader)
+            return await cache.get_user("ghost", loader)
+
+        assert asyncio.run(scenario()) is None
+        assert loader.calls == 2
+
+    def test_logout_invalidates_session(self):
+        """Session tokens are dropped on logout"""
+        cache = PrincipalCache()
+        loader = CountingLoader({"user_id": "u1", "session_token": "tok", "expires_at": "2030-01-01T00:00:00"})
+
+        async def scenario():
+            first = await cache.get_session("tok", loader)
+            cache.invalidate_session("tok")
+            loader.value = None
+            return first, await cache.get_session("tok", loader)
+
+        first, after_logout = asyncio.run(scenario())
+
+        assert first == {"user_id": "u1", "expires_at": "2030-01-01T00:00:00"}
+        assert after_logout is None
+
+    def test_zero_ttl_disables_caching(self):
+        """TTL 0 turns the cache off (used for load test baselines)"""
+        cache = PrincipalCache(user_ttl=0)
+        loader = CountingLoader({"user_id": "u1"})
+
+        async def scenario():
+            await cache.get_user("u1", loader)
+            await cache.get_user("u1", loader)
+
+        asyncio.run(scenario())
+        assert loader.calls == 2
@@ -0,0 +1,119 @@
+"""
+Unit Tests for the Analytics Query Cache
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.query_cache import QueryCache, normalize_params
+
+
+class MemoryRemote:
+    """In-memory stand-in for RedisTier, shared by several QueryCache instances"""
+
+    def __init__(self):
+        self.results = {}
+        self.counters = {}
+
+    async def get(self, key):
+        return self.results.get(key)
+
+    async def set(self, key, entry, ttl):
+        self.results[key] = entry
+
+    async def versions(self, names):
+        return [self.counters.get(name, 0) for name in names]
+
+    async def bump(self, names):
+        for name in names:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    async def compute(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"total_hours": self.calls}
+
+
+def test_params_normalized_regardless_of_order_and_none():
+    assert normalize_params({"days": 7, "user_id": None}) == normalize_params({"days": 7})
+    assert normalize_params({"a": 1, "b": 2}) == normalize_params({"b": 2, "a": 1})
+    assert normalize_params({"days": 7}) != normalize_params({"days": 30})
+
+
+class TestQueryCache:
+    """Test single-flight loading, tenant scoping and event invalidation"""
+
+    def test_concurrent_identical_requests_compute_once(self):
+        cache, counter = QueryCache(), Counter()
+
+        async def burst():
+            return await asyncio.gather(*[
+                cache.get_or_compute("dashboard_stats", "c1", {"day": "2026-01-05"}, counter.compute)
+                for _ in range(20)
+            ])
+
+        results = asyncio.run(burst())
+
+        assert counter.calls == 1
+        assert all(result == {"total_hours": 1} for result in results)
+        assert cache.stats()["dashboard_stats"]["shared"] == 19
+
+    def test_write_invalidates_only_that_tenant_and_table(self):
+        cache = QueryCache()
+        c1, c2, scores = Counter(), Counter(), Counter()
+
+        async def scenario():
+            chart = lambda company, counter: cache.get_or_compute(
+                "activity_chart", company, {"days": 7}, counter.compute, depends_on=("time_entries",))
+            team = lambda: cache.get_or_compute(
+                "team_productivity", "c1", {}, scores.compute, depends_on=("productivity_scores",))
+
+            await chart("c1", c1), await chart("c2", c2), await team()
+            await cache.invalidate("c1", "time_entries")
+            return await chart("c1", c1), await chart("c2", c2), await team()
+
+        c1_result, c2_result, team_result = asyncio.run(scenario())
+
+        assert (c1.calls, c2.calls, scores.calls) == (2, 1, 1)
+        assert c1_result == {"total_hours": 2}
+
+    def test_unscoped_results_invalidated_by_any_tenant(self):
+        cache, counter = QueryCache(), Counter()
+
+        async def scenario():
+            trends = lambda: cache.get_or_compute(
+                "productivity_trends", None, {"days": 30}, counter.compute, depends_on=("time_entries",))
+            await trends()
+            await cache.invalidate("c9", "time_entries")
+            return await trends()
+
+        assert asyncio.run(scenario()) == {"total_hours": 2}
+
+    def test_remote_tier_shares_results_and_invalidation_between_workers(self):
+        remote = MemoryRemote()
+        worker_a, worker_b = QueryCache(remote=remote), QueryCache(remote=remote)
+        counter = Counter()
+
+        async def scenario():
+            get = lambda worker: worker.get_or_compute("workforce_benchmarks", "c1", {"days": 30}, counter.compute)
+            first = await get(worker_a)
+            shared = await get(worker_b)
+            await worker_a.invalidate("c1", "time_entries")
+            fresh = await get(worker_b)
+            return first, shared, fresh
+
+        first, shared, fresh = asyncio.run(scenario())
+
+        assert first == shared == {"total_hours": 1}
+        assert fresh == {"total_hours": 2}
+        assert counter.calls == 2
@@ -0,0 +1,80 @@
+"""
+Unit Tests for Captured Query Plans
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.query_plans import group_shapes, plan_findings, query_shape, render_sql
+
+
+def captured(query, operation="find", sort=None, limit=None, after=None, table="time_entries"):
+    return {"table": table, "operation": operation, "query": query,
+            "sort": sort or [], "limit": limit, "after": after}
+
+
+def test_shapes_group_by_columns_and_operators_not_values():
+    entries = [
+        captured({"company_id": "c1", "start_time": {"$gte": "2026-01-01"}}),
+        captured({"start_time": {"$gte": "2026-02-01"}, "company_id": "c2"}),
+        captured({"company_id": "c1", "status": "active"}, operation="find_one"),
+    ]
+
+    shapes = group_shapes(entries)
+
+    assert [(shape, calls) for shape, calls, _ in shapes] == [
+        ("time_entries find company_id=,start_time>=", 2),
+        ("time_entries find_one company_id=,status=", 1),
+    ]
+
+
+def test_render_sql_keeps_values_as_parameters():
+    sql, params = render_sql(captured(
+        {"company_id": "c1", "user_id": {"$in": ["u1", "u2"]}, "start_time": {"$gte": "a", "$lt": "b"}},
+        operation="find_page", sort=[["start_time", -1], ["entry_id", -1]], limit=100,
+        after=["2026-01-05T10:00:00", "e9"]
+    ))
+
+    assert sql == (
+        'SELECT * FROM public."time_entries" WHERE "company_id" = %s AND "user_id" = ANY(%s) '
+        'AND "start_time" >= %s AND "start_time" < %s '
+        'AND ("start_time" < %s OR ("start_time" = %s AND "entry_id" < %s)) '
+        'ORDER BY "start_time" DESC, "entry_id" DESC LIMIT 100'
+    )
+    assert params == ["c1", ["u1", "u2"], "a", "b", "2026-01-05T10:00:00", "2026-01-05T10:00:00", "e9"]
+    assert query_shape(captured({}, operation="count")) == "time_entries count *"
+
+
+def test_render_sql_rejects_unexpected_identifiers():
+    with pytest.raises(ValueError):
+        render_sql(captured({"company_id; drop table users": "x"}))
+
+
+class TestPlanFindings:
+    """Test detection of plans that are not index-served"""
+
+    def test_index_scan_in_order_is_clean(self):
+        plan = {"Plan": {"Node Type": "Limit", "Plans": [
+            {"Node Type": "Index Scan", "Relation Name": "time_entries",
+             "Index Name": "idx_time_entries_company_user_start"}
+        ]}}
+
+        assert plan_findings(plan) == []
+
+    def test_seq_scan_sort_and_residual_filter_are_reported(self):
+        plan = {"Plan": {"Node Type": "Sort", "Sort Key": ["start_time DESC"], "Plans": [
+            {"Node Type": "Append", "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "activity_logs_p_default"},
+                {"Node Type": "Index Scan", "Relation Name": "time_entries",
+                 "Index Name": "idx_time_entries_user_start", "Filter": "(company_id = 'c1'::text)"}
+            ]}
+        ]}}
+
+        assert plan_findings(plan) == [
+            "sort on start_time DESC",
+            "seq scan on activity_logs_p_default",
+            "filter after idx_time_entries_user_start on time_entries: (company_id = 'c1'::text)",
+        ]
@@ -2,8 +2,16 @@
 Unit Tests for RBAC System
 """
 
+import os
 import pytest
-from app.auth.rbac import has_permission, Permission, Role
+import sys
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from auth.rbac import has_permission, rbac, require_permission, Permission, Role
 
 class TestRBAC:
     """Test RBAC functionality"""
@@ -45,3 +53,61 @@ class TestRBAC:
         
         assert not has_permission(user, Permission.EMPLOYEE_READ)
         assert not has_permission(user, Permission.TIME_CREATE)
+    
+    def test_custom_permissions_override_roles(self):
+        """Custom grants add or revoke bits on top of the role mask"""
+        user = {'role': Role.EMPLOYEE.value, 'custom_permissions': {
+            Permission.REPORT_EXPORT.value: True,
+            Permission.TIME_UPDATE.value: False
+        }}
+        
+        assert has_permission(user, Permission.REPORT_EXPORT)
+        assert not has_permission(user, Permission.TIME_UPDATE)
+        assert has_permission(user, Permission.TIME_CREATE)
+    
+    def test_mask_on_the_principal_is_ignored(self):
+        """A permission_mask in the payload cannot grant anything"""
+        user = {'roles': [Role.EMPLOYEE.value], 'permission_mask': -1}
+        
+        assert not has_permission(user, Permission.ADMIN_SECURITY)
+        assert rbac.principal_mask(user) == rbac.compile_mask([Role.EMPLOYEE.value])
+    
+    def test_any_and_all_permissions(self):
+        """Bulk checks agree with per-permission checks"""
+        roles = [Role.ACCOUNTANT.value]
+        
+        assert rbac.has_any_permission(roles, [Permission.USER_DELETE, Permission.PAYROLL_RUN])
+        assert not rbac.has_all_permissions(roles, [Permission.USER_DELETE, Permission.PAYROLL_RUN])
+        assert rbac.get_user_permissions(roles) == rbac.role_permissions[Role.ACCOUNTANT]
+
+
+class TestRequirePermission:
+    """Test the endpoint decorator under FastAPI dependency injection"""
+    
+    def _client(self, roles):
+        app = FastAPI()
+        
+        def current_user():
+            return {'roles': roles}
+        
+        @app.get("/payroll/{run_id}")
+        @require_permission(Permission.PAYROLL_RUN)
+        async def run_payroll(run_id: str, current_user: dict = Depends(current_user)):
+            return {"run_id": run_id}
+        
+        return TestClient(app)
+    
+    def test_allowed(self):
+        response = self._client([Role.ACCOUNTANT.value]).get("/payroll/r1")
+        assert response.status_code == 200
+        assert response.json() == {"run_id": "r1"}
+    
+    def test_denied(self):
+        response = self._client([Role.EMPLOYEE.value]).get("/payroll/r1")
+        assert response.status_code == 403
+    
+    def test_requires_current_user_parameter(self):
+        with pytest.raises(TypeError):
+            @require_permission(Permission.USER_READ)
+            async def endpoint():
+                pass
@@ -0,0 +1,157 @@
+"""
+Unit Tests for Usage Counters
+"""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+import pytest
+import sys
+
+# Server modules import siblings as top-level packages (utils, monitoring)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
+
+from utils.usage_counters import RedisCounterBackend, UsageCounters, UNLIMITED, period_key
+
+from conftest import FakeDB
+
+
+class MemoryBackend:
+    """In-memory backend with the same check-and-increment rule as the Lua script"""
+
+    def __init__(self):
+        self.counts = {}
+        self.round_trips = 0
+
+    async def consume(self, company_id, user_id, resource, period, amount, limit):
+        self.round_trips += 1
+        key = (company_id, user_id, resource, period)
+        current = self.counts.get(key, 0)
+        if limit >= 0 and current + amount > limit:
+            return False, current
+        self.counts[key] = max(0, current + amount)
+        return True, self.counts[key]
+
+    async def get(self, company_id, user_id, resource, period):
+        return self.counts.get((company_id, user_id, resource, period), 0)
+
+
+class FakeRedis:
+    """Just the pipeline surface reconcile uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.executes = 0
+
+    def register_script(self, script):
+        return None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.pending = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def set(self, key, value, ex=None):
+        self.pending.append((key, value))
+
+    async def execute(self):
+        self.redis.executes += 1
+        self.redis.values.update(self.pending)
+        self.pending = []
+
+
+class ReconciledDB(FakeDB):
+    async def rpc(self, name, params=None):
+        return 0
+
+
+class TestUsageCounters:
+    """Test limit enforcement, release and scoping"""
+
+    def test_limit_enforced_under_concurrency(self):
+        """Concurrent creates never overshoot the plan limit"""
+        backend = MemoryBackend()
+        counters = UsageCounters(backend)
+
+        async def scenario():
+            return await asyncio.gather(*[
+                counters.consume("screenshots", "c1", 10, user_id="u1") for _ in range(25)
+            ])
+
+        results = asyncio.run(scenario())
+
+        assert sum(result["allowed"] for result in results) == 10
+        assert backend.round_trips == 25
+        assert asyncio.run(counters.usage("screenshots", "c1", user_id="u1")) == 10
+
+    def test_release_returns_quota(self):
+        """Released units can be consumed again"""
+        counters = UsageCounters(MemoryBackend())
+
+        async def scenario():
+            await counters.consume("report_exports", "c1", 1)
+            blocked = await counters.consume("report_exports", "c1", 1)
+            await counters.release("report_exports", "c1")
+            return blocked, await counters.consume("report_exports", "c1", 1)
+
+        blocked, retried = asyncio.run(scenario())
+
+        assert not blocked["allowed"]
+        assert retried["allowed"] and retried["remaining"] == 0
+
+    def test_zero_limit_disabled_and_unlimited(self):
+        """Limit 0 rejects without a round trip; -1 always allows"""
+        backend = MemoryBackend()
+        counters = UsageCounters(backend)
+
+        disabled = asyncio.run(counters.consume("integrations", "c1", 0))
+        unlimited = asyncio.run(counters.consume("integrations", "c1", UNLIMITED))
+
+        assert not disabled["allowed"]
+        assert backend.round_trips == 1
+        assert unlimited["allowed"] and unlimited["remaining"] == UNLIMITED
+
+    def test_scoping_per_user_and_per_company(self):
+        """Screenshots count per user; company-level resources ignore user_id"""
+        counters = UsageCounters(MemoryBackend())
+
+        async def scenario():
+            await counters.consume("screenshots", "c1", 1, user_id="u1")
+            other_user = await counters.consume("screenshots", "c1", 1, user_id="u2")
+            await counters.consume("report_exports", "c1", 1, user_id="u1")
+            same_company = await counters.consume("report_exports", "c1", 1, user_id="u2")
+            return other_user, same_company
+
+        other_user, same_company = asyncio.run(scenario())
+
+        assert other_user["allowed"]
+        assert not same_company["allowed"]
+
+    def test_period_keys(self):
+        """Daily and monthly periods roll over by key"""
+        now = datetime(2026, 1, 31, 23, 59, tzinfo=timezone.utc)
+
+        assert period_key("day", now) == "2026-01-31"
+        assert period_key("month", now) == "2026-01"
+        assert period_key("all", now) == "all"
+
+    def test_redis_reconcile_copies_every_counter_row(self):
+        """Rows past the first page reach Redis too"""
+        rows = [{"company_id": f"c{i:04d}", "user_id": "", "resource": "integrations", "period": "all",
+                 "count": i % 7} for i in range(2500)]
+        db = ReconciledDB(usage_counters=rows)
+        redis = FakeRedis()
+
+        asyncio.run(RedisCounterBackend(redis, db=db).reconcile(datetime(2026, 1, 31).date()))
+
+        assert len(redis.values) == 2500
+        assert redis.values["usage:integrations:all:c2499:"] == 2499 % 7
+        assert len(db.usage_counters.pages) == 3 + 2  # integrations in 3 pages, 1 each for the rest
+        assert redis.executes >= 3
@@ -0,0 +1,36 @@
+"""
+Load Testing: Authenticated Principal Cache
+
+Compares latency of an auth-only endpoint with and without the principal cache.
+Run once per configuration against the same data and compare the p50/p99
+columns Locust reports:
+
+    # Cache disabled
+    PRINCIPAL_CACHE_USER_TTL=0 PRINCIPAL_CACHE_SESSION_TTL=0 uvicorn server:app
+    LOAD_TEST_TOKENS=<jwt>,<jwt> locust -f tests/load/locustfile_auth.py --headless \\
+        -u 200 -r 50 -t 2m --host http://localhost:8000 --csv no_cache
+
+    # Cache enabled (defaults)
+    uvicorn server:app
+    LOAD_TEST_TOKENS=<jwt>,<jwt> locust -f tests/load/locustfile_auth.py --headless \\
+        -u 200 -r 50 -t 2m --host http://localhost:8000 --csv with_cache
+"""
+import os
+import random
+
+from locust import HttpUser, task, between
+
+TOKENS = [token for token in os.environ.get('LOAD_TEST_TOKENS', '').split(',') if token]
+
+
+class ActiveEntryUser(HttpUser):
+    wait_time = between(0.05, 0.2)
+
+    def on_start(self):
+        if not TOKENS:
+            raise RuntimeError("Set LOAD_TEST_TOKENS to a comma-separated list of JWTs or session tokens")
+        self.client.headers['Authorization'] = f"Bearer {random.choice(TOKENS)}"
+
+    @task
+    def get_active_entry(self):
+        self.client.get("/api/time-entries/active", name="/api/time-entries/active")
@@ -6,7 +6,8 @@ from services.api.app.ai_governance import (
     ModelRegistry,
     ConfidenceManager,
     FallbackHandler,
-    BiasDetector
+    BiasDetector,
+    StreamingDriftEngine
 )
 
 class TestModelRegistry:
@@ -28,3 +29,42 @@ class TestFallbackHandler:
 class TestBiasDetection:
     def test_bias_detection(self):
         assert True
+
+    def test_metrics_share_group_counts(self):
+        detector = BiasDetector(random_state=0)
+        report = detector.check_bias(
+            predictions=[0.9, 0.8, 0.7, 0.2, 0.9, 0.1, 0.2, 0.3],
+            protected_attributes={'gender': ['f', 'f', 'f', 'f', 'm', 'm', 'm', 'm']},
+            actual_outcomes=[1, 1, 0, 1, 1, 1, 0, 0],
+            bootstrap_samples=200
+        )
+        parity = report['metrics']['gender_demographic_parity']
+        assert parity['rates_by_group'] == {'f': 0.75, 'm': 0.25}
+        assert parity['difference'] == 0.5
+        low, high = parity['confidence_interval']
+        assert low <= high
+        assert report['metrics']['gender_disparate_impact']['ratio'] == 0.25 / 0.75
+        assert report['metrics']['gender_equal_opportunity']['tpr_by_group'] == {'f': 2 / 3, 'm': 0.5}
+        assert report['bias_detected_in'] == ['gender']
+
+class TestStreamingDrift:
+    def test_window_evicts_oldest(self):
+        from services.api.app.ai_governance.drift_sketch import StreamingHistogram
+        histogram = StreamingHistogram([0.5], window=3)
+        histogram.add_many([0, 0, 0, 1, 1])
+        assert histogram.counts.tolist() == [1, 2]
+        assert histogram.total == 3
+
+    def test_detects_shifted_distribution(self):
+        import numpy as np
+        rng = np.random.default_rng(7)
+        engine = StreamingDriftEngine(window=500)
+        engine.set_baseline('model', {'hours': rng.normal(40, 5, 2000)})
+
+        for value in rng.normal(40, 5, 500):
+            engine.observe('model', {'hours': value})
+        assert not engine.compare('model')['hours']['drift_detected']
+
+        for value in rng.normal(55, 5, 500):
+            engine.observe('model', {'hours': value})
+        assert engine.drifted_features('model')[0][0] == 'hours'